@@ -1,3 +1,6 @@
+-- Recherche approchée (trigrammes) : installée dans public, commun à tous les schémas
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+
 -----------------------------------------------------
 -- Utilisateur 
 -----------------------------------------------------
@@ -9,9 +12,21 @@ CREATE TABLE utilisateur (
     nom                     VARCHAR(50),
     prenom                  VARCHAR(30),
     date_de_naissance       DATE,
-    sexe                    VARCHAR(10)
+    sexe                    VARCHAR(10),
+    -- Compteurs tenus à jour par AbonnementDao (même transaction que l'abonnement)
+    nb_suiveurs             INTEGER NOT NULL DEFAULT 0,
+    nb_suivis               INTEGER NOT NULL DEFAULT 0,
+    -- Texte de la recherche de profils (voir UtilisateurDao.rechercher)
+    recherche               TEXT GENERATED ALWAYS AS (
+        lower(pseudo || ' ' || coalesce(prenom, '') || ' ' || coalesce(nom, ''))
+    ) STORED
 );
 
+-- Recherche approchée et par sous-chaîne sur pseudo, prénom et nom
+CREATE INDEX utilisateur_recherche_trgm_idx ON utilisateur USING gin (recherche gin_trgm_ops);
+-- Recherche par début de pseudo (autocomplétion, recherches de moins de 3 caractères)
+CREATE INDEX utilisateur_pseudo_prefixe_idx ON utilisateur (lower(pseudo) text_pattern_ops);
+
 -----------------------------------------------------
 -- Credentials (authentification)
 -----------------------------------------------------
@@ -40,6 +55,10 @@ CREATE TABLE activite (
     FOREIGN KEY (id_utilisateur) REFERENCES utilisateur(id_utilisateur) ON DELETE CASCADE
 );
 
+-- Activités récentes d'un utilisateur (fil d'actualité)
+-- (même ordre que les requêtes : les activités sans date en dernier)
+CREATE INDEX activite_utilisateur_date_idx ON activite (id_utilisateur, date_activite DESC NULLS LAST, id_activite DESC);
+
 -----------------------------------------------------
 -- Commentaire
 -----------------------------------------------------
@@ -51,10 +70,17 @@ CREATE TABLE commentaire (
     id_auteur               INTEGER, 
     contenu             VARCHAR(300),
     date_commentaire        DATE,
+    -- Recherche plein texte (configuration française), calculée à l'insertion
+    contenu_tsv             TSVECTOR GENERATED ALWAYS AS
+                                (to_tsvector('french', coalesce(contenu, ''))) STORED,
     FOREIGN KEY (id_activite) REFERENCES activite(id_activite) ON DELETE CASCADE,  
     FOREIGN KEY (id_auteur) REFERENCES utilisateur(id_utilisateur) ON DELETE CASCADE
 );
 
+CREATE INDEX commentaire_activite_idx ON commentaire (id_activite);
+CREATE INDEX commentaire_auteur_idx ON commentaire (id_auteur);
+CREATE INDEX commentaire_contenu_tsv_idx ON commentaire USING gin (contenu_tsv);
+
 -----------------------------------------------------
 -- Jaime
 -----------------------------------------------------
@@ -68,6 +94,9 @@ CREATE TABLE jaime (
     FOREIGN KEY (id_auteur) REFERENCES utilisateur(id_utilisateur) ON DELETE CASCADE
 );
 
+-- La clé primaire sert le comptage par activité, cet index les jaimes d'un auteur
+CREATE INDEX jaime_auteur_idx ON jaime (id_auteur);
+
 -----------------------------------------------------
 -- Abonnement
 -----------------------------------------------------
@@ -80,3 +109,42 @@ CREATE TABLE abonnement (
     FOREIGN KEY (id_utilisateur_suiveur) REFERENCES utilisateur(id_utilisateur) ON DELETE CASCADE,  
     FOREIGN KEY (id_utilisateur_suivi) REFERENCES utilisateur(id_utilisateur) ON DELETE CASCADE   
 );
+
+-- La clé primaire sert les recherches par suiveur, cet index celles par suivi
+CREATE INDEX abonnement_suivi_idx ON abonnement (id_utilisateur_suivi, id_utilisateur_suiveur);
+
+-----------------------------------------------------
+-- Compteurs des tendances (voir src/dao/compteurs_tendances.py)
+-----------------------------------------------------
+DROP TABLE IF EXISTS tendance_compteur CASCADE ;
+
+-- Pas de clé étrangère : les compteurs d'une activité supprimée expirent avec la période
+CREATE TABLE tendance_compteur (
+    heure                   INTEGER,  -- heures écoulées depuis le 01/01/1970 (UTC)
+    id_activite             INTEGER,
+    nb_jaimes               INTEGER NOT NULL DEFAULT 0,
+    nb_commentaires         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (heure, id_activite)
+);
+
+-----------------------------------------------------
+-- Notification (écrites par lots, voir src/dao/notification_dao.py)
+-----------------------------------------------------
+DROP TABLE IF EXISTS notification CASCADE ;
+
+CREATE TABLE notification (
+    id_notification         SERIAL PRIMARY KEY,
+    type_notification       VARCHAR(20) NOT NULL,  -- jaime, commentaire ou abonnement
+    id_destinataire         INTEGER NOT NULL,
+    id_auteur               INTEGER NOT NULL,
+    id_activite             INTEGER,
+    date_notification       TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    lue                     BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (id_destinataire) REFERENCES utilisateur(id_utilisateur) ON DELETE CASCADE,
+    FOREIGN KEY (id_auteur) REFERENCES utilisateur(id_utilisateur) ON DELETE CASCADE,
+    FOREIGN KEY (id_activite) REFERENCES activite(id_activite) ON DELETE CASCADE
+);
+
+-- Pages de la boîte de réception (par identifiant décroissant) et compteur des non lues
+CREATE INDEX notification_destinataire_idx ON notification (id_destinataire, id_notification DESC);
+CREATE INDEX notification_non_lues_idx ON notification (id_destinataire) WHERE NOT lue;
@@ -67,3 +67,15 @@ VALUES
     (993, 994),
     (994, 995),
     (995, 991);
+
+-----------------------------------------------------
+-- Insertion des notifications
+-----------------------------------------------------
+INSERT INTO notification (id_notification, type_notification, id_destinataire, id_auteur, id_activite, date_notification, lue)
+VALUES 
+    (991, 'abonnement', 991, 995, NULL, '2024-09-24 10:00:00+02', TRUE),
+    (992, 'commentaire', 991, 992, 991, '2024-09-25 18:00:00+02', FALSE),
+    (993, 'jaime', 991, 993, 991, '2024-09-25 19:00:00+02', FALSE);
+
+-- Les notifications créées par les tests doivent suivre celles insérées ici
+SELECT setval(pg_get_serial_sequence('notification', 'id_notification'), 993);
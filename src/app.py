@@ -1,51 +1,292 @@
-from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi.responses import (
+    RedirectResponse,
+    HTMLResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
+from fastapi import (
+    FastAPI,
+    Depends,
+    HTTPException,
+    status,
+    UploadFile,
+    File,
+    Request,
+    Response,
+    Query,
+)
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
+import os
+import json
+import math
+import time
+import uuid
+import asyncio
 import logging
-from utils.log_init import initialiser_logs
+import functools
+import contextvars
+
+from typing import Literal, Optional
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.log_init import initialiser_logs, id_requete, exporter_metriques_logs
+from utils.instrumentation import (
+    MesuresRequete,
+    mesures_requete,
+    metriques,
+    entete_server_timing,
+    signaler_n_plus_un,
+)
+from utils.profileur import Profileur, verrou_profilage
+from utils.securite import cache_identifiants
+from utils.cache import exporter_metriques_caches
+from utils.versions import etag, etag_correspond
+from utils.limiteur_debit import creer_limiteur
+from utils.compression import MiddlewareCompression
+from utils.taches_periodiques import TachePeriodique
 
 from service.activite_service import ActiviteService
 from service.utilisateur_service import UtilisateurService
 from service.abonnement_service import AbonnementService
 from service.statistiques_service import StatistiquesService
 from service.fil_dactualite_service import FilDactualiteService
+from service.suggestion_service import SuggestionService, INTERVALLE_PRECALCUL
+from service.tendance_service import TendanceService
+from service.notification_service import NotificationService
+
+from dao.compteurs_tendances import compteurs_tendances
+from dao.notifications_temps_reel import ecouteur_notifications
+from dao.notification_dao import tampon_notifications
+from dao.tampon_jaimes import tampon_jaimes
 
 from utils.gpx_parser import parse_gpx
 
 from exceptions import NotFoundError, AlreadyExistsError, InvalidPasswordError
+from modeles_api import (
+    UtilisateurReponse,
+    AutocompletionReponse,
+    ActiviteReponse,
+    CommentaireReponse,
+    CommentairesRechercheReponse,
+    JaimeReponse,
+    AbonnementReponse,
+    CompteursAbonnementsReponse,
+    MessageReponse,
+    MessageActiviteReponse,
+    NombreJaimesReponse,
+    StatistiquesTotalesReponse,
+    StatistiquesSemaineReponse,
+    SuggestionReponse,
+    TendancesReponse,
+    NotificationsReponse,
+)
 
 # --- Configuration ---
 
-app = FastAPI(title="Webservice Sports ENSAI")
+INTERVALLE_TENDANCES = float(os.environ.get("TENDANCES_INTERVALLE", "60"))
+# Délai (en secondes) sans notification au bout duquel un commentaire SSE est envoyé,
+# pour que les proxys ne ferment pas la connexion
+INTERVALLE_PING_NOTIFICATIONS = float(os.environ.get("NOTIFICATIONS_PING", "15"))
+
+
+@asynccontextmanager
+async def cycle_de_vie(app: FastAPI):
+    """Démarre les tâches de fond au lancement du serveur, les arrête à sa fermeture"""
+    taches = []
+    if INTERVALLE_PRECALCUL > 0:
+        taches.append(
+            TachePeriodique(
+                "precalcul-suggestions",
+                INTERVALLE_PRECALCUL,
+                SuggestionService().precalculer,
+            )
+        )
+    taches.append(
+        TachePeriodique(
+            "synchronisation-tendances",
+            INTERVALLE_TENDANCES,
+            compteurs_tendances.synchroniser,
+            delai_initial=INTERVALLE_TENDANCES,
+        )
+    )
+    for tache in taches:
+        tache.demarrer()
+    yield
+    for tache in taches:
+        tache.arreter()
+    ecouteur_notifications.arreter()
+    # Les jaimes et notifications en attente d'écriture ne sont pas perdus à l'arrêt
+    # (les jaimes d'abord : leur écriture crée des notifications)
+    tampon_jaimes.arreter()
+    tampon_notifications.arreter()
+    # Les derniers évènements comptés ne sont pas perdus à l'arrêt
+    try:
+        compteurs_tendances.ecrire_en_attente()
+    except Exception:
+        logging.exception("Écriture des compteurs des tendances impossible")
+
+
+app = FastAPI(title="Webservice Sports ENSAI", lifespan=cycle_de_vie)
 
 initialiser_logs("Webservice")
 
+# Ajouté en premier : c'est le middleware le plus interne, la compression est donc
+# comptée dans le temps mesuré par mesurer_requete
+app.add_middleware(
+    MiddlewareCompression, seuil=int(os.environ.get("COMPRESSION_SEUIL", "1024"))
+)
+
+
+@app.middleware("http")
+async def identifier_requete(request: Request, call_next):
+    """Associe un identifiant à chaque requête (repris de l'en-tête X-Request-ID s'il existe)
+    pour le retrouver dans les logs"""
+    valeur = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    jeton = id_requete.set(valeur)
+    try:
+        response = await call_next(request)
+    finally:
+        id_requete.reset(jeton)
+    response.headers["X-Request-ID"] = valeur
+    return response
+
+
+@app.middleware("http")
+async def mesurer_requete(request: Request, call_next):
+    """Mesure le temps total, le temps CPU et les requêtes SQL de chaque requête
+    (en-tête Server-Timing, métriques /metrics, détection des motifs N+1)
+    Le temps CPU est celui du processus : approximatif si plusieurs requêtes sont en cours"""
+    mesures = MesuresRequete()
+    jeton = mesures_requete.set(mesures)
+    debut, debut_cpu = time.perf_counter(), time.process_time()
+    statut = 500
+    try:
+        response = await call_next(request)
+        statut = response.status_code
+    finally:
+        mesures_requete.reset(jeton)
+        duree = time.perf_counter() - debut
+        route = getattr(request.scope.get("route"), "path", "inconnue")
+        metriques.ajouter_requete_http(request.method, route, statut, duree)
+        signaler_n_plus_un(mesures, request.method, route)
+    response.headers["Server-Timing"] = entete_server_timing(
+        mesures, duree, time.process_time() - debut_cpu
+    )
+    return response
+
+
 # Authentification basique
 
 security = HTTPBasic()
 
 
-def get_current_user(credentials: HTTPBasicCredentials = Depends(security)):
+# Pool dédié à la vérification des mots de passe (bcrypt libère le GIL) : le calcul
+# du hash ne bloque ni la boucle d'évènements ni le pool de threads des endpoints
+pool_authentification = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("AUTH_THREADS", os.cpu_count() or 1)),
+    thread_name_prefix="authentification",
+)
+
+
+# Tentatives d'authentification (hors cache) autorisées par adresse IP, et échecs
+# (mot de passe erroné) autorisés par pseudo. LIMITEUR_BACKEND=aucun les désactive
+limiteur_pseudo = creer_limiteur(
+    "pseudo",
+    capacite=float(os.environ.get("LIMITEUR_CAPACITE_PSEUDO", "10")),
+    debit=float(os.environ.get("LIMITEUR_DEBIT_PSEUDO", "0.2")),
+)
+limiteur_ip = creer_limiteur(
+    "ip",
+    capacite=float(os.environ.get("LIMITEUR_CAPACITE_IP", "50")),
+    debit=float(os.environ.get("LIMITEUR_DEBIT_IP", "2")),
+)
+
+
+async def appeler_limiteur(methode, cle: str):
+    """Appelle une méthode d'un limiteur, hors de la boucle d'évènements s'il fait des
+    entrées-sorties bloquantes (SQLite)"""
+    if not methode.__self__.bloquant:
+        return methode(cle)
+    return await asyncio.get_running_loop().run_in_executor(
+        pool_authentification, methode, cle
+    )
+
+
+async def get_current_user(
+    request: Request, credentials: HTTPBasicCredentials = Depends(security)
+):
     username = credentials.username
     password = credentials.password
 
+    # Identifiants vérifiés récemment : pas de calcul de hash ni d'accès à la base
+    utilisateur = cache_identifiants.obtenir(username, password)
+    if utilisateur is not None:
+        return utilisateur
+
+    # Trop de tentatives : refus avant tout accès à la base. Le seau du pseudo n'est
+    # que consulté : seuls les mots de passe erronés le vident
+    ip = request.client.host if request.client else "inconnue"
+    attente = await appeler_limiteur(limiteur_ip.consommer, ip)
+    if attente == 0:
+        attente = await appeler_limiteur(limiteur_pseudo.attente, username)
+    if attente > 0:
+        logging.warning(f"Authentification limitée pour {username} depuis {ip}")
+        raise HTTPException(
+            status_code=429,
+            detail="Authentification : trop de tentatives, réessayez plus tard",
+            headers={"Retry-After": str(math.ceil(attente))},
+        )
+
     try:
-        return UtilisateurService().se_connecter(username, password)
+        contexte = contextvars.copy_context()
+        utilisateur = await asyncio.get_running_loop().run_in_executor(
+            pool_authentification,
+            functools.partial(
+                contexte.run, UtilisateurService().se_connecter, username, password
+            ),
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail="Authentification : " + str(e))
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail="Authentification : " + str(e))
     except InvalidPasswordError as e:
+        await appeler_limiteur(limiteur_pseudo.consommer, username)
         raise HTTPException(status_code=401, detail="Authentification : " + str(e))
 
+    # Une authentification réussie n'est pas décomptée
+    await appeler_limiteur(limiteur_ip.rendre, ip)
+    return utilisateur
+
+
+def get_admin(user=Depends(get_current_user)):
+    """Utilisateur connecté, s'il fait partie des administrateurs (variable ADMIN_PSEUDOS)"""
+    admins = {p.strip() for p in os.environ.get("ADMIN_PSEUDOS", "").split(",") if p.strip()}
+    if user.pseudo not in admins:
+        raise HTTPException(status_code=403, detail="Réservé aux administrateurs")
+    return user
+
+
+# Requêtes conditionnelles
+
+
+def verifier_etag(request: Request, response: Response, type_ressource: str, id_ressource: int):
+    """Répond 304 (sans appeler les services) si le client a déjà la version courante
+    de la ressource (en-tête If-None-Match), sinon ajoute l'ETag à la réponse"""
+    valeur = etag(type_ressource, id_ressource)
+    if etag_correspond(request.headers.get("If-None-Match"), valeur):
+        raise HTTPException(status_code=304, headers={"ETag": valeur})
+    response.headers["ETag"] = valeur
+    response.headers["Cache-Control"] = "private, no-cache"
+
 
 # ----------------------------------------------------------
 
 # --- Endpoints Authentification ---
 
 
-@app.get("/me", tags=["Authentification"])
+@app.get("/me", tags=["Authentification"], response_model=UtilisateurReponse)
 def me(user=Depends(get_current_user)):
     """Se connecter ou consulter son profil utilisateur"""
     return user
@@ -59,7 +300,7 @@ async def logout():
     )
 
 
-@app.post("/inscription", tags=["Authentification"])
+@app.post("/inscription", tags=["Authentification"], response_model=MessageReponse)
 def inscription(
     pseudo: str,
     mot_de_passe: str,
@@ -99,7 +340,7 @@ async def redirect_to_docs():
 # --- Endpoints Gestion des activités ---
 
 
-@app.post("/activites", tags=["Activités"])
+@app.post("/activites", tags=["Activités"], response_model=MessageActiviteReponse)
 async def creer_activite(
     file: UploadFile = File(...),
     sport: str = "randonnée",
@@ -130,7 +371,11 @@ async def creer_activite(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.put("/activites/{id_activite}", tags=["Activités"])
+@app.put(
+    "/activites/{id_activite}",
+    tags=["Activités"],
+    response_model=MessageActiviteReponse,
+)
 def modifier_activite(id_activite: int, sport: str, user=Depends(get_current_user)):
     """Modifier une activité existante appartenant à l'utilisateur connecté."""
     # Vérification appartenance
@@ -152,7 +397,11 @@ def modifier_activite(id_activite: int, sport: str, user=Depends(get_current_use
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.delete("/activites/{id_activite}", tags=["Activités"])
+@app.delete(
+    "/activites/{id_activite}",
+    tags=["Activités"],
+    response_model=MessageReponse,
+)
 def supprimer_activite(id_activite: int, user=Depends(get_current_user)):
     """Supprimer une activité appartenant à l'utilisateur connecté."""
     # Vérification appartenance
@@ -172,16 +421,30 @@ def supprimer_activite(id_activite: int, user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/activites/{id_utilisateur}", tags=["Activités"])
-def activites_par_utilisateur(id_utilisateur: int, user=Depends(get_current_user)):
+@app.get(
+    "/activites/{id_utilisateur}",
+    tags=["Activités"],
+    response_model=list[ActiviteReponse],
+)
+def activites_par_utilisateur(
+    id_utilisateur: int,
+    request: Request,
+    response: Response,
+    user=Depends(get_current_user),
+):
     """Lister les activités d'un utilisateur donné."""
+    verifier_etag(request, response, "activites", id_utilisateur)
     try:
         return ActiviteService().lister_activites(id_utilisateur)
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/activites-filtres/{id_utilisateur}", tags=["Activités"])
+@app.get(
+    "/activites-filtres/{id_utilisateur}",
+    tags=["Activités"],
+    response_model=list[ActiviteReponse],
+)
 def activites_par_utilisateur_filtres(
     id_utilisateur: int,
     sport: str = None,
@@ -208,7 +471,64 @@ def activites_par_utilisateur_filtres(
 # --- Endpoints Utilisateurs ---
 
 
-@app.get("/utilisateurs/{id_utilisateur}", tags=["Utilisateurs"])
+@app.get(
+    "/utilisateurs/lot",
+    tags=["Utilisateurs"],
+    response_model=list[UtilisateurReponse],
+)
+def consulter_utilisateurs_par_ids(
+    ids: list[int] = Query(..., max_length=500), user=Depends(get_current_user)
+):
+    """Récupérer plusieurs utilisateurs grâce à leurs IDs (ex: ?ids=1&ids=2).
+    Les IDs inconnus sont ignorés."""
+    return UtilisateurService().trouver_par_ids(ids)
+
+
+# Déclarés avant /utilisateurs/{id_utilisateur}, qui les masquerait
+
+
+@app.get(
+    "/utilisateurs/recherche",
+    tags=["Utilisateurs"],
+    response_model=list[UtilisateurReponse],
+)
+def rechercher_utilisateurs(
+    q: str = Query(..., min_length=1, max_length=100),
+    limite: int = Query(20, ge=1, le=100),
+    user=Depends(get_current_user),
+):
+    """Rechercher des utilisateurs par pseudo, prénom ou nom, même approximativement.
+    Les pseudos commençant par le texte recherché sont classés en premier."""
+    try:
+        return UtilisateurService().rechercher(q, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get(
+    "/utilisateurs/autocompletion",
+    tags=["Utilisateurs"],
+    response_model=list[AutocompletionReponse],
+)
+def autocompleter_pseudos(
+    prefixe: str = Query(..., min_length=1, max_length=30),
+    nb: int = Query(10, ge=1, le=20),
+    user=Depends(get_current_user),
+):
+    """Pseudos commençant par le préfixe (insensible à la casse), les plus suivis en
+    premier. Destiné à la saisie : les préfixes fréquents sont servis sans accès à la
+    base."""
+    try:
+        return UtilisateurService().autocompleter(prefixe, nb)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get(
+    "/utilisateurs/{id_utilisateur}",
+    tags=["Utilisateurs"],
+    response_model=UtilisateurReponse,
+)
 def consulter_utilisateur_par_id(id_utilisateur: int, user=Depends(get_current_user)):
     """Récupérer un utilisateur grâce à son ID."""
     try:
@@ -217,7 +537,11 @@ def consulter_utilisateur_par_id(id_utilisateur: int, user=Depends(get_current_u
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/utilisateurs/pseudo/{pseudo}", tags=["Utilisateurs"])
+@app.get(
+    "/utilisateurs/pseudo/{pseudo}",
+    tags=["Utilisateurs"],
+    response_model=UtilisateurReponse,
+)
 def consulter_utilisateur_par_pseudo(pseudo: str, user=Depends(get_current_user)):
     """Récupérer un utilisateur grâce à son pseudo."""
     try:
@@ -226,7 +550,11 @@ def consulter_utilisateur_par_pseudo(pseudo: str, user=Depends(get_current_user)
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/utilisateurs", tags=["Utilisateurs"])
+@app.get(
+    "/utilisateurs",
+    tags=["Utilisateurs"],
+    response_model=list[UtilisateurReponse],
+)
 def lister_utilisateurs(user=Depends(get_current_user)):
     """Lister tous les utilisateurs."""
     return (
@@ -237,7 +565,7 @@ def lister_utilisateurs(user=Depends(get_current_user)):
 # --- Endpoints Jaimes ---
 
 
-@app.post("/jaimes", tags=["Jaimes"])
+@app.post("/jaimes", tags=["Jaimes"], response_model=JaimeReponse)
 def ajouter_jaime(id_activite: int, user=Depends(get_current_user)):
     """Ajouter un jaime à une activité pour l'utilisateur connecté."""
     try:
@@ -249,7 +577,7 @@ def ajouter_jaime(id_activite: int, user=Depends(get_current_user)):
         raise HTTPException(status_code=409, detail=str(e))
 
 
-@app.delete("/jaimes/{id_activite}", tags=["Jaimes"])
+@app.delete("/jaimes/{id_activite}", tags=["Jaimes"], response_model=MessageReponse)
 def supprimer_jaime(id_activite: int, user=Depends(get_current_user)):
     """Supprimer le jaime appartenant à l'utilisateur connecté d'une activité."""
     try:
@@ -259,7 +587,7 @@ def supprimer_jaime(id_activite: int, user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/jaimes/existe", tags=["Jaimes"])
+@app.get("/jaimes/existe", tags=["Jaimes"], response_model=bool)
 def jaime_existe(id_activite: int, id_auteur: int, user=Depends(get_current_user)):
     """Vérifier si un jaime existe pour une activité et un auteur donné."""
     try:
@@ -268,7 +596,7 @@ def jaime_existe(id_activite: int, id_auteur: int, user=Depends(get_current_user
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/jaimes/compter", tags=["Jaimes"])
+@app.get("/jaimes/compter", tags=["Jaimes"], response_model=NombreJaimesReponse)
 def compter_jaimes(id_activite: int, user=Depends(get_current_user)):
     """Compter le nombre de jaimes pour une activité donnée."""
 
@@ -282,7 +610,7 @@ def compter_jaimes(id_activite: int, user=Depends(get_current_user)):
 # --- Endpoints Commentaires ---
 
 
-@app.post("/commentaires", tags=["Commentaires"])
+@app.post("/commentaires", tags=["Commentaires"], response_model=CommentaireReponse)
 def ajouter_commentaire(
     id_activite: int, commentaire: str, user=Depends(get_current_user)
 ):
@@ -296,7 +624,31 @@ def ajouter_commentaire(
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.delete("/commentaires/{id_commentaire}", tags=["Commentaires"])
+# Déclaré avant /commentaires/{id_activite}, qui le masquerait
+@app.get(
+    "/commentaires/recherche",
+    tags=["Commentaires"],
+    response_model=CommentairesRechercheReponse,
+)
+def rechercher_commentaires(
+    q: str = Query(..., min_length=1, max_length=200),
+    limite: int = Query(20, ge=1, le=100),
+    decalage: int = Query(0, ge=0, le=1000),
+    user=Depends(get_current_user),
+):
+    """Recherche plein texte dans les commentaires (mots, "expression", -exclu), les
+    plus pertinents d'abord. La page suivante s'obtient avec decalage=suivant."""
+    try:
+        return ActiviteService().rechercher_commentaires(q, limite, decalage)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete(
+    "/commentaires/{id_commentaire}",
+    tags=["Commentaires"],
+    response_model=MessageReponse,
+)
 def supprimer_commentaire(id_commentaire: int, user=Depends(get_current_user)):
     """Supprimer un commentaire appartenant à l'utilisateur connecté."""
     # Vérification appartenance
@@ -316,9 +668,19 @@ def supprimer_commentaire(id_commentaire: int, user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/commentaires/{id_activite}", tags=["Commentaires"])
-def lister_commentaires(id_activite: int, user=Depends(get_current_user)):
+@app.get(
+    "/commentaires/{id_activite}",
+    tags=["Commentaires"],
+    response_model=list[CommentaireReponse],
+)
+def lister_commentaires(
+    id_activite: int,
+    request: Request,
+    response: Response,
+    user=Depends(get_current_user),
+):
     """Lister les commentaires d'une activité donnée."""
+    verifier_etag(request, response, "commentaires", id_activite)
     try:
         return ActiviteService().lister_commentaires(id_activite)
     except NotFoundError as e:
@@ -328,7 +690,7 @@ def lister_commentaires(id_activite: int, user=Depends(get_current_user)):
 # --- Endpoints Abonnements ---
 
 
-@app.post("/abonnements", tags=["Abonnements"])
+@app.post("/abonnements", tags=["Abonnements"], response_model=AbonnementReponse)
 def creer_abonnement(id_utilisateur_suivi: int, user=Depends(get_current_user)):
     """S'abonner à un utilisateur par l'utilisateur connecté."""
     try:
@@ -342,7 +704,7 @@ def creer_abonnement(id_utilisateur_suivi: int, user=Depends(get_current_user)):
         raise HTTPException(status_code=409, detail=str(e))
 
 
-@app.delete("/abonnements", tags=["Abonnements"])
+@app.delete("/abonnements", tags=["Abonnements"], response_model=MessageReponse)
 def supprimer_abonnement(id_utilisateur_suivi: int, user=Depends(get_current_user)):
     """Se désabonner d'un utilisateur par l'utilisateur connecté."""
     try:
@@ -355,7 +717,7 @@ def supprimer_abonnement(id_utilisateur_suivi: int, user=Depends(get_current_use
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/abonnements/existe", tags=["Abonnements"])
+@app.get("/abonnements/existe", tags=["Abonnements"], response_model=bool)
 def abonnement_existe(
     id_utilisateur_suiveur: int,
     id_utilisateur_suivi: int,
@@ -370,7 +732,11 @@ def abonnement_existe(
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/abonnements/suivis/{id_utilisateur}", tags=["Abonnements"])
+@app.get(
+    "/abonnements/suivis/{id_utilisateur}",
+    tags=["Abonnements"],
+    response_model=list[int],
+)
 def lister_abonnements_suivis(id_utilisateur: int, user=Depends(get_current_user)):
     """Lister les utilisateurs suivis par l'utilisateur donné."""
     try:
@@ -379,7 +745,11 @@ def lister_abonnements_suivis(id_utilisateur: int, user=Depends(get_current_user
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/abonnements/suiveurs/{id_utilisateur}", tags=["Abonnements"])
+@app.get(
+    "/abonnements/suiveurs/{id_utilisateur}",
+    tags=["Abonnements"],
+    response_model=list[int],
+)
 def lister_abonnements_suiveurs(id_utilisateur: int, user=Depends(get_current_user)):
     """Lister les utilisateurs qui suivent l'utilisateur."""
     try:
@@ -388,24 +758,164 @@ def lister_abonnements_suiveurs(id_utilisateur: int, user=Depends(get_current_us
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@app.get(
+    "/abonnements/compteurs/{id_utilisateur}",
+    tags=["Abonnements"],
+    response_model=CompteursAbonnementsReponse,
+)
+def compter_abonnements(id_utilisateur: int, user=Depends(get_current_user)):
+    """Nombres de suiveurs et de suivis de l'utilisateur."""
+    try:
+        return AbonnementService().compter_abonnements(id_utilisateur)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get(
+    "/abonnements/mutuels/{id_utilisateur_a}/{id_utilisateur_b}",
+    tags=["Abonnements"],
+    response_model=list[int],
+)
+def lister_suivis_communs(
+    id_utilisateur_a: int, id_utilisateur_b: int, user=Depends(get_current_user)
+):
+    """Lister les utilisateurs suivis à la fois par les deux utilisateurs."""
+    try:
+        return AbonnementService().lister_suivis_communs(
+            id_utilisateur_a, id_utilisateur_b
+        )
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+# --- Endpoints Suggestions ---
+
+
+@app.get(
+    "/suggestions/{id_utilisateur}",
+    tags=["Abonnements"],
+    response_model=list[SuggestionReponse],
+)
+def lister_suggestions(
+    id_utilisateur: int,
+    nb: int = Query(10, ge=1, le=50),
+    user=Depends(get_current_user),
+):
+    """Suggérer des utilisateurs à suivre : utilisateurs non suivis, classés par nombre
+    de relations communes pondéré par les sports pratiqués en commun."""
+    try:
+        return SuggestionService().lister_suggestions(id_utilisateur, nb)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 # --- Endpoints Fil d'actualité ---
 
 
-@app.get("/fil-dactualite/{id_utilisateur}", tags=["Fil d'actualité"])
-def fil_dactualite(id_utilisateur: int, user=Depends(get_current_user)):
-    """Afficher le fil d'actualités de l'utilisateur."""
+@app.get(
+    "/fil-dactualite/{id_utilisateur}",
+    tags=["Fil d'actualité"],
+    response_model=list[ActiviteReponse],
+)
+def fil_dactualite(
+    id_utilisateur: int,
+    mode: Literal["chrono", "ranked"] = "chrono",
+    user=Depends(get_current_user),
+):
+    """Afficher le fil d'actualités de l'utilisateur : par date (chrono) ou classé par
+    récence, jaimes, commentaires et affinité avec les auteurs (ranked)."""
     try:
-        return FilDactualiteService().creer_fil_dactualite(id_utilisateur)
+        return FilDactualiteService().creer_fil_dactualite(id_utilisateur, mode)
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+# --- Endpoint Tendances ---
+
+
+@app.get("/tendances", tags=["Activités"], response_model=TendancesReponse)
+def lister_tendances(
+    periode: Literal["24h", "7j"] = "24h",
+    nb: int = Query(10, ge=1, le=100),
+    user=Depends(get_current_user),
+):
+    """Activités les plus aimées et les plus commentées sur les dernières 24 heures
+    ou les 7 derniers jours."""
+    return TendanceService().lister_tendances(periode, nb)
+
+
+# --- Endpoints Notifications ---
+
+
+@app.get("/notifications", tags=["Notifications"], response_model=NotificationsReponse)
+def lister_notifications(
+    limite: int = Query(20, ge=1, le=100),
+    avant: Optional[int] = None,
+    user=Depends(get_current_user),
+):
+    """Boîte de réception de l'utilisateur connecté, des notifications les plus récentes
+    aux plus anciennes. La page suivante s'obtient en passant la valeur de "suivant"
+    dans le paramètre avant."""
+    return NotificationService().lister_notifications(user.id_utilisateur, limite, avant)
+
+
+@app.put("/notifications/lues", tags=["Notifications"], response_model=MessageReponse)
+def marquer_notifications_lues(
+    jusqu_a: Optional[int] = None, user=Depends(get_current_user)
+):
+    """Marque comme lues les notifications de l'utilisateur connecté (toutes, ou celles
+    d'identifiant inférieur ou égal à jusqu_a)"""
+    nb = NotificationService().marquer_lues(user.id_utilisateur, jusqu_a)
+    return {"message": f"{nb} notification(s) marquée(s) comme lue(s)"}
+
+
+@app.get("/notifications/stream", tags=["Notifications"], response_class=StreamingResponse)
+async def suivre_notifications(request: Request, user=Depends(get_current_user)):
+    """Flux SSE (text/event-stream) des notifications de l'utilisateur connecté :
+    jaimes et commentaires reçus sur ses activités, nouveaux abonnés."""
+    id_utilisateur = user.id_utilisateur
+
+    async def evenements():
+        file = ecouteur_notifications.abonner(id_utilisateur)
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    notification = await asyncio.wait_for(
+                        file.get(), INTERVALLE_PING_NOTIFICATIONS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                donnees = json.dumps(notification.en_dict())
+                yield f"event: notification\ndata: {donnees}\n\n"
+        finally:
+            ecouteur_notifications.desabonner(id_utilisateur, file)
+
+    return StreamingResponse(
+        evenements(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- Endpoints Statistiques ---
 
 
-@app.get("/statistiques/total/{id_utilisateur}", tags=["Statistiques"])
-def statistiques_totales(id_utilisateur: int, user=Depends(get_current_user)):
+@app.get(
+    "/statistiques/total/{id_utilisateur}",
+    tags=["Statistiques"],
+    response_model=StatistiquesTotalesReponse,
+)
+def statistiques_totales(
+    id_utilisateur: int,
+    request: Request,
+    response: Response,
+    user=Depends(get_current_user),
+):
     """Récupérer les statistiques globales (totales) d'un utilisateur."""
+    # Les statistiques totales ne dépendent que des activités de l'utilisateur
+    verifier_etag(request, response, "activites", id_utilisateur)
     try:
         # Récupérer les données nécessaires via les méthodes de StatistiquesService
         nombre_activites = StatistiquesService().calculer_nombre_activites_total(
@@ -422,7 +932,11 @@ def statistiques_totales(id_utilisateur: int, user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.get("/statistiques/semaine/{id_utilisateur}", tags=["Statistiques"])
+@app.get(
+    "/statistiques/semaine/{id_utilisateur}",
+    tags=["Statistiques"],
+    response_model=StatistiquesSemaineReponse,
+)
 def statistiques_semaine(
     id_utilisateur: int, date_reference: str, user=Depends(get_current_user)
 ):
@@ -452,6 +966,59 @@ def statistiques_semaine(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# --- Endpoint Métriques ---
+
+
+@app.get("/metrics", include_in_schema=False)
+def exporter_metriques():
+    """Métriques au format Prometheus (requêtes HTTP, requêtes SQL, motifs N+1,
+    caches, file de logs)"""
+    return PlainTextResponse(
+        metriques.exporter() + exporter_metriques_caches() + exporter_metriques_logs()
+    )
+
+
+# --- Endpoint Profilage ---
+
+PROFIL_DUREE_MAX = 60
+
+
+@app.get("/debug/profile", include_in_schema=False)
+async def profiler(
+    seconds: float = 10,
+    intervalle_ms: float = 5,
+    inclure_attente: bool = False,
+    user=Depends(get_admin),
+):
+    """Profile le processus pendant seconds secondes par échantillonnage des piles
+    de tous les threads. Renvoie les piles au format collapsed (flamegraph.pl, speedscope)"""
+    if not 0 < seconds <= PROFIL_DUREE_MAX:
+        raise HTTPException(
+            status_code=400, detail=f"seconds doit être compris entre 0 et {PROFIL_DUREE_MAX}"
+        )
+    if not 1 <= intervalle_ms <= 1000:
+        raise HTTPException(status_code=400, detail="intervalle_ms doit être compris entre 1 et 1000")
+    if not verrou_profilage.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Un profilage est déjà en cours")
+
+    try:
+        profileur = Profileur(intervalle_ms / 1000, inclure_attente)
+        profileur.demarrer()
+        try:
+            # La boucle d'évènements reste libre : elle est elle-même échantillonnée
+            await asyncio.sleep(seconds)
+        finally:
+            profileur.arreter()
+    finally:
+        verrou_profilage.release()
+
+    logging.info(f"Profilage de {seconds} s par {user.pseudo} : {profileur.nb_releves} relevés")
+    return PlainTextResponse(
+        profileur.exporter_collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="profil.collapsed"'},
+    )
+
+
 # --- Endpoint Upload GPX ---
 @app.post("/upload-gpx", tags=["Utilitaires"])
 async def upload_gpx(file: UploadFile = File(...)):
@@ -0,0 +1,434 @@
+"""Micro-benchmarks des chemins critiques (DAO et services), avec pytest-benchmark
+
+La base de données est remplacée par des données en mémoire : seules les parties
+Python (parsing, décorateur @log, construction des objets, calculs) sont mesurées.
+Les tailles de jeux de données (10, 1k, 100k activités) rendent visible la complexité.
+
+Lancement (depuis la racine du projet) :
+    pytest src/benchmarks/bench_micro.py --benchmark-autosave
+    pytest src/benchmarks/bench_micro.py --benchmark-compare
+"""
+
+import json
+import pytest
+
+import numpy as np
+
+from datetime import date, datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from business_object.activite import Activite
+from business_object.notification import Notification
+
+from modeles_api import ActiviteReponse
+
+from dao.activite_dao import ActiviteDao
+from dao.graphe_abonnements import GrapheAbonnements
+from dao.compteurs_tendances import CompteursTendances
+from dao.notifications_temps_reel import EcouteurNotifications
+from dao.tampon_jaimes import TamponJaimes
+
+from service.fil_dactualite_service import FilDactualiteService
+from service.statistiques_service import StatistiquesService
+from service.suggestion_service import SPORTS, classer, deux_sauts, profils_sportifs
+
+from utils.gpx_parser import parse_gpx
+from utils.compression import compresser
+from utils.tampon_ecriture import TamponEcriture
+from utils.trie_prefixes import TriePrefixes
+from utils.log_decorator import log
+from utils.generateur_donnees import GenerateurDonnees
+
+
+TAILLES = [10, 1_000, 100_000]
+DATE_REFERENCE = "2025-06-15"
+
+
+def generer_gpx(nb_points: int) -> str:
+    """Trace GPX synthétique de nb_points points (un point toutes les 5 secondes)"""
+    debut = datetime(2025, 6, 15, 8, 0, 0)
+    points = "".join(
+        f'<trkpt lat="{45.9 + i * 1e-5:.7f}" lon="{6.1 + i * 1e-5:.7f}">'
+        f"<ele>{480 + (i % 50)}.0</ele>"
+        f"<time>{(debut + timedelta(seconds=5 * i)).isoformat()}Z</time></trkpt>"
+        for i in range(nb_points)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+        f"<metadata><time>{debut.isoformat()}Z</time></metadata>"
+        f"<trk><name>Bench</name><type>Run</type><trkseg>{points}</trkseg></trk></gpx>"
+    )
+
+
+def lignes_activites(nb_activites: int, nb_utilisateurs: int = 100) -> list[dict]:
+    """Lignes 'activite' telles que renvoyées par le curseur RealDictCursor"""
+    generateur = GenerateurDonnees(
+        nb_utilisateurs=nb_utilisateurs,
+        nb_activites=nb_activites,
+        date_fin=date(2025, 6, 30),
+    )
+    colonnes = ["id_activite", "id_utilisateur", "sport", "date_activite", "distance", "duree"]
+    return [dict(zip(colonnes, ligne)) for ligne in generateur.lignes_activites()]
+
+
+_CACHE_LIGNES = {}
+
+
+def lignes_en_cache(nb_activites: int) -> list[dict]:
+    if nb_activites not in _CACHE_LIGNES:
+        _CACHE_LIGNES[nb_activites] = lignes_activites(nb_activites)
+    return _CACHE_LIGNES[nb_activites]
+
+
+def activites_en_memoire(nb_activites: int) -> list[Activite]:
+    return [Activite(**ligne) for ligne in lignes_en_cache(nb_activites)]
+
+
+def fausse_connexion(lignes: list[dict]) -> MagicMock:
+    """DBConnection factice dont le curseur renvoie les lignes fournies"""
+    curseur = MagicMock()
+    curseur.fetchall.return_value = lignes
+    connexion = MagicMock()
+    connexion.__enter__.return_value = connexion
+    connexion.cursor.return_value.__enter__.return_value = curseur
+    db = MagicMock()
+    db.connection = connexion
+    return db
+
+
+# --- Parsing GPX ---
+
+
+@pytest.mark.parametrize("nb_points", [10, 1_000, 10_000])
+def test_parse_gpx(benchmark, nb_points):
+    contenu = generer_gpx(nb_points)
+    resultat = benchmark(parse_gpx, contenu)
+    assert resultat["distance totale"] > 0
+
+
+def test_parse_gpx_fichier_exemple(benchmark):
+    with open("src/strava_trail_run_12k.gpx", encoding="utf-8") as f:
+        contenu = f.read()
+    benchmark(parse_gpx, contenu)
+
+
+# --- Décorateur @log ---
+
+
+class _Cible:
+    def sans_log(self, id_utilisateur: int, resultat: list):
+        return resultat
+
+    @log
+    def avec_log(self, id_utilisateur: int, resultat: list):
+        return resultat
+
+
+@pytest.mark.parametrize("decore", [False, True])
+@pytest.mark.parametrize("taille_resultat", [1, 1_000])
+def test_surcout_log(benchmark, decore, taille_resultat):
+    cible = _Cible()
+    resultat = activites_en_memoire(taille_resultat)
+    methode = cible.avec_log if decore else cible.sans_log
+    benchmark(methode, 42, resultat)
+
+
+# --- Construction des objets dans les DAO ---
+
+
+@pytest.mark.parametrize("nb_activites", TAILLES)
+def test_dao_lister_par_utilisateur(benchmark, nb_activites):
+    lignes = lignes_en_cache(nb_activites)
+    with patch("dao.activite_dao.DBConnection", return_value=fausse_connexion(lignes)):
+        resultat = benchmark(ActiviteDao().lister_par_utilisateur, 1)
+    assert len(resultat) == nb_activites
+
+
+# --- Fil d'actualité : n activités réparties sur k utilisateurs suivis ---
+
+
+@pytest.mark.parametrize("nb_suivis", [10, 100])
+@pytest.mark.parametrize("nb_activites", TAILLES)
+def test_creer_fil_dactualite(benchmark, nb_activites, nb_suivis):
+    activites = activites_en_memoire(nb_activites)
+    par_utilisateur = {u: [] for u in range(nb_suivis)}
+    for i, a in enumerate(activites):
+        par_utilisateur[i % nb_suivis].append(a)
+
+    with (
+        patch("dao.utilisateur_dao.UtilisateurDao.verifier_id_existant", return_value=True),
+        patch(
+            "service.abonnement_service.AbonnementService.lister_utilisateurs_suivis",
+            return_value=set(par_utilisateur),
+        ),
+        patch(
+            "dao.activite_dao.ActiviteDao.lister_par_utilisateur",
+            side_effect=lambda u: list(par_utilisateur[u]),
+        ),
+    ):
+        fil = benchmark(FilDactualiteService().creer_fil_dactualite, 1)
+    assert len(fil) == nb_activites
+
+
+@pytest.mark.parametrize("nb_candidats", [50, 500])
+def test_classer_fil(benchmark, nb_candidats):
+    """Score et tri des candidats du fil classé (requête simulée)"""
+    generateur = np.random.default_rng(0)
+    candidats = [
+        {
+            "activite": a,
+            "nb_jaimes": int(generateur.integers(0, 50)),
+            "nb_commentaires": int(generateur.integers(0, 10)),
+            "affinite": int(generateur.integers(0, 5)),
+        }
+        for a in activites_en_memoire(nb_candidats)
+    ]
+
+    with patch(
+        "dao.activite_dao.ActiviteDao.lister_candidats_fil",
+        side_effect=lambda *args: list(candidats),
+    ):
+        fil = benchmark(FilDactualiteService().classer_fil, 1)
+    assert len(fil) == nb_candidats
+
+
+# --- Statistiques ---
+
+METHODES_STATISTIQUES = [
+    ("calculer_nombre_activites_total", False),
+    ("calculer_distance_totale", False),
+    ("calculer_duree_totale", False),
+    ("calculer_nombre_activites_semaine", True),
+    ("calculer_distance_semaine", True),
+    ("calculer_duree_semaine", True),
+]
+
+
+@pytest.mark.parametrize("methode, avec_date", METHODES_STATISTIQUES)
+@pytest.mark.parametrize("nb_activites", TAILLES)
+def test_statistiques(benchmark, nb_activites, methode, avec_date):
+    activites = activites_en_memoire(nb_activites)
+    args = (1, DATE_REFERENCE) if avec_date else (1,)
+
+    with (
+        patch("dao.utilisateur_dao.UtilisateurDao.verifier_id_existant", return_value=True),
+        patch("dao.activite_dao.ActiviteDao.lister_par_utilisateur", return_value=activites),
+    ):
+        service = StatistiquesService()
+        benchmark(getattr(service, methode), *args)
+
+
+# --- Index des abonnements (CSR) : 1 utilisateur pour 20 abonnements ---
+
+
+def graphe_aleatoire(nb_abonnements: int) -> GrapheAbonnements:
+    generateur = np.random.default_rng(0)
+    nb_utilisateurs = max(10, nb_abonnements // 20)
+    graphe = GrapheAbonnements()
+    graphe.construire(
+        generateur.integers(1, nb_utilisateurs, nb_abonnements),
+        generateur.integers(1, nb_utilisateurs, nb_abonnements),
+    )
+    return graphe
+
+
+@pytest.mark.parametrize("nb_abonnements", [1_000, 100_000, 1_000_000])
+def test_graphe_construction(benchmark, nb_abonnements):
+    generateur = np.random.default_rng(0)
+    nb_utilisateurs = nb_abonnements // 20
+    suiveurs = generateur.integers(1, nb_utilisateurs, nb_abonnements)
+    suivis = generateur.integers(1, nb_utilisateurs, nb_abonnements)
+    benchmark(GrapheAbonnements().construire, suiveurs, suivis)
+
+
+@pytest.mark.parametrize("avec_deltas", [False, True])
+def test_graphe_requetes(benchmark, avec_deltas):
+    """1 000 lectures (suivis, suiveurs, existe) sur un graphe de 1M d'abonnements"""
+    graphe = graphe_aleatoire(1_000_000)
+    if avec_deltas:
+        for i in range(1_000):
+            graphe.ajouter(i + 1, i + 2)
+    ids = np.random.default_rng(1).integers(1, 50_000, 1_000).tolist()
+
+    def lire():
+        for id_utilisateur in ids:
+            graphe.suivis(id_utilisateur)
+            graphe.suiveurs(id_utilisateur)
+            graphe.existe(id_utilisateur, id_utilisateur + 1)
+
+    benchmark(lire)
+
+
+@pytest.mark.parametrize("taille_lot", [1, 2_000])
+def test_suggestions_lot(benchmark, taille_lot):
+    """Suggestions d'un lot d'utilisateurs (produit A·A creux et classement) sur un
+    graphe de 1M d'abonnements"""
+    graphe = graphe_aleatoire(1_000_000)
+    suivis = graphe.csr_suivis()
+    profils = profils_sportifs(
+        [(i, SPORTS[i % len(SPORTS)], 1 + i % 3) for i in range(suivis.nb_sommets)]
+    )
+    ids = np.arange(1, taille_lot + 1)
+
+    benchmark(lambda: classer(ids, *deux_sauts(suivis, ids), profils))
+
+
+# --- Tendances : compteurs glissants de 100 000 activités ---
+
+
+def compteurs_remplis(nb_activites: int) -> CompteursTendances:
+    compteurs = CompteursTendances()
+    generateur = np.random.default_rng(0)
+    for id_activite, nombre in enumerate(generateur.zipf(1.5, nb_activites).tolist()):
+        compteurs.enregistrer("jaimes", id_activite, min(nombre, 10_000))
+    return compteurs
+
+
+def test_tendances_enregistrer(benchmark):
+    """1 000 jaimes comptés"""
+    compteurs = compteurs_remplis(100_000)
+
+    def enregistrer():
+        for id_activite in range(1_000):
+            compteurs.enregistrer("jaimes", id_activite)
+
+    benchmark(enregistrer)
+
+
+def test_tendances_meilleures(benchmark):
+    """Top 10 par tas sur 100 000 activités"""
+    compteurs = compteurs_remplis(100_000)
+    meilleures = benchmark(compteurs.meilleures, "24h", "jaimes", 10)
+    assert len(meilleures) == 10
+
+
+def test_notifications_diffuser(benchmark):
+    """1 000 notifications réparties entre 10 000 abonnés (100 par destinataire)"""
+    ecouteur = EcouteurNotifications()
+
+    class Boucle:
+        def call_soon_threadsafe(self, fonction, *args):
+            pass
+
+    boucle = Boucle()
+    for i in range(10_000):
+        ecouteur._abonnes.setdefault(i % 100, {})[object()] = boucle
+    notifications = [Notification("jaime", i % 1_000, 1, 1) for i in range(1_000)]
+
+    def diffuser():
+        for notification in notifications:
+            ecouteur.diffuser(notification)
+
+    benchmark(diffuser)
+
+
+def test_tampon_ajouter(benchmark):
+    """1 000 notifications ajoutées au tampon d'écriture (coût payé par la requête)"""
+    tampon = TamponEcriture("bench", lambda lot: None, taille_lot=10**9, intervalle=3600)
+    notification = Notification("jaime", 1, 2, 3)
+
+    def ajouter():
+        for _ in range(1_000):
+            tampon.ajouter(notification)
+        tampon.abandonner()
+
+    benchmark(ajouter)
+    tampon.arreter()
+
+
+def test_tampon_jaimes_aimer_retirer(benchmark):
+    """1 000 jaimes puis leurs retraits (compensés en mémoire, rien à écrire)"""
+    tampon = TamponJaimes(taille_lot=10**9, intervalle=3600)
+
+    def aimer_retirer():
+        for id_auteur in range(1_000):
+            tampon.aimer(1, id_auteur)
+        for id_auteur in range(1_000):
+            tampon.retirer(1, id_auteur)
+
+    # Aucun jaime en base
+    with patch("dao.tampon_jaimes.JaimeDao.existe", lambda self, a, u: False):
+        tampon.aimer(0, 0)  # démarre le thread hors mesure
+        benchmark(aimer_retirer)
+    tampon.abandonner()
+    tampon.arreter()
+
+
+def test_trie_autocompletion(benchmark):
+    """1 000 frappes servies par le trie (10k pseudos, listes des préfixes d'une lettre
+    tronquées, complètes à partir de deux lettres)"""
+    rng = np.random.default_rng(0)
+    lettres = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    pseudos = ["".join(rng.choice(lettres, 8)) for _ in range(10_000)]
+    trie = TriePrefixes(taille_resultats=20)
+    for prefixe in {p[:2] for p in pseudos}:
+        trie.enregistrer(
+            prefixe,
+            [(i, p) for i, p in enumerate(pseudos) if p.startswith(prefixe)],
+        )
+    frappes = [pseudos[i][: 2 + i % 4] for i in range(1_000)]
+
+    def obtenir():
+        for prefixe in frappes:
+            trie.obtenir(prefixe)
+
+    benchmark(obtenir)
+
+
+# --- Sérialisation JSON et compression d'une liste de 10k activités ---
+
+NB_ACTIVITES_SERIALISATION = 10_000
+
+
+def serialiser_jsonable_encoder(activites: list[Activite]) -> bytes:
+    """Chemin sans response_model : jsonable_encoder puis json.dumps (JSONResponse)"""
+    return json.dumps(
+        jsonable_encoder(activites), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+_adaptateur_activites = TypeAdapter(list[ActiviteReponse])
+
+
+def serialiser_pydantic(activites: list[Activite]) -> bytes:
+    """Chemin avec response_model : validation depuis les attributs puis dump_json"""
+    return _adaptateur_activites.dump_json(
+        _adaptateur_activites.validate_python(activites, from_attributes=True)
+    )
+
+
+def serialiser_orjson(activites: list[Activite]) -> bytes:
+    orjson = pytest.importorskip("orjson")
+    return orjson.dumps(activites, default=vars)
+
+
+@pytest.mark.parametrize(
+    "serialiser", [serialiser_jsonable_encoder, serialiser_pydantic, serialiser_orjson]
+)
+def test_serialisation_activites(benchmark, serialiser):
+    activites = activites_en_memoire(NB_ACTIVITES_SERIALISATION)
+    corps = benchmark(serialiser, activites)
+    benchmark.extra_info["octets"] = len(corps)
+    assert len(json.loads(corps)) == NB_ACTIVITES_SERIALISATION
+
+
+@pytest.mark.parametrize(
+    "encodage, niveau", [("gzip", 1), ("gzip", 6), ("br", 1), ("br", 4), ("br", 11)]
+)
+def test_compression_activites(benchmark, encodage, niveau):
+    if encodage == "br":
+        pytest.importorskip("brotli")
+    corps = serialiser_pydantic(activites_en_memoire(NB_ACTIVITES_SERIALISATION))
+    compresse = benchmark(compresser, corps, encodage, niveau, niveau)
+    # Octets transmis : visibles dans le rapport (--benchmark-json) ou avec -s
+    benchmark.extra_info["octets"] = len(compresse)
+    benchmark.extra_info["ratio"] = round(len(corps) / len(compresse), 1)
+    print(f"{encodage} {niveau} : {len(corps)} -> {len(compresse)} octets")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
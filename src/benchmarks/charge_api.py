@@ -0,0 +1,326 @@
+"""Test de charge de l'API REST
+
+Le script :
+1. peuple un schéma dédié (projet_bench par défaut) avec des données synthétiques,
+2. lance src/app.py sous uvicorn,
+3. rejoue une charge mixte réaliste (fil d'actualité, uploads GPX, jaimes,
+   commentaires, statistiques...) avec plusieurs clients concurrents,
+4. enregistre le débit et les latences p50/p95/p99 par endpoint dans un fichier JSON,
+5. compare éventuellement le résultat à un fichier de référence (seuils de régression).
+
+Exemple (depuis la racine du projet) :
+    python src/benchmarks/charge_api.py --utilisateurs 10000 --duree 60 --clients 16
+    python src/benchmarks/charge_api.py --reference bench_resultats/charge_abc1234.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import subprocess
+
+from datetime import date, datetime
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.reset_database import ResetDatabase  # noqa: E402
+from utils.generateur_donnees import GenerateurDonnees  # noqa: E402
+
+
+FICHIER_GPX = "src/strava_trail_run_12k.gpx"
+
+# Textes recherchés dans les commentaires (présents dans les données synthétiques)
+RECHERCHES_COMMENTAIRES = ["bravo", "parcours magnifique", "semaine prochaine"]
+
+# (nom de l'endpoint, poids dans la charge)
+SCENARIOS = [
+    ("GET /fil-dactualite/{id_utilisateur}", 30),
+    ("GET /activites/{id_utilisateur}", 15),
+    ("GET /statistiques/total/{id_utilisateur}", 10),
+    ("GET /statistiques/semaine/{id_utilisateur}", 5),
+    ("GET /commentaires/{id_activite}", 10),
+    ("GET /commentaires/recherche", 2),
+    ("GET /jaimes/compter", 8),
+    ("POST /jaimes", 8),
+    ("DELETE /jaimes/{id_activite}", 4),
+    ("POST /commentaires", 5),
+    ("POST /activites", 3),
+    ("GET /me", 2),
+]
+
+# Réponses 4xx normales d'un scénario (jaime déjà présent ou déjà retiré) : tout
+# autre statut 4xx (429 du limiteur compris), 5xx ou échec réseau (0) est une erreur
+STATUTS_ATTENDUS = {
+    "POST /jaimes": {409},
+    "DELETE /jaimes/{id_activite}": {404},
+}
+
+
+def percentile(valeurs_triees: list[float], p: float) -> float:
+    """Percentile par la méthode du rang le plus proche (valeurs déjà triées)"""
+    if not valeurs_triees:
+        return 0.0
+    rang = max(0, math.ceil(p / 100 * len(valeurs_triees)) - 1)
+    return valeurs_triees[rang]
+
+
+class ClientCharge(threading.Thread):
+    """Client de charge : enchaîne des requêtes tirées selon les poids des scénarios"""
+
+    def __init__(self, num, url, nb_utilisateurs, nb_activites, fin, graine, gpx, mesures):
+        super().__init__(daemon=True)
+        self.url = url
+        self.nb_utilisateurs = nb_utilisateurs
+        self.nb_activites = nb_activites
+        self.fin = fin
+        self.gpx = gpx
+        self.mesures = mesures
+        self.rng = random.Random(graine * 1000 + num)
+        self.session = requests.Session()
+        self.noms = [nom for nom, _ in SCENARIOS]
+        self.poids = [poids for _, poids in SCENARIOS]
+
+    def _requete(self, nom: str) -> requests.Response:
+        id_utilisateur = self.rng.randint(1, self.nb_utilisateurs)
+        id_activite = self.rng.randint(1, max(1, self.nb_activites))
+        auth = (f"util{id_utilisateur}", "motdepasse")
+        s, url = self.session, self.url
+
+        if nom == "GET /fil-dactualite/{id_utilisateur}":
+            return s.get(f"{url}/fil-dactualite/{id_utilisateur}", auth=auth)
+        if nom == "GET /activites/{id_utilisateur}":
+            return s.get(f"{url}/activites/{id_utilisateur}", auth=auth)
+        if nom == "GET /statistiques/total/{id_utilisateur}":
+            return s.get(f"{url}/statistiques/total/{id_utilisateur}", auth=auth)
+        if nom == "GET /statistiques/semaine/{id_utilisateur}":
+            return s.get(
+                f"{url}/statistiques/semaine/{id_utilisateur}",
+                params={"date_reference": date.today().isoformat()},
+                auth=auth,
+            )
+        if nom == "GET /commentaires/{id_activite}":
+            return s.get(f"{url}/commentaires/{id_activite}", auth=auth)
+        if nom == "GET /commentaires/recherche":
+            return s.get(
+                f"{url}/commentaires/recherche",
+                params={"q": self.rng.choice(RECHERCHES_COMMENTAIRES)},
+                auth=auth,
+            )
+        if nom == "GET /jaimes/compter":
+            return s.get(f"{url}/jaimes/compter", params={"id_activite": id_activite}, auth=auth)
+        if nom == "POST /jaimes":
+            return s.post(f"{url}/jaimes", params={"id_activite": id_activite}, auth=auth)
+        if nom == "DELETE /jaimes/{id_activite}":
+            return s.delete(f"{url}/jaimes/{id_activite}", auth=auth)
+        if nom == "POST /commentaires":
+            return s.post(
+                f"{url}/commentaires",
+                params={"id_activite": id_activite, "commentaire": "Bravo !"},
+                auth=auth,
+            )
+        if nom == "POST /activites":
+            return s.post(
+                f"{url}/activites",
+                files={"file": ("activite.gpx", self.gpx, "application/gpx+xml")},
+                params={"sport": "course"},
+                auth=auth,
+            )
+        return s.get(f"{url}/me", auth=auth)
+
+    def run(self):
+        while time.perf_counter() < self.fin:
+            nom = self.rng.choices(self.noms, weights=self.poids)[0]
+            debut = time.perf_counter()
+            try:
+                statut = self._requete(nom).status_code
+            except requests.RequestException:
+                statut = 0
+            self.mesures.append((nom, time.perf_counter() - debut, statut))
+
+
+def lancer_api(
+    port: int, schema: str, nb_workers: int, limiteur: bool = False
+) -> subprocess.Popen:
+    """Démarre l'API sous uvicorn et attend qu'elle réponde
+    Sans limiteur, les tentatives d'authentification ne sont pas limitées : tous les
+    clients viennent de la même adresse IP"""
+    env = dict(os.environ, POSTGRES_SCHEMA=schema, PYTHONPATH="src")
+    if not limiteur:
+        env["LIMITEUR_BACKEND"] = "aucun"
+    processus = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--port", str(port), "--workers", str(nb_workers), "--log-level", "warning",
+        ],
+        env=env,
+    )
+    limite = time.time() + 30
+    while time.time() < limite:
+        try:
+            requests.get(f"http://localhost:{port}/docs", timeout=1)
+            return processus
+        except requests.RequestException:
+            time.sleep(0.2)
+    processus.terminate()
+    raise RuntimeError("L'API n'a pas démarré dans les 30 secondes")
+
+
+def est_erreur(nom: str, statut: int) -> bool:
+    """Échec réseau (statut 0), erreur serveur ou statut 4xx inattendu"""
+    if statut == 0 or statut >= 500:
+        return True
+    return statut >= 400 and statut not in STATUTS_ATTENDUS.get(nom, ())
+
+
+def synthetiser(mesures: list[tuple], duree: float) -> dict:
+    """Débit, latences (en millisecondes), erreurs et répartition des statuts HTTP
+    par endpoint et au global"""
+    par_endpoint, total = {}, []
+    for nom, latence, statut in mesures:
+        valeur = (latence, statut, est_erreur(nom, statut))
+        par_endpoint.setdefault(nom, []).append(valeur)
+        total.append(valeur)
+    par_endpoint["TOTAL"] = total
+
+    resultats = {}
+    for nom, valeurs in par_endpoint.items():
+        latences = sorted(latence * 1000 for latence, _, _ in valeurs)
+        statuts = {}
+        for _, statut, _ in valeurs:
+            statuts[str(statut)] = statuts.get(str(statut), 0) + 1
+        resultats[nom] = {
+            "requetes": len(valeurs),
+            "erreurs": sum(1 for _, _, erreur in valeurs if erreur),
+            "statuts": dict(sorted(statuts.items())),
+            "debit": round(len(valeurs) / duree, 2),
+            "moyenne_ms": round(sum(latences) / len(latences), 2),
+            "p50_ms": round(percentile(latences, 50), 2),
+            "p95_ms": round(percentile(latences, 95), 2),
+            "p99_ms": round(percentile(latences, 99), 2),
+        }
+    return resultats
+
+
+def comparer(resultats: dict, reference: dict, seuil: float) -> list[str]:
+    """Liste des régressions : p95 plus lent ou débit plus faible que la référence au-delà du seuil"""
+    regressions = []
+    for nom, mesure in resultats["endpoints"].items():
+        ref = reference["endpoints"].get(nom)
+        if ref is None:
+            continue
+        if ref["p95_ms"] > 0 and mesure["p95_ms"] > ref["p95_ms"] * (1 + seuil):
+            regressions.append(f"{nom} : p95 {ref['p95_ms']} ms -> {mesure['p95_ms']} ms")
+        if ref["debit"] > 0 and mesure["debit"] < ref["debit"] * (1 - seuil):
+            regressions.append(f"{nom} : débit {ref['debit']} -> {mesure['debit']} req/s")
+    return regressions
+
+
+def commit_courant() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API REST")
+    parser.add_argument("--utilisateurs", type=int, default=1000)
+    parser.add_argument("--activites", type=int, default=10000)
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--schema", default="projet_bench")
+    parser.add_argument("--sans-reset", action="store_true", help="Réutiliser la base existante")
+    parser.add_argument("--port", type=int, default=9877)
+    parser.add_argument("--workers", type=int, default=1, help="Workers uvicorn")
+    parser.add_argument("--clients", type=int, default=8, help="Clients concurrents")
+    parser.add_argument(
+        "--avec-limiteur",
+        action="store_true",
+        help="Garder la limitation des tentatives d'authentification (LIMITEUR_*)",
+    )
+    parser.add_argument("--duree", type=float, default=30, help="Durée mesurée (s)")
+    parser.add_argument("--echauffement", type=float, default=5, help="Durée non mesurée (s)")
+    parser.add_argument("--sortie", default=None, help="Fichier JSON de résultats")
+    parser.add_argument("--reference", default=None, help="Résultats JSON de référence")
+    parser.add_argument("--seuil", type=float, default=0.15, help="Tolérance de régression")
+    args = parser.parse_args()
+
+    if not args.sans_reset:
+        os.environ["POSTGRES_SCHEMA"] = args.schema
+        ResetDatabase().lancer(
+            generateur=GenerateurDonnees(
+                nb_utilisateurs=args.utilisateurs,
+                nb_activites=args.activites,
+                graine=args.graine,
+            )
+        )
+
+    with open(FICHIER_GPX, "rb") as f:
+        gpx = f.read()
+
+    api = lancer_api(args.port, args.schema, args.workers, args.avec_limiteur)
+    try:
+        url = f"http://localhost:{args.port}"
+        for phase, duree in [("echauffement", args.echauffement), ("mesure", args.duree)]:
+            mesures = []
+            fin = time.perf_counter() + duree
+            clients = [
+                ClientCharge(
+                    i, url, args.utilisateurs, args.activites, fin, args.graine, gpx, mesures
+                )
+                for i in range(args.clients)
+            ]
+            debut = time.perf_counter()
+            for c in clients:
+                c.start()
+            for c in clients:
+                c.join()
+            duree_reelle = time.perf_counter() - debut
+            print(f"{phase} : {len(mesures)} requêtes en {duree_reelle:.1f} s")
+    finally:
+        api.terminate()
+        api.wait()
+
+    commit = commit_courant()
+    resultats = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "parametres": vars(args),
+        "endpoints": synthetiser(mesures, duree_reelle),
+    }
+
+    sortie = args.sortie or os.path.join(
+        "bench_resultats", f"charge_{commit}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(sortie) or ".", exist_ok=True)
+    with open(sortie, "w", encoding="utf-8") as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+
+    print(f"{'endpoint':45} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}")
+    for nom, m in resultats["endpoints"].items():
+        print(
+            f"{nom:45} {m['debit']:8} {m['p50_ms']:8} {m['p95_ms']:8} "
+            f"{m['p99_ms']:8} {m['erreurs']:5}"
+        )
+    print(f"Résultats enregistrés dans {sortie}")
+
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+        regressions = comparer(resultats, reference, args.seuil)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        if regressions:
+            sys.exit(1)
+        print(f"Aucune régression par rapport à {reference.get('commit')}")
+
+
+if __name__ == "__main__":
+    main()
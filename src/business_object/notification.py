@@ -0,0 +1,100 @@
+import json
+
+from datetime import datetime
+from typing import Optional
+
+
+class Notification:
+    """Classe représentant une notification envoyée à un utilisateur
+
+    Attributes
+    ----------
+    type_notification : str
+        évènement notifié : 'jaime', 'commentaire' ou 'abonnement'
+    id_destinataire : int
+        identifiant de l'utilisateur notifié
+    id_auteur : int
+        identifiant de l'utilisateur à l'origine de l'évènement
+    id_activite : int, optional
+        identifiant de l'activité aimée ou commentée (None pour un abonnement)
+    date_notification : datetime, optional
+        date et heure de l'évènement
+    id_notification : int, optional
+        identifiant unique (une fois enregistrée)
+    lue : bool
+        la notification a été vue par son destinataire
+    """
+
+    TYPES = ("jaime", "commentaire", "abonnement")
+
+    def __init__(
+        self,
+        type_notification: str,
+        id_destinataire: int,
+        id_auteur: int,
+        id_activite: Optional[int] = None,
+        date_notification: Optional[datetime] = None,
+        id_notification: Optional[int] = None,
+        lue: bool = False,
+    ):
+        if type_notification not in self.TYPES:
+            raise ValueError(
+                f"Le type de notification doit valoir {', '.join(self.TYPES)}"
+            )
+        self.type_notification = type_notification
+        self.id_destinataire = id_destinataire
+        self.id_auteur = id_auteur
+        self.id_activite = id_activite
+        self.date_notification = date_notification
+        self.id_notification = id_notification
+        self.lue = lue
+
+    @classmethod
+    def depuis_json(cls, charge: str) -> "Notification":
+        """Notification décrite par le message JSON émis par pg_notify
+
+        Raises
+        ------
+        ValueError
+            si le message n'est pas une notification valide
+        """
+        try:
+            donnees = json.loads(charge)
+            date_notification = donnees.get("date")
+            return cls(
+                type_notification=donnees["type"],
+                id_destinataire=int(donnees["id_destinataire"]),
+                id_auteur=int(donnees["id_auteur"]),
+                id_activite=donnees.get("id_activite"),
+                date_notification=(
+                    datetime.fromisoformat(date_notification) if date_notification else None
+                ),
+            )
+        except (KeyError, TypeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Notification invalide : {charge!r}") from e
+
+    def en_dict(self) -> dict:
+        """Représentation JSON envoyée aux clients"""
+        return {
+            "type": self.type_notification,
+            "id_auteur": self.id_auteur,
+            "id_activite": self.id_activite,
+            "date": (
+                self.date_notification.isoformat() if self.date_notification else None
+            ),
+        }
+
+    def en_json(self) -> str:
+        """Message émis par pg_notify (relu par depuis_json)"""
+        return json.dumps({"id_destinataire": self.id_destinataire, **self.en_dict()})
+
+    def __repr__(self) -> str:
+        return (
+            f"Notification(id_notification={self.id_notification!r}, "
+            f"type_notification={self.type_notification!r}, "
+            f"id_destinataire={self.id_destinataire!r}, "
+            f"id_auteur={self.id_auteur!r}, "
+            f"id_activite={self.id_activite!r}, "
+            f"date_notification={self.date_notification!r}, "
+            f"lue={self.lue!r})"
+        )
@@ -4,6 +4,9 @@ import logging
 from utils.log_decorator import log
 
 from dao.db_connection import DBConnection
+from dao.graphe_abonnements import enregistrer_abonnement, enregistrer_desabonnement
+from dao.notifications_temps_reel import notifier_utilisateur
+from dao.notification_dao import enregistrer_notification
 
 from business_object.abonnement import Abonnement
 
@@ -31,16 +34,37 @@ class AbonnementDao:
         try:
             with DBConnection().connection as connection:
                 with connection.cursor() as cursor:
+                    # Les compteurs des deux utilisateurs sont mis à jour par la même
+                    # requête : ils restent cohérents avec la table abonnement
                     cursor.execute(
-                        "INSERT INTO abonnement(id_utilisateur_suiveur, id_utilisateur_suivi) VALUES "
-                        "(%(id_utilisateur_suiveur)s, %(id_utilisateur_suivi)s)                      "
-                        "  RETURNING id_utilisateur_suiveur, id_utilisateur_suivi;                   ",
+                        "WITH ajout AS (                                                       "
+                        "  INSERT INTO abonnement(id_utilisateur_suiveur, id_utilisateur_suivi) "
+                        "  VALUES (%(id_utilisateur_suiveur)s, %(id_utilisateur_suivi)s)       "
+                        "  RETURNING id_utilisateur_suiveur, id_utilisateur_suivi              "
+                        "), compteurs AS (                                                     "
+                        "  UPDATE utilisateur u                                                "
+                        "     SET nb_suivis = nb_suivis                                        "
+                        "           + (u.id_utilisateur = a.id_utilisateur_suiveur)::int,      "
+                        "         nb_suiveurs = nb_suiveurs                                    "
+                        "           + (u.id_utilisateur = a.id_utilisateur_suivi)::int         "
+                        "    FROM ajout a                                                      "
+                        "   WHERE u.id_utilisateur IN (a.id_utilisateur_suiveur,               "
+                        "                              a.id_utilisateur_suivi)                 "
+                        ")                                                                     "
+                        "SELECT id_utilisateur_suiveur, id_utilisateur_suivi FROM ajout;       ",
                         {
                             "id_utilisateur_suiveur": abonnement.id_utilisateur_suiveur,
                             "id_utilisateur_suivi": abonnement.id_utilisateur_suivi,
                         },
                     )
                     res = cursor.fetchone()
+                    # Délivrée à la validation de la transaction
+                    notification = notifier_utilisateur(
+                        cursor,
+                        "abonnement",
+                        abonnement.id_utilisateur_suivi,
+                        abonnement.id_utilisateur_suiveur,
+                    )
         except Exception as e:
             logging.error(e)
             raise
@@ -50,6 +74,10 @@ class AbonnementDao:
             logging.error(msg_err)
             raise DatabaseCreationError(msg_err)
 
+        enregistrer_abonnement(
+            abonnement.id_utilisateur_suiveur, abonnement.id_utilisateur_suivi
+        )
+        enregistrer_notification(notification)
         return abonnement
 
     @log
@@ -177,6 +205,83 @@ class AbonnementDao:
 
         return liste_abonnements
 
+    @log
+    def compter(self, id_utilisateur: int) -> dict | None:
+        """Nombres de suiveurs et de suivis d'un utilisateur (compteurs de la table
+        utilisateur, lus par clé primaire)
+
+        Parameters
+        ----------
+        id_utilisateur : int
+            ID de l'utilisateur
+
+        Returns
+        -------
+        dict | None
+            {"nb_suiveurs": int, "nb_suivis": int}, None si l'utilisateur n'existe pas
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT nb_suiveurs, nb_suivis                           "
+                        "  FROM utilisateur                                      "
+                        " WHERE id_utilisateur = %(id_utilisateur)s;             ",
+                        {"id_utilisateur": id_utilisateur},
+                    )
+                    res = cursor.fetchone()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        if res is None:
+            return None
+        return {"nb_suiveurs": res["nb_suiveurs"], "nb_suivis": res["nb_suivis"]}
+
+    @log
+    def lister_suivis_communs(
+        self, id_utilisateur_a: int, id_utilisateur_b: int
+    ) -> List[int]:
+        """Lister les utilisateurs suivis à la fois par deux utilisateurs
+
+        Intersection calculée par PostgreSQL sur la clé primaire (suiveur, suivi) :
+        deux parcours d'index triés par id_utilisateur_suivi, sans lecture de la table
+
+        Parameters
+        ----------
+        id_utilisateur_a : int
+            ID du premier utilisateur
+        id_utilisateur_b : int
+            ID du second utilisateur
+
+        Returns
+        -------
+        List[int]
+            ids (triés) des utilisateurs suivis par les deux
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT a.id_utilisateur_suivi                                  "
+                        "  FROM abonnement a                                            "
+                        "  JOIN abonnement b                                            "
+                        "    ON b.id_utilisateur_suivi = a.id_utilisateur_suivi         "
+                        "   AND b.id_utilisateur_suiveur = %(id_utilisateur_b)s         "
+                        " WHERE a.id_utilisateur_suiveur = %(id_utilisateur_a)s         "
+                        " ORDER BY a.id_utilisateur_suivi;                              ",
+                        {
+                            "id_utilisateur_a": id_utilisateur_a,
+                            "id_utilisateur_b": id_utilisateur_b,
+                        },
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return [row["id_utilisateur_suivi"] for row in res]
+
     @log
     def lister_tous(self) -> List[Abonnement]:
         """Lister tous les abonnements
@@ -227,9 +332,22 @@ class AbonnementDao:
             with DBConnection().connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
-                        "DELETE FROM abonnement                                      "
-                        " WHERE id_utilisateur_suiveur = %(id_utilisateur_suiveur)s "
-                        "   AND id_utilisateur_suivi = %(id_utilisateur_suivi)s;    ",
+                        "WITH retrait AS (                                                     "
+                        "  DELETE FROM abonnement                                              "
+                        "   WHERE id_utilisateur_suiveur = %(id_utilisateur_suiveur)s         "
+                        "     AND id_utilisateur_suivi = %(id_utilisateur_suivi)s              "
+                        "  RETURNING id_utilisateur_suiveur, id_utilisateur_suivi              "
+                        "), compteurs AS (                                                     "
+                        "  UPDATE utilisateur u                                                "
+                        "     SET nb_suivis = nb_suivis                                        "
+                        "           - (u.id_utilisateur = r.id_utilisateur_suiveur)::int,      "
+                        "         nb_suiveurs = nb_suiveurs                                    "
+                        "           - (u.id_utilisateur = r.id_utilisateur_suivi)::int         "
+                        "    FROM retrait r                                                    "
+                        "   WHERE u.id_utilisateur IN (r.id_utilisateur_suiveur,               "
+                        "                              r.id_utilisateur_suivi)                 "
+                        ")                                                                     "
+                        "SELECT 1 FROM retrait;                                                ",
                         {
                             "id_utilisateur_suiveur": id_utilisateur_suiveur,
                             "id_utilisateur_suivi": id_utilisateur_suivi,
@@ -245,4 +363,5 @@ class AbonnementDao:
             logging.error(msg_err)
             raise DatabaseDeletionError(msg_err)
 
+        enregistrer_desabonnement(id_utilisateur_suiveur, id_utilisateur_suivi)
         return True
@@ -3,7 +3,9 @@ from utils.log_decorator import log
 
 from typing import List
 
+from utils.versions import changer_version
 from dao.db_connection import DBConnection
+from dao.compteurs_tendances import oublier_activite
 
 from business_object.activite import Activite
 
@@ -60,6 +62,7 @@ class ActiviteDao:
             raise DatabaseCreationError(msg_err)
 
         activite.id_activite = res["id_activite"]
+        changer_version("activites", activite.id_utilisateur)
         return activite
 
     @log
@@ -119,13 +122,16 @@ class ActiviteDao:
                 with connection.cursor() as cursor:
                     cursor.execute(
                         """
-                        UPDATE activite
+                        UPDATE activite a
                         SET id_utilisateur=%(id_utilisateur)s,
                             sport=%(sport)s,
                             date_activite=%(date_activite)s,
                             distance=%(distance)s,
                             duree=%(duree)s
-                        WHERE id_activite=%(id_activite)s;
+                        FROM activite ancienne
+                        WHERE a.id_activite=%(id_activite)s
+                          AND ancienne.id_activite=a.id_activite
+                        RETURNING ancienne.id_utilisateur;
                         """,
                         {
                             "id_activite": activite.id_activite,
@@ -136,16 +142,17 @@ class ActiviteDao:
                             "duree": activite.duree,
                         },
                     )
-                    res = cursor.rowcount
+                    res = cursor.fetchone()
         except Exception as e:
             logging.error(e)
             raise
 
-        if res < 1:
+        if res is None:
             msg_err = "Echec de la modification de l'activité : aucune ligne retournée par la base"
             logging.error(msg_err)
             raise DatabaseUpdateError(msg_err)
 
+        changer_version("activites", res["id_utilisateur"], activite.id_utilisateur)
         return True
 
     @log
@@ -166,19 +173,30 @@ class ActiviteDao:
             with DBConnection().connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
-                        "DELETE FROM activite WHERE id_activite=%(id_activite)s;",
+                        "DELETE FROM activite WHERE id_activite=%(id_activite)s "
+                        "RETURNING id_utilisateur;",
+                        {"id_activite": id_activite},
+                    )
+                    res = cursor.fetchone()
+                    # Pas de clé étrangère sur tendance_compteur
+                    cursor.execute(
+                        "DELETE FROM tendance_compteur "
+                        " WHERE id_activite = %(id_activite)s;",
                         {"id_activite": id_activite},
                     )
-                    res = cursor.rowcount
         except Exception as e:
             logging.error(e)
             raise
 
-        if res < 1:
+        if res is None:
             msg_err = "Echec de la suppression de l'activité : aucune ligne retournée par la base"
             logging.error(msg_err)
             raise DatabaseDeletionError(msg_err)
 
+        # Les commentaires de l'activité sont supprimés en cascade
+        changer_version("activites", res["id_utilisateur"])
+        changer_version("commentaires", id_activite)
+        oublier_activite(id_activite)
         return True
 
     @log
@@ -264,7 +282,7 @@ class ActiviteDao:
             query += " AND date_activite <= %(date_fin)s"
             params["date_fin"] = date_fin
 
-        query += " ORDER BY date_activite DESC;"
+        query += " ORDER BY date_activite DESC NULLS LAST;"
 
         res = None
         try:
@@ -317,3 +335,191 @@ class ActiviteDao:
         except Exception as e:
             logging.error(f"Erreur lors de la vérification de l'id {id_activite}: {e}")
             raise
+
+    @log
+    def filtrer_existantes(self, ids_activites: List[int]) -> set[int]:
+        """Identifiants des activités qui existent encore, parmi ceux donnés
+
+        Parameters
+        ----------
+        ids_activites : List[int]
+            Identifiants des activités à vérifier
+
+        Returns
+        -------
+        set[int]
+            Les identifiants des activités présentes en base
+        """
+        if not ids_activites:
+            return set()
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id_activite FROM activite "
+                        " WHERE id_activite = ANY(%(ids)s);",
+                        {"ids": list(ids_activites)},
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return {row["id_activite"] for row in res}
+
+    @log
+    def compter_par_sport(self, ids_utilisateurs: List[int] = None) -> List[tuple]:
+        """Nombre d'activités de chaque utilisateur par sport, en une requête
+
+        Parameters
+        ----------
+        ids_utilisateurs : List[int], optional
+            Utilisateurs concernés (tous si None)
+
+        Returns
+        -------
+        List[tuple]
+            Triplets (id_utilisateur, sport, nombre d'activités)
+        """
+        query = "SELECT id_utilisateur, sport, COUNT(*) AS nb FROM activite"
+        params = {}
+        if ids_utilisateurs is not None:
+            query += " WHERE id_utilisateur = ANY(%(ids)s)"
+            params["ids"] = list(ids_utilisateurs)
+        query += " GROUP BY id_utilisateur, sport;"
+
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(query, params)
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return [(row["id_utilisateur"], row["sport"], row["nb"]) for row in res]
+
+    @log
+    def lister_utilisateurs_actifs(self, date_debut) -> List[int]:
+        """Lister les ids des utilisateurs ayant publié une activité depuis une date
+
+        Parameters
+        ----------
+        date_debut : date | str
+            Date (incluse) à partir de laquelle un utilisateur est considéré actif
+
+        Returns
+        -------
+        List[int]
+            Ids des utilisateurs actifs (triés)
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT DISTINCT id_utilisateur FROM activite "
+                        " WHERE date_activite >= %(date_debut)s "
+                        " ORDER BY id_utilisateur;",
+                        {"date_debut": date_debut},
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return [row["id_utilisateur"] for row in res]
+
+    @log
+    def lister_candidats_fil(
+        self, id_utilisateur: int, limite: int, limite_par_auteur: int
+    ) -> List[dict]:
+        """Activités candidates au fil classé d'un utilisateur, en une requête
+
+        Les activités les plus récentes de chaque utilisateur suivi (parcours de
+        l'index (id_utilisateur, date_activite) limité à limite_par_auteur lignes,
+        les activités sans date en dernier),
+        avec leurs nombres de jaimes et de commentaires et l'affinité de l'utilisateur
+        avec leur auteur (nombre de jaimes et commentaires qu'il lui a déjà laissés).
+
+        Parameters
+        ----------
+        id_utilisateur : int
+            Utilisateur dont on construit le fil
+        limite : int
+            Nombre maximal de candidats (les plus récents)
+        limite_par_auteur : int
+            Nombre maximal de candidats par utilisateur suivi
+
+        Returns
+        -------
+        List[dict]
+            {"activite": Activite, "nb_jaimes": int, "nb_commentaires": int,
+            "affinite": int} par date décroissante
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "WITH candidats AS (                                            "
+                        "  SELECT a.*                                                   "
+                        "    FROM abonnement ab                                         "
+                        "   CROSS JOIN LATERAL (                                        "
+                        "         SELECT * FROM activite                                "
+                        "          WHERE id_utilisateur = ab.id_utilisateur_suivi       "
+                        "          ORDER BY date_activite DESC NULLS LAST,              "
+                        "                   id_activite DESC                            "
+                        "          LIMIT %(limite_par_auteur)s) a                       "
+                        "   WHERE ab.id_utilisateur_suiveur = %(id_utilisateur)s        "
+                        "   ORDER BY a.date_activite DESC NULLS LAST,                   "
+                        "            a.id_activite DESC                                 "
+                        "   LIMIT %(limite)s                                            "
+                        "), interactions AS (                                           "
+                        "  SELECT id_activite FROM jaime                                "
+                        "   WHERE id_auteur = %(id_utilisateur)s                        "
+                        "  UNION ALL                                                    "
+                        "  SELECT id_activite FROM commentaire                          "
+                        "   WHERE id_auteur = %(id_utilisateur)s                        "
+                        "), affinites AS (                                              "
+                        "  SELECT a.id_utilisateur, COUNT(*) AS nb                      "
+                        "    FROM interactions i                                        "
+                        "    JOIN activite a ON a.id_activite = i.id_activite           "
+                        "   GROUP BY a.id_utilisateur                                   "
+                        ")                                                              "
+                        "SELECT c.*,                                                    "
+                        "       (SELECT COUNT(*) FROM jaime j                           "
+                        "         WHERE j.id_activite = c.id_activite) AS nb_jaimes,    "
+                        "       (SELECT COUNT(*) FROM commentaire co                    "
+                        "         WHERE co.id_activite = c.id_activite)                 "
+                        "         AS nb_commentaires,                                   "
+                        "       COALESCE(f.nb, 0) AS affinite                           "
+                        "  FROM candidats c                                             "
+                        "  LEFT JOIN affinites f ON f.id_utilisateur = c.id_utilisateur "
+                        " ORDER BY c.date_activite DESC NULLS LAST,                     "
+                        "          c.id_activite DESC;                                  ",
+                        {
+                            "id_utilisateur": id_utilisateur,
+                            "limite": limite,
+                            "limite_par_auteur": limite_par_auteur,
+                        },
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return [
+            {
+                "activite": Activite(
+                    id_activite=row["id_activite"],
+                    id_utilisateur=row["id_utilisateur"],
+                    sport=row["sport"],
+                    date_activite=row["date_activite"],
+                    distance=row["distance"],
+                    duree=row["duree"],
+                ),
+                "nb_jaimes": row["nb_jaimes"],
+                "nb_commentaires": row["nb_commentaires"],
+                "affinite": row["affinite"],
+            }
+            for row in res
+        ]
@@ -4,7 +4,11 @@ import logging
 
 from utils.log_decorator import log
 
+from utils.versions import changer_version
 from dao.db_connection import DBConnection
+from dao.compteurs_tendances import enregistrer_commentaire, retirer_commentaire
+from dao.notifications_temps_reel import notifier_activite
+from dao.notification_dao import enregistrer_notification
 
 from business_object.commentaire import Commentaire
 
@@ -43,6 +47,10 @@ class CommentaireDao:
                         },
                     )
                     res = cursor.fetchone()
+                    # Délivrée à la validation de la transaction
+                    notification = notifier_activite(
+                        cursor, "commentaire", commentaire.id_activite, commentaire.id_auteur
+                    )
         except Exception as e:
             logging.error(e)
             raise
@@ -53,6 +61,9 @@ class CommentaireDao:
             raise DatabaseCreationError(msg_err)
 
         commentaire.id_commentaire = res["id_commentaire"]
+        changer_version("commentaires", commentaire.id_activite)
+        enregistrer_commentaire(commentaire.id_activite)
+        enregistrer_notification(notification)
         return commentaire
 
     @log
@@ -73,7 +84,8 @@ class CommentaireDao:
             with DBConnection().connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
-                        "SELECT *                              "
+                        "SELECT id_commentaire, id_activite, id_auteur,   "
+                        "       contenu, date_commentaire                 "
                         "  FROM commentaire                        "
                         "  WHERE id_activite= %(id_activite)s;  ",
                         {"id_activite": id_activite},
@@ -99,6 +111,61 @@ class CommentaireDao:
 
         return liste_commentaires
 
+    @log
+    def rechercher(
+        self, texte: str, limite: int, decalage: int = 0
+    ) -> List[Commentaire]:
+        """Recherche plein texte dans le contenu des commentaires
+
+        Le texte suit la syntaxe des moteurs de recherche (websearch_to_tsquery) : mots
+        (racinisés, configuration française), "expression exacte", -exclu, or. La
+        recherche utilise l'index GIN de la colonne contenu_tsv.
+
+        Parameters
+        ----------
+        texte : str
+            texte recherché
+        limite : int
+            nombre maximal de commentaires renvoyés
+        decalage : int
+            nombre de commentaires à sauter (pages suivantes)
+
+        Returns
+        -------
+        List[Commentaire]
+            Les commentaires trouvés, du plus au moins pertinent (les plus récents
+            d'abord à pertinence égale)
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id_commentaire, id_activite, id_auteur,             "
+                        "       contenu, date_commentaire                           "
+                        "  FROM commentaire,                                        "
+                        "       websearch_to_tsquery('french', %(texte)s) requete   "
+                        " WHERE contenu_tsv @@ requete                              "
+                        " ORDER BY ts_rank_cd(contenu_tsv, requete) DESC,           "
+                        "          id_commentaire DESC                              "
+                        " LIMIT %(limite)s OFFSET %(decalage)s;                     ",
+                        {"texte": texte, "limite": limite, "decalage": decalage},
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return [
+            Commentaire(
+                id_commentaire=row["id_commentaire"],
+                id_activite=row["id_activite"],
+                id_auteur=row["id_auteur"],
+                contenu=row["contenu"],
+                date_commentaire=row["date_commentaire"],
+            )
+            for row in res
+        ]
+
     @log
     def supprimer(self, id_commentaire: int) -> bool:
         """Suppression d'un commentaire dans la base de données
@@ -119,19 +186,22 @@ class CommentaireDao:
                     # Supprimer le commentaire
                     cursor.execute(
                         "DELETE FROM commentaire                  "
-                        " WHERE id_commentaire=%(id_commentaire)s      ",
+                        " WHERE id_commentaire=%(id_commentaire)s      "
+                        " RETURNING id_activite                        ",
                         {"id_commentaire": id_commentaire},
                     )
-                    res = cursor.rowcount
+                    res = cursor.fetchone()
         except Exception as e:
             logging.error(e)
             raise
 
-        if res < 1:
+        if res is None:
             msg_err = "Echec de la suppression du commentaire : aucune ligne retournée par la base"
             logging.error(msg_err)
             raise DatabaseDeletionError(msg_err)
 
+        changer_version("commentaires", res["id_activite"])
+        retirer_commentaire(res["id_activite"])
         return True
 
     @log
@@ -152,7 +222,10 @@ class CommentaireDao:
             with DBConnection().connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(
-                        "SELECT * FROM commentaire WHERE id_commentaire = %(id_commentaire)s;",
+                        "SELECT id_commentaire, id_activite, id_auteur,   "
+                        "       contenu, date_commentaire                 "
+                        "  FROM commentaire                               "
+                        " WHERE id_commentaire = %(id_commentaire)s;      ",
                         {"id_commentaire": id_commentaire},
                     )
                     res = cursor.fetchone()
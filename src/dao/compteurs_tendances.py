@@ -0,0 +1,293 @@
+"""Compteurs de jaimes et de commentaires par activité sur des fenêtres glissantes
+
+Les évènements (jaime, commentaire) sont comptés en mémoire dans des seaux d'une heure.
+Un jaime retiré ou un commentaire supprimé compte pour -1 dans le seau courant : aimer
+puis retirer son jaime ne fait pas monter une activité. Pour chaque période (24h, 7j),
+les totaux par activité sont tenus à jour au fil de l'eau : un évènement est ajouté
+aux totaux, un seau qui sort de la période en est retranché. Les plus aimées /
+commentées sont extraites des totaux par un tas (heapq.nlargest) : aucune agrégation
+de la table jaime n'est faite à la lecture.
+
+Les seaux sont écrits périodiquement dans la table tendance_compteur (une ligne par
+heure et par activité), puis relus sur la plus longue période : chaque processus
+retrouve ainsi les évènements enregistrés par les autres (avec un décalage d'au plus
+TENDANCES_INTERVALLE secondes) et les compteurs survivent aux redémarrages.
+"""
+
+import time
+import heapq
+import logging
+import threading
+
+from operator import itemgetter
+
+from psycopg2.extras import execute_values
+
+from dao.db_connection import DBConnection
+from utils.reinitialisation import a_reinitialiser
+
+# Période -> nombre de seaux d'une heure
+PERIODES = {"24h": 24, "7j": 7 * 24}
+TYPES = ("jaimes", "commentaires")
+
+_DUREE_SEAU = 3600
+_NB_SEAUX_MAX = max(PERIODES.values())
+
+# Les classements (NB_MAX_CLASSEMENT premières activités) sont réutilisés pendant
+# DUREE_CLASSEMENT secondes : l'extraction par tas parcourt tous les totaux
+NB_MAX_CLASSEMENT = 100
+DUREE_CLASSEMENT = 5.0
+
+
+class CompteursTendances:
+    """Seaux horaires et totaux glissants des jaimes et commentaires
+
+    Parameters
+    ----------
+    horloge : Callable[[], float]
+        source du temps (secondes depuis l'epoch), remplaçable dans les tests
+    """
+
+    def __init__(self, horloge=time.time):
+        self.horloge = horloge
+        self._verrou = threading.Lock()
+        self._verrou_synchronisation = threading.Lock()
+        self.charge = False
+        self._reinitialiser()
+
+    def _reinitialiser(self):
+        # type -> heure -> id_activite -> nombre
+        self._seaux = {t: {} for t in TYPES}
+        # évènements pas encore écrits en base : (heure, id_activite) -> [jaimes, commentaires]
+        self._en_attente = {}
+        # période -> type -> id_activite -> total sur la période
+        self._totaux = {p: {t: {} for t in TYPES} for p in PERIODES}
+        # période -> première heure comptée dans les totaux
+        self._debuts = {p: self._heure() - n + 1 for p, n in PERIODES.items()}
+        self._heure_courante = self._heure()
+        # (période, type) -> (instant du calcul, classement)
+        self._classements = {}
+
+    def _heure(self) -> int:
+        return int(self.horloge() // _DUREE_SEAU)
+
+    # --- Écritures ---
+
+    def enregistrer(self, type_evenement: str, id_activite: int, nombre: int = 1):
+        """Compte un évènement ('jaimes' ou 'commentaires') sur une activité (nombre
+        négatif pour un retrait)"""
+        indice = TYPES.index(type_evenement)
+        with self._verrou:
+            heure = self._avancer()
+            self._ajouter(type_evenement, heure, id_activite, nombre)
+            attente = self._en_attente.setdefault((heure, id_activite), [0, 0])
+            attente[indice] += nombre
+
+    @staticmethod
+    def _incrementer(compteurs: dict, id_activite: int, nombre: int):
+        """Les compteurs nuls sont retirés (les valeurs négatives sont gardées : un
+        retrait compense un ajout compté dans un autre seau)"""
+        total = compteurs.get(id_activite, 0) + nombre
+        if total:
+            compteurs[id_activite] = total
+        else:
+            compteurs.pop(id_activite, None)
+
+    def _ajouter(self, type_evenement: str, heure: int, id_activite: int, nombre: int):
+        self._incrementer(
+            self._seaux[type_evenement].setdefault(heure, {}), id_activite, nombre
+        )
+        for periode, debut in self._debuts.items():
+            if heure >= debut:
+                totaux = self._totaux[periode][type_evenement]
+                self._incrementer(totaux, id_activite, nombre)
+
+    def _avancer(self) -> int:
+        """Retranche des totaux les seaux sortis de chaque période (seulement au
+        changement d'heure)"""
+        heure = self._heure()
+        if heure == self._heure_courante:
+            return heure
+        self._heure_courante = heure
+        for periode, nb_seaux in PERIODES.items():
+            nouveau_debut = heure - nb_seaux + 1
+            ancien_debut = self._debuts[periode]
+            if nouveau_debut <= ancien_debut:
+                continue
+            for type_evenement in TYPES:
+                totaux = self._totaux[periode][type_evenement]
+                seaux = self._seaux[type_evenement]
+                for h in [h for h in seaux if ancien_debut <= h < nouveau_debut]:
+                    for id_activite, nombre in seaux[h].items():
+                        self._incrementer(totaux, id_activite, -nombre)
+            self._debuts[periode] = nouveau_debut
+
+        limite = heure - _NB_SEAUX_MAX + 1
+        for seaux in self._seaux.values():
+            for h in [h for h in seaux if h < limite]:
+                del seaux[h]
+        for cle in [cle for cle in self._en_attente if cle[0] < limite]:
+            del self._en_attente[cle]
+        return heure
+
+    # --- Lectures ---
+
+    def meilleures(self, periode: str, type_evenement: str, nb: int) -> list[tuple]:
+        """Les nb activités les plus aimées ou commentées sur la période
+
+        Returns
+        -------
+        list[tuple]
+            (id_activite, nombre) par nombre décroissant
+        """
+        if periode not in PERIODES:
+            raise ValueError(f"La période doit valoir {' ou '.join(PERIODES)}")
+        if nb > NB_MAX_CLASSEMENT:
+            with self._verrou:
+                self._avancer()
+                return self._classer(periode, type_evenement, nb)
+
+        maintenant = self.horloge()
+        cle = (periode, type_evenement)
+        calcul, classement = self._classements.get(cle, (None, None))
+        if calcul is None or maintenant - calcul > DUREE_CLASSEMENT:
+            with self._verrou:
+                self._avancer()
+                classement = self._classer(periode, type_evenement, NB_MAX_CLASSEMENT)
+            self._classements[cle] = (maintenant, classement)
+        return classement[:nb]
+
+    def _classer(self, periode: str, type_evenement: str, nb: int) -> list[tuple]:
+        totaux = self._totaux[periode][type_evenement]
+        # À nombre égal, l'activité la plus récente (id le plus grand) passe devant
+        classement = heapq.nlargest(nb, totaux.items(), key=itemgetter(1, 0))
+        return [(id_activite, n) for id_activite, n in classement if n > 0]
+
+    # --- Persistance ---
+
+    def ecrire_en_attente(self):
+        """Écrit en base les évènements comptés depuis la dernière écriture"""
+        with self._verrou:
+            a_ecrire, self._en_attente = self._en_attente, {}
+        if not a_ecrire:
+            return
+        lignes = [(h, i, nj, nc) for (h, i), (nj, nc) in a_ecrire.items()]
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    execute_values(
+                        cursor,
+                        "INSERT INTO tendance_compteur                            "
+                        "       (heure, id_activite, nb_jaimes, nb_commentaires)  "
+                        "VALUES %s                                                "
+                        "ON CONFLICT (heure, id_activite) DO UPDATE               "
+                        "   SET nb_jaimes = tendance_compteur.nb_jaimes           "
+                        "                   + EXCLUDED.nb_jaimes,                 "
+                        "       nb_commentaires = tendance_compteur.nb_commentaires "
+                        "                   + EXCLUDED.nb_commentaires;           ",
+                        lignes,
+                    )
+                    cursor.execute(
+                        "DELETE FROM tendance_compteur WHERE heure < %(limite)s;",
+                        {"limite": self._heure() - _NB_SEAUX_MAX + 1},
+                    )
+        except Exception as e:
+            logging.error(e)
+            # Les évènements seront écrits à la prochaine tentative
+            with self._verrou:
+                for cle, (nj, nc) in a_ecrire.items():
+                    attente = self._en_attente.setdefault(cle, [0, 0])
+                    attente[0] += nj
+                    attente[1] += nc
+            raise
+
+    def synchroniser(self):
+        """Écrit les évènements en attente puis recharge les seaux depuis la table
+        (qui contient aussi ceux des autres processus)"""
+        with self._verrou_synchronisation:
+            self.ecrire_en_attente()
+            try:
+                with DBConnection().connection as connection:
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT heure, id_activite, nb_jaimes, nb_commentaires "
+                            "  FROM tendance_compteur                              "
+                            " WHERE heure >= %(debut)s;                            ",
+                            {"debut": self._heure() - _NB_SEAUX_MAX + 1},
+                        )
+                        res = cursor.fetchall()
+            except Exception as e:
+                logging.error(e)
+                raise
+
+            with self._verrou:
+                en_attente = self._en_attente
+                self._reinitialiser()
+                self._en_attente = en_attente
+                for row in res:
+                    for type_evenement, nombre in zip(
+                        TYPES, (row["nb_jaimes"], row["nb_commentaires"])
+                    ):
+                        if nombre:
+                            self._ajouter(
+                                type_evenement, row["heure"], row["id_activite"], nombre
+                            )
+                # Évènements enregistrés pendant la synchronisation (pas encore en base)
+                for (heure, id_activite), nombres in en_attente.items():
+                    for type_evenement, nombre in zip(TYPES, nombres):
+                        if nombre:
+                            self._ajouter(type_evenement, heure, id_activite, nombre)
+                self.charge = True
+
+    def oublier(self, id_activite: int):
+        """Retire une activité supprimée des compteurs en mémoire"""
+        with self._verrou:
+            for seaux in self._seaux.values():
+                for seau in seaux.values():
+                    seau.pop(id_activite, None)
+            for par_type in self._totaux.values():
+                for totaux in par_type.values():
+                    totaux.pop(id_activite, None)
+            for cle in [cle for cle in self._en_attente if cle[1] == id_activite]:
+                del self._en_attente[cle]
+            self._classements = {}
+
+    def verifier_charge(self):
+        """Charge les compteurs depuis la table à la première lecture"""
+        if not self.charge:
+            self.synchroniser()
+
+    def invalider(self):
+        """Oublie les compteurs en mémoire (après une réinitialisation de la base)"""
+        with self._verrou:
+            self._reinitialiser()
+            self.charge = False
+
+
+compteurs_tendances = CompteursTendances()
+a_reinitialiser(compteurs_tendances.invalider)
+
+
+def enregistrer_jaime(id_activite: int):
+    """Appelée par JaimeDao après la création d'un jaime"""
+    compteurs_tendances.enregistrer("jaimes", id_activite)
+
+
+def enregistrer_commentaire(id_activite: int):
+    """Appelée par CommentaireDao après la création d'un commentaire"""
+    compteurs_tendances.enregistrer("commentaires", id_activite)
+
+
+def retirer_jaime(id_activite: int):
+    """Appelée par JaimeDao après la suppression d'un jaime"""
+    compteurs_tendances.enregistrer("jaimes", id_activite, -1)
+
+
+def retirer_commentaire(id_activite: int):
+    """Appelée par CommentaireDao après la suppression d'un commentaire"""
+    compteurs_tendances.enregistrer("commentaires", id_activite, -1)
+
+
+def oublier_activite(id_activite: int):
+    """Appelée par ActiviteDao après la suppression d'une activité"""
+    compteurs_tendances.oublier(id_activite)
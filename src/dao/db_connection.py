@@ -1,8 +1,9 @@
 import os
+import time
 import dotenv
 import psycopg2
 
-from psycopg2.extras import RealDictCursor
+from utils.instrumentation import CurseurInstrumente, enregistrer_connexion
 
 
 class DBConnection:
@@ -14,15 +15,18 @@ class DBConnection:
         """Ouverture de la connexion"""
         dotenv.load_dotenv()
 
+        debut = time.perf_counter()
         self.__connection = psycopg2.connect(
             host=os.environ["POSTGRES_HOST"],
             port=os.environ["POSTGRES_PORT"],
             database=os.environ["POSTGRES_DATABASE"],
             user=os.environ["POSTGRES_USER"],
             password=os.environ["POSTGRES_PASSWORD"],
-            options=f"-c search_path={os.environ['POSTGRES_SCHEMA']}",
-            cursor_factory=RealDictCursor,
+            # public : fonctions et opérateurs des extensions (pg_trgm)
+            options=f"-c search_path={os.environ['POSTGRES_SCHEMA']},public",
+            cursor_factory=CurseurInstrumente,
         )
+        enregistrer_connexion(time.perf_counter() - debut)
 
     @property
     def connection(self):
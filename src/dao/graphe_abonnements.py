@@ -0,0 +1,475 @@
+"""Index en mémoire du graphe des abonnements (optionnel, variable INDEX_GRAPHE)
+
+Les listes de suivis et de suiveurs sont stockées au format CSR (compressed sparse
+row) : pour les suivis, `debuts` (n+1 entiers) donne pour chaque id d'utilisateur
+la plage de `voisins` (int32, triés) qui contient les ids qu'il suit. Un voisinage
+est une vue sur le tableau (sans copie), l'appartenance une recherche dichotomique.
+Les deux sens (suivis et suiveurs) sont indexés.
+
+Les abonnements créés ou supprimés après le chargement sont gardés dans des deltas
+(ensembles d'ajouts et de suppressions) appliqués à la lecture, puis intégrés aux
+tableaux quand ils dépassent SEUIL_COMPACTION.
+
+L'index est propre à chaque processus. Un compteur partagé (cache "graphe_abonnements",
+voir utils/cache.py) est incrémenté à chaque écriture : un worker qui constate une
+écriture faite par un autre recharge l'index depuis la base. Comme pour les ETags,
+un backend de cache partagé (sqlite ou reseau) est nécessaire avec plusieurs workers.
+
+Un instantané (fichier .npz, INDEX_GRAPHE_FICHIER) permet de démarrer sans relire
+toute la table : il n'est utilisé que si son empreinte (nombre d'abonnements et MD5
+de la liste triée des couples "suiveur,suivi") correspond à celle de la table.
+"""
+
+import io
+import os
+import hashlib
+import time
+import logging
+import threading
+
+import dotenv
+import numpy as np
+
+from dao.db_connection import DBConnection
+from utils.cache import creer_cache, MANQUANT
+from utils.reinitialisation import a_reinitialiser
+
+dotenv.load_dotenv()
+
+# Nombre de modifications en attente au-delà duquel les tableaux sont reconstruits
+SEUIL_COMPACTION = 10000
+# Intervalle (en secondes) entre deux vérifications du compteur d'écritures partagé
+INTERVALLE_VERIFICATION = 1.0
+# Nombre d'abonnements convertis en texte à la fois pour le calcul de l'empreinte
+_TAILLE_BLOC_EMPREINTE = 100000
+
+_compteur = creer_cache("graphe_abonnements", taille_max=10, duree_vie=30 * 24 * 3600)
+
+
+def index_graphe_actif() -> bool:
+    return os.environ.get("INDEX_GRAPHE", "0").lower() in ("1", "true", "oui")
+
+
+class CSR:
+    """Listes d'adjacence compressées : voisins[debuts[i]:debuts[i + 1]] sont les
+    voisins (triés) du sommet i
+
+    Parameters
+    ----------
+    debuts : np.ndarray
+        positions de début des voisinages (int64, taille nb_sommets + 1)
+    voisins : np.ndarray
+        voisins concaténés (int32)
+    """
+
+    def __init__(self, debuts: np.ndarray, voisins: np.ndarray):
+        self.debuts = debuts
+        self.voisins = voisins
+
+    @classmethod
+    def depuis_aretes(cls, sources: np.ndarray, cibles: np.ndarray) -> "CSR":
+        """Construit l'index à partir des arêtes sources[k] -> cibles[k] (doublons ignorés)"""
+        # Un seul tri sur la clé (source << 32) | cible, puis retrait des doublons
+        sources = np.asarray(sources, dtype=np.int64)
+        cles = np.sort((sources << 32) | np.asarray(cibles, dtype=np.int64))
+        if len(cles):
+            distinct = np.empty(len(cles), dtype=bool)
+            distinct[0] = True
+            np.not_equal(cles[1:], cles[:-1], out=distinct[1:])
+            cles = cles[distinct]
+        sources, cibles = cles >> 32, cles & 0xFFFFFFFF
+        nb_sommets = int(sources.max()) + 1 if len(sources) else 0
+        debuts = np.zeros(nb_sommets + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=nb_sommets), out=debuts[1:])
+        return cls(debuts, cibles.astype(np.int32))
+
+    @property
+    def nb_sommets(self) -> int:
+        return len(self.debuts) - 1
+
+    def voisins_de(self, sommet: int) -> np.ndarray:
+        if not 0 <= sommet < self.nb_sommets:
+            return self.voisins[:0]
+        return self.voisins[self.debuts[sommet] : self.debuts[sommet + 1]]
+
+    def degre(self, sommet: int) -> int:
+        if not 0 <= sommet < self.nb_sommets:
+            return 0
+        return int(self.debuts[sommet + 1] - self.debuts[sommet])
+
+    def contient(self, source: int, cible: int) -> bool:
+        voisins = self.voisins_de(source)
+        position = np.searchsorted(voisins, cible)
+        return bool(position < len(voisins) and voisins[position] == cible)
+
+    def aretes(self) -> tuple[np.ndarray, np.ndarray]:
+        """Arêtes (sources, cibles) de l'index"""
+        sources = np.repeat(
+            np.arange(self.nb_sommets, dtype=np.int64), np.diff(self.debuts)
+        )
+        return sources, self.voisins.astype(np.int64)
+
+
+class GrapheAbonnements:
+    """Index des abonnements : suivis et suiveurs de chaque utilisateur
+
+    Parameters
+    ----------
+    fichier : str | None
+        chemin de l'instantané (.npz), None pour ne pas en utiliser
+    """
+
+    def __init__(self, fichier: str | None = None):
+        self.fichier = fichier
+        self._verrou = threading.RLock()
+        self._suivis = CSR.depuis_aretes([], [])
+        self._suiveurs = CSR.depuis_aretes([], [])
+        self._ajouts = set()  # (suiveur, suivi) absents des tableaux
+        self._suppressions = set()  # (suiveur, suivi) présents dans les tableaux
+        # Mêmes deltas par utilisateur : sens -> id -> ids ajoutés / retirés
+        self._ajouts_par_id = ({}, {})
+        self._suppressions_par_id = ({}, {})
+        self.charge = False
+        self._generation = None  # valeur du compteur partagé reflétée par l'index
+        self._derniere_verification = 0.0
+
+    # --- Construction ---
+
+    def construire(self, suiveurs: np.ndarray, suivis: np.ndarray):
+        """Remplace le contenu de l'index par les abonnements suiveurs[k] -> suivis[k]"""
+        index_suivis = CSR.depuis_aretes(suiveurs, suivis)
+        index_suiveurs = CSR.depuis_aretes(suivis, suiveurs)
+        with self._verrou:
+            self._suivis, self._suiveurs = index_suivis, index_suiveurs
+            self._vider_deltas()
+            self.charge = True
+
+    def charger_depuis_base(self):
+        """Lecture de toute la table abonnement (COPY) et construction de l'index"""
+        debut = time.perf_counter()
+        generation = self._lire_generation()
+        tampon = io.StringIO()
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.copy_expert(
+                        "COPY abonnement (id_utilisateur_suiveur, id_utilisateur_suivi) "
+                        "TO STDOUT WITH (FORMAT csv)",
+                        tampon,
+                    )
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        texte = tampon.getvalue()
+        if texte:
+            aretes = np.loadtxt(
+                io.StringIO(texte), delimiter=",", dtype=np.int64, ndmin=2
+            )
+        else:
+            aretes = np.empty((0, 2), dtype=np.int64)
+        self.construire(aretes[:, 0], aretes[:, 1])
+        self._generation = generation
+        logging.info(
+            f"Index des abonnements chargé : {len(aretes)} abonnements "
+            f"en {(time.perf_counter() - debut) * 1000:.0f} ms"
+        )
+
+    def charger(self):
+        """Chargement depuis l'instantané s'il est à jour, sinon depuis la base
+        (l'instantané est alors réécrit)"""
+        if self.fichier and self.charger_instantane(self.fichier):
+            return
+        self.charger_depuis_base()
+        if self.fichier:
+            self.sauvegarder(self.fichier)
+
+    def invalider(self):
+        """L'index sera rechargé à la prochaine lecture (après une réinitialisation
+        de la base ou un chargement par COPY par exemple), dans ce processus comme
+        dans les autres workers (incrément du compteur partagé)"""
+        _compteur.incrementer("generation")
+        with self._verrou:
+            self.charge = False
+
+    # --- Instantanés ---
+
+    def empreinte(self) -> tuple[int, str]:
+        """Empreinte du contenu de l'index : (nombre d'abonnements, MD5)"""
+        with self._verrou:
+            self.compacter()
+            suivis = self._suivis
+        return self._empreinte_csr(suivis)
+
+    @staticmethod
+    def _empreinte_csr(suivis: CSR) -> tuple[int, str]:
+        """MD5 du texte "suiveur,suivi" des abonnements, un par ligne, triés : le même
+        texte que celui produit par string_agg dans empreinte_base"""
+        sources, cibles = suivis.aretes()
+        md5 = hashlib.md5()
+        for debut in range(0, len(sources), _TAILLE_BLOC_EMPREINTE):
+            bloc = slice(debut, debut + _TAILLE_BLOC_EMPREINTE)
+            texte = "\n".join(
+                map("{},{}".format, sources[bloc].tolist(), cibles[bloc].tolist())
+            )
+            md5.update(("\n" if debut else "").encode() + texte.encode())
+        return len(sources), md5.hexdigest()
+
+    @staticmethod
+    def empreinte_base() -> tuple[int, str]:
+        """Empreinte de la table abonnement, calculée par PostgreSQL"""
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COUNT(*) AS nb,                                          "
+                        "       md5(COALESCE(string_agg(                                 "
+                        "           concat_ws(',', id_utilisateur_suiveur,               "
+                        "                          id_utilisateur_suivi),                "
+                        "           E'\\n'                                               "
+                        "           ORDER BY id_utilisateur_suiveur,                     "
+                        "                    id_utilisateur_suivi                        "
+                        "       ), '')) AS md5                                           "
+                        "  FROM abonnement;                                              "
+                    )
+                    res = cursor.fetchone()
+        except Exception as e:
+            logging.error(e)
+            raise
+        return int(res["nb"]), res["md5"]
+
+    def sauvegarder(self, chemin: str):
+        """Écrit l'instantané (remplacement atomique du fichier)"""
+        with self._verrou:
+            self.compacter()
+            suivis, suiveurs = self._suivis, self._suiveurs
+        # Empreinte des tableaux écrits (et non de l'index courant, qui a pu changer)
+        nb, md5 = self._empreinte_csr(suivis)
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        with open(temporaire, "wb") as f:
+            np.savez(
+                f,
+                suivis_debuts=suivis.debuts,
+                suivis_voisins=suivis.voisins,
+                suiveurs_debuts=suiveurs.debuts,
+                suiveurs_voisins=suiveurs.voisins,
+                nb_abonnements=np.array(nb, dtype=np.int64),
+                empreinte=np.array(md5),
+            )
+        os.replace(temporaire, chemin)
+
+    def charger_instantane(self, chemin: str) -> bool:
+        """Charge l'instantané s'il existe et correspond au contenu de la table"""
+        if not os.path.exists(chemin):
+            return False
+        generation = self._lire_generation()
+        try:
+            with np.load(chemin) as donnees:
+                suivis = CSR(donnees["suivis_debuts"], donnees["suivis_voisins"])
+                suiveurs = CSR(donnees["suiveurs_debuts"], donnees["suiveurs_voisins"])
+                nb = int(donnees["nb_abonnements"])
+                md5 = str(donnees["empreinte"])
+        except Exception as e:
+            logging.warning(f"Instantané de l'index des abonnements illisible : {e}")
+            return False
+        if (nb, md5) != self.empreinte_base():
+            logging.info("Instantané de l'index des abonnements périmé")
+            return False
+        with self._verrou:
+            self._suivis, self._suiveurs = suivis, suiveurs
+            self._vider_deltas()
+            self.charge = True
+        self._generation = generation
+        logging.info(f"Index des abonnements chargé depuis {chemin} : {nb} abonnements")
+        return True
+
+    # --- Mises à jour ---
+
+    def ajouter(self, id_suiveur: int, id_suivi: int):
+        with self._verrou:
+            arete = (id_suiveur, id_suivi)
+            if arete in self._suppressions:
+                self._modifier_delta(
+                    self._suppressions, self._suppressions_par_id, arete, False
+                )
+            elif not self._suivis.contient(id_suiveur, id_suivi):
+                self._modifier_delta(self._ajouts, self._ajouts_par_id, arete, True)
+            self._compacter_si_necessaire()
+
+    def retirer(self, id_suiveur: int, id_suivi: int):
+        with self._verrou:
+            arete = (id_suiveur, id_suivi)
+            if arete in self._ajouts:
+                self._modifier_delta(self._ajouts, self._ajouts_par_id, arete, False)
+            elif self._suivis.contient(id_suiveur, id_suivi):
+                self._modifier_delta(
+                    self._suppressions, self._suppressions_par_id, arete, True
+                )
+            self._compacter_si_necessaire()
+
+    @staticmethod
+    def _modifier_delta(aretes: set, par_id: tuple, arete: tuple, present: bool):
+        for sens in (0, 1):
+            id_utilisateur, autre = arete[sens], arete[1 - sens]
+            ids = par_id[sens].setdefault(id_utilisateur, set())
+            if present:
+                ids.add(autre)
+            else:
+                ids.discard(autre)
+                if not ids:
+                    del par_id[sens][id_utilisateur]
+        if present:
+            aretes.add(arete)
+        else:
+            aretes.discard(arete)
+
+    def _vider_deltas(self):
+        self._ajouts, self._suppressions = set(), set()
+        self._ajouts_par_id = ({}, {})
+        self._suppressions_par_id = ({}, {})
+
+    def retirer_utilisateur(self, id_utilisateur: int):
+        """Retire tous les abonnements d'un utilisateur supprimé"""
+        with self._verrou:
+            for id_suivi in self.suivis(id_utilisateur).tolist():
+                self.retirer(id_utilisateur, id_suivi)
+            for id_suiveur in self.suiveurs(id_utilisateur).tolist():
+                self.retirer(id_suiveur, id_utilisateur)
+
+    def compacter(self):
+        """Intègre les modifications en attente dans les tableaux"""
+        with self._verrou:
+            if not self._ajouts and not self._suppressions:
+                return
+            sources, cibles = self._suivis.aretes()
+            if self._suppressions:
+                retirees = np.array(sorted(self._suppressions), dtype=np.int64)
+                cles = sources * (1 << 32) + cibles
+                garder = ~np.isin(cles, retirees[:, 0] * (1 << 32) + retirees[:, 1])
+                sources, cibles = sources[garder], cibles[garder]
+            if self._ajouts:
+                ajoutees = np.array(list(self._ajouts), dtype=np.int64)
+                sources = np.concatenate([sources, ajoutees[:, 0]])
+                cibles = np.concatenate([cibles, ajoutees[:, 1]])
+            self.construire(sources, cibles)
+
+    def csr_suivis(self) -> CSR:
+        """Index des suivis, modifications en attente comprises (calculs par lots).
+        Les tableaux renvoyés ne sont plus modifiés : une compaction en crée d'autres"""
+        with self._verrou:
+            self.compacter()
+            return self._suivis
+
+    def _compacter_si_necessaire(self):
+        if len(self._ajouts) + len(self._suppressions) > SEUIL_COMPACTION:
+            self.compacter()
+
+    # --- Lectures ---
+
+    def suivis(self, id_utilisateur: int) -> np.ndarray:
+        """Ids (triés) des utilisateurs suivis par l'utilisateur"""
+        with self._verrou:
+            voisins = self._suivis.voisins_de(id_utilisateur)
+            if self._ajouts or self._suppressions:
+                voisins = self._appliquer_deltas(voisins, id_utilisateur, sens=0)
+        return voisins
+
+    def suiveurs(self, id_utilisateur: int) -> np.ndarray:
+        """Ids (triés) des utilisateurs qui suivent l'utilisateur"""
+        with self._verrou:
+            voisins = self._suiveurs.voisins_de(id_utilisateur)
+            if self._ajouts or self._suppressions:
+                voisins = self._appliquer_deltas(voisins, id_utilisateur, sens=1)
+        return voisins
+
+    def existe(self, id_suiveur: int, id_suivi: int) -> bool:
+        with self._verrou:
+            arete = (id_suiveur, id_suivi)
+            if arete in self._ajouts:
+                return True
+            if arete in self._suppressions:
+                return False
+            return self._suivis.contient(id_suiveur, id_suivi)
+
+    def nb_suivis(self, id_utilisateur: int) -> int:
+        return len(self.suivis(id_utilisateur))
+
+    def nb_suiveurs(self, id_utilisateur: int) -> int:
+        return len(self.suiveurs(id_utilisateur))
+
+    def _appliquer_deltas(
+        self, voisins: np.ndarray, sommet: int, sens: int
+    ) -> np.ndarray:
+        retires = self._suppressions_par_id[sens].get(sommet)
+        ajoutes = self._ajouts_par_id[sens].get(sommet)
+        if retires:
+            voisins = voisins[~np.isin(voisins, list(retires))]
+        if ajoutes:
+            voisins = np.union1d(voisins, np.array(list(ajoutes), dtype=np.int32))
+        return voisins
+
+    # --- Cohérence entre processus ---
+
+    @staticmethod
+    def _lire_generation() -> int:
+        generation = _compteur.obtenir("generation")
+        return 0 if generation is MANQUANT else generation
+
+    def signaler_ecriture(self):
+        """À appeler après chaque écriture validée dans la table abonnement
+        (les modifications doivent aussi être appliquées avec ajouter/retirer)"""
+        generation = _compteur.incrementer("generation")
+        with self._verrou:
+            if self._generation is not None and generation != self._generation + 1:
+                # Un autre processus a aussi écrit : l'index sera rechargé
+                self.charge = False
+            self._generation = generation
+
+    def verifier_fraicheur(self):
+        """Recharge l'index s'il n'est pas chargé ou si un autre processus a modifié
+        la table (vérification au plus toutes les INTERVALLE_VERIFICATION secondes)"""
+        maintenant = time.monotonic()
+        recent = maintenant - self._derniere_verification < INTERVALLE_VERIFICATION
+        if self.charge and recent:
+            return
+        self._derniere_verification = maintenant
+        if self.charge and self._lire_generation() == self._generation:
+            return
+        with self._verrou:
+            if not self.charge or self._lire_generation() != self._generation:
+                self.charger()
+
+
+graphe_abonnements = GrapheAbonnements(
+    fichier=os.environ.get("INDEX_GRAPHE_FICHIER", "graphe_abonnements.npz") or None
+)
+a_reinitialiser(graphe_abonnements.invalider)
+
+
+def enregistrer_abonnement(id_suiveur: int, id_suivi: int):
+    """Appelée par AbonnementDao après la création d'un abonnement"""
+    if index_graphe_actif():
+        graphe_abonnements.ajouter(id_suiveur, id_suivi)
+        graphe_abonnements.signaler_ecriture()
+
+
+def enregistrer_desabonnement(id_suiveur: int, id_suivi: int):
+    """Appelée par AbonnementDao après la suppression d'un abonnement"""
+    if index_graphe_actif():
+        graphe_abonnements.retirer(id_suiveur, id_suivi)
+        graphe_abonnements.signaler_ecriture()
+
+
+def enregistrer_suppression_utilisateur(id_utilisateur: int):
+    """Appelée par UtilisateurDao : ses abonnements sont supprimés en cascade"""
+    if index_graphe_actif():
+        graphe_abonnements.retirer_utilisateur(id_utilisateur)
+        graphe_abonnements.signaler_ecriture()
+
+
+def obtenir_graphe() -> GrapheAbonnements | None:
+    """Index des abonnements à jour, ou None si l'index n'est pas activé"""
+    if not index_graphe_actif():
+        return None
+    graphe_abonnements.verifier_fraicheur()
+    return graphe_abonnements
@@ -2,11 +2,17 @@ import logging
 
 from typing import List
 
+from psycopg2.extras import execute_values
+
 from utils.log_decorator import log
 
 from dao.db_connection import DBConnection
+from dao.compteurs_tendances import enregistrer_jaime, retirer_jaime
+from dao.notifications_temps_reel import notifier_activite, notifier_lot
+from dao.notification_dao import enregistrer_notification
 
 from business_object.jaime import Jaime
+from business_object.notification import Notification
 
 from exceptions import DatabaseCreationError, DatabaseDeletionError
 
@@ -43,6 +49,10 @@ class JaimeDao:
                         },
                     )
                     res = cursor.fetchone()
+                    # Délivrée à la validation de la transaction
+                    notification = notifier_activite(
+                        cursor, "jaime", jaime.id_activite, jaime.id_auteur
+                    )
         except Exception as e:
             logging.error(f"Erreur lors de la création d'un jaime : {e}")
             raise
@@ -54,8 +64,156 @@ class JaimeDao:
             logging.error(msg_err)
             raise DatabaseCreationError(msg_err)
 
+        enregistrer_jaime(jaime.id_activite)
+        enregistrer_notification(notification)
         return jaime
 
+    @staticmethod
+    def _inserer_lot(cursor, jaimes: List[Jaime]) -> List[dict]:
+        """Insère les jaimes et émet les notifications (délivrées à la validation de
+        la transaction)
+
+        Returns
+        -------
+        List[dict]
+            les lignes insérées : id_activite, id_auteur, id_utilisateur (propriétaire
+            de l'activité), date_notification
+        """
+        if not jaimes:
+            return []
+        res = execute_values(
+            cursor,
+            "WITH ajouts AS (                                             "
+            "  INSERT INTO jaime(id_activite, id_auteur)                  "
+            "  SELECT v.id_activite, v.id_auteur                          "
+            "    FROM (VALUES %s) AS v(id_activite, id_auteur)            "
+            "   WHERE EXISTS (SELECT 1 FROM activite a                    "
+            "                  WHERE a.id_activite = v.id_activite)       "
+            "     AND EXISTS (SELECT 1 FROM utilisateur u                 "
+            "                  WHERE u.id_utilisateur = v.id_auteur)      "
+            "  ON CONFLICT DO NOTHING                                     "
+            "  RETURNING id_activite, id_auteur                           "
+            ")                                                            "
+            "SELECT aj.id_activite, aj.id_auteur,                         "
+            "       act.id_utilisateur, now() AS date_notification        "
+            "  FROM ajouts aj                                             "
+            "  JOIN activite act ON act.id_activite = aj.id_activite;     ",
+            [(j.id_activite, j.id_auteur) for j in jaimes],
+            page_size=len(jaimes),
+            fetch=True,
+        )
+        notifier_lot(cursor, JaimeDao._notifications(res))
+        return res
+
+    @staticmethod
+    def _notifications(lignes: List[dict]) -> List[Notification]:
+        return [
+            Notification(
+                "jaime",
+                id_destinataire=row["id_utilisateur"],
+                id_auteur=row["id_auteur"],
+                id_activite=row["id_activite"],
+                date_notification=row["date_notification"],
+            )
+            for row in lignes
+            if row["id_utilisateur"] != row["id_auteur"]
+        ]
+
+    @staticmethod
+    def _supprimer_lot(cursor, jaimes: List[Jaime]) -> List[int]:
+        """Supprime les jaimes, renvoie l'activité de chaque jaime supprimé"""
+        if not jaimes:
+            return []
+        res = execute_values(
+            cursor,
+            "DELETE FROM jaime j                                     "
+            " USING (VALUES %s) AS v(id_activite, id_auteur)         "
+            " WHERE j.id_activite = v.id_activite                    "
+            "   AND j.id_auteur = v.id_auteur                        "
+            " RETURNING j.id_activite;                               ",
+            [(j.id_activite, j.id_auteur) for j in jaimes],
+            page_size=len(jaimes),
+            fetch=True,
+        )
+        return [row["id_activite"] for row in res]
+
+    @staticmethod
+    def _apres_suppression_lot(ids_activites: List[int]) -> int:
+        """Compteurs de tendances, une fois la transaction validée"""
+        for id_activite in ids_activites:
+            retirer_jaime(id_activite)
+        return len(ids_activites)
+
+    @staticmethod
+    def _apres_creation_lot(lignes: List[dict]) -> List[Jaime]:
+        """Compteurs de tendances et notifications, une fois la transaction validée"""
+        for row in lignes:
+            enregistrer_jaime(row["id_activite"])
+        for notification in JaimeDao._notifications(lignes):
+            enregistrer_notification(notification)
+        return [Jaime(row["id_activite"], row["id_auteur"]) for row in lignes]
+
+    @log
+    def creer_lot(self, jaimes: List[Jaime]) -> List[Jaime]:
+        """Création de plusieurs jaimes en une requête
+
+        Les jaimes déjà présents, ou dont l'activité ou l'auteur a été supprimé
+        entre-temps, sont ignorés.
+
+        Parameters
+        ----------
+        jaimes : List[Jaime]
+            Les jaimes à insérer
+
+        Returns
+        -------
+        List[Jaime]
+            Les jaimes effectivement insérés
+        """
+        if not jaimes:
+            return []
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    res = self._inserer_lot(cursor, jaimes)
+        except Exception as e:
+            logging.error(f"Erreur lors de la création d'un lot de jaimes : {e}")
+            raise
+
+        return self._apres_creation_lot(res)
+
+    @log
+    def ecrire_lot(
+        self, creations: List[Jaime], suppressions: List[Jaime]
+    ) -> tuple[List[Jaime], int]:
+        """Création et suppression de jaimes dans une même transaction : en cas
+        d'échec, aucune des deux n'est écrite
+
+        Parameters
+        ----------
+        creations : List[Jaime]
+            Les jaimes à insérer (voir creer_lot)
+        suppressions : List[Jaime]
+            Les jaimes à supprimer (voir supprimer_lot)
+
+        Returns
+        -------
+        tuple[List[Jaime], int]
+            Les jaimes effectivement insérés et le nombre de jaimes supprimés
+        """
+        if not creations and not suppressions:
+            return [], 0
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    res = self._inserer_lot(cursor, creations)
+                    supprimes = self._supprimer_lot(cursor, suppressions)
+        except Exception as e:
+            logging.error(f"Erreur lors de l'écriture d'un lot de jaimes : {e}")
+            raise
+
+        return self._apres_creation_lot(res), self._apres_suppression_lot(supprimes)
+
     @log
     def lister_par_activite(self, id_activite: int) -> List[Jaime]:
         """Lister tous les jaimes d'une activité
@@ -136,8 +294,35 @@ class JaimeDao:
             logging.error(msg_err)
             raise DatabaseDeletionError(msg_err)
 
+        retirer_jaime(id_activite)
         return True
 
+    @log
+    def supprimer_lot(self, jaimes: List[Jaime]) -> int:
+        """Suppression de plusieurs jaimes en une requête
+
+        Parameters
+        ----------
+        jaimes : List[Jaime]
+            Les jaimes à supprimer (ceux qui n'existent pas sont ignorés)
+
+        Returns
+        -------
+        int
+            Le nombre de jaimes supprimés
+        """
+        if not jaimes:
+            return 0
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    supprimes = self._supprimer_lot(cursor, jaimes)
+        except Exception as e:
+            logging.error(f"Erreur lors de la suppression d'un lot de jaimes : {e}")
+            raise
+
+        return self._apres_suppression_lot(supprimes)
+
     @log
     def existe(self, id_activite: int, id_auteur: int) -> bool:
         """Vérifie si un jaime existe déjà dans la base de données
@@ -0,0 +1,214 @@
+import os
+import logging
+
+from typing import List
+
+from psycopg2.extras import execute_values
+
+from utils.log_decorator import log
+from utils.reinitialisation import a_reinitialiser
+from utils.tampon_ecriture import TamponEcriture
+
+from dao.db_connection import DBConnection
+
+from business_object.notification import Notification
+
+
+class NotificationDao:
+    """Classe contenant les méthodes pour accéder aux notifications de la base de données"""
+
+    @log
+    def creer_lot(self, notifications: List[Notification]) -> int:
+        """Insertion de plusieurs notifications en une requête
+
+        Les notifications dont le destinataire, l'auteur ou l'activité a été supprimé
+        entre-temps sont ignorées.
+
+        Parameters
+        ----------
+        notifications : List[Notification]
+            Les notifications à insérer
+
+        Returns
+        -------
+        int
+            Le nombre de notifications insérées
+        """
+        if not notifications:
+            return 0
+        lignes = [
+            (
+                n.type_notification,
+                n.id_destinataire,
+                n.id_auteur,
+                n.id_activite,
+                n.date_notification,
+            )
+            for n in notifications
+        ]
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    execute_values(
+                        cursor,
+                        "INSERT INTO notification(type_notification, id_destinataire,  "
+                        "                         id_auteur, id_activite,              "
+                        "                         date_notification)                   "
+                        "SELECT v.type_notification, v.id_destinataire, v.id_auteur,   "
+                        "       v.id_activite, COALESCE(v.date_notification, now())    "
+                        "  FROM (VALUES %s) AS v(type_notification, id_destinataire,   "
+                        "                        id_auteur, id_activite,               "
+                        "                        date_notification)                    "
+                        "  JOIN utilisateur d ON d.id_utilisateur = v.id_destinataire  "
+                        "  JOIN utilisateur a ON a.id_utilisateur = v.id_auteur        "
+                        " WHERE v.id_activite IS NULL                                  "
+                        "    OR EXISTS (SELECT 1 FROM activite act                     "
+                        "                WHERE act.id_activite = v.id_activite);       ",
+                        lignes,
+                        template="(%s, %s::int, %s::int, %s::int, %s::timestamptz)",
+                        page_size=len(lignes),
+                    )
+                    nb = cursor.rowcount
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return nb
+
+    @log
+    def lister(
+        self, id_destinataire: int, limite: int, avant: int | None = None
+    ) -> List[Notification]:
+        """Lister les notifications d'un utilisateur, des plus récentes aux plus anciennes
+
+        Parameters
+        ----------
+        id_destinataire : int
+            L'identifiant de l'utilisateur notifié
+        limite : int
+            Le nombre maximal de notifications renvoyées
+        avant : int, optional
+            Ne renvoie que les notifications d'identifiant inférieur (page suivante)
+
+        Returns
+        -------
+        List[Notification]
+            Les notifications, par identifiant décroissant
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT *                                                "
+                        "  FROM notification                                     "
+                        " WHERE id_destinataire = %(id_destinataire)s            "
+                        "   AND (%(avant)s::int IS NULL                          "
+                        "        OR id_notification < %(avant)s)                 "
+                        " ORDER BY id_notification DESC                          "
+                        " LIMIT %(limite)s;                                      ",
+                        {
+                            "id_destinataire": id_destinataire,
+                            "avant": avant,
+                            "limite": limite,
+                        },
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return [
+            Notification(
+                type_notification=row["type_notification"],
+                id_destinataire=row["id_destinataire"],
+                id_auteur=row["id_auteur"],
+                id_activite=row["id_activite"],
+                date_notification=row["date_notification"],
+                id_notification=row["id_notification"],
+                lue=row["lue"],
+            )
+            for row in res
+        ]
+
+    @log
+    def compter_non_lues(self, id_destinataire: int) -> int:
+        """Nombre de notifications non lues d'un utilisateur
+
+        Parameters
+        ----------
+        id_destinataire : int
+            L'identifiant de l'utilisateur notifié
+
+        Returns
+        -------
+        int
+            Le nombre de notifications non lues
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COUNT(*) AS nb                        "
+                        "  FROM notification                          "
+                        " WHERE id_destinataire = %(id_destinataire)s "
+                        "   AND NOT lue;                              ",
+                        {"id_destinataire": id_destinataire},
+                    )
+                    res = cursor.fetchone()
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return res["nb"]
+
+    @log
+    def marquer_lues(self, id_destinataire: int, jusqu_a: int | None = None) -> int:
+        """Marque comme lues les notifications d'un utilisateur
+
+        Parameters
+        ----------
+        id_destinataire : int
+            L'identifiant de l'utilisateur notifié
+        jusqu_a : int, optional
+            Seules les notifications d'identifiant inférieur ou égal sont marquées
+
+        Returns
+        -------
+        int
+            Le nombre de notifications marquées
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "UPDATE notification                          "
+                        "   SET lue = TRUE                            "
+                        " WHERE id_destinataire = %(id_destinataire)s "
+                        "   AND NOT lue                               "
+                        "   AND (%(jusqu_a)s::int IS NULL             "
+                        "        OR id_notification <= %(jusqu_a)s);  ",
+                        {"id_destinataire": id_destinataire, "jusqu_a": jusqu_a},
+                    )
+                    nb = cursor.rowcount
+        except Exception as e:
+            logging.error(e)
+            raise
+
+        return nb
+
+
+# Les notifications créées par les DAO sont écrites par lots, hors des requêtes
+tampon_notifications = TamponEcriture(
+    "notifications",
+    lambda lot: NotificationDao().creer_lot(lot),
+    taille_lot=int(os.environ.get("NOTIFICATIONS_LOT_TAILLE", "500")),
+    intervalle=float(os.environ.get("NOTIFICATIONS_LOT_INTERVALLE_MS", "200")) / 1000,
+)
+a_reinitialiser(tampon_notifications.abandonner)
+
+
+def enregistrer_notification(notification: Notification | None):
+    """Appelée par les DAO après la validation de la transaction qui a émis la
+    notification"""
+    if notification is not None:
+        tampon_notifications.ajouter(notification)
@@ -0,0 +1,244 @@
+"""Notifications en temps réel par LISTEN / NOTIFY de PostgreSQL
+
+Les DAO émettent une notification (pg_notify) dans la transaction qui crée le jaime,
+le commentaire ou l'abonnement : elle n'est délivrée que si la transaction est validée,
+à tous les processus du serveur. Elle est aussi conservée dans la table notification
+(voir dao/notification_dao.py).
+
+Chaque processus n'ouvre qu'une connexion d'écoute (LISTEN), lue par un thread dédié.
+Les notifications reçues sont réparties entre les abonnés (une file asyncio par flux
+SSE ouvert) selon leur destinataire, quel que soit le nombre de clients connectés.
+Une file pleine (client trop lent) perd ses plus anciennes notifications.
+"""
+
+import os
+import asyncio
+import logging
+import select
+import threading
+
+from psycopg2 import sql
+
+from dao.db_connection import DBConnection
+
+from business_object.notification import Notification
+
+TAILLE_FILE = 100
+
+# Délai (en secondes) avant de rouvrir une connexion d'écoute perdue, doublé à chaque
+# échec jusqu'à DELAI_RECONNEXION_MAX
+DELAI_RECONNEXION = 1.0
+DELAI_RECONNEXION_MAX = 30.0
+
+
+def canal() -> str:
+    """Canal NOTIFY du schéma courant (les schémas de test ne reçoivent pas les
+    notifications de l'application)"""
+    return "notifications_" + os.environ.get("POSTGRES_SCHEMA", "public")
+
+
+# --- Émission (dans la transaction des DAO) ---
+
+
+def notifier_activite(
+    cursor, type_notification: str, id_activite: int, id_auteur: int
+) -> Notification | None:
+    """Notifie le propriétaire de l'activité (sauf s'il en est l'auteur)
+
+    Returns
+    -------
+    Notification | None
+        la notification émise, None si l'auteur est le propriétaire de l'activité
+    """
+    cursor.execute(
+        "SELECT id_utilisateur, now() AS date_notification,          "
+        "       pg_notify(%(canal)s, json_build_object(              "
+        "         'type', %(type)s,                                  "
+        "         'id_destinataire', id_utilisateur,                 "
+        "         'id_auteur', %(id_auteur)s,                        "
+        "         'id_activite', id_activite,                        "
+        "         'date', now())::text)                              "
+        "  FROM activite                                             "
+        " WHERE id_activite = %(id_activite)s                        "
+        "   AND id_utilisateur <> %(id_auteur)s;                     ",
+        {
+            "canal": canal(),
+            "type": type_notification,
+            "id_activite": id_activite,
+            "id_auteur": id_auteur,
+        },
+    )
+    res = cursor.fetchone()
+    if res is None:
+        return None
+    return Notification(
+        type_notification,
+        id_destinataire=res["id_utilisateur"],
+        id_auteur=id_auteur,
+        id_activite=id_activite,
+        date_notification=res["date_notification"],
+    )
+
+
+def notifier_utilisateur(
+    cursor, type_notification: str, id_destinataire: int, id_auteur: int
+) -> Notification:
+    """Notifie directement un utilisateur
+
+    Returns
+    -------
+    Notification
+        la notification émise
+    """
+    cursor.execute(
+        "SELECT now() AS date_notification,                          "
+        "       pg_notify(%(canal)s, json_build_object(              "
+        "         'type', %(type)s,                                  "
+        "         'id_destinataire', %(id_destinataire)s::int,       "
+        "         'id_auteur', %(id_auteur)s::int,                   "
+        "         'date', now())::text);                             ",
+        {
+            "canal": canal(),
+            "type": type_notification,
+            "id_destinataire": id_destinataire,
+            "id_auteur": id_auteur,
+        },
+    )
+    return Notification(
+        type_notification,
+        id_destinataire=id_destinataire,
+        id_auteur=id_auteur,
+        date_notification=cursor.fetchone()["date_notification"],
+    )
+
+
+def notifier_lot(cursor, notifications: list[Notification]):
+    """Émet en une requête des notifications déjà construites"""
+    if not notifications:
+        return
+    cursor.execute(
+        "SELECT pg_notify(%(canal)s, charge)                    "
+        "  FROM unnest(%(charges)s::text[]) AS charge;           ",
+        {"canal": canal(), "charges": [n.en_json() for n in notifications]},
+    )
+
+
+# --- Réception ---
+
+
+class EcouteurNotifications:
+    """Connexion d'écoute partagée et répartition des notifications entre les abonnés
+
+    Parameters
+    ----------
+    taille_file : int
+        nombre maximal de notifications en attente par abonné
+    """
+
+    def __init__(self, taille_file: int = TAILLE_FILE):
+        self.taille_file = taille_file
+        self._verrou = threading.Lock()
+        # id_destinataire -> file asyncio -> boucle d'évènements de la file
+        self._abonnes = {}
+        self._arret = threading.Event()
+        self._thread = None
+
+    # --- Abonnés ---
+
+    def abonner(self, id_utilisateur: int) -> asyncio.Queue:
+        """File recevant les notifications de l'utilisateur (à appeler depuis la boucle
+        d'évènements), démarre l'écoute si besoin"""
+        file = asyncio.Queue(maxsize=self.taille_file)
+        boucle = asyncio.get_running_loop()
+        with self._verrou:
+            self._abonnes.setdefault(id_utilisateur, {})[file] = boucle
+        self.demarrer()
+        return file
+
+    def desabonner(self, id_utilisateur: int, file: asyncio.Queue):
+        with self._verrou:
+            files = self._abonnes.get(id_utilisateur)
+            if files is None:
+                return
+            files.pop(file, None)
+            if not files:
+                del self._abonnes[id_utilisateur]
+
+    def nb_abonnes(self) -> int:
+        with self._verrou:
+            return sum(len(files) for files in self._abonnes.values())
+
+    def diffuser(self, notification: Notification):
+        """Dépose la notification dans les files de son destinataire"""
+        with self._verrou:
+            files = list(self._abonnes.get(notification.id_destinataire, {}).items())
+        for file, boucle in files:
+            try:
+                boucle.call_soon_threadsafe(self._deposer, file, notification)
+            except RuntimeError:
+                # Boucle fermée : l'abonné a disparu sans se désabonner
+                self.desabonner(notification.id_destinataire, file)
+
+    @staticmethod
+    def _deposer(file: asyncio.Queue, notification: Notification):
+        if file.full():
+            file.get_nowait()
+        file.put_nowait(notification)
+
+    # --- Connexion d'écoute ---
+
+    def demarrer(self):
+        with self._verrou:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._arret.clear()
+            self._thread = threading.Thread(
+                target=self._boucle, name="ecoute-notifications", daemon=True
+            )
+            self._thread.start()
+
+    def arreter(self, attente: float = 5):
+        self._arret.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(attente)
+
+    def traiter(self, charge: str):
+        """Diffuse le message reçu sur le canal"""
+        try:
+            notification = Notification.depuis_json(charge)
+        except ValueError as e:
+            logging.warning(e)
+            return
+        self.diffuser(notification)
+
+    def _boucle(self):
+        delai = DELAI_RECONNEXION
+        while not self._arret.is_set():
+            try:
+                self._ecouter(DBConnection().connection)
+                delai = DELAI_RECONNEXION
+            except Exception:
+                logging.exception("Écoute des notifications interrompue")
+                if self._arret.wait(delai):
+                    return
+                delai = min(delai * 2, DELAI_RECONNEXION_MAX)
+
+    def _ecouter(self, connection):
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(sql.SQL("LISTEN {};").format(sql.Identifier(canal())))
+            logging.info("Écoute des notifications démarrée")
+            while not self._arret.is_set():
+                # Réveil régulier pour vérifier la demande d'arrêt
+                if select.select([connection], [], [], 1.0) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    self.traiter(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+
+ecouteur_notifications = EcouteurNotifications()
@@ -0,0 +1,169 @@
+"""Écriture différée des jaimes (optionnelle, variable JAIMES_DIFFERES)
+
+Quand elle est activée, ActiviteService n'écrit plus les jaimes dans la requête : le
+jaime (ou son retrait) est noté en mémoire et la requête répond aussitôt. Les
+opérations sur un même couple (activité, auteur) se compensent (un jaime retiré avant
+son écriture n'atteint jamais la base). Le tampon est écrit par lots, en une
+transaction (JaimeDao.ecrire_lot), dès que JAIMES_LOT_TAILLE couples sont en attente et
+au plus tard après JAIMES_LOT_INTERVALLE_MS.
+
+Les lectures du service (existence, nombre de jaimes d'une activité) combinent la base
+et les opérations en attente : l'utilisateur retrouve immédiatement son jaime. Les
+autres lectures (listes, fil d'actualité, tendances) le voient après l'écriture.
+:warning: Avec plusieurs workers, un utilisateur ne voit ses opérations en attente que
+sur le worker qui les a reçues.
+"""
+
+import os
+
+from collections import defaultdict
+
+from utils.reinitialisation import a_reinitialiser
+from utils.tampon_ecriture import TamponEcriture
+
+from dao.jaime_dao import JaimeDao
+
+from business_object.jaime import Jaime
+
+
+def jaimes_differes_actifs() -> bool:
+    return os.environ.get("JAIMES_DIFFERES", "0").lower() in ("1", "true", "oui")
+
+
+class TamponJaimes(TamponEcriture):
+    """Jaimes et retraits de jaimes en attente d'écriture, fusionnés par couple
+
+    Chaque couple en attente porte l'état qu'il aura une fois écrit (True : aimé,
+    False : retiré), par rapport à l'état de la couche inférieure : le lot en cours
+    d'écriture, puis la base.
+
+    Parameters
+    ----------
+    taille_lot : int
+        nombre de couples en attente qui déclenche une écriture
+    intervalle : float
+        délai maximal (en secondes) avant l'écriture d'une opération
+    """
+
+    def __init__(self, taille_lot: int = 500, intervalle: float = 0.2):
+        super().__init__("jaimes", None, taille_lot=taille_lot, intervalle=intervalle)
+        # (id_activite, id_auteur) -> état après écriture
+        self._en_attente = {}
+        self._en_cours = {}
+        # id_activite -> variation du nombre de jaimes
+        self._variations_en_attente = defaultdict(int)
+        self._variations_en_cours = {}
+
+    def __len__(self) -> int:
+        return len(self._en_attente)
+
+    # --- Opérations ---
+
+    def _etat(self, cle: tuple) -> bool | None:
+        """État en attente du couple, None s'il est celui de la base"""
+        etat = self._en_attente.get(cle)
+        return self._en_cours.get(cle) if etat is None else etat
+
+    def _appliquer(self, id_activite: int, id_auteur: int, aime: bool) -> bool:
+        cle = (id_activite, id_auteur)
+        with self._verrou:
+            etat = self._etat(cle)
+        if etat is None:
+            etat = JaimeDao().existe(id_activite, id_auteur)
+        with self._verrou:
+            # Une opération concurrente sur le même couple a pu passer entre-temps
+            etat_courant = self._etat(cle)
+            if (etat if etat_courant is None else etat_courant) == aime:
+                return False
+            if cle in self._en_attente:
+                # L'opération annule celle en attente
+                del self._en_attente[cle]
+            else:
+                self._en_attente[cle] = aime
+            self._variations_en_attente[id_activite] += 1 if aime else -1
+            plein = len(self._en_attente) >= self.taille_lot
+        if self._thread is None:
+            self.demarrer()
+        if plein:
+            self._reveil.set()
+        return True
+
+    def aimer(self, id_activite: int, id_auteur: int) -> bool:
+        """Note un jaime, False si l'auteur aime déjà l'activité"""
+        return self._appliquer(id_activite, id_auteur, True)
+
+    def retirer(self, id_activite: int, id_auteur: int) -> bool:
+        """Note le retrait d'un jaime, False si l'auteur n'aime pas l'activité"""
+        return self._appliquer(id_activite, id_auteur, False)
+
+    # --- Lectures combinées ---
+
+    def existe(self, id_activite: int, id_auteur: int) -> bool:
+        with self._verrou:
+            etat = self._etat((id_activite, id_auteur))
+        if etat is None:
+            return JaimeDao().existe(id_activite, id_auteur)
+        return etat
+
+    def compter_par_activite(self, id_activite: int) -> int:
+        with self._verrou:
+            variation = self._variations_en_attente.get(id_activite, 0)
+            variation += self._variations_en_cours.get(id_activite, 0)
+        return JaimeDao().compter_par_activite(id_activite) + variation
+
+    # --- Écriture ---
+
+    def vider(self) -> int:
+        """Écrit immédiatement les opérations en attente
+
+        Returns
+        -------
+        int
+            nombre de couples écrits
+        """
+        with self._verrou_ecriture:
+            with self._verrou:
+                if not self._en_attente:
+                    return 0
+                self._en_cours, self._en_attente = self._en_attente, {}
+                self._variations_en_cours = self._variations_en_attente
+                self._variations_en_attente = defaultdict(int)
+            en_cours = self._en_cours
+            try:
+                JaimeDao().ecrire_lot(
+                    [Jaime(a, u) for (a, u), aime in en_cours.items() if aime],
+                    [Jaime(a, u) for (a, u), aime in en_cours.items() if not aime],
+                )
+            except Exception:
+                # Transaction annulée : rien du lot n'est en base, il est remis en
+                # attente (les opérations arrivées entre-temps le compensent)
+                with self._verrou:
+                    for cle, aime in en_cours.items():
+                        if cle in self._en_attente:
+                            del self._en_attente[cle]
+                        else:
+                            self._en_attente[cle] = aime
+                    for id_activite, variation in self._variations_en_cours.items():
+                        self._variations_en_attente[id_activite] += variation
+                    self._en_cours, self._variations_en_cours = {}, {}
+                raise
+            with self._verrou:
+                self._en_cours, self._variations_en_cours = {}, {}
+            return len(en_cours)
+
+    def abandonner(self) -> int:
+        """Oublie les opérations en attente sans les écrire (après une réinitialisation
+        de la base)"""
+        with self._verrou:
+            nb = len(self._en_attente)
+            self._en_attente = {}
+            self._variations_en_attente = defaultdict(int)
+        return nb
+
+
+tampon_jaimes = TamponJaimes(
+    taille_lot=int(os.environ.get("JAIMES_LOT_TAILLE", "500")),
+    intervalle=float(os.environ.get("JAIMES_LOT_INTERVALLE_MS", "200")) / 1000,
+)
+# Les jaimes en attente visent des activités qui n'existent plus après un reset
+a_reinitialiser(tampon_jaimes.abandonner)
@@ -1,9 +1,21 @@
 from typing import List
 
+import os
 import logging
 from utils.log_decorator import log
-from utils.securite import hash_password, generer_salt, verifier_mot_de_passe
+from utils.securite import (
+    hash_password,
+    generer_salt,
+    verifier_mot_de_passe,
+    doit_etre_rehache,
+    cache_identifiants,
+)
+from utils.cache import creer_cache, MANQUANT
+from utils.reinitialisation import a_reinitialiser
+from utils.trie_prefixes import TriePrefixes
+from utils.versions import changer_version
 from dao.db_connection import DBConnection
+from dao.graphe_abonnements import enregistrer_suppression_utilisateur
 
 from business_object.utilisateur import Utilisateur
 
@@ -15,6 +27,34 @@ from exceptions import (
     InvalidPasswordError,
 )
 
+# Profils récemment lus : ("id", id_utilisateur) -> Utilisateur | None
+# et ("pseudo", pseudo) -> id_utilisateur | None
+cache_utilisateurs = creer_cache("utilisateurs", taille_max=10000, duree_vie=300, duree_vie_absent=30)
+
+# Autocomplétion des pseudos : préfixe (en minuscules) -> [(id_utilisateur, pseudo)]
+trie_pseudos = TriePrefixes(
+    taille_resultats=20, duree_vie=float(os.environ.get("AUTOCOMPLETION_DUREE", "60"))
+)
+a_reinitialiser(cache_utilisateurs.vider)
+a_reinitialiser(trie_pseudos.vider)
+
+
+def oublier_utilisateur_en_cache(id_utilisateur: int, *pseudos: str):
+    """Retire un utilisateur des caches (profil, pseudos et identifiants vérifiés)"""
+    ancien = cache_utilisateurs.obtenir(("id", id_utilisateur))
+    if ancien is not MANQUANT and ancien is not None:
+        pseudos += (ancien.pseudo,)
+    for pseudo in set(pseudos):
+        cache_utilisateurs.supprimer(("pseudo", pseudo))
+        cache_identifiants.oublier(pseudo)
+        trie_pseudos.invalider(pseudo)
+    cache_utilisateurs.supprimer(("id", id_utilisateur))
+
+
+def echapper_like(texte: str) -> str:
+    """Échappe les caractères spéciaux d'un motif LIKE (\\, % et _)"""
+    return texte.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
 class UtilisateurDao:
     """Classe contenant les méthodes pour accéder aux utilisateurs de la base de données"""
@@ -80,6 +120,8 @@ class UtilisateurDao:
                     )
                 # Si on arrive ici, commit du bloc, sinon, rollback automatique (donc l'utilisateur et les credentials sont forcément créés ensemble)
 
+            # Le pseudo et l'id ont pu être mis en cache comme absents
+            oublier_utilisateur_en_cache(utilisateur.id_utilisateur, utilisateur.pseudo)
             logging.info(
                 f"Utilisateur {utilisateur.pseudo} créé avec succès (id={utilisateur.id_utilisateur})."
             )
@@ -117,7 +159,7 @@ class UtilisateurDao:
             logging.error(
                 f"Erreur lors de la recherche de l'utilisateur par pseudo {pseudo}: {e}"
             )
-            return None
+            raise
 
         if res:
             utilisateur = Utilisateur(
@@ -157,7 +199,7 @@ class UtilisateurDao:
             logging.error(
                 f"Erreur lors de la recherche de l'utilisateur par ID {id_utilisateur}: {e}"
             )
-            return None
+            raise
 
         if res:
             utilisateur = Utilisateur(
@@ -171,6 +213,47 @@ class UtilisateurDao:
             return utilisateur
         return None
 
+    @log
+    def trouver_par_ids(self, ids_utilisateurs: List[int]) -> List[Utilisateur]:
+        """Trouver plusieurs utilisateurs par leurs identifiants, en une seule requête
+
+        Parameters
+        ----------
+        ids_utilisateurs : List[int]
+            Les identifiants des utilisateurs recherchés
+
+        Returns
+        -------
+        List[Utilisateur]
+            Les utilisateurs trouvés (les identifiants inconnus sont ignorés)
+        """
+        if not ids_utilisateurs:
+            return []
+
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT * FROM utilisateur WHERE id_utilisateur = ANY(%(ids)s);",
+                        {"ids": list(ids_utilisateurs)},
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Erreur lors de la recherche des utilisateurs {ids_utilisateurs}: {e}")
+            raise
+
+        return [
+            Utilisateur(
+                pseudo=row["pseudo"],
+                nom=row["nom"],
+                prenom=row["prenom"],
+                date_de_naissance=row["date_de_naissance"],
+                sexe=row["sexe"],
+                id_utilisateur=row["id_utilisateur"],
+            )
+            for row in res
+        ]
+
     @log
     def lister_tous(self) -> List[Utilisateur]:
         """Lister tous les utilisateurs
@@ -209,6 +292,109 @@ class UtilisateurDao:
 
         return liste_utilisateurs
 
+    @log
+    def rechercher(self, texte: str, limite: int) -> List[Utilisateur]:
+        """Recherche approchée d'utilisateurs sur le pseudo, le prénom et le nom
+
+        Les utilisateurs dont le pseudo commence par le texte sont classés en premier,
+        puis par similarité (trigrammes) décroissante. Un texte de moins de 3
+        caractères ne cherche que les débuts de pseudo.
+
+        Parameters
+        ----------
+        texte : str
+            texte recherché (insensible à la casse)
+        limite : int
+            nombre maximal d'utilisateurs renvoyés
+
+        Returns
+        -------
+        List[Utilisateur]
+            Les utilisateurs trouvés, du plus au moins pertinent
+        """
+        texte = texte.strip().lower()
+        echappe = echapper_like(texte)
+        if len(texte) < 3:
+            condition = "lower(pseudo) LIKE %(prefixe)s"
+        else:
+            condition = (
+                "lower(pseudo) LIKE %(prefixe)s        "
+                "   OR recherche LIKE %(contient)s     "
+                "   OR %(texte)s <%% recherche         "
+            )
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id_utilisateur, pseudo, nom, prenom,              "
+                        "       date_de_naissance, sexe                           "
+                        "  FROM utilisateur                                       "
+                        f" WHERE {condition}                                      "
+                        " ORDER BY lower(pseudo) LIKE %(prefixe)s DESC,           "
+                        "          word_similarity(%(texte)s, recherche) DESC,    "
+                        "          nb_suiveurs DESC, pseudo                       "
+                        " LIMIT %(limite)s;                                       ",
+                        {
+                            "texte": texte,
+                            "prefixe": echappe + "%",
+                            "contient": "%" + echappe + "%",
+                            "limite": limite,
+                        },
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Erreur lors de la recherche d'utilisateurs : {e}")
+            raise
+
+        return [
+            Utilisateur(
+                id_utilisateur=row["id_utilisateur"],
+                pseudo=row["pseudo"],
+                nom=row["nom"],
+                prenom=row["prenom"],
+                date_de_naissance=row["date_de_naissance"],
+                sexe=row["sexe"],
+            )
+            for row in res
+        ]
+
+    @log
+    def lister_par_prefixe(self, prefixe: str, limite: int) -> List[tuple]:
+        """Utilisateurs dont le pseudo commence par le préfixe (insensible à la casse)
+
+        Parameters
+        ----------
+        prefixe : str
+            début du pseudo
+        limite : int
+            nombre maximal d'utilisateurs renvoyés
+
+        Returns
+        -------
+        List[tuple]
+            (id_utilisateur, pseudo), les plus suivis en premier
+        """
+        try:
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT id_utilisateur, pseudo                  "
+                        "  FROM utilisateur                             "
+                        " WHERE lower(pseudo) LIKE %(prefixe)s          "
+                        " ORDER BY nb_suiveurs DESC, pseudo             "
+                        " LIMIT %(limite)s;                             ",
+                        {
+                            "prefixe": echapper_like(prefixe.lower()) + "%",
+                            "limite": limite,
+                        },
+                    )
+                    res = cursor.fetchall()
+        except Exception as e:
+            logging.error(f"Erreur lors de l'autocomplétion des pseudos : {e}")
+            raise
+
+        return [(row["id_utilisateur"], row["pseudo"]) for row in res]
+
     @log
     def modifier(self, utilisateur: Utilisateur) -> bool:
         """Modification d'un utilisateur dans la base de données
@@ -224,18 +410,23 @@ class UtilisateurDao:
             False sinon
         """
         res = None
+        ancien_pseudo = None
 
         try:
             with DBConnection().connection as connection:
                 with connection.cursor() as cursor:
+                    # La jointure sur la ligne avant modification donne l'ancien pseudo
                     cursor.execute(
-                        "UPDATE utilisateur SET "
+                        "UPDATE utilisateur u SET "
                         "pseudo = %(pseudo)s, "
                         "nom = %(nom)s, "
                         "prenom = %(prenom)s, "
                         "date_de_naissance = %(date_de_naissance)s, "
                         "sexe = %(sexe)s "
-                        "WHERE id_utilisateur = %(id_utilisateur)s;",
+                        "FROM utilisateur ancien "
+                        "WHERE u.id_utilisateur = %(id_utilisateur)s "
+                        "AND ancien.id_utilisateur = u.id_utilisateur "
+                        "RETURNING ancien.pseudo AS ancien_pseudo;",
                         {
                             "pseudo": utilisateur.pseudo,
                             "nom": utilisateur.nom,
@@ -246,9 +437,14 @@ class UtilisateurDao:
                         },
                     )
                     res = cursor.rowcount
+                    if res > 0:
+                        ancien_pseudo = cursor.fetchone()["ancien_pseudo"]
         except Exception as e:
             logging.error(f"Erreur lors de la modification de l'utilisateur: {e}")
             raise
+        finally:
+            pseudos = (utilisateur.pseudo,) + ((ancien_pseudo,) if ancien_pseudo else ())
+            oublier_utilisateur_en_cache(utilisateur.id_utilisateur, *pseudos)
 
         if res < 1:
             msg_err = "Echec de la modification de l'utilisateur : aucune ligne retournée par la base"
@@ -270,23 +466,61 @@ class UtilisateurDao:
         -------
         True si l'utilisateur a bien été supprimé
         """
+        pseudos = ()
+        ids_activites_commentees = []
         try:
             with DBConnection().connection as connection:
                 with connection.cursor() as cursor:
+                    # Activités dont la liste de commentaires change : celles qu'il a
+                    # commentées et les siennes (supprimées en cascade)
+                    cursor.execute(
+                        "SELECT id_activite FROM commentaire                       "
+                        " WHERE id_auteur = %(id_utilisateur)s                     "
+                        " UNION                                                    "
+                        "SELECT id_activite FROM activite                          "
+                        " WHERE id_utilisateur = %(id_utilisateur)s;               ",
+                        {"id_utilisateur": id_utilisateur},
+                    )
+                    ids_activites_commentees = [
+                        row["id_activite"] for row in cursor.fetchall()
+                    ]
+                    # Ses abonnements seront supprimés en cascade : les compteurs des
+                    # utilisateurs concernés sont décrémentés dans la même transaction
+                    cursor.execute(
+                        "UPDATE utilisateur SET nb_suiveurs = nb_suiveurs - 1         "
+                        " WHERE id_utilisateur IN (SELECT id_utilisateur_suivi        "
+                        "                            FROM abonnement                  "
+                        "     WHERE id_utilisateur_suiveur = %(id_utilisateur)s);     "
+                        "UPDATE utilisateur SET nb_suivis = nb_suivis - 1             "
+                        " WHERE id_utilisateur IN (SELECT id_utilisateur_suiveur      "
+                        "                            FROM abonnement                  "
+                        "     WHERE id_utilisateur_suivi = %(id_utilisateur)s);       ",
+                        {"id_utilisateur": id_utilisateur},
+                    )
                     cursor.execute(
-                        "DELETE FROM utilisateur WHERE id_utilisateur = %(id_utilisateur)s;",
+                        "DELETE FROM utilisateur WHERE id_utilisateur = %(id_utilisateur)s "
+                        "RETURNING pseudo;",
                         {"id_utilisateur": id_utilisateur},
                     )
                     res = cursor.rowcount
+                    if res > 0:
+                        pseudos = (cursor.fetchone()["pseudo"],)
         except Exception as e:
             logging.error(f"Erreur lors de la suppression de l'utilisateur: {e}")
             raise
+        finally:
+            oublier_utilisateur_en_cache(id_utilisateur, *pseudos)
+            # Activités et commentaires supprimés en cascade
+            changer_version("activites", id_utilisateur)
+            changer_version("commentaires", *ids_activites_commentees)
 
         if res < 1:
             msg_err = "Echec de la suppression de l'utilisateur : aucune ligne retournée par la base"
             logging.error(msg_err)
             raise DatabaseDeletionError(msg_err)
 
+        # Abonnements supprimés en cascade
+        enregistrer_suppression_utilisateur(id_utilisateur)
         return True
 
     @log
@@ -393,6 +627,11 @@ class UtilisateurDao:
                 logging.error(msg_err)
                 raise InvalidPasswordError(msg_err)
 
+            # Hash produit avec un ancien algorithme (ou un coût plus faible) :
+            # le mot de passe clair est connu, on en profite pour le mettre à jour
+            if doit_etre_rehache(res["mot_de_passe_hash"]):
+                self._rehacher(res["id_utilisateur"], mot_de_passe)
+
             # Création de l'objet métier Utilisateur
             utilisateur = Utilisateur(
                 id_utilisateur=res["id_utilisateur"],
@@ -408,3 +647,27 @@ class UtilisateurDao:
         except Exception as e:
             logging.error(e)
             raise
+
+    def _rehacher(self, id_utilisateur: int, mot_de_passe: str):
+        """Remplace le hash stocké par un hash calculé avec l'algorithme configuré
+        Un échec n'empêche pas la connexion : l'ancien hash reste valide"""
+        try:
+            sel = generer_salt()
+            mot_de_passe_hash = hash_password(mot_de_passe, sel)
+
+            with DBConnection().connection as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        UPDATE credentials
+                        SET mot_de_passe_hash = %(mot_de_passe_hash)s, sel = %(sel)s
+                        WHERE id_utilisateur = %(id_utilisateur)s;
+                        """,
+                        {
+                            "mot_de_passe_hash": mot_de_passe_hash,
+                            "sel": sel,
+                            "id_utilisateur": id_utilisateur,
+                        },
+                    )
+        except Exception as e:
+            logging.warning(f"Echec de la mise à jour du hash de l'utilisateur {id_utilisateur} : {e}")
@@ -0,0 +1,126 @@
+"""Modèles des réponses de l'API
+
+Déclarés comme `response_model` des endpoints : FastAPI valide alors les objets
+métier (lecture des attributs, `from_attributes`) puis les sérialise directement en
+octets JSON avec pydantic-core, sans passer par jsonable_encoder et json.dumps.
+Ils documentent aussi le format des réponses dans /docs.
+"""
+
+from datetime import date, datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ModeleReponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UtilisateurReponse(ModeleReponse):
+    id_utilisateur: Optional[int] = None
+    pseudo: str
+    nom: str
+    prenom: str
+    date_de_naissance: Optional[date] = None
+    sexe: str
+
+
+class AutocompletionReponse(ModeleReponse):
+    id_utilisateur: int
+    pseudo: str
+
+
+class ActiviteReponse(ModeleReponse):
+    id_activite: Optional[int] = None
+    id_utilisateur: int
+    sport: str
+    date_activite: Optional[date] = None
+    distance: Optional[float] = None
+    duree: Optional[float] = None
+
+
+class CommentaireReponse(ModeleReponse):
+    id_commentaire: Optional[int] = None
+    id_activite: int
+    id_auteur: int
+    contenu: str
+    date_commentaire: Optional[datetime | date] = None
+
+
+class CommentairesRechercheReponse(ModeleReponse):
+    commentaires: list[CommentaireReponse]
+    suivant: Optional[int] = None  # paramètre decalage de la page suivante
+
+
+class JaimeReponse(ModeleReponse):
+    id_activite: int
+    id_auteur: int
+
+
+class AbonnementReponse(ModeleReponse):
+    id_utilisateur_suiveur: int
+    id_utilisateur_suivi: int
+
+
+class CompteursAbonnementsReponse(ModeleReponse):
+    id_utilisateur: int
+    nb_suiveurs: int
+    nb_suivis: int
+
+
+class MessageReponse(ModeleReponse):
+    message: str
+
+
+class MessageActiviteReponse(MessageReponse):
+    activite: ActiviteReponse
+
+
+class NombreJaimesReponse(ModeleReponse):
+    id_activite: int
+    nombre_jaimes: int
+
+
+class StatistiquesTotalesReponse(ModeleReponse):
+    nombre_activites_total: dict[str, int]  # nombre d'activités par sport
+    distance_totale: float  # km
+    duree_totale: int  # secondes
+
+
+class StatistiquesSemaineReponse(ModeleReponse):
+    nombre_activites_semaine: dict[str, int]
+    distance_semaine: float
+    duree_semaine: int
+
+
+class SuggestionReponse(ModeleReponse):
+    id_utilisateur: int
+    pseudo: str
+    nb_relations_communes: int
+    score: float
+
+
+class TendanceReponse(ModeleReponse):
+    id_activite: int
+    nombre: int  # jaimes ou commentaires sur la période
+
+
+class TendancesReponse(ModeleReponse):
+    periode: str
+    plus_aimees: list[TendanceReponse]
+    plus_commentees: list[TendanceReponse]
+
+
+class NotificationReponse(ModeleReponse):
+    id_notification: int
+    type_notification: str  # jaime, commentaire ou abonnement
+    id_auteur: int
+    id_activite: Optional[int] = None
+    date_notification: Optional[datetime] = None
+    lue: bool
+
+
+class NotificationsReponse(ModeleReponse):
+    notifications: list[NotificationReponse]
+    nb_non_lues: int
+    suivant: Optional[int] = None  # paramètre avant de la page suivante
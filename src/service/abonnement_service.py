@@ -1,4 +1,6 @@
-from typing import Set
+from typing import List, Set
+
+import numpy as np
 
 from utils.log_decorator import log
 
@@ -6,6 +8,7 @@ from business_object.abonnement import Abonnement
 
 from dao.abonnement_dao import AbonnementDao
 from dao.utilisateur_dao import UtilisateurDao
+from dao.graphe_abonnements import obtenir_graphe
 
 from exceptions import NotFoundError, AlreadyExistsError
 
@@ -62,6 +65,10 @@ class AbonnementService:
                 f"L'utilisateur avec l'id {id_utilisateur} n'existe pas"
             )
 
+        graphe = obtenir_graphe()
+        if graphe is not None:
+            return set(graphe.suivis(id_utilisateur).tolist())
+
         liste_abonnements = AbonnementDao().lister_suivis(id_utilisateur)
         utilisateurs_suivis = set()
         for j in liste_abonnements:
@@ -76,6 +83,10 @@ class AbonnementService:
                 f"L'utilisateur avec l'id {id_utilisateur} n'existe pas"
             )
 
+        graphe = obtenir_graphe()
+        if graphe is not None:
+            return set(graphe.suiveurs(id_utilisateur).tolist())
+
         liste_abonnements = AbonnementDao().lister_suiveurs(id_utilisateur)
         utilisateurs_suiveurs = set()
         for j in liste_abonnements:
@@ -96,7 +107,44 @@ class AbonnementService:
                 f"L'utilisateur avec l'id {id_utilisateur_suivi} n'existe pas"
             )
 
+        graphe = obtenir_graphe()
+        if graphe is not None:
+            return graphe.existe(id_utilisateur_suiveur, id_utilisateur_suivi)
+
         abonnement = AbonnementDao().trouver_par_ids(
             id_utilisateur_suiveur, id_utilisateur_suivi
         )
         return abonnement is not None
+
+    @log
+    def compter_abonnements(self, id_utilisateur: int) -> dict:
+        """Nombres de suiveurs et de suivis d'un utilisateur (compteurs, sans lister
+        les abonnements)"""
+        compteurs = AbonnementDao().compter(id_utilisateur)
+        if compteurs is None:
+            raise NotFoundError(
+                f"L'utilisateur avec l'id {id_utilisateur} n'existe pas"
+            )
+        return {"id_utilisateur": id_utilisateur, **compteurs}
+
+    @log
+    def lister_suivis_communs(
+        self, id_utilisateur_a: int, id_utilisateur_b: int
+    ) -> List[int]:
+        """Lister les ids des utilisateurs suivis à la fois par deux utilisateurs"""
+        for id_utilisateur in (id_utilisateur_a, id_utilisateur_b):
+            if not UtilisateurDao().verifier_id_existant(id_utilisateur):
+                raise NotFoundError(
+                    f"L'utilisateur avec l'id {id_utilisateur} n'existe pas"
+                )
+
+        graphe = obtenir_graphe()
+        if graphe is not None:
+            communs = np.intersect1d(
+                graphe.suivis(id_utilisateur_a),
+                graphe.suivis(id_utilisateur_b),
+                assume_unique=True,
+            )
+            return communs.tolist()
+
+        return AbonnementDao().lister_suivis_communs(id_utilisateur_a, id_utilisateur_b)
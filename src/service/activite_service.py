@@ -11,6 +11,7 @@ from dao.utilisateur_dao import UtilisateurDao
 from dao.activite_dao import ActiviteDao
 from dao.commentaire_dao import CommentaireDao
 from dao.jaime_dao import JaimeDao
+from dao.tampon_jaimes import tampon_jaimes, jaimes_differes_actifs
 
 from utils.utils_date import verifier_date
 
@@ -134,10 +135,16 @@ class ActiviteService:
             raise NotFoundError("Cette activité n'existe pas")
         if not UtilisateurDao().verifier_id_existant(id_utilisateur):
             raise NotFoundError("Cet utilisateur n'existe pas")
+
+        jaime = Jaime(id_activite=id_activite, id_auteur=id_utilisateur)
+        if jaimes_differes_actifs():
+            # Écrit par lot, après la réponse
+            if not tampon_jaimes.aimer(id_activite, id_utilisateur):
+                raise AlreadyExistsError("Ce jaime existe déjà")
+            return jaime
         if JaimeDao().existe(id_activite, id_utilisateur):
             raise AlreadyExistsError("Ce jaime existe déjà")
 
-        jaime = Jaime(id_activite=id_activite, id_auteur=id_utilisateur)
         return JaimeDao().creer(jaime)
 
     @log
@@ -147,6 +154,10 @@ class ActiviteService:
             raise NotFoundError("Cette activité n'existe pas")
         if not UtilisateurDao().verifier_id_existant(id_utilisateur):
             raise NotFoundError("Cet utilisateur n'existe pas")
+        if jaimes_differes_actifs():
+            if not tampon_jaimes.retirer(id_activite, id_utilisateur):
+                raise NotFoundError("Ce jaime n'existe pas")
+            return True
         if not JaimeDao().existe(id_activite, id_utilisateur):
             raise NotFoundError("Ce jaime n'existe pas")
 
@@ -160,6 +171,8 @@ class ActiviteService:
         if not UtilisateurDao().verifier_id_existant(id_utilisateur):
             raise NotFoundError("Cet utilisateur n'existe pas")
 
+        if jaimes_differes_actifs():
+            return tampon_jaimes.existe(id_activite, id_utilisateur)
         return JaimeDao().existe(id_activite, id_utilisateur)
 
     @log
@@ -168,6 +181,8 @@ class ActiviteService:
         if not ActiviteDao().verifier_id_existant(id_activite):
             raise NotFoundError("Cette activité n'existe pas")
 
+        if jaimes_differes_actifs():
+            return tampon_jaimes.compter_par_activite(id_activite)
         return JaimeDao().compter_par_activite(id_activite)
 
     # --- Commentaires ---
@@ -207,6 +222,30 @@ class ActiviteService:
 
         return CommentaireDao().lister_par_activite(id_activite=id_activite)
 
+    @log
+    def rechercher_commentaires(
+        self, texte: str, limite: int = 20, decalage: int = 0
+    ) -> dict:
+        """Une page des commentaires contenant le texte, les plus pertinents d'abord
+
+        Returns
+        -------
+        dict
+            {"commentaires", "suivant"} : les commentaires de la page et le paramètre
+            decalage de la page suivante (None s'il n'y en a pas)
+        """
+        if not texte.strip():
+            raise ValueError("Le texte recherché ne doit pas être vide")
+        if limite < 1 or decalage < 0:
+            raise ValueError("Pagination invalide")
+        # Un commentaire de plus indique s'il existe une page suivante
+        commentaires = CommentaireDao().rechercher(texte, limite + 1, decalage)
+        suivant = None
+        if len(commentaires) > limite:
+            commentaires = commentaires[:limite]
+            suivant = decalage + limite
+        return {"commentaires": commentaires, "suivant": suivant}
+
     @log
     def trouver_commentaire_par_id(self, id_commentaire: int) -> Commentaire:
         """Trouver un commentaire par son id"""
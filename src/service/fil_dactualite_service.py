@@ -1,6 +1,33 @@
+"""Fil d'actualité : activités des utilisateurs suivis
+
+Deux modes :
+- "chrono" : toutes les activités des suivis, par date décroissante
+- "ranked" : les activités candidates (les plus récentes de chaque suivi, lues en une
+  requête) sont classées par un score combinant récence, engagement et affinité :
+
+      score = 0.5 ** (age en jours / DEMI_VIE_JOURS)
+              * (1 + POIDS_ENGAGEMENT * log(1 + jaimes + POIDS_COMMENTAIRE * commentaires))
+              * (1 + POIDS_AFFINITE * log(1 + interactions passées avec l'auteur))
+
+  Le classement est mis en cache par utilisateur (FIL_CACHE_DUREE secondes). Le nombre
+  de candidats est ajusté pour garder le p95 du calcul sous FIL_BUDGET_MS : réduit
+  quand le budget est dépassé, augmenté progressivement quand il est largement tenu.
+"""
+
+import os
+import time
+import threading
+
+from collections import deque
+from datetime import date
 from typing import List
 
+import dotenv
+import numpy as np
+
 from utils.log_decorator import log
+from utils.cache import creer_cache
+from utils.reinitialisation import a_reinitialiser
 
 from dao.abonnement_dao import AbonnementDao
 from dao.activite_dao import ActiviteDao
@@ -12,6 +39,82 @@ from business_object.activite import Activite
 
 from exceptions import NotFoundError
 
+dotenv.load_dotenv()
+
+MODES_FIL = ("chrono", "ranked")
+
+DEMI_VIE_JOURS = 2.0
+POIDS_ENGAGEMENT = 0.5
+POIDS_COMMENTAIRE = 2.0
+POIDS_AFFINITE = 0.5
+
+BUDGET_MS = float(os.environ.get("FIL_BUDGET_MS", "200"))
+CANDIDATS_MAX = int(os.environ.get("FIL_CANDIDATS_MAX", "500"))
+CANDIDATS_MIN = 50
+CANDIDATS_PAR_AUTEUR = 20
+# Nombre de calculs entre deux ajustements du nombre de candidats
+FENETRE_AJUSTEMENT = 50
+
+cache_fil_classe = creer_cache(
+    "fil_classe",
+    taille_max=10000,
+    duree_vie=float(os.environ.get("FIL_CACHE_DUREE", "30")),
+)
+a_reinitialiser(cache_fil_classe.vider)
+
+
+def scorer_fil(
+    ages_jours: np.ndarray,
+    nb_jaimes: np.ndarray,
+    nb_commentaires: np.ndarray,
+    affinites: np.ndarray,
+) -> np.ndarray:
+    """Scores des activités candidates (voir la docstring du module)"""
+    recence = np.exp2(-np.maximum(ages_jours, 0) / DEMI_VIE_JOURS)
+    engagement = np.log1p(nb_jaimes + POIDS_COMMENTAIRE * nb_commentaires)
+    affinite = np.log1p(affinites)
+    return (
+        recence * (1 + POIDS_ENGAGEMENT * engagement) * (1 + POIDS_AFFINITE * affinite)
+    )
+
+
+class BudgetLatence:
+    """Nombre de candidats du fil classé, ajusté pour tenir le budget de latence
+
+    Toutes les FENETRE_AJUSTEMENT mesures : si le p95 dépasse le budget, la limite est
+    réduite d'un quart ; s'il est sous la moitié du budget, elle augmente de 10 %.
+
+    Parameters
+    ----------
+    budget_ms : float
+        p95 visé (en millisecondes) pour le calcul d'un fil classé
+    limite_min, limite_max : int
+        bornes du nombre de candidats
+    """
+
+    def __init__(self, budget_ms: float, limite_min: int, limite_max: int):
+        self.budget_ms = budget_ms
+        self.limite_min = limite_min
+        self.limite_max = limite_max
+        self.limite = limite_max
+        self._durees = deque(maxlen=FENETRE_AJUSTEMENT)
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, duree_ms: float):
+        with self._verrou:
+            self._durees.append(duree_ms)
+            if len(self._durees) < FENETRE_AJUSTEMENT:
+                return
+            p95 = float(np.percentile(self._durees, 95))
+            self._durees.clear()
+            if p95 > self.budget_ms:
+                self.limite = max(self.limite_min, int(self.limite * 0.75))
+            elif p95 < self.budget_ms / 2:
+                self.limite = min(self.limite_max, int(self.limite * 1.1) + 1)
+
+
+budget_fil = BudgetLatence(BUDGET_MS, CANDIDATS_MIN, CANDIDATS_MAX)
+
 
 class FilDactualiteService:
     """Classe contenant les méthodes de service pour le fil d'actualité"""
@@ -23,11 +126,28 @@ class FilDactualiteService:
         self.activite_dao = ActiviteDao()
 
     @log
-    def creer_fil_dactualite(self, id_utilisateur: int) -> List[Activite]:
-        """Retourne le fil d'actualité d'un utilisateur"""
+    def creer_fil_dactualite(
+        self, id_utilisateur: int, mode: str = "chrono"
+    ) -> List[Activite]:
+        """Retourne le fil d'actualité d'un utilisateur
+
+        Parameters
+        ----------
+        id_utilisateur : int
+            Utilisateur dont on construit le fil
+        mode : str
+            "chrono" (par date décroissante) ou "ranked" (classé par score)
+        """
+        if mode not in MODES_FIL:
+            raise ValueError(f"Le mode doit valoir {' ou '.join(MODES_FIL)}")
         if not UtilisateurDao().verifier_id_existant(id_utilisateur):
             raise NotFoundError("Cet utilisateur n'existe pas")
 
+        if mode == "ranked":
+            return cache_fil_classe.obtenir_ou_calculer(
+                id_utilisateur, lambda: self.classer_fil(id_utilisateur)
+            )
+
         set_id_suivis = AbonnementService().lister_utilisateurs_suivis(id_utilisateur)
         ls_activites = []
         for u in set_id_suivis:
@@ -35,3 +155,34 @@ class FilDactualiteService:
         ls_activites = sorted(ls_activites, key=lambda a: a.date_activite, reverse=True)
 
         return ls_activites
+
+    @log
+    def classer_fil(self, id_utilisateur: int) -> List[Activite]:
+        """Fil classé par score (sans cache), à partir d'une seule requête"""
+        debut = time.perf_counter()
+        candidats = self.activite_dao.lister_candidats_fil(
+            id_utilisateur, budget_fil.limite, CANDIDATS_PAR_AUTEUR
+        )
+        if candidats:
+            aujourdhui = date.today()
+            # Une activité sans date est classée en dernier
+            ages = np.array(
+                [
+                    (aujourdhui - c["activite"].date_activite).days
+                    if c["activite"].date_activite
+                    else np.inf
+                    for c in candidats
+                ],
+                dtype=np.float64,
+            )
+            scores = scorer_fil(
+                ages,
+                np.array([c["nb_jaimes"] for c in candidats], dtype=np.float64),
+                np.array([c["nb_commentaires"] for c in candidats], dtype=np.float64),
+                np.array([c["affinite"] for c in candidats], dtype=np.float64),
+            )
+            # Tri stable : à score égal, l'ordre chronologique de la requête est gardé
+            ordre = np.argsort(-scores, kind="stable")
+            candidats = [candidats[i] for i in ordre.tolist()]
+        budget_fil.enregistrer((time.perf_counter() - debut) * 1000)
+        return [c["activite"] for c in candidats]
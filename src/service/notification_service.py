@@ -0,0 +1,56 @@
+from utils.log_decorator import log
+
+from dao.notification_dao import NotificationDao
+
+
+class NotificationService:
+    """Classe contenant les méthodes de service pour les notifications"""
+
+    @log
+    def lister_notifications(
+        self, id_utilisateur: int, limite: int = 20, avant: int | None = None
+    ) -> dict:
+        """Une page de la boîte de réception d'un utilisateur
+
+        Parameters
+        ----------
+        id_utilisateur : int
+            identifiant de l'utilisateur notifié
+        limite : int
+            nombre maximal de notifications de la page
+        avant : int, optional
+            valeur de "suivant" renvoyée avec la page précédente
+
+        Returns
+        -------
+        dict
+            {"notifications", "nb_non_lues", "suivant"} : les notifications de la page
+            (plus récentes d'abord), le nombre total de notifications non lues et le
+            paramètre avant de la page suivante (None s'il n'y en a pas)
+        """
+        if limite < 1:
+            raise ValueError("La limite doit être strictement positive")
+        dao = NotificationDao()
+        # Une notification de plus indique s'il existe une page suivante
+        notifications = dao.lister(id_utilisateur, limite + 1, avant)
+        suivant = None
+        if len(notifications) > limite:
+            notifications = notifications[:limite]
+            suivant = notifications[-1].id_notification
+        return {
+            "notifications": notifications,
+            "nb_non_lues": dao.compter_non_lues(id_utilisateur),
+            "suivant": suivant,
+        }
+
+    @log
+    def marquer_lues(self, id_utilisateur: int, jusqu_a: int | None = None) -> int:
+        """Marque comme lues les notifications de l'utilisateur (toutes, ou celles
+        d'identifiant inférieur ou égal à jusqu_a)
+
+        Returns
+        -------
+        int
+            nombre de notifications marquées
+        """
+        return NotificationDao().marquer_lues(id_utilisateur, jusqu_a)
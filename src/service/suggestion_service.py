@@ -0,0 +1,302 @@
+"""Suggestions d'abonnements : utilisateurs non suivis, classés par relations communes
+
+Pour un utilisateur u, les candidats sont les utilisateurs suivis par ceux que u suit
+(chemins à deux sauts u -> v -> w). Le nombre de relations communes est le nombre de
+chemins de u à w, soit le coefficient (u, w) du produit creux A·A de la matrice
+d'adjacence des abonnements. Il est pondéré par la similarité (cosinus) des sports
+pratiqués : score = nb_relations_communes * (1 + POIDS_SPORTS * similarite).
+
+Le produit est calculé par lots avec numpy sur l'index CSR des abonnements
+(dao/graphe_abonnements.py) : les voisinages de tout un lot d'utilisateurs sont
+rassemblés en tableaux, puis les couples (u, w) sont comptés par un tri.
+
+Les suggestions des utilisateurs actifs (activité depuis SUGGESTIONS_JOURS_ACTIFS jours,
+ou suggestions demandées depuis le dernier calcul) sont précalculées périodiquement
+(tâche de fond, SUGGESTIONS_INTERVALLE) et mises en cache. Une requête ne fait donc
+qu'une lecture du cache, sans parcours du graphe : un utilisateur absent du cache
+reçoit une liste vide et ses suggestions sont calculées au précalcul suivant.
+"""
+
+import os
+import threading
+
+from datetime import date, timedelta
+from typing import List
+
+import dotenv
+import numpy as np
+
+from utils.log_decorator import log
+from utils.cache import creer_cache, MANQUANT
+from utils.reinitialisation import a_reinitialiser
+
+from dao.activite_dao import ActiviteDao
+from dao.graphe_abonnements import CSR, GrapheAbonnements, obtenir_graphe
+
+from service.abonnement_service import AbonnementService
+from service.utilisateur_service import UtilisateurService
+
+dotenv.load_dotenv()
+
+SPORTS = ["course", "natation", "vélo", "randonnée", "autre"]
+# Nombre de suggestions conservées par utilisateur
+NB_SUGGESTIONS_MAX = 50
+# Importance de la similarité des sports face au nombre de relations communes
+POIDS_SPORTS = 1.0
+# Nombre d'utilisateurs traités ensemble lors du précalcul
+TAILLE_LOT = 2000
+
+INTERVALLE_PRECALCUL = float(os.environ.get("SUGGESTIONS_INTERVALLE", "3600"))
+JOURS_ACTIFS = int(os.environ.get("SUGGESTIONS_JOURS_ACTIFS", "30"))
+
+# Les suggestions restent valides jusqu'au calcul suivant (et au-delà s'il échoue)
+cache_suggestions = creer_cache(
+    "suggestions",
+    taille_max=100000,
+    duree_vie=2 * INTERVALLE_PRECALCUL if INTERVALLE_PRECALCUL > 0 else 3600,
+)
+a_reinitialiser(cache_suggestions.vider)
+
+# Utilisateurs ayant demandé leurs suggestions depuis le dernier précalcul
+_demandeurs = set()
+# Index des abonnements utilisé quand INDEX_GRAPHE n'est pas activé (rechargé à
+# chaque précalcul)
+_graphe_lot = None
+_verrou = threading.Lock()
+
+
+def _voisinages(csr: CSR, sommets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Voisins de tous les sommets donnés, concaténés
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        (lignes, voisins) : voisins[k] est un voisin de sommets[lignes[k]]
+    """
+    sommets = np.asarray(sommets, dtype=np.int64)
+    dans_index = (sommets >= 0) & (sommets < csr.nb_sommets)
+    debuts = np.zeros(len(sommets), dtype=np.int64)
+    longueurs = np.zeros(len(sommets), dtype=np.int64)
+    debuts[dans_index] = csr.debuts[sommets[dans_index]]
+    longueurs[dans_index] = csr.debuts[sommets[dans_index] + 1] - debuts[dans_index]
+
+    lignes = np.repeat(np.arange(len(sommets), dtype=np.int64), longueurs)
+    # Position de chaque voisin dans `voisins` : début de sa plage + rang dans la plage
+    decalages = np.arange(len(lignes), dtype=np.int64) - np.repeat(
+        np.cumsum(longueurs) - longueurs, longueurs
+    )
+    positions = np.repeat(debuts, longueurs) + decalages
+    return lignes, csr.voisins[positions].astype(np.int64)
+
+
+def deux_sauts(
+    suivis: CSR, ids: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Nombre de relations communes entre chaque utilisateur de ids et les utilisateurs
+    qu'il ne suit pas encore (lignes de A·A, sans u lui-même ni ses suivis)
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        (lignes, candidats, nb) : ids[lignes[k]] a nb[k] relations communes avec
+        candidats[k], triés par ligne puis par candidat
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    lignes_1, intermediaires = _voisinages(suivis, ids)
+    lignes_2, candidats = _voisinages(suivis, intermediaires)
+    lignes = lignes_1[lignes_2]
+
+    # Clés (ligne, utilisateur) : celles du premier saut sont déjà triées
+    cles = (lignes << 32) | candidats
+    suivis_deja = (lignes_1 << 32) | intermediaires
+    position = np.searchsorted(suivis_deja, cles)
+    deja_suivi = np.zeros(len(cles), dtype=bool)
+    if len(suivis_deja):
+        np.equal(
+            suivis_deja[np.minimum(position, len(suivis_deja) - 1)], cles, out=deja_suivi
+        )
+    cles = cles[~deja_suivi & (candidats != ids[lignes])]
+
+    # Comptage des chemins par couple : tri puis longueur des séries de clés égales
+    cles.sort()
+    if not len(cles):
+        vide = np.empty(0, dtype=np.int64)
+        return vide, vide, vide
+    nouvelles = np.flatnonzero(np.concatenate(([True], cles[1:] != cles[:-1])))
+    nb = np.diff(np.append(nouvelles, len(cles)))
+    cles = cles[nouvelles]
+    return cles >> 32, cles & 0xFFFFFFFF, nb
+
+
+def profils_sportifs(comptes: List[tuple]) -> np.ndarray:
+    """Matrice des profils (une ligne par id d'utilisateur, une colonne par sport) :
+    proportions d'activités par sport, normalisées (norme euclidienne 1)
+
+    Parameters
+    ----------
+    comptes : List[tuple]
+        triplets (id_utilisateur, sport, nombre d'activités), voir
+        ActiviteDao.compter_par_sport
+    """
+    colonnes = {sport: j for j, sport in enumerate(SPORTS)}
+    comptes = [c for c in comptes if c[1] in colonnes]
+    nb_lignes = max((c[0] for c in comptes), default=-1) + 1
+    profils = np.zeros((nb_lignes, len(SPORTS)), dtype=np.float32)
+    if comptes:
+        ids, sports, nb = zip(*comptes)
+        np.add.at(profils, (list(ids), [colonnes[s] for s in sports]), nb)
+    normes = np.linalg.norm(profils, axis=1, keepdims=True)
+    np.divide(profils, normes, out=profils, where=normes > 0)
+    return profils
+
+
+def _profils_de(profils: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    res = np.zeros((len(ids), profils.shape[1]), dtype=np.float32)
+    connus = ids < len(profils)
+    res[connus] = profils[ids[connus]]
+    return res
+
+
+def classer(
+    ids: np.ndarray,
+    lignes: np.ndarray,
+    candidats: np.ndarray,
+    nb: np.ndarray,
+    profils: np.ndarray,
+    nb_max: int = NB_SUGGESTIONS_MAX,
+    poids_sports: float = POIDS_SPORTS,
+) -> dict[int, list[tuple[int, int, float]]]:
+    """Meilleures suggestions de chaque utilisateur, à partir du résultat de deux_sauts
+
+    Returns
+    -------
+    dict[int, list[tuple[int, int, float]]]
+        id_utilisateur -> [(id suggéré, nb de relations communes, score)] par score
+        décroissant (liste vide si aucune suggestion)
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    similarites = np.einsum(
+        "ij,ij->i", _profils_de(profils, ids[lignes]), _profils_de(profils, candidats)
+    )
+    scores = nb * (1 + poids_sports * similarites)
+
+    # Tri par ligne, score décroissant puis id, et rang dans la ligne
+    ordre = np.lexsort((candidats, -scores, lignes))
+    lignes, candidats, nb, scores = (
+        lignes[ordre], candidats[ordre], nb[ordre], scores[ordre]
+    )
+    debuts_lignes = np.searchsorted(lignes, lignes)
+    garder = np.arange(len(lignes)) - debuts_lignes < nb_max
+
+    suggestions = {int(i): [] for i in ids}
+    for ligne, candidat, n, score in zip(
+        lignes[garder].tolist(),
+        candidats[garder].tolist(),
+        nb[garder].tolist(),
+        scores[garder].tolist(),
+    ):
+        suggestions[int(ids[ligne])].append((candidat, n, round(score, 4)))
+    return suggestions
+
+
+def graphe_suggestions(recharger: bool = False) -> GrapheAbonnements:
+    """Index des abonnements : celui de l'application si INDEX_GRAPHE est activé, sinon
+    une copie chargée pour les calculs de suggestions"""
+    global _graphe_lot
+    graphe = obtenir_graphe()
+    if graphe is not None:
+        return graphe
+    with _verrou:
+        if recharger or _graphe_lot is None:
+            graphe = GrapheAbonnements()
+            graphe.charger_depuis_base()
+            _graphe_lot = graphe
+        return _graphe_lot
+
+
+class SuggestionService:
+    """Classe contenant les méthodes de service pour les suggestions d'abonnements"""
+
+    @log
+    def lister_suggestions(self, id_utilisateur: int, nb: int = 10) -> List[dict]:
+        """Suggestions d'utilisateurs à suivre, par score décroissant, lues dans le
+        cache des suggestions précalculées (liste vide si l'utilisateur n'a pas encore
+        été traité : il est ajouté au précalcul suivant)
+
+        Returns
+        -------
+        List[dict]
+            {id_utilisateur, pseudo, nb_relations_communes, score} pour chaque
+            utilisateur suggéré
+        """
+        # Lève NotFoundError si l'utilisateur n'existe pas
+        suivis = AbonnementService().lister_utilisateurs_suivis(id_utilisateur)
+
+        suggestions = cache_suggestions.obtenir(id_utilisateur)
+        if suggestions is MANQUANT:
+            suggestions = []
+        with _verrou:
+            _demandeurs.add(id_utilisateur)
+
+        # Les abonnements créés depuis le calcul sont retirés
+        suggestions = [s for s in suggestions if s[0] not in suivis][:nb]
+        utilisateurs = {
+            u.id_utilisateur: u
+            for u in UtilisateurService().trouver_par_ids([s[0] for s in suggestions])
+        }
+        return [
+            {
+                "id_utilisateur": id_suggere,
+                "pseudo": utilisateurs[id_suggere].pseudo,
+                "nb_relations_communes": nb_relations,
+                "score": score,
+            }
+            for id_suggere, nb_relations, score in suggestions
+            if id_suggere in utilisateurs
+        ]
+
+    @log
+    def calculer(
+        self, ids_utilisateurs: List[int], profils: np.ndarray = None
+    ) -> dict[int, list[tuple[int, int, float]]]:
+        """Calcule les suggestions d'un lot d'utilisateurs (sans cache)
+
+        Parameters
+        ----------
+        ids_utilisateurs : List[int]
+            utilisateurs du lot
+        profils : np.ndarray, optional
+            profils sportifs de tous les utilisateurs (voir profils_sportifs), lus en
+            base pour les seuls utilisateurs concernés si None
+        """
+        ids = np.asarray(ids_utilisateurs, dtype=np.int64)
+        suivis = graphe_suggestions().csr_suivis()
+        lignes, candidats, nb = deux_sauts(suivis, ids)
+        if profils is None:
+            concernes = np.union1d(ids, candidats).tolist()
+            profils = profils_sportifs(ActiviteDao().compter_par_sport(concernes))
+        return classer(ids, lignes, candidats, nb, profils)
+
+    @log
+    def precalculer(self) -> int:
+        """Calcule et met en cache les suggestions des utilisateurs actifs
+
+        Returns
+        -------
+        int
+            nombre d'utilisateurs traités
+        """
+        with _verrou:
+            ids = set(_demandeurs)
+            _demandeurs.clear()
+        depuis = date.today() - timedelta(days=JOURS_ACTIFS)
+        ids.update(ActiviteDao().lister_utilisateurs_actifs(depuis))
+        ids = sorted(ids)
+
+        graphe_suggestions(recharger=True)
+        profils = profils_sportifs(ActiviteDao().compter_par_sport())
+        for debut in range(0, len(ids), TAILLE_LOT):
+            lot = ids[debut : debut + TAILLE_LOT]
+            for id_utilisateur, suggestions in self.calculer(lot, profils).items():
+                cache_suggestions.ajouter(id_utilisateur, suggestions)
+        return len(ids)
@@ -0,0 +1,55 @@
+from utils.log_decorator import log
+
+from dao.activite_dao import ActiviteDao
+from dao.compteurs_tendances import compteurs_tendances, PERIODES, NB_MAX_CLASSEMENT
+
+
+class TendanceService:
+    """Classe contenant les méthodes de service pour les tendances"""
+
+    @log
+    def lister_tendances(self, periode: str = "24h", nb: int = 10) -> dict:
+        """Activités les plus aimées et les plus commentées sur la période
+
+        Parameters
+        ----------
+        periode : str
+            "24h" ou "7j"
+        nb : int
+            nombre d'activités de chaque classement
+
+        Returns
+        -------
+        dict
+            {"periode", "plus_aimees", "plus_commentees"}, chaque classement étant une
+            liste de {"id_activite", "nombre"} par nombre décroissant
+        """
+        if periode not in PERIODES:
+            raise ValueError(f"La période doit valoir {' ou '.join(PERIODES)}")
+        compteurs_tendances.verifier_charge()
+
+        # Les compteurs d'une activité supprimée (par un autre processus, ou avec son
+        # utilisateur) restent en mémoire jusqu'à la prochaine synchronisation : les
+        # classements (gardés en cache) sont filtrés sur les activités existantes
+        candidats = {
+            type_evenement: compteurs_tendances.meilleures(
+                periode, type_evenement, max(nb, NB_MAX_CLASSEMENT)
+            )
+            for type_evenement in ("jaimes", "commentaires")
+        }
+        existantes = ActiviteDao().filtrer_existantes(
+            list({id_activite for c in candidats.values() for id_activite, _ in c})
+        )
+
+        def classement(type_evenement: str) -> list[dict]:
+            return [
+                {"id_activite": id_activite, "nombre": nombre}
+                for id_activite, nombre in candidats[type_evenement]
+                if id_activite in existantes
+            ][:nb]
+
+        return {
+            "periode": periode,
+            "plus_aimees": classement("jaimes"),
+            "plus_commentees": classement("commentaires"),
+        }
@@ -5,7 +5,11 @@ from utils.log_decorator import log
 
 from business_object.utilisateur import Utilisateur
 
-from dao.utilisateur_dao import UtilisateurDao
+from dao.utilisateur_dao import UtilisateurDao, cache_utilisateurs, trie_pseudos
+
+from utils.cache import MANQUANT
+
+from utils.securite import cache_identifiants
 
 from exceptions import NotFoundError, AlreadyExistsError
 
@@ -50,7 +54,11 @@ class UtilisateurService:
         if not pseudo or not mot_de_passe:
             raise ValueError("Pseudo ou mot de passe manquant.")
 
-        return UtilisateurDao().se_connecter(pseudo, mot_de_passe)
+        utilisateur = cache_identifiants.obtenir(pseudo, mot_de_passe)
+        if utilisateur is None:
+            utilisateur = UtilisateurDao().se_connecter(pseudo, mot_de_passe)
+            cache_identifiants.ajouter(pseudo, mot_de_passe, utilisateur)
+        return utilisateur
 
     @log
     def lister_utilisateurs(self) -> List[Utilisateur]:
@@ -62,17 +70,86 @@ class UtilisateurService:
     @log
     def trouver_par_id(self, id_utilisateur: int) -> Utilisateur:
         """Trouver un Utilisateur à partir de son id"""
-        if not UtilisateurDao().verifier_id_existant(id_utilisateur):
+        utilisateur = cache_utilisateurs.obtenir(("id", id_utilisateur))
+        if utilisateur is MANQUANT:
+            utilisateur = UtilisateurDao().trouver_par_id(id_utilisateur)
+            cache_utilisateurs.ajouter(("id", id_utilisateur), utilisateur)
+
+        if utilisateur is None:
             raise NotFoundError(
                 f"L'utilisateur avec l'id {id_utilisateur} n'existe pas"
             )
-
-        return UtilisateurDao().trouver_par_id(id_utilisateur)
+        return utilisateur
 
     @log
     def trouver_par_pseudo(self, pseudo: str) -> Utilisateur:
         """Trouver un Utilisateur à partir de son pseudo"""
-        if not UtilisateurDao().verifier_pseudo_existant(pseudo):
+        id_utilisateur = cache_utilisateurs.obtenir(("pseudo", pseudo))
+        if id_utilisateur is None:
+            raise NotFoundError(f"L'utilisateur avec le pseudo {pseudo} n'existe pas")
+
+        utilisateur = MANQUANT
+        if id_utilisateur is not MANQUANT:
+            utilisateur = cache_utilisateurs.obtenir(("id", id_utilisateur))
+
+        # Absent du cache, ou pseudo modifié depuis la mise en cache
+        if utilisateur is MANQUANT or utilisateur is None or utilisateur.pseudo != pseudo:
+            utilisateur = UtilisateurDao().trouver_par_pseudo(pseudo)
+            cache_utilisateurs.ajouter(
+                ("pseudo", pseudo), utilisateur.id_utilisateur if utilisateur else None
+            )
+            if utilisateur is not None:
+                cache_utilisateurs.ajouter(("id", utilisateur.id_utilisateur), utilisateur)
+
+        if utilisateur is None:
             raise NotFoundError(f"L'utilisateur avec le pseudo {pseudo} n'existe pas")
+        return utilisateur
 
-        return UtilisateurDao().trouver_par_pseudo(pseudo)
+    @log
+    def trouver_par_ids(self, ids_utilisateurs: List[int]) -> List[Utilisateur]:
+        """Trouver plusieurs Utilisateurs (les ids inconnus sont ignorés), en une requête au plus"""
+        ids_utilisateurs = list(dict.fromkeys(ids_utilisateurs))
+        trouves = {}
+        manquants = []
+        for id_utilisateur in ids_utilisateurs:
+            utilisateur = cache_utilisateurs.obtenir(("id", id_utilisateur))
+            if utilisateur is MANQUANT:
+                manquants.append(id_utilisateur)
+            elif utilisateur is not None:
+                trouves[id_utilisateur] = utilisateur
+
+        if manquants:
+            for utilisateur in UtilisateurDao().trouver_par_ids(manquants):
+                trouves[utilisateur.id_utilisateur] = utilisateur
+            for id_utilisateur in manquants:
+                cache_utilisateurs.ajouter(("id", id_utilisateur), trouves.get(id_utilisateur))
+
+        return [trouves[i] for i in ids_utilisateurs if i in trouves]
+
+    @log
+    def rechercher(self, texte: str, limite: int = 20) -> List[Utilisateur]:
+        """Recherche approchée sur le pseudo, le prénom et le nom (pertinence décroissante)"""
+        if not texte.strip():
+            raise ValueError("Le texte recherché ne doit pas être vide")
+        return UtilisateurDao().rechercher(texte, limite)
+
+    @log
+    def autocompleter(self, prefixe: str, nb: int = 10) -> List[dict]:
+        """Pseudos commençant par le préfixe, les plus suivis en premier
+
+        Les résultats sont servis par le trie des préfixes quand c'est possible, sans
+        accès à la base.
+        """
+        prefixe = prefixe.strip().lower()
+        if not prefixe:
+            raise ValueError("Le préfixe ne doit pas être vide")
+        resultats = trie_pseudos.obtenir(prefixe)
+        if resultats is None:
+            resultats = UtilisateurDao().lister_par_prefixe(
+                prefixe, trie_pseudos.taille_resultats
+            )
+            trie_pseudos.enregistrer(prefixe, resultats)
+        return [
+            {"id_utilisateur": id_utilisateur, "pseudo": pseudo}
+            for id_utilisateur, pseudo in resultats[:nb]
+        ]
@@ -1,7 +1,13 @@
+import threading
+
 import streamlit as st
 import requests
-from typing import Any, List
+from typing import Any, Callable, List
 from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
 
 # --- URLs API ---
 API_BASE = "http://localhost:9876"
@@ -11,10 +17,13 @@ API_ACTIVITES_FILTRES = f"{API_BASE}/activites-filtres"
 API_DELETE_ACTIVITE = f"{API_BASE}/activites"
 API_COMMENTAIRES = f"{API_BASE}/commentaires"
 API_UPLOAD_GPX = f"{API_BASE}/upload-gpx"
-API_UTILISATEUR_PSEUDO = f"{API_BASE}/utilisateurs/pseudo"
 API_UTILISATEUR_ID = f"{API_BASE}/utilisateurs"
+API_UTILISATEURS_LOT = f"{API_BASE}/utilisateurs/lot"
+API_UTILISATEURS_RECHERCHE = f"{API_BASE}/utilisateurs/recherche"
 API_ABONNEMENTS = f"{API_BASE}/abonnements"
 API_ABONNEMENTS_SUIVIS = f"{API_BASE}/abonnements/suivis"
+API_ABONNEMENTS_COMPTEURS = f"{API_BASE}/abonnements/compteurs"
+API_ABONNEMENTS_MUTUELS = f"{API_BASE}/abonnements/mutuels"
 API_JAIMES = f"{API_BASE}/jaimes"
 API_JAIMES_EXISTE = f"{API_BASE}/jaimes/existe"
 API_JAIMES_COMPTER = f"{API_BASE}/jaimes/compter"
@@ -23,6 +32,18 @@ API_STATS_SEMAINE = f"{API_BASE}/statistiques/semaine"
 API_INSCRIPTION = f"{API_BASE}/inscription"
 API_FIL = f"{API_BASE}/fil-dactualite"
 
+# Requêtes envoyées en même temps vers l'API lors de l'affichage d'une liste d'activités
+NB_REQUETES_PARALLELES = 8
+# Nombre maximal d'IDs par appel à /utilisateurs/lot
+TAILLE_LOT_UTILISATEURS = 500
+# Durées de vie (en secondes) des données de l'API mises en cache par st.cache_data
+DUREE_CACHE_COURTE = 30  # jaimes, commentaires
+DUREE_CACHE_MOYENNE = 60  # fil d'actualité, activités, abonnements, statistiques
+DUREE_CACHE_LONGUE = 300  # profils et pseudos
+
+# Modes du fil d'actualité : paramètre mode de l'API -> libellé affiché
+MODES_FIL = {"chrono": "Les plus récentes", "ranked": "Les plus pertinentes"}
+
 # --- Initialisation Session ---
 if "connected" not in st.session_state:
     st.session_state["connected"] = False
@@ -38,9 +59,36 @@ st.title("Réseau social Sports ENSAI")
 
 
 # --- Utility helpers ---
-def auth_tuple() -> tuple[str, str] | None:
+@st.cache_resource
+def session_http() -> requests.Session:
+    """Session HTTP partagée par toutes les exécutions du script : les connexions à
+    l'API sont gardées ouvertes (keep-alive) et réutilisées au lieu d'être rouvertes
+    à chaque appel. Les identifiants sont passés à chaque requête, pas à la session."""
+    session = requests.Session()
+    adaptateur = HTTPAdapter(pool_connections=4, pool_maxsize=2 * NB_REQUETES_PARALLELES)
+    session.mount("http://", adaptateur)
+    session.mount("https://", adaptateur)
+    return session
+
+
+class Identifiants(tuple):
+    """(pseudo, mot de passe) passés à requests. Dans les clés de st.cache_data, seul
+    le pseudo est haché (voir HACHAGE_IDENTIFIANTS) : le mot de passe n'y entre pas,
+    mais deux utilisateurs ne partagent jamais une réponse de l'API"""
+
+    @property
+    def pseudo(self) -> str:
+        return self[0]
+
+
+HACHAGE_IDENTIFIANTS = {Identifiants: lambda identifiants: identifiants.pseudo}
+
+
+def auth_tuple() -> Identifiants | None:
     if st.session_state.get("username") and st.session_state.get("password"):
-        return (st.session_state["username"], st.session_state["password"])
+        return Identifiants(
+            (st.session_state["username"], st.session_state["password"])
+        )
     return None
 
 
@@ -51,6 +99,236 @@ def safe_json(resp: requests.Response) -> Any:
         return resp.text
 
 
+class ErreurAPI(Exception):
+    """Réponse de l'API autre que 200. Les exceptions ne sont pas mises en cache par
+    st.cache_data : une erreur est redemandée à l'API à l'exécution suivante."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"{status_code} - {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+def get_json(url: str, auth, params: dict | None = None) -> Any:
+    """GET vers l'API : contenu JSON de la réponse, ErreurAPI si le statut n'est pas 200.
+    N'utilise pas st.session_state : peut être appelée depuis un thread du pool."""
+    resp = session_http().get(url, params=params, auth=auth)
+    if resp.status_code != 200:
+        raise ErreurAPI(resp.status_code, safe_json(resp))
+    return safe_json(resp)
+
+
+def verifier_reponse(resp: requests.Response) -> requests.Response:
+    """ErreurAPI si l'action demandée à l'API (POST, DELETE) a échoué"""
+    if not resp.ok:
+        raise ErreurAPI(resp.status_code, safe_json(resp))
+    return resp
+
+
+def ou_defaut(appel: Callable[[], Any], default=None) -> Any:
+    try:
+        return appel()
+    except Exception:
+        return default
+
+
+def executer_en_parallele(appels: dict[Any, Callable[[], Any]]) -> dict[Any, Any]:
+    """Exécute des appels indépendants à l'API avec un petit pool de threads.
+    Renvoie un dictionnaire clé -> résultat."""
+    if not appels:
+        return {}
+    with ThreadPoolExecutor(max_workers=NB_REQUETES_PARALLELES) as pool:
+        futures = {cle: pool.submit(appel) for cle, appel in appels.items()}
+        return {cle: future.result() for cle, future in futures.items()}
+
+
+# --- Données de l'API mises en cache ---
+# Les clés contiennent la ressource et le pseudo des identifiants auth (l'API filtre
+# ses réponses selon l'utilisateur connecté) : après une action, seules les clés
+# concernées sont effacées (voir les fonctions invalider_*), les autres restent
+# valides jusqu'à leur TTL.
+cache_api = partial(st.cache_data, show_spinner=False, hash_funcs=HACHAGE_IDENTIFIANTS)
+
+
+@cache_api(ttl=DUREE_CACHE_COURTE)
+def lire_nombre_jaimes(id_activite: int, auth) -> int:
+    return get_json(API_JAIMES_COMPTER, auth, {"id_activite": id_activite}).get(
+        "nombre_jaimes", 0
+    )
+
+
+@cache_api(ttl=DUREE_CACHE_COURTE)
+def lire_jaime_existe(id_activite: int, id_utilisateur: int, auth) -> bool:
+    params = {"id_activite": id_activite, "id_auteur": id_utilisateur}
+    return bool(get_json(API_JAIMES_EXISTE, auth, params))
+
+
+@cache_api(ttl=DUREE_CACHE_COURTE)
+def lire_commentaires(id_activite: int, auth) -> list:
+    return get_json(f"{API_COMMENTAIRES}/{id_activite}", auth)
+
+
+@cache_api(ttl=DUREE_CACHE_LONGUE)
+def lire_pseudos_lot(ids_utilisateurs: tuple, auth) -> dict:
+    """Pseudos d'un lot d'utilisateurs (id -> pseudo)"""
+    params = {"ids": list(ids_utilisateurs)}
+    utilisateurs = get_json(API_UTILISATEURS_LOT, auth, params)
+    return {
+        u["id_utilisateur"]: u.get("pseudo", u["id_utilisateur"]) for u in utilisateurs
+    }
+
+
+@cache_api(ttl=DUREE_CACHE_COURTE)
+def rechercher_utilisateurs(texte: str, auth) -> list:
+    return get_json(API_UTILISATEURS_RECHERCHE, auth, {"q": texte, "limite": 20})
+
+
+@cache_api(ttl=DUREE_CACHE_MOYENNE)
+def lire_fil_dactualite(id_utilisateur: int, mode: str, auth) -> list:
+    return get_json(f"{API_FIL}/{id_utilisateur}", auth, {"mode": mode})
+
+
+@cache_api(ttl=DUREE_CACHE_MOYENNE)
+def lire_activites(id_utilisateur: int, auth) -> list:
+    return get_json(f"{API_ACTIVITES}/{id_utilisateur}", auth)
+
+
+@cache_api(ttl=DUREE_CACHE_MOYENNE)
+def lire_activites_filtrees(id_utilisateur: int, filtres: tuple, auth) -> list:
+    """filtres : tuple de paires (nom du paramètre, valeur)"""
+    return get_json(f"{API_ACTIVITES_FILTRES}/{id_utilisateur}", auth, dict(filtres))
+
+
+@cache_api(ttl=DUREE_CACHE_MOYENNE)
+def lire_utilisateurs_suivis(id_utilisateur: int, auth) -> list:
+    return get_json(f"{API_ABONNEMENTS_SUIVIS}/{id_utilisateur}", auth)
+
+
+@cache_api(ttl=DUREE_CACHE_MOYENNE)
+def lire_compteurs_abonnements(id_utilisateur: int, auth) -> dict:
+    return get_json(f"{API_ABONNEMENTS_COMPTEURS}/{id_utilisateur}", auth)
+
+
+@cache_api(ttl=DUREE_CACHE_MOYENNE)
+def lire_suivis_communs(id_utilisateur_a: int, id_utilisateur_b: int, auth) -> list:
+    url = f"{API_ABONNEMENTS_MUTUELS}/{id_utilisateur_a}/{id_utilisateur_b}"
+    return get_json(url, auth)
+
+
+@cache_api(ttl=DUREE_CACHE_MOYENNE)
+def lire_statistiques_totales(id_utilisateur: int, auth) -> dict:
+    return get_json(f"{API_STATS_TOTAL}/{id_utilisateur}", auth)
+
+
+@cache_api(ttl=DUREE_CACHE_MOYENNE)
+def lire_statistiques_semaine(id_utilisateur: int, date_reference: str, auth) -> dict:
+    params = {"date_reference": date_reference}
+    return get_json(f"{API_STATS_SEMAINE}/{id_utilisateur}", auth, params)
+
+
+@st.cache_resource
+def variantes_en_cache() -> tuple[threading.Lock, dict]:
+    """(fonction, id_utilisateur, pseudo) -> arguments supplémentaires mis en cache
+    (filtres, dates de référence), pour effacer toutes les variantes d'un utilisateur.
+    Partagé par toutes les sessions : le dictionnaire n'est lu et modifié que sous le
+    verrou"""
+    return threading.Lock(), {}
+
+
+def lire_variante(fonction, id_utilisateur: int, *args, auth=None):
+    verrou, variantes = variantes_en_cache()
+    cle = (fonction.__name__, id_utilisateur, auth.pseudo if auth else None)
+    with verrou:
+        variantes.setdefault(cle, set()).add(args)
+    return fonction(id_utilisateur, *args, auth)
+
+
+def effacer_variantes(fonction, id_utilisateur: int):
+    auth = auth_tuple()
+    verrou, variantes = variantes_en_cache()
+    cle = (fonction.__name__, id_utilisateur, auth.pseudo if auth else None)
+    with verrou:
+        variantes_effacees = variantes.pop(cle, set())
+    for args in variantes_effacees:
+        fonction.clear(id_utilisateur, *args, auth)
+
+
+# Les invalider_* suivent une action réussie de l'utilisateur connecté : seules ses
+# entrées sont effacées, celles des autres utilisateurs expirent avec leur TTL
+def invalider_jaime(id_activite: int, id_utilisateur: int):
+    lire_nombre_jaimes.clear(id_activite, auth_tuple())
+    lire_jaime_existe.clear(id_activite, id_utilisateur, auth_tuple())
+
+
+def invalider_commentaires(id_activite: int):
+    lire_commentaires.clear(id_activite, auth_tuple())
+
+
+def effacer_fil(id_utilisateur: int):
+    for mode in MODES_FIL:
+        lire_fil_dactualite.clear(id_utilisateur, mode, auth_tuple())
+
+
+def invalider_abonnements(id_utilisateur: int, id_utilisateur_suivi: int):
+    lire_utilisateurs_suivis.clear(id_utilisateur, auth_tuple())
+    effacer_fil(id_utilisateur)
+    lire_compteurs_abonnements.clear(id_utilisateur, auth_tuple())
+    lire_compteurs_abonnements.clear(id_utilisateur_suivi, auth_tuple())
+
+
+def invalider_activites(id_utilisateur: int):
+    """Après la création ou la suppression d'une activité de l'utilisateur"""
+    lire_activites.clear(id_utilisateur, auth_tuple())
+    effacer_variantes(lire_activites_filtrees, id_utilisateur)
+    lire_statistiques_totales.clear(id_utilisateur, auth_tuple())
+    effacer_variantes(lire_statistiques_semaine, id_utilisateur)
+
+
+def recuperer_pseudos(auth, ids_utilisateurs) -> dict:
+    """Pseudos de plusieurs utilisateurs (id -> pseudo), via /utilisateurs/lot"""
+    ids = sorted({i for i in ids_utilisateurs if i is not None})
+    lots = [
+        tuple(ids[debut : debut + TAILLE_LOT_UTILISATEURS])
+        for debut in range(0, len(ids), TAILLE_LOT_UTILISATEURS)
+    ]
+    resultats = executer_en_parallele(
+        {
+            lot: lambda lot=lot: ou_defaut(lambda: lire_pseudos_lot(lot, auth), {})
+            for lot in lots
+        }
+    )
+    pseudos = {}
+    for pseudos_lot in resultats.values():
+        pseudos.update(pseudos_lot)
+    return pseudos
+
+
+def recuperer_details_activites(auth, ids_activites: list, id_utilisateur) -> dict:
+    """Nombre de jaimes, jaime de l'utilisateur connecté et commentaires de chaque
+    activité, récupérés en parallèle (ou lus dans le cache) :
+    id_activite -> (nb_jaimes, a_aime, commentaires)"""
+    appels = {}
+    for i in ids_activites:
+        appels[(i, "nb_jaimes")] = lambda i=i: ou_defaut(
+            lambda: lire_nombre_jaimes(i, auth), 0
+        )
+        appels[(i, "a_aime")] = lambda i=i: ou_defaut(
+            lambda: lire_jaime_existe(i, id_utilisateur, auth), False
+        )
+        appels[(i, "commentaires")] = lambda i=i: ou_defaut(
+            lambda: lire_commentaires(i, auth)
+        )
+    resultats = executer_en_parallele(appels)
+    return {
+        i: (
+            resultats[(i, "nb_jaimes")],
+            resultats[(i, "a_aime")],
+            resultats[(i, "commentaires")],
+        )
+        for i in ids_activites
+    }
+
+
 def extract_activity_field(a: dict, *keys, default=None):
     for k in keys:
         if k in a:
@@ -126,7 +404,7 @@ def auth_screen():
         password = st.text_input("Mot de passe", type="password", key="login_pass")
         if st.button("Se connecter"):
             try:
-                resp = requests.get(API_ME, auth=(username, password))
+                resp = session_http().get(API_ME, auth=(username, password))
                 if resp.status_code == 200:
                     user = resp.json()
                     uid = user.get("id_utilisateur") or user.get("id")
@@ -173,7 +451,7 @@ def auth_screen():
                 try:
                     # Note: FastAPI attend des query params selon définition dans app.py
                     # Utilisation de params=payload pour envoyer en query string
-                    resp = requests.post(API_INSCRIPTION, params=payload)
+                    resp = session_http().post(API_INSCRIPTION, params=payload)
                     if resp.status_code == 200:
                         st.success(
                             "Compte créé ! Vous pouvez maintenant vous connecter."
@@ -210,7 +488,7 @@ def gpx_analyse_et_creation():
                 )
             }
             try:
-                resp = requests.post(API_UPLOAD_GPX, files=files)
+                resp = session_http().post(API_UPLOAD_GPX, files=files)
                 if resp.status_code == 200:
                     data = resp.json()
                     activite = data.get("activite", data)
@@ -241,7 +519,7 @@ def gpx_analyse_et_creation():
                 )
             }
             try:
-                resp = requests.post(
+                resp = session_http().post(
                     API_ACTIVITES,
                     files=files_create,
                     params={"sport": sport},
@@ -249,6 +527,7 @@ def gpx_analyse_et_creation():
                 )
                 if resp.status_code == 200:
                     st.success("Activité postée !")
+                    invalider_activites(st.session_state["user_id"])
                     del st.session_state["analyse_data"]
                     st.rerun()
                 else:
@@ -267,24 +546,29 @@ def display_activity_list(
 
     auth = auth_tuple()
     logged_in_user_id = st.session_state["user_id"]
+    session = session_http()
+
+    activites = [normalize_activity(raw) for raw in activites_list]
+    activites = [a for a in activites if a.get("id_activite")]
 
-    for raw in activites_list:
-        a = normalize_activity(raw)
-        activity_id = a.get("id_activite")
+    # Toutes les données de la page sont récupérées avant l'affichage : les appels
+    # indépendants (jaimes, commentaires) en parallèle, puis tous les pseudos
+    # (auteurs des activités et des commentaires) en un seul appel groupé
+    details = recuperer_details_activites(
+        auth, [a["id_activite"] for a in activites], logged_in_user_id
+    )
+    ids_auteurs = {a.get("id_utilisateur") for a in activites}
+    for _, _, commentaires in details.values():
+        ids_auteurs.update(c.get("id_auteur") for c in commentaires or [])
+    pseudos = recuperer_pseudos(auth, ids_auteurs)
 
-        if not activity_id:
-            continue
+    for a in activites:
+        activity_id = a["id_activite"]
+        nb_likes, user_has_liked, commentaires = details[activity_id]
 
-        # --- RÉCUPÉRER LE PSEUDO DE L'AUTEUR ---
+        # --- PSEUDO DE L'AUTEUR ---
         auteur_id = a.get("id_utilisateur")
-        pseudo_auteur = auteur_id  # fallback si erreur
-
-        try:
-            resp_user = requests.get(f"{API_UTILISATEUR_ID}/{auteur_id}", auth=auth)
-            if resp_user.status_code == 200:
-                pseudo_auteur = resp_user.json().get("pseudo", auteur_id)
-        except Exception:
-            pass
+        pseudo_auteur = pseudos.get(auteur_id, auteur_id)  # fallback si erreur
 
         expander_label = f"**{pseudo_auteur}** - {a.get('sport', 'Activité')} - {a.get('date','')} ({a.get('distance',0)} km)"
         with st.expander(expander_label):
@@ -303,46 +587,29 @@ def display_activity_list(
             # --- LIKES ---
             col_l1, col_l2 = st.columns([1, 5])
 
-            nb_likes = 0
-            try:
-                resp_count = requests.get(
-                    API_JAIMES_COMPTER, params={"id_activite": activity_id}, auth=auth
-                )
-                if resp_count.status_code == 200:
-                    nb_likes = resp_count.json().get("nombre_jaimes", 0)
-            except Exception:
-                pass
-
-            user_has_liked = False
-            try:
-                resp_exist = requests.get(
-                    API_JAIMES_EXISTE,
-                    params={"id_activite": activity_id, "id_auteur": logged_in_user_id},
-                    auth=auth,
-                )
-                if resp_exist.status_code == 200:
-                    user_has_liked = bool(resp_exist.json())
-            except Exception:
-                pass
-
             with col_l1:
                 like_btn_key = f"{key_prefix}btn_like_{activity_id}"
 
                 if user_has_liked:
                     if st.button("❤️", key=like_btn_key, help="Je n'aime plus"):
                         try:
-                            requests.delete(f"{API_JAIMES}/{activity_id}", auth=auth)
+                            verifier_reponse(
+                                session.delete(f"{API_JAIMES}/{activity_id}", auth=auth)
+                            )
+                            invalider_jaime(activity_id, logged_in_user_id)
                             st.rerun()
                         except Exception as e:
                             st.error(str(e))
                 else:
                     if st.button("🤍", key=like_btn_key, help="J'aime"):
                         try:
-                            requests.post(
+                            resp = session.post(
                                 API_JAIMES,
                                 params={"id_activite": activity_id},
                                 auth=auth,
                             )
+                            verifier_reponse(resp)
+                            invalider_jaime(activity_id, logged_in_user_id)
                             st.rerun()
                         except Exception as e:
                             st.error(str(e))
@@ -351,42 +618,32 @@ def display_activity_list(
 
             # --- COMMENTAIRES ---
             st.markdown("#### Commentaires")
-            try:
-                resp_com = requests.get(f"{API_COMMENTAIRES}/{activity_id}", auth=auth)
-                if resp_com.status_code == 200:
-                    for c in resp_com.json():
-                        contenu = c.get("contenu") or ""
-                        auteur_id = c.get("id_auteur")
-                        date_com = c.get("date_commentaire")
-
-                        pseudo = auteur_id  # fallback si erreur
-                        try:
-                            resp_user = requests.get(
-                                f"{API_UTILISATEUR_ID}/{auteur_id}", auth=auth
-                            )
-                            if resp_user.status_code == 200:
-                                pseudo = resp_user.json().get("pseudo", auteur_id)
-                        except Exception:
-                            pass  # On garde l'ID si erreur API
-
-                        st.markdown(f"👤 **{pseudo}** ({date_com}) : {contenu}")
-                else:
-                    st.caption("Pas de commentaires.")
-            except Exception:
-                st.caption("Erreur chargement commentaires.")
+            if commentaires is not None:
+                for c in commentaires:
+                    contenu = c.get("contenu") or ""
+                    id_auteur = c.get("id_auteur")
+                    date_com = c.get("date_commentaire")
+                    pseudo = pseudos.get(id_auteur, id_auteur)  # ID si erreur API
+                    st.markdown(f"👤 **{pseudo}** ({date_com}) : {contenu}")
+            else:
+                st.caption("Pas de commentaires.")
 
             txt_com = st.text_input(
                 "Écrire un commentaire...", key=f"{key_prefix}input_com_{activity_id}"
             )
             if st.button("Envoyer", key=f"{key_prefix}send_com_{activity_id}"):
                 if txt_com:
-                    requests.post(
+                    resp = session.post(
                         API_COMMENTAIRES,
                         params={"id_activite": activity_id, "commentaire": txt_com},
                         auth=auth,
                     )
-                    st.success("Envoyé !")
-                    st.rerun()
+                    if resp.ok:
+                        invalider_commentaires(activity_id)
+                        st.success("Envoyé !")
+                        st.rerun()
+                    else:
+                        st.error(f"Erreur commentaire : {resp.status_code}")
 
             # --- DELETE ---
             if show_delete_button:
@@ -394,9 +651,15 @@ def display_activity_list(
                 if st.button(
                     "Supprimer l'activité", key=f"{key_prefix}del_act_{activity_id}"
                 ):
-                    requests.delete(f"{API_DELETE_ACTIVITE}/{activity_id}", auth=auth)
-                    st.success("Supprimé")
-                    st.rerun()
+                    resp = session.delete(
+                        f"{API_DELETE_ACTIVITE}/{activity_id}", auth=auth
+                    )
+                    if resp.ok:
+                        invalider_activites(logged_in_user_id)
+                        st.success("Supprimé")
+                        st.rerun()
+                    else:
+                        st.error(f"Erreur suppression : {resp.status_code}")
 
 
 # --- 4. Fil d'actualité ---
@@ -405,22 +668,28 @@ def afficher_fil_dactualite():
     user_id = st.session_state["user_id"]
     auth = auth_tuple()
 
+    mode = st.radio(
+        "Trier par",
+        list(MODES_FIL),
+        format_func=MODES_FIL.get,
+        horizontal=True,
+        key="mode_fil",
+    )
     if st.button("Actualiser le fil"):
+        # Le fil est gardé en cache : le bouton force une nouvelle lecture
+        effacer_fil(user_id)
+        st.session_state["fil_affiche"] = True
+
+    if st.session_state.get("fil_affiche"):
         try:
-            # Appel à l'endpoint GET /fil-dactualite/{id}
-            resp = requests.get(f"{API_FIL}/{user_id}", auth=auth)
-            if resp.status_code == 200:
-                st.session_state["fil_actu"] = resp.json()
-            else:
-                st.warning("Impossible de récupérer le fil ou fil vide.")
-                st.session_state["fil_actu"] = []
+            fil = lire_fil_dactualite(user_id, mode, auth)
+        except ErreurAPI:
+            st.warning("Impossible de récupérer le fil ou fil vide.")
+            fil = []
         except Exception as e:
             st.error(f"Erreur : {e}")
-
-    if "fil_actu" in st.session_state:
-        display_activity_list(
-            st.session_state["fil_actu"], show_delete_button=False, key_prefix="fil_"
-        )
+            fil = []
+        display_activity_list(fil, show_delete_button=False, key_prefix="fil_")
 
 
 # --- 5. Mes Activités ---
@@ -446,20 +715,22 @@ def afficher_activites_personnelles():
             params["date_debut"] = date_debut.strftime("%Y-%m-%d")
         if date_fin:
             params["date_fin"] = date_fin.strftime("%Y-%m-%d")
+        st.session_state["filtres_mes_activites"] = tuple(sorted(params.items()))
 
-        resp = requests.get(
-            f"{API_ACTIVITES_FILTRES}/{user_id}", params=params, auth=auth_tuple()
-        )
-
-        if resp.status_code == 200:
-            st.session_state["mes_activites"] = resp.json()
-        else:
+    # Affichage si des filtres ont déjà été choisis (activités lues dans le cache)
+    if "filtres_mes_activites" in st.session_state:
+        try:
+            mes_activites = lire_variante(
+                lire_activites_filtrees,
+                user_id,
+                st.session_state["filtres_mes_activites"],
+                auth=auth_tuple(),
+            )
+        except Exception:
             st.error("Erreur lors du chargement des activités.")
-
-    # Affichage si données déjà en session
-    if "mes_activites" in st.session_state:
+            return
         display_activity_list(
-            st.session_state["mes_activites"],
+            mes_activites,
             show_delete_button=True,
             key_prefix="mes-",
         )
@@ -468,67 +739,92 @@ def afficher_activites_personnelles():
 # --- 6. Recherche Profil ---
 def afficher_recherche_profil():
     st.subheader("Rechercher un profil")
-    pseudo = st.text_input("Pseudo")
-    if st.button("Rechercher"):
-        resp = requests.get(f"{API_UTILISATEUR_PSEUDO}/{pseudo}", auth=auth_tuple())
-        if resp.status_code == 200:
-            st.session_state["profil_trouve"] = resp.json()
-            # Charger ses activités
-            uid = resp.json()["id_utilisateur"]
-            r2 = requests.get(f"{API_ACTIVITES}/{uid}", auth=auth_tuple())
-            if r2.status_code == 200:
-                st.session_state["profil_activites"] = r2.json()
+    texte = st.text_input("Pseudo, prénom ou nom")
+    if st.button("Rechercher") and texte.strip():
+        try:
+            st.session_state["resultats_recherche"] = rechercher_utilisateurs(
+                texte.strip(), auth_tuple()
+            )
+        except Exception:
+            st.error("Recherche impossible.")
+
+    resultats = st.session_state.get("resultats_recherche")
+    if resultats is not None:
+        if not resultats:
+            st.info("Aucun utilisateur trouvé.")
         else:
-            st.error("Utilisateur introuvable.")
+            choix = st.selectbox(
+                "Résultats",
+                resultats,
+                format_func=lambda u: (
+                    f"{u['pseudo']} ({u.get('prenom') or ''} {u.get('nom') or ''})"
+                ),
+            )
+            st.session_state["profil_trouve"] = choix
 
     if "profil_trouve" in st.session_state:
         profil = st.session_state["profil_trouve"]
         st.markdown(f"### Profil de {profil['pseudo']}")
         st.write(f"Nom : {profil.get('prenom')} {profil.get('nom')}")
 
-        # Bouton Suivre / Ne plus suivre
         current_uid = st.session_state["user_id"]
         target_uid = profil["id_utilisateur"]
 
+        # En-tête : compteurs tenus à jour par l'API (une lecture par clé primaire)
+        compteurs = ou_defaut(
+            lambda: lire_compteurs_abonnements(target_uid, auth_tuple()), {}
+        )
+        col_suiveurs, col_suivis, col_communs = st.columns(3)
+        col_suiveurs.metric("Abonnés", compteurs.get("nb_suiveurs", "-"))
+        col_suivis.metric("Abonnements", compteurs.get("nb_suivis", "-"))
         if current_uid != target_uid:
-            # Vérifier abonnement
-            is_following = False
-            try:
-                # On récupère la liste des suivis pour vérifier
-                r_suivis = requests.get(
-                    f"{API_ABONNEMENTS_SUIVIS}/{current_uid}", auth=auth_tuple()
-                )
-                if r_suivis.status_code == 200:
-                    suivis = r_suivis.json()  # liste d'IDs
-                    if target_uid in suivis:
-                        is_following = True
-            except Exception:
-                pass
+            communs = ou_defaut(
+                lambda: lire_suivis_communs(current_uid, target_uid, auth_tuple()), []
+            )
+            col_communs.metric("Suivis en commun", len(communs))
+
+        # Bouton Suivre / Ne plus suivre
+
+        if current_uid != target_uid:
+            # Vérifier abonnement (liste d'IDs des utilisateurs suivis)
+            suivis = ou_defaut(
+                lambda: lire_utilisateurs_suivis(current_uid, auth_tuple()), []
+            )
+            is_following = target_uid in suivis
 
             if is_following:
                 if st.button("Se désabonner"):
-                    requests.delete(
+                    resp = session_http().delete(
                         API_ABONNEMENTS,
                         params={"id_utilisateur_suivi": target_uid},
                         auth=auth_tuple(),
                     )
-                    st.success("Désabonné")
-                    st.rerun()
+                    if resp.ok:
+                        invalider_abonnements(current_uid, target_uid)
+                        st.success("Désabonné")
+                        st.rerun()
+                    else:
+                        st.error(f"Erreur désabonnement : {resp.status_code}")
             else:
                 if st.button("Suivre"):
-                    requests.post(
+                    resp = session_http().post(
                         API_ABONNEMENTS,
                         params={"id_utilisateur_suivi": target_uid},
                         auth=auth_tuple(),
                     )
-                    st.success("Abonné !")
-                    st.rerun()
+                    if resp.ok:
+                        invalider_abonnements(current_uid, target_uid)
+                        st.success("Abonné !")
+                        st.rerun()
+                    else:
+                        st.error(f"Erreur abonnement : {resp.status_code}")
 
         st.divider()
         st.markdown("**Activités récentes**")
-        if "profil_activites" in st.session_state:
+        activites = ou_defaut(lambda: lire_activites(target_uid, auth_tuple()))
+        if activites is not None:
             display_activity_list(
-                st.session_state["profil_activites"],
+                activites,
                 show_delete_button=False,
                 key_prefix="recherche_",
             )
@@ -542,23 +838,18 @@ def afficher_statistiques():
 
     st.markdown("##### 📈 Statistiques Globales")
     if st.button("Afficher mes statistiques totales"):
+        st.session_state["total_stats_affichees"] = True
+
+    stats_total = None
+    if st.session_state.get("total_stats_affichees"):
         try:
-            resp = requests.get(f"{API_STATS_TOTAL}/{user_id}", auth=auth)
-            if resp.status_code == 200:
-                st.session_state["total_stats"] = resp.json()
-            else:
-                st.error(
-                    f"Erreur récupération stats totales : {resp.status_code} - {safe_json(resp)}"
-                )
-                if "total_stats" in st.session_state:
-                    del st.session_state["total_stats"]
+            stats_total = lire_statistiques_totales(user_id, auth)
+        except ErreurAPI as e:
+            st.error(f"Erreur récupération stats totales : {e}")
         except Exception as e:
             st.error(f"Erreur requête stats totales : {e}")
-            if "total_stats" in st.session_state:
-                del st.session_state["total_stats"]
 
-    if "total_stats" in st.session_state:
-        stats_total = st.session_state["total_stats"]
+    if stats_total is not None:
         # API renvoie: nombre_activites_total, distance_totale, duree_totale
         nb = stats_total.get("nombre_activites_total", {})
         dist = stats_total.get("distance_totale", 0)
@@ -579,29 +870,23 @@ def afficher_statistiques():
     st.markdown("##### 📅 Statistiques Hebdomadaires")
     date_ref = st.date_input("Choisir une date de référence pour la semaine")
     if st.button("Afficher les statistiques de la semaine"):
-        date_str = date_ref.strftime("%Y-%m-%d")
+        st.session_state["weekly_stats_date"] = date_ref.strftime("%Y-%m-%d")
+
+    s = None
+    if "weekly_stats_date" in st.session_state:
         try:
-            resp = requests.get(
-                f"{API_STATS_SEMAINE}/{user_id}",
-                params={"date_reference": date_str},
+            s = lire_variante(
+                lire_statistiques_semaine,
+                user_id,
+                st.session_state["weekly_stats_date"],
                 auth=auth,
             )
-            if resp.status_code == 200:
-                st.session_state["weekly_stats"] = resp.json()
-                st.session_state["weekly_stats_date"] = date_str
-            else:
-                st.error(
-                    f"Erreur récupération stats semaine : {resp.status_code} - {safe_json(resp)}"
-                )
-                if "weekly_stats" in st.session_state:
-                    del st.session_state["weekly_stats"]
+        except ErreurAPI as e:
+            st.error(f"Erreur récupération stats semaine : {e}")
         except Exception as e:
             st.error(f"Erreur requête stats semaine : {e}")
-            if "weekly_stats" in st.session_state:
-                del st.session_state["weekly_stats"]
 
-    if "weekly_stats" in st.session_state:
-        s = st.session_state["weekly_stats"]
+    if s is not None:
         st.info(
             f"Affichage des statistiques pour la semaine du {st.session_state.get('weekly_stats_date','?')}"
         )
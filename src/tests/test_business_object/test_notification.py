@@ -0,0 +1,49 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from business_object.notification import Notification
+
+
+def test_depuis_json():
+    """Le message émis par pg_notify est relu en notification"""
+    charge = (
+        '{"type" : "jaime", "id_destinataire" : 991, "id_auteur" : 993, '
+        '"id_activite" : 991, "date" : "2026-10-19T10:00:00.5+02:00"}'
+    )
+    notification = Notification.depuis_json(charge)
+    assert notification.type_notification == "jaime"
+    assert notification.id_destinataire == 991
+    assert notification.id_auteur == 993
+    assert notification.id_activite == 991
+    assert notification.date_notification == datetime(
+        2026, 10, 19, 10, 0, 0, 500000, tzinfo=timezone(timedelta(hours=2))
+    )
+
+
+@pytest.mark.parametrize(
+    "charge",
+    [
+        "pas du json",
+        '{"type": "jaime", "id_auteur": 993}',
+        '{"type": "inconnu", "id_destinataire": 991, "id_auteur": 993}',
+    ],
+)
+def test_depuis_json_invalide(charge):
+    """Un message invalide lève une ValueError"""
+    with pytest.raises(ValueError):
+        Notification.depuis_json(charge)
+
+
+def test_en_dict():
+    """Le destinataire n'est pas répété dans la représentation envoyée au client"""
+    notification = Notification("abonnement", id_destinataire=991, id_auteur=995)
+    assert notification.en_dict() == {
+        "type": "abonnement",
+        "id_auteur": 995,
+        "id_activite": None,
+        "date": None,
+    }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
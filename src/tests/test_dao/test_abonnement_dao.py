@@ -1,7 +1,7 @@
 import os
 import pytest
 from unittest.mock import patch
-from utils.reset_database import ResetDatabase
+from utils.reset_database import ResetDatabase, ENV_TEST
 
 from business_object.abonnement import Abonnement
 from dao.abonnement_dao import AbonnementDao
@@ -10,7 +10,7 @@ from dao.abonnement_dao import AbonnementDao
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test dans le schéma dédié aux tests"""
-    with patch.dict(os.environ, {"SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         ResetDatabase().lancer(test_dao=True)
         yield
 
@@ -128,5 +128,59 @@ def test_supprimer_abonnement_ko():
         AbonnementDao().supprimer(id_utilisateur_suiveur, id_utilisateur_suivi)
 
 
+def test_compter():
+    """Les compteurs initialisés au reset correspondent aux abonnements"""
+
+    # GIVEN
+    id_utilisateur = 992  # suit 991, 993, 994 ; suivi par 991
+
+    # WHEN
+    compteurs = AbonnementDao().compter(id_utilisateur)
+
+    # THEN
+    assert compteurs == {"nb_suiveurs": 1, "nb_suivis": 3}
+
+
+def test_compter_utilisateur_inexistant():
+    """Compteurs d'un utilisateur inexistant"""
+
+    # WHEN
+    compteurs = AbonnementDao().compter(99999)
+
+    # THEN
+    assert compteurs is None
+
+
+def test_creer_supprimer_met_a_jour_compteurs():
+    """Création et suppression d'un abonnement mettent à jour les deux compteurs"""
+
+    # GIVEN
+    abonnement = Abonnement(id_utilisateur_suiveur=991, id_utilisateur_suivi=993)
+
+    # WHEN
+    AbonnementDao().creer(abonnement)
+
+    # THEN
+    assert AbonnementDao().compter(991) == {"nb_suiveurs": 2, "nb_suivis": 2}
+    assert AbonnementDao().compter(993) == {"nb_suiveurs": 2, "nb_suivis": 1}
+
+    # WHEN
+    AbonnementDao().supprimer(991, 993)
+
+    # THEN
+    assert AbonnementDao().compter(991) == {"nb_suiveurs": 2, "nb_suivis": 1}
+    assert AbonnementDao().compter(993) == {"nb_suiveurs": 1, "nb_suivis": 1}
+
+
+def test_lister_suivis_communs():
+    """Utilisateurs suivis à la fois par 992 (991, 993, 994) et 993 (994)"""
+
+    # WHEN
+    communs = AbonnementDao().lister_suivis_communs(992, 993)
+
+    # THEN
+    assert communs == [994]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -3,15 +3,17 @@ import pytest
 from unittest.mock import patch
 from datetime import datetime
 
-from utils.reset_database import ResetDatabase
+from utils.reset_database import ResetDatabase, ENV_TEST
+from dao.db_connection import DBConnection
 from dao.activite_dao import ActiviteDao
 from business_object.activite import Activite
+from utils.versions import version
 
 
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test dans le schéma dédié aux tests"""
-    with patch.dict(os.environ, {"SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         ResetDatabase().lancer(test_dao=True)
         yield
 
@@ -153,6 +155,20 @@ def test_supprimer_ok():
     assert suppression_ok
 
 
+def test_supprimer_change_version():
+    """La suppression d'une activité change la version des activités de son utilisateur"""
+    # GIVEN
+    id_activite = 994
+    id_utilisateur = ActiviteDao().trouver_par_id(id_activite).id_utilisateur
+    version_avant = version("activites", id_utilisateur)
+
+    # WHEN
+    ActiviteDao().supprimer(id_activite)
+
+    # THEN
+    assert version("activites", id_utilisateur) != version_avant
+
+
 def test_supprimer_ko():
     """Suppression échouée pour une activité inexistante"""
     # GIVEN
@@ -264,5 +280,72 @@ def test_verifier_id_non_existant():
     assert existe is False
 
 
+def test_compter_par_sport():
+    """Nombre d'activités par utilisateur et par sport, pour les utilisateurs donnés"""
+    # GIVEN
+    ids_utilisateurs = [991, 993]
+
+    # WHEN
+    comptes = ActiviteDao().compter_par_sport(ids_utilisateurs)
+
+    # THEN
+    assert sorted(comptes) == [
+        (991, "course", 1),
+        (991, "natation", 1),
+        (991, "vélo", 1),
+        (993, "vélo", 1),
+    ]
+
+
+def test_lister_utilisateurs_actifs():
+    """Seuls les utilisateurs ayant une activité depuis la date sont listés"""
+    # GIVEN
+    date_debut = "2025-09-28"
+
+    # WHEN
+    ids = ActiviteDao().lister_utilisateurs_actifs(date_debut)
+
+    # THEN
+    # 994 (28/09), 995 (29/09), 991 (25/10)
+    assert ids == [991, 994, 995]
+
+
+def test_lister_candidats_fil():
+    """Candidats du fil de 992 (suit 991, 993 et 994) avec leur engagement"""
+    # GIVEN
+    id_utilisateur = 992
+
+    # WHEN
+    candidats = ActiviteDao().lister_candidats_fil(
+        id_utilisateur, limite=10, limite_par_auteur=2
+    )
+
+    # THEN
+    # 2 activités au plus par auteur : 997 et 996 pour 991
+    assert [c["activite"].id_activite for c in candidats] == [997, 994, 996, 993]
+    par_id = {c["activite"].id_activite: c for c in candidats}
+    assert (par_id[993]["nb_jaimes"], par_id[993]["nb_commentaires"]) == (1, 1)
+    # 992 a commenté une activité de 991 et aimé une activité de 994
+    assert par_id[997]["affinite"] == 1
+    assert par_id[993]["affinite"] == 0
+
+
+
+def test_lister_candidats_fil_sans_date():
+    """Une activité sans date ne passe pas devant les activités récentes"""
+    # GIVEN
+    with DBConnection().connection as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO activite (id_utilisateur, sport, date_activite) "
+                "VALUES (991, 'course', NULL);"
+            )
+
+    # WHEN
+    candidats = ActiviteDao().lister_candidats_fil(992, limite=10, limite_par_auteur=2)
+
+    # THEN
+    assert [c["activite"].id_activite for c in candidats] == [997, 994, 996, 993]
+
 if __name__ == "__main__":
     pytest.main([__file__])
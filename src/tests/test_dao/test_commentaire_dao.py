@@ -1,7 +1,7 @@
 import os
 import pytest
 from unittest.mock import patch
-from utils.reset_database import ResetDatabase
+from utils.reset_database import ResetDatabase, ENV_TEST
 
 from dao.commentaire_dao import CommentaireDao
 
@@ -11,7 +11,7 @@ from business_object.commentaire import Commentaire
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test"""
-    with patch.dict(os.environ, {"SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         ResetDatabase().lancer(test_dao=True)
         yield
 
@@ -114,5 +114,67 @@ def test_trouver_par_id_ok():
     assert commentaire.id_commentaire == id_commentaire
 
 
+def test_rechercher_racinisation():
+    """Les mots sont comparés après racinisation (vue / vues)"""
+
+    # GIVEN
+    texte = "vue"
+
+    # WHEN
+    commentaires = CommentaireDao().rechercher(texte, 10)
+
+    # THEN
+    assert [c.id_commentaire for c in commentaires] == [994]
+
+
+def test_rechercher_nouveau_commentaire():
+    """Un commentaire est trouvé dès son insertion"""
+
+    # GIVEN
+    CommentaireDao().creer(
+        Commentaire(
+            id_activite=991,
+            id_auteur=993,
+            contenu="Belle sortie en vélo",
+            date_commentaire="2025-10-01",
+        )
+    )
+
+    # WHEN
+    commentaires = CommentaireDao().rechercher("vélo", 10)
+
+    # THEN
+    assert len(commentaires) == 2
+    assert all("vélo" in c.contenu for c in commentaires)
+
+
+def test_rechercher_pagination():
+    """Les pages successives ne se recouvrent pas"""
+
+    # GIVEN
+    texte = "natation or vélo"
+
+    # WHEN
+    page_1 = CommentaireDao().rechercher(texte, 1)
+    page_2 = CommentaireDao().rechercher(texte, 1, decalage=1)
+
+    # THEN
+    ids = {c.id_commentaire for c in page_1 + page_2}
+    assert ids == {992, 993}
+
+
+def test_rechercher_mots_vides():
+    """Un texte fait uniquement de mots vides ne trouve rien"""
+
+    # GIVEN
+    texte = "le la les"
+
+    # WHEN
+    commentaires = CommentaireDao().rechercher(texte, 10)
+
+    # THEN
+    assert commentaires == []
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,176 @@
+import os
+import pytest
+from unittest.mock import patch
+
+from utils.reset_database import ResetDatabase, ENV_TEST
+
+from business_object.jaime import Jaime
+from dao.jaime_dao import JaimeDao
+from dao.activite_dao import ActiviteDao
+from dao.compteurs_tendances import CompteursTendances, compteurs_tendances
+
+from service.tendance_service import TendanceService
+
+HEURE = 3600
+
+
+class Horloge:
+    def __init__(self):
+        self.maintenant = 1_000_000 * HEURE
+
+    def __call__(self):
+        return self.maintenant
+
+
+@pytest.fixture
+def horloge():
+    return Horloge()
+
+
+@pytest.fixture
+def compteurs(horloge):
+    return CompteursTendances(horloge=horloge)
+
+
+@pytest.fixture
+def base_de_test():
+    """Initialisation des données de test dans le schéma dédié aux tests"""
+    with patch.dict(os.environ, ENV_TEST):
+        ResetDatabase().lancer(test_dao=True)
+        yield
+
+
+def test_meilleures(compteurs):
+    """Classement par nombre décroissant, limité à nb activités"""
+
+    # GIVEN
+    for id_activite, nombre in [(1, 3), (2, 5), (3, 1)]:
+        compteurs.enregistrer("jaimes", id_activite, nombre)
+    compteurs.enregistrer("commentaires", 3)
+
+    # WHEN
+    res = compteurs.meilleures("24h", "jaimes", 2)
+
+    # THEN
+    assert res == [(2, 5), (1, 3)]
+    assert compteurs.meilleures("7j", "commentaires", 10) == [(3, 1)]
+
+
+def test_fenetre_glissante(compteurs, horloge):
+    """Un seau sorti de la période n'est plus compté"""
+
+    # GIVEN
+    compteurs.enregistrer("jaimes", 1, 4)
+    horloge.maintenant += 10 * HEURE
+    compteurs.enregistrer("jaimes", 2, 2)
+
+    # WHEN
+    horloge.maintenant += 20 * HEURE
+
+    # THEN
+    # Seau de l'activité 1 vieux de 30 h : hors des 24 h, compté sur 7 jours
+    assert compteurs.meilleures("24h", "jaimes", 10) == [(2, 2)]
+    assert compteurs.meilleures("7j", "jaimes", 10) == [(1, 4), (2, 2)]
+
+    # WHEN
+    horloge.maintenant += 7 * 24 * HEURE
+
+    # THEN
+    assert compteurs.meilleures("7j", "jaimes", 10) == []
+    assert not compteurs._seaux["jaimes"]
+
+
+def test_retrait_compense(compteurs):
+    """Aimer puis retirer son jaime ne fait pas monter l'activité"""
+
+    # GIVEN
+    for _ in range(5):
+        compteurs.enregistrer("jaimes", 1)
+        compteurs.enregistrer("jaimes", 1, -1)
+    compteurs.enregistrer("jaimes", 2)
+
+    # WHEN
+    res = compteurs.meilleures("24h", "jaimes", 10)
+
+    # THEN
+    assert res == [(2, 1)]
+    assert 1 not in compteurs._totaux["7j"]["jaimes"]
+
+
+def test_retrait_jaime_hors_periode(compteurs, horloge):
+    """Le retrait d'un jaime compté avant la période ne donne pas de total négatif
+    dans le classement"""
+
+    # GIVEN
+    compteurs.enregistrer("jaimes", 1)
+    horloge.maintenant += 30 * HEURE
+    compteurs.enregistrer("jaimes", 1, -1)
+
+    # WHEN
+    res_24h = compteurs.meilleures("24h", "jaimes", 10)
+    res_7j = compteurs.meilleures("7j", "jaimes", 10)
+
+    # THEN
+    assert res_24h == []
+    assert res_7j == []
+
+
+def test_oublier(compteurs):
+    """Une activité supprimée disparaît des compteurs et des écritures en attente"""
+
+    # GIVEN
+    compteurs.enregistrer("jaimes", 1, 3)
+    compteurs.enregistrer("commentaires", 1)
+    compteurs.enregistrer("jaimes", 2)
+
+    # WHEN
+    compteurs.oublier(1)
+
+    # THEN
+    assert compteurs.meilleures("24h", "jaimes", 10) == [(2, 1)]
+    assert compteurs.meilleures("7j", "commentaires", 10) == []
+    assert all(id_activite != 1 for _, id_activite in compteurs._en_attente)
+
+
+def test_periode_invalide(compteurs):
+    """Période inconnue"""
+
+    # WHEN / THEN
+    with pytest.raises(ValueError):
+        compteurs.meilleures("1an", "jaimes", 10)
+
+
+def test_synchroniser(base_de_test):
+    """Les jaimes créés sont comptés, écrits dans la table puis relus"""
+
+    # GIVEN
+    JaimeDao().creer(Jaime(id_activite=992, id_auteur=991))
+    JaimeDao().creer(Jaime(id_activite=992, id_auteur=993))
+    JaimeDao().creer(Jaime(id_activite=993, id_auteur=992))
+
+    # WHEN
+    compteurs_tendances.synchroniser()
+    relus = CompteursTendances()
+    relus.synchroniser()
+
+    # THEN
+    assert not compteurs_tendances._en_attente
+    assert relus.meilleures("24h", "jaimes", 10) == [(992, 2), (993, 1)]
+    assert compteurs_tendances.meilleures("24h", "jaimes", 10) == [(992, 2), (993, 1)]
+
+
+def test_tendances_suppressions(base_de_test):
+    """Les jaimes retirés et les activités supprimées sortent des tendances"""
+
+    # GIVEN
+    JaimeDao().creer(Jaime(id_activite=992, id_auteur=991))
+    JaimeDao().creer(Jaime(id_activite=993, id_auteur=992))
+    JaimeDao().creer(Jaime(id_activite=995, id_auteur=991))
+    JaimeDao().supprimer(993, 992)
+
+    # WHEN
+    ActiviteDao().supprimer(995)
+    tendances = TendanceService().lister_tendances("24h")
+
+    # THEN
+    assert tendances["plus_aimees"] == [{"id_activite": 992, "nombre": 1}]
@@ -0,0 +1,257 @@
+import os
+import hashlib
+import pytest
+from unittest.mock import patch
+
+import numpy as np
+
+from utils.reset_database import ResetDatabase, ENV_TEST
+
+from business_object.abonnement import Abonnement
+from dao.abonnement_dao import AbonnementDao
+from dao.graphe_abonnements import GrapheAbonnements, CSR, obtenir_graphe
+
+# Abonnements du jeu de données de test (suiveur, suivi)
+ABONNEMENTS_TEST = [
+    (991, 992),
+    (992, 991),
+    (992, 993),
+    (992, 994),
+    (993, 994),
+    (994, 995),
+    (995, 991),
+]
+
+
+@pytest.fixture
+def graphe():
+    suiveurs, suivis = zip(*ABONNEMENTS_TEST)
+    graphe = GrapheAbonnements()
+    graphe.construire(np.array(suiveurs), np.array(suivis))
+    return graphe
+
+
+@pytest.fixture
+def base_de_test():
+    """Initialisation des données de test dans le schéma dédié aux tests"""
+    with patch.dict(os.environ, {**ENV_TEST, "INDEX_GRAPHE": "1"}):
+        ResetDatabase().lancer(test_dao=True)
+        yield
+
+
+def test_csr_voisins_tries_sans_doublons():
+    """Les voisins de chaque sommet sont triés et les doublons ignorés"""
+
+    # GIVEN
+    sources = np.array([2, 0, 2, 2, 0])
+    cibles = np.array([5, 3, 1, 5, 1])
+
+    # WHEN
+    csr = CSR.depuis_aretes(sources, cibles)
+
+    # THEN
+    assert csr.voisins_de(0).tolist() == [1, 3]
+    assert csr.voisins_de(1).tolist() == []
+    assert csr.voisins_de(2).tolist() == [1, 5]
+    assert csr.voisins_de(42).tolist() == []
+    assert csr.voisins.dtype == np.int32
+
+
+def test_suivis_et_suiveurs(graphe):
+    """Les deux sens du graphe sont indexés"""
+
+    # THEN
+    assert graphe.suivis(992).tolist() == [991, 993, 994]
+    assert graphe.suiveurs(991).tolist() == [992, 995]
+    assert graphe.nb_suivis(992) == 3
+    assert graphe.nb_suiveurs(994) == 2
+    assert graphe.existe(991, 992)
+    assert not graphe.existe(992, 995)
+
+
+def test_ajouter_retirer(graphe):
+    """Les abonnements ajoutés ou retirés après le chargement sont pris en compte"""
+
+    # WHEN
+    graphe.ajouter(991, 995)
+    graphe.retirer(992, 993)
+
+    # THEN
+    assert graphe.suivis(991).tolist() == [992, 995]
+    assert graphe.suiveurs(995).tolist() == [991, 994]
+    assert graphe.suivis(992).tolist() == [991, 994]
+    assert graphe.suiveurs(993).tolist() == []
+    assert graphe.existe(991, 995)
+    assert not graphe.existe(992, 993)
+
+
+def test_compacter(graphe):
+    """La compaction intègre les deltas sans changer les réponses"""
+
+    # GIVEN
+    graphe.ajouter(991, 995)
+    graphe.retirer(992, 993)
+    graphe.retirer(991, 995)
+    graphe.ajouter(992, 993)
+    graphe.ajouter(993, 991)
+
+    # WHEN
+    graphe.compacter()
+
+    # THEN
+    assert not graphe._ajouts and not graphe._suppressions
+    assert graphe.suivis(993).tolist() == [991, 994]
+    assert graphe.suivis(991).tolist() == [992]
+    assert graphe.suiveurs(991).tolist() == [992, 993, 995]
+
+
+def test_retirer_utilisateur(graphe):
+    """Tous les abonnements d'un utilisateur supprimé disparaissent"""
+
+    # WHEN
+    graphe.retirer_utilisateur(992)
+
+    # THEN
+    assert graphe.suivis(992).tolist() == []
+    assert graphe.suiveurs(992).tolist() == []
+    assert graphe.suivis(991).tolist() == []
+    assert graphe.suiveurs(994).tolist() == [993]
+
+
+def test_sauvegarder_charger_instantane(graphe, tmp_path):
+    """Un instantané dont l'empreinte correspond à la base est rechargé"""
+
+    # GIVEN
+    chemin = str(tmp_path / "graphe.npz")
+    graphe.sauvegarder(chemin)
+    empreinte = graphe.empreinte()
+    nouveau = GrapheAbonnements()
+
+    # WHEN
+    with patch.object(GrapheAbonnements, "empreinte_base", return_value=empreinte):
+        res = nouveau.charger_instantane(chemin)
+
+    # THEN
+    assert res
+    assert nouveau.suivis(992).tolist() == [991, 993, 994]
+    assert nouveau.suiveurs(991).tolist() == [992, 995]
+
+
+def test_charger_instantane_perime(graphe, tmp_path):
+    """Un instantané qui ne correspond plus à la base est ignoré"""
+
+    # GIVEN
+    chemin = str(tmp_path / "graphe.npz")
+    graphe.sauvegarder(chemin)
+    nb, md5 = graphe.empreinte()
+    nouveau = GrapheAbonnements()
+
+    # WHEN
+    with patch.object(GrapheAbonnements, "empreinte_base", return_value=(nb + 1, md5)):
+        res = nouveau.charger_instantane(chemin)
+
+    # THEN
+    assert not res
+    assert not nouveau.charge
+
+
+def test_empreinte_echange_de_suivis():
+    """Échanger les suivis de deux abonnements (A->B et C->D remplacés par A->D et
+    C->B) change l'empreinte, bien que le nombre d'abonnements soit le même"""
+
+    # GIVEN
+    avant = CSR.depuis_aretes(np.array([1, 3, 5]), np.array([2, 4, 6]))
+    apres = CSR.depuis_aretes(np.array([1, 3, 5]), np.array([4, 2, 6]))
+
+    # WHEN
+    nb_avant, md5_avant = GrapheAbonnements._empreinte_csr(avant)
+    nb_apres, md5_apres = GrapheAbonnements._empreinte_csr(apres)
+
+    # THEN
+    assert nb_avant == nb_apres == 3
+    assert md5_avant != md5_apres
+
+
+def test_empreinte_texte_trie():
+    """L'empreinte est le MD5 du texte produit par string_agg dans empreinte_base,
+    quelle que soit la taille des blocs"""
+
+    # GIVEN
+    csr = CSR.depuis_aretes(np.array([10, 2, 2]), np.array([1, 30, 4]))
+    attendu = hashlib.md5(b"2,4\n2,30\n10,1").hexdigest()
+
+    # WHEN
+    with patch("dao.graphe_abonnements._TAILLE_BLOC_EMPREINTE", 2):
+        par_blocs = GrapheAbonnements._empreinte_csr(csr)
+
+    # THEN
+    assert GrapheAbonnements._empreinte_csr(csr) == par_blocs == (3, attendu)
+
+
+def test_sauvegarder_empreinte_des_tableaux_ecrits(graphe, tmp_path):
+    """L'empreinte de l'instantané est calculée sur les tableaux écrits, sans
+    reprendre le verrou"""
+
+    # GIVEN
+    chemin = str(tmp_path / "graphe.npz")
+    graphe.ajouter(991, 993)
+
+    # WHEN
+    with patch.object(GrapheAbonnements, "empreinte", side_effect=AssertionError):
+        graphe.sauvegarder(chemin)
+
+    # THEN
+    with np.load(chemin) as donnees:
+        suivis = CSR(donnees["suivis_debuts"], donnees["suivis_voisins"])
+        empreinte = (int(donnees["nb_abonnements"]), str(donnees["empreinte"]))
+    assert empreinte == GrapheAbonnements._empreinte_csr(suivis)
+    assert empreinte[0] == len(ABONNEMENTS_TEST) + 1
+
+
+def test_invalider_autres_workers(graphe):
+    """invalider incrémente le compteur partagé : les autres workers rechargent"""
+
+    # GIVEN
+    autre_worker = GrapheAbonnements()
+    autre_worker._generation = autre_worker._lire_generation()
+    autre_worker.charge = True
+
+    # WHEN
+    graphe.invalider()
+
+    # THEN
+    assert not graphe.charge
+    assert autre_worker._lire_generation() != autre_worker._generation
+
+
+def test_charger_depuis_base(base_de_test):
+    """L'index chargé depuis la base correspond à la table et à son empreinte"""
+
+    # GIVEN
+    graphe = GrapheAbonnements()
+
+    # WHEN
+    graphe.charger_depuis_base()
+
+    # THEN
+    assert graphe.suivis(992).tolist() == [991, 993, 994]
+    assert graphe.suiveurs(991).tolist() == [992, 995]
+    assert graphe.empreinte() == GrapheAbonnements.empreinte_base()
+
+
+def test_dao_met_a_jour_index(base_de_test):
+    """Les créations et suppressions d'abonnements sont appliquées à l'index"""
+
+    # GIVEN
+    graphe = obtenir_graphe()
+
+    # WHEN
+    AbonnementDao().creer(
+        Abonnement(id_utilisateur_suiveur=991, id_utilisateur_suivi=993)
+    )
+    AbonnementDao().supprimer(992, 994)
+
+    # THEN
+    assert graphe.suivis(991).tolist() == [992, 993]
+    assert not graphe.existe(992, 994)
+    assert graphe.empreinte() == GrapheAbonnements.empreinte_base()
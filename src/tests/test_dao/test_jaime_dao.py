@@ -3,7 +3,7 @@ import pytest
 
 from unittest.mock import patch
 
-from utils.reset_database import ResetDatabase
+from utils.reset_database import ResetDatabase, ENV_TEST
 
 from dao.jaime_dao import JaimeDao
 
@@ -13,7 +13,7 @@ from business_object.jaime import Jaime
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test"""
-    with patch.dict(os.environ, {"SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         ResetDatabase().lancer(test_dao=True)
         yield
 
@@ -206,5 +206,78 @@ def test_compter_par_activite_inexistante():
     assert count == 0
 
 
+def test_creer_lot():
+    """Seuls les jaimes nouveaux et dont l'activité existe sont insérés"""
+
+    # GIVEN
+    jaimes = [
+        Jaime(id_activite=991, id_auteur=994),
+        Jaime(id_activite=991, id_auteur=993),  # existe déjà
+        Jaime(id_activite=99999, id_auteur=994),  # activité inexistante
+        Jaime(id_activite=992, id_auteur=991),
+    ]
+
+    # WHEN
+    crees = JaimeDao().creer_lot(jaimes)
+
+    # THEN
+    assert sorted((j.id_activite, j.id_auteur) for j in crees) == [
+        (991, 994),
+        (992, 991),
+    ]
+    assert JaimeDao().compter_par_activite(991) == 2
+
+
+def test_supprimer_lot():
+    """Les jaimes inexistants sont ignorés"""
+
+    # GIVEN
+    jaimes = [
+        Jaime(id_activite=991, id_auteur=993),
+        Jaime(id_activite=991, id_auteur=995),  # n'existe pas
+    ]
+
+    # WHEN
+    nb = JaimeDao().supprimer_lot(jaimes)
+
+    # THEN
+    assert nb == 1
+    assert not JaimeDao().existe(991, 993)
+
+
+def test_ecrire_lot():
+    """Créations et suppressions écrites ensemble"""
+
+    # GIVEN
+    creations = [Jaime(id_activite=991, id_auteur=994)]
+    suppressions = [Jaime(id_activite=991, id_auteur=993)]
+
+    # WHEN
+    crees, nb_supprimes = JaimeDao().ecrire_lot(creations, suppressions)
+
+    # THEN
+    assert [(j.id_activite, j.id_auteur) for j in crees] == [(991, 994)]
+    assert nb_supprimes == 1
+    assert JaimeDao().existe(991, 994)
+    assert not JaimeDao().existe(991, 993)
+
+
+def test_ecrire_lot_echec_suppression():
+    """Un échec des suppressions annule aussi les créations"""
+
+    # GIVEN
+    creations = [Jaime(id_activite=991, id_auteur=994)]
+    suppressions = [Jaime(id_activite=991, id_auteur=993)]
+
+    # WHEN
+    with patch.object(JaimeDao, "_supprimer_lot", side_effect=ConnectionError):
+        with pytest.raises(ConnectionError):
+            JaimeDao().ecrire_lot(creations, suppressions)
+
+    # THEN
+    assert not JaimeDao().existe(991, 994)
+    assert JaimeDao().existe(991, 993)
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,135 @@
+import os
+import pytest
+from unittest.mock import patch
+
+from utils.reset_database import ResetDatabase, ENV_TEST
+from utils.tampon_ecriture import TamponEcriture
+
+from business_object.jaime import Jaime
+from business_object.notification import Notification
+from dao.jaime_dao import JaimeDao
+from dao.notification_dao import NotificationDao, tampon_notifications
+
+
+@pytest.fixture
+def base_de_test():
+    """Initialisation des données de test dans le schéma dédié aux tests"""
+    with patch.dict(os.environ, ENV_TEST):
+        ResetDatabase().lancer(test_dao=True)
+        yield
+
+
+def test_tampon_ecrit_par_lots():
+    """Les éléments sont écrits par lots de taille_lot, dans l'ordre d'ajout"""
+
+    # GIVEN
+    lots = []
+    tampon = TamponEcriture("test", lots.append, taille_lot=2, intervalle=60)
+    with patch.object(tampon, "demarrer"):
+        for i in range(5):
+            tampon.ajouter(i)
+
+    # WHEN
+    nb = tampon.vider()
+
+    # THEN
+    assert nb == 5
+    assert lots == [[0, 1], [2, 3], [4]]
+    assert len(tampon) == 0
+
+
+def test_tampon_conserve_lot_en_echec():
+    """Un lot dont l'écriture échoue est gardé pour la tentative suivante"""
+
+    # GIVEN
+    def ecrire(lot):
+        raise ConnectionError("base indisponible")
+
+    tampon = TamponEcriture("test", ecrire, taille_lot=10, intervalle=60, taille_max=3)
+    with patch.object(tampon, "demarrer"):
+        for i in range(4):
+            tampon.ajouter(i)
+
+    # WHEN
+    with pytest.raises(ConnectionError):
+        tampon.vider()
+
+    # THEN
+    assert tampon._elements == [0, 1, 2]
+    assert tampon.nb_perdus == 1
+
+
+def test_tampon_arreter_vide():
+    """L'arrêt écrit les éléments restants"""
+
+    # GIVEN
+    lots = []
+    tampon = TamponEcriture("test", lots.append, taille_lot=10, intervalle=60)
+    tampon.ajouter("a")
+
+    # WHEN
+    tampon.arreter()
+
+    # THEN
+    assert lots == [["a"]]
+
+
+def test_creer_lot_ignore_references_disparues(base_de_test):
+    """Les notifications d'une activité supprimée depuis ne sont pas insérées"""
+
+    # GIVEN
+    notifications = [
+        Notification("jaime", 992, 991, 992),
+        Notification("jaime", 992, 991, 123456),
+        Notification("abonnement", 994, 991),
+    ]
+
+    # WHEN
+    nb = NotificationDao().creer_lot(notifications)
+
+    # THEN
+    assert nb == 2
+    assert [n.id_auteur for n in NotificationDao().lister(994, 10)] == [991]
+
+
+def test_lister_pagination(base_de_test):
+    """Les notifications sont listées des plus récentes aux plus anciennes"""
+
+    # WHEN
+    page = NotificationDao().lister(991, 2)
+    suite = NotificationDao().lister(991, 2, avant=page[-1].id_notification)
+
+    # THEN
+    assert [n.id_notification for n in page] == [993, 992]
+    assert [n.id_notification for n in suite] == [991]
+    assert suite[0].lue
+
+
+def test_compter_marquer_lues(base_de_test):
+    """Seules les notifications jusqu'à jusqu_a sont marquées comme lues"""
+
+    # WHEN
+    avant = NotificationDao().compter_non_lues(991)
+    nb = NotificationDao().marquer_lues(991, jusqu_a=992)
+    apres = NotificationDao().compter_non_lues(991)
+
+    # THEN
+    assert (avant, nb, apres) == (2, 1, 1)
+
+
+def test_jaime_enregistre_notification(base_de_test):
+    """Un jaime crée une notification pour le propriétaire de l'activité"""
+
+    # GIVEN
+    with patch.object(tampon_notifications, "demarrer"):
+        JaimeDao().creer(Jaime(id_activite=993, id_auteur=992))
+
+    # WHEN
+    tampon_notifications.vider()
+
+    # THEN
+    notification = NotificationDao().lister(993, 1)[0]
+    assert notification.type_notification == "jaime"
+    assert notification.id_auteur == 992
+    assert notification.id_activite == 993
+    assert notification.id_notification > 993
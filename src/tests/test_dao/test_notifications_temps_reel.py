@@ -0,0 +1,106 @@
+import os
+import json
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from utils.reset_database import ResetDatabase, ENV_TEST
+
+from business_object.jaime import Jaime
+from business_object.abonnement import Abonnement
+from business_object.notification import Notification
+from dao.db_connection import DBConnection
+from dao.jaime_dao import JaimeDao
+from dao.abonnement_dao import AbonnementDao
+from dao.notifications_temps_reel import EcouteurNotifications, canal
+
+
+@pytest.fixture
+def base_de_test():
+    """Initialisation des données de test dans le schéma dédié aux tests"""
+    with patch.dict(os.environ, ENV_TEST):
+        ResetDatabase().lancer(test_dao=True)
+        yield
+
+
+@pytest.fixture
+def ecouteur():
+    ecouteur = EcouteurNotifications(taille_file=2)
+    with patch.object(ecouteur, "demarrer"):
+        yield ecouteur
+
+
+def test_repartition_par_destinataire(ecouteur):
+    """Chaque abonné ne reçoit que les notifications qui lui sont destinées"""
+
+    async def scenario():
+        file_991 = ecouteur.abonner(991)
+        file_991_bis = ecouteur.abonner(991)
+        file_992 = ecouteur.abonner(992)
+        ecouteur.traiter(json.dumps({"type": "jaime", "id_destinataire": 991, "id_auteur": 993}))
+        ecouteur.traiter("pas du json")
+        await asyncio.sleep(0)
+        return file_991.qsize(), file_991_bis.qsize(), file_992.qsize()
+
+    # WHEN
+    res = asyncio.run(scenario())
+
+    # THEN
+    assert res == (1, 1, 0)
+
+
+def test_file_pleine_garde_les_plus_recentes(ecouteur):
+    """Un abonné trop lent perd ses plus anciennes notifications"""
+
+    async def scenario():
+        file = ecouteur.abonner(991)
+        for id_auteur in (992, 993, 994):
+            ecouteur.diffuser(Notification("abonnement", 991, id_auteur))
+        await asyncio.sleep(0)
+        return [file.get_nowait().id_auteur for _ in range(file.qsize())]
+
+    # WHEN
+    res = asyncio.run(scenario())
+
+    # THEN
+    assert res == [993, 994]
+
+
+def test_desabonner(ecouteur):
+    """Un abonné retiré ne reçoit plus rien"""
+
+    async def scenario():
+        file = ecouteur.abonner(991)
+        ecouteur.desabonner(991, file)
+        ecouteur.diffuser(Notification("abonnement", 991, 992))
+        await asyncio.sleep(0)
+        return file.qsize()
+
+    # THEN
+    assert asyncio.run(scenario()) == 0
+    assert ecouteur.nb_abonnes() == 0
+
+
+def test_dao_emettent_notifications(base_de_test):
+    """Les créations de jaime et d'abonnement notifient le destinataire, pas un
+    utilisateur qui aime sa propre activité"""
+
+    # GIVEN
+    connection = DBConnection().connection
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(f'LISTEN "{canal()}";')
+
+    # WHEN
+    JaimeDao().creer(Jaime(id_activite=991, id_auteur=992))
+    JaimeDao().creer(Jaime(id_activite=992, id_auteur=992))
+    AbonnementDao().creer(Abonnement(id_utilisateur_suiveur=991, id_utilisateur_suivi=993))
+    connection.poll()
+    notifications = [Notification.depuis_json(n.payload) for n in connection.notifies]
+    connection.close()
+
+    # THEN
+    assert [
+        (n.type_notification, n.id_destinataire, n.id_auteur, n.id_activite)
+        for n in notifications
+    ] == [("jaime", 991, 992, 991), ("abonnement", 993, 991, None)]
@@ -0,0 +1,111 @@
+import pytest
+from unittest.mock import patch
+
+from dao.jaime_dao import JaimeDao
+from dao.tampon_jaimes import TamponJaimes
+
+# Jaimes présents en base : (id_activite, id_auteur)
+JAIMES_EN_BASE = {(1, 10), (1, 11)}
+
+
+@pytest.fixture
+def tampon():
+    """Tampon dont les lectures en base portent sur JAIMES_EN_BASE"""
+    tampon = TamponJaimes(intervalle=60)
+    with patch.object(tampon, "demarrer"), patch.object(
+        JaimeDao, "existe", side_effect=lambda a, u: (a, u) in JAIMES_EN_BASE
+    ), patch.object(
+        JaimeDao,
+        "compter_par_activite",
+        side_effect=lambda a: sum(1 for x, _ in JAIMES_EN_BASE if x == a),
+    ):
+        yield tampon
+
+
+def test_operations_compensees(tampon):
+    """Un jaime retiré avant son écriture n'est pas écrit"""
+
+    # WHEN
+    ajout = tampon.aimer(1, 12)
+    doublon = tampon.aimer(1, 12)
+    retrait = tampon.retirer(1, 12)
+
+    # THEN
+    assert (ajout, doublon, retrait) == (True, False, True)
+    assert len(tampon) == 0
+    assert not tampon.existe(1, 12)
+
+
+def test_lectures_combinees(tampon):
+    """Les opérations en attente sont prises en compte par les lectures"""
+
+    # WHEN
+    tampon.aimer(1, 12)
+    tampon.retirer(1, 10)
+    deja_retire = tampon.retirer(1, 10)
+
+    # THEN
+    assert not deja_retire
+    assert tampon.existe(1, 12)
+    assert not tampon.existe(1, 10)
+    assert tampon.existe(1, 11)
+    assert tampon.compter_par_activite(1) == 2
+
+
+def test_vider_ecrit_par_lot(tampon):
+    """Les jaimes et retraits sont écrits en un seul lot"""
+
+    # GIVEN
+    tampon.aimer(1, 12)
+    tampon.aimer(2, 10)
+    tampon.retirer(1, 10)
+
+    # WHEN
+    with patch.object(JaimeDao, "ecrire_lot") as ecrire_lot:
+        nb = tampon.vider()
+
+    # THEN
+    creations, suppressions = ecrire_lot.call_args.args
+    assert nb == 3
+    assert [(j.id_activite, j.id_auteur) for j in creations] == [(1, 12), (2, 10)]
+    assert [(j.id_activite, j.id_auteur) for j in suppressions] == [(1, 10)]
+    assert len(tampon) == 0
+
+
+def test_vider_echec_conserve_operations(tampon):
+    """Les opérations d'un lot en échec restent en attente et visibles"""
+
+    # GIVEN
+    tampon.aimer(1, 12)
+
+    # WHEN
+    with patch.object(JaimeDao, "ecrire_lot", side_effect=ConnectionError):
+        with pytest.raises(ConnectionError):
+            tampon.vider()
+
+    # THEN
+    assert tampon.existe(1, 12)
+    assert tampon.compter_par_activite(1) == 3
+    assert len(tampon) == 1
+
+
+def test_vider_echec_retrait_pendant_ecriture(tampon):
+    """Un lot en échec n'est pas en base : le retrait reçu pendant son écriture le
+    compense"""
+
+    # GIVEN
+    tampon.aimer(1, 12)
+
+    def ecrire_lot(creations, suppressions):
+        tampon.retirer(1, 12)
+        raise ConnectionError
+
+    # WHEN
+    with patch.object(JaimeDao, "ecrire_lot", side_effect=ecrire_lot):
+        with pytest.raises(ConnectionError):
+            tampon.vider()
+
+    # THEN
+    assert not tampon.existe(1, 12)
+    assert tampon.compter_par_activite(1) == 2
+    assert len(tampon) == 0
@@ -0,0 +1,85 @@
+from utils.trie_prefixes import TriePrefixes
+
+
+class Horloge:
+    """Horloge réglable à la main"""
+
+    def __init__(self):
+        self.instant = 0.0
+
+    def __call__(self) -> float:
+        return self.instant
+
+
+PSEUDOS_J = [(1, "johndoe"), (2, "janedoe"), (3, "joel")]
+
+
+def test_obtenir_prefixe_enregistre():
+    """Les résultats enregistrés pour un préfixe lui sont rendus"""
+
+    # GIVEN
+    trie = TriePrefixes(taille_resultats=3)
+    trie.enregistrer("j", PSEUDOS_J)
+
+    # WHEN / THEN
+    assert trie.obtenir("j") == PSEUDOS_J
+    assert trie.obtenir("a") is None
+
+
+def test_obtenir_liste_complete_filtree():
+    """La liste complète d'un préfixe plus court sert les préfixes plus longs"""
+
+    # GIVEN
+    trie = TriePrefixes(taille_resultats=5)
+    trie.enregistrer("j", PSEUDOS_J)
+
+    # WHEN
+    resultats = trie.obtenir("jo")
+
+    # THEN
+    assert resultats == [(1, "johndoe"), (3, "joel")]
+    assert trie.obtenir("jx") == []
+
+
+def test_obtenir_liste_tronquee():
+    """Une liste tronquée ne sert pas les préfixes plus longs"""
+
+    # GIVEN
+    trie = TriePrefixes(taille_resultats=3)
+    trie.enregistrer("j", PSEUDOS_J)
+
+    # WHEN / THEN
+    assert trie.obtenir("jo") is None
+
+
+def test_invalider():
+    """Seuls les préfixes du mot modifié sont oubliés"""
+
+    # GIVEN
+    trie = TriePrefixes(taille_resultats=5)
+    trie.enregistrer("j", PSEUDOS_J)
+    trie.enregistrer("jo", [(1, "johndoe"), (3, "joel")])
+    trie.enregistrer("s", [(4, "samsmith")])
+
+    # WHEN
+    trie.invalider("Joe")
+
+    # THEN
+    assert trie.obtenir("j") is None
+    assert trie.obtenir("jo") is None
+    assert trie.obtenir("s") == [(4, "samsmith")]
+
+
+def test_expiration():
+    """Les résultats expirent après duree_vie secondes"""
+
+    # GIVEN
+    horloge = Horloge()
+    trie = TriePrefixes(duree_vie=60, horloge=horloge)
+    trie.enregistrer("j", PSEUDOS_J)
+
+    # WHEN
+    horloge.instant = 61
+
+    # THEN
+    assert trie.obtenir("j") is None
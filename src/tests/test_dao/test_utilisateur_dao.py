@@ -3,9 +3,11 @@ import pytest
 
 from unittest.mock import patch
 
-from utils.reset_database import ResetDatabase
+from utils.reset_database import ResetDatabase, ENV_TEST
+from utils.versions import etag
 
 from dao.utilisateur_dao import UtilisateurDao
+from dao.db_connection import DBConnection
 
 from business_object.utilisateur import Utilisateur
 
@@ -13,7 +15,7 @@ from business_object.utilisateur import Utilisateur
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test"""
-    with patch.dict(os.environ, {"SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         ResetDatabase().lancer(test_dao=True)
         yield
 
@@ -46,6 +48,19 @@ def test_trouver_par_id_non_existant():
     assert utilisateur is None
 
 
+def test_trouver_par_ids():
+    """Recherche de plusieurs utilisateurs en une requête (les ids inconnus sont ignorés)"""
+
+    # GIVEN
+    ids_utilisateurs = [991, 993, 999999]
+
+    # WHEN
+    utilisateurs = UtilisateurDao().trouver_par_ids(ids_utilisateurs)
+
+    # THEN
+    assert sorted(u.id_utilisateur for u in utilisateurs) == [991, 993]
+
+
 def test_trouver_par_pseudo_ok():
     """Recherche par pseudo d'un utilisateur existant"""
 
@@ -290,5 +305,97 @@ def test_se_connecter_ok():
     assert utilisateur.pseudo == "janedoe"
 
 
+def test_se_connecter_rehache_mot_de_passe():
+    """Connexion OK avec un hash d'un autre algorithme : le hash est mis à jour"""
+
+    # GIVEN
+    pseudo = "janedoe"
+    bon_mdp = "mdp2"
+
+    # WHEN
+    with patch.dict(os.environ, {"KDF_MOT_DE_PASSE": "pbkdf2", "PBKDF2_ITERATIONS": "1000"}):
+        utilisateur = UtilisateurDao().se_connecter(pseudo, bon_mdp)
+
+    # THEN
+    with DBConnection().connection as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT mot_de_passe_hash FROM credentials WHERE id_utilisateur = %(id)s;",
+                {"id": utilisateur.id_utilisateur},
+            )
+            res = cursor.fetchone()
+    assert res["mot_de_passe_hash"].startswith("$pbkdf2-sha256$1000$")
+    assert UtilisateurDao().se_connecter(pseudo, bon_mdp).pseudo == "janedoe"
+
+
+def test_rechercher_nom():
+    """Recherche sur le nom : les plus suivis d'abord à pertinence égale"""
+
+    # GIVEN
+    texte = "doe"
+
+    # WHEN
+    utilisateurs = UtilisateurDao().rechercher(texte, 10)
+
+    # THEN
+    assert [u.pseudo for u in utilisateurs] == ["johndoe", "janedoe"]
+
+
+def test_rechercher_prefixe_court():
+    """Moins de 3 caractères : seuls les pseudos commençant par le texte"""
+
+    # GIVEN
+    texte = "Ja"
+
+    # WHEN
+    utilisateurs = UtilisateurDao().rechercher(texte, 10)
+
+    # THEN
+    assert [u.pseudo for u in utilisateurs] == ["janedoe"]
+
+
+def test_rechercher_caracteres_like():
+    """Les caractères spéciaux de LIKE sont recherchés tels quels"""
+
+    # GIVEN
+    texte = "%_"
+
+    # WHEN
+    utilisateurs = UtilisateurDao().rechercher(texte, 10)
+
+    # THEN
+    assert utilisateurs == []
+
+
+def test_lister_par_prefixe():
+    """Pseudos commençant par le préfixe, les plus suivis d'abord"""
+
+    # GIVEN
+    prefixe = "j"
+
+    # WHEN
+    resultats = UtilisateurDao().lister_par_prefixe(prefixe, 10)
+
+    # THEN
+    assert resultats == [(991, "johndoe"), (992, "janedoe")]
+
+
+def test_supprimer_change_version_commentaires():
+    """Les listes de commentaires des activités commentées par l'utilisateur supprimé
+    changent de version"""
+
+    # GIVEN
+    # 992 a commenté l'activité 991 et possède l'activité 992
+    etags = {i: etag("commentaires", i) for i in (991, 992, 993)}
+
+    # WHEN
+    UtilisateurDao().supprimer(992)
+
+    # THEN
+    assert etag("commentaires", 991) != etags[991]
+    assert etag("commentaires", 992) != etags[992]
+    assert etag("commentaires", 993) == etags[993]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
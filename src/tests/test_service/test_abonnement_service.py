@@ -1,15 +1,17 @@
 import os
 import pytest
 from unittest.mock import patch
-from utils.reset_database import ResetDatabase
+from utils.reset_database import ResetDatabase, ENV_TEST
 
 from service.abonnement_service import AbonnementService
 
+from exceptions import NotFoundError
+
 
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test dans le schéma dédié aux tests"""
-    with patch.dict(os.environ, {"SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         ResetDatabase().lancer(test_dao=True)
         yield
 
@@ -130,5 +132,33 @@ def test_abonnement_existe_ko():
     assert not existe
 
 
+def test_compter_abonnements():
+    """Nombres de suiveurs et de suivis d'un utilisateur"""
+
+    # WHEN
+    compteurs = AbonnementService().compter_abonnements(994)
+
+    # THEN
+    assert compteurs == {"id_utilisateur": 994, "nb_suiveurs": 2, "nb_suivis": 1}
+
+
+def test_compter_abonnements_utilisateur_inexistant():
+    """Compteurs d'un utilisateur inexistant"""
+
+    # WHEN / THEN
+    with pytest.raises(NotFoundError):
+        AbonnementService().compter_abonnements(99999)
+
+
+def test_lister_suivis_communs():
+    """Utilisateurs suivis à la fois par deux utilisateurs"""
+
+    # WHEN
+    communs = AbonnementService().lister_suivis_communs(992, 993)
+
+    # THEN
+    assert communs == [994]
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
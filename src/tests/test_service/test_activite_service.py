@@ -1,18 +1,20 @@
 import os
 import pytest
 from unittest.mock import patch
-from utils.reset_database import ResetDatabase
+from utils.reset_database import ResetDatabase, ENV_TEST
 
 from datetime import date
 
 from service.activite_service import ActiviteService
+from dao.jaime_dao import JaimeDao
+from dao.tampon_jaimes import tampon_jaimes
 
 
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test dans la base de données"""
     # Assurez-vous d'utiliser un schéma de test pour éviter de modifier la vraie base de données
-    with patch.dict(os.environ, {"SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         # Reset de la base de données avant de commencer
         ResetDatabase().lancer(test_dao=True)
         yield
@@ -231,6 +233,29 @@ def test_supprimer_jaime_ko():
         ActiviteService().supprimer_jaime(id_activite, id_auteur)
 
 
+def test_jaimes_differes():
+    """En écriture différée, le jaime est visible avant d'être écrit en base"""
+
+    # GIVEN
+    id_activite = 991
+    id_utilisateur = 994
+
+    # WHEN
+    with patch.dict(os.environ, {"JAIMES_DIFFERES": "1"}), patch.object(
+        tampon_jaimes, "demarrer"
+    ):
+        ActiviteService().ajouter_jaime(id_activite, id_utilisateur)
+        existe = ActiviteService().jaime_existe(id_activite, id_utilisateur)
+        nombre = ActiviteService().compter_jaimes_par_activite(id_activite)
+        en_base_avant = JaimeDao().existe(id_activite, id_utilisateur)
+        tampon_jaimes.vider()
+
+    # THEN
+    assert existe and nombre == 2
+    assert not en_base_avant
+    assert JaimeDao().existe(id_activite, id_utilisateur)
+
+
 def test_lister_commentaires():
     """Test pour lister les commentaires d'une activité"""
 
@@ -344,6 +369,35 @@ def test_trouver_commentaire_par_id_ok():
     assert commentaire.id_commentaire == id_commentaire
 
 
+def test_rechercher_commentaires_pages():
+    """La page indique le décalage de la page suivante"""
+
+    # GIVEN
+    texte = "natation or vélo"
+
+    # WHEN
+    page_1 = ActiviteService().rechercher_commentaires(texte, limite=1)
+    page_2 = ActiviteService().rechercher_commentaires(
+        texte, limite=1, decalage=page_1["suivant"]
+    )
+
+    # THEN
+    assert page_1["suivant"] == 1
+    assert len(page_2["commentaires"]) == 1
+    assert page_2["suivant"] is None
+
+
+def test_rechercher_commentaires_texte_vide():
+    """Une recherche sans texte est refusée"""
+
+    # GIVEN
+    texte = " "
+
+    # WHEN / THEN
+    with pytest.raises(ValueError):
+        ActiviteService().rechercher_commentaires(texte)
+
+
 def test_jaime_existe_ok():
     """Vérifier qu'un jaime existe pour une activité et un utilisateur donnés"""
 
@@ -1,9 +1,17 @@
 import os
 import pytest
 from unittest.mock import patch
-from utils.reset_database import ResetDatabase
+from utils.reset_database import ResetDatabase, ENV_TEST
 
-from service.fil_dactualite_service import FilDactualiteService
+import numpy as np
+
+from service.fil_dactualite_service import (
+    FilDactualiteService,
+    BudgetLatence,
+    FENETRE_AJUSTEMENT,
+    cache_fil_classe,
+    scorer_fil,
+)
 
 from datetime import date
 
@@ -11,8 +19,9 @@ from datetime import date
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test dans le schéma dédié aux tests"""
-    with patch.dict(os.environ, {"SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         ResetDatabase().lancer(test_dao=True)
+        cache_fil_classe.vider()
         yield
 
 
@@ -42,5 +51,67 @@ def test_creer_fil_dactualite_ok():
         assert isinstance(activite.date_activite, date)
 
 
+def test_creer_fil_dactualite_ranked():
+    """Fil classé : à date égale, l'activité la plus engageante passe devant"""
+
+    # GIVEN
+    id_utilisateur = 992
+
+    # WHEN
+    fil = FilDactualiteService().creer_fil_dactualite(id_utilisateur, mode="ranked")
+
+    # THEN
+    # 993 (1 jaime, 1 commentaire) devant 996 (aucun), toutes deux du 27/09
+    assert [a.id_activite for a in fil] == [997, 994, 993, 996, 991]
+
+
+def test_creer_fil_dactualite_mode_invalide():
+    """Mode de fil inconnu"""
+
+    # WHEN / THEN
+    with pytest.raises(ValueError):
+        FilDactualiteService().creer_fil_dactualite(992, mode="aleatoire")
+
+
+def test_scorer_fil():
+    """Le score décroît avec l'âge et croît avec l'engagement et l'affinité"""
+
+    # GIVEN
+    ages = np.array([0.0, 2.0, 0.0, 0.0])
+    nb_jaimes = np.array([0.0, 0.0, 3.0, 0.0])
+    nb_commentaires = np.zeros(4)
+    affinites = np.array([0.0, 0.0, 0.0, 5.0])
+
+    # WHEN
+    scores = scorer_fil(ages, nb_jaimes, nb_commentaires, affinites)
+
+    # THEN
+    assert scores[0] == pytest.approx(1.0)
+    assert scores[1] == pytest.approx(0.5)  # une demi-vie
+    assert scores[2] > scores[0]
+    assert scores[3] > scores[0]
+
+
+def test_budget_latence():
+    """Le nombre de candidats baisse quand le p95 dépasse le budget, puis remonte"""
+
+    # GIVEN
+    budget = BudgetLatence(budget_ms=100, limite_min=50, limite_max=400)
+
+    # WHEN
+    for _ in range(FENETRE_AJUSTEMENT):
+        budget.enregistrer(150)
+
+    # THEN
+    assert budget.limite == 300
+
+    # WHEN
+    for _ in range(FENETRE_AJUSTEMENT):
+        budget.enregistrer(10)
+
+    # THEN
+    assert budget.limite == 331
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,48 @@
+import os
+import pytest
+from unittest.mock import patch
+from utils.reset_database import ResetDatabase, ENV_TEST
+
+from service.notification_service import NotificationService
+
+
+@pytest.fixture(autouse=True)
+def setup_test_environment():
+    """Initialisation des données de test dans le schéma dédié aux tests"""
+    with patch.dict(os.environ, ENV_TEST):
+        ResetDatabase().lancer(test_dao=True)
+        yield
+
+
+def test_lister_notifications_pages():
+    """La page indique l'identifiant à passer pour obtenir la suivante"""
+
+    # WHEN
+    page = NotificationService().lister_notifications(991, limite=2)
+    derniere = NotificationService().lister_notifications(991, 2, page["suivant"])
+
+    # THEN
+    assert [n.id_notification for n in page["notifications"]] == [993, 992]
+    assert page["suivant"] == 992
+    assert page["nb_non_lues"] == 2
+    assert [n.id_notification for n in derniere["notifications"]] == [991]
+    assert derniere["suivant"] is None
+
+
+def test_lister_notifications_limite_invalide():
+    """Une limite nulle est refusée"""
+
+    # WHEN / THEN
+    with pytest.raises(ValueError):
+        NotificationService().lister_notifications(991, limite=0)
+
+
+def test_marquer_lues():
+    """Toutes les notifications sont marquées comme lues"""
+
+    # WHEN
+    nb = NotificationService().marquer_lues(991)
+
+    # THEN
+    assert nb == 2
+    assert NotificationService().lister_notifications(991)["nb_non_lues"] == 0
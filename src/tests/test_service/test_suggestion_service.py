@@ -0,0 +1,157 @@
+import os
+import pytest
+from unittest.mock import patch
+
+import numpy as np
+
+from utils.reset_database import ResetDatabase, ENV_TEST
+
+from dao.graphe_abonnements import CSR
+from service.suggestion_service import (
+    SuggestionService,
+    cache_suggestions,
+    classer,
+    deux_sauts,
+    profils_sportifs,
+)
+
+from exceptions import NotFoundError
+
+# Abonnements du jeu de données de test (suiveur, suivi)
+ABONNEMENTS_TEST = [
+    (991, 992),
+    (992, 991),
+    (992, 993),
+    (992, 994),
+    (993, 994),
+    (994, 995),
+    (995, 991),
+]
+
+
+@pytest.fixture
+def suivis():
+    suiveurs, suivis = zip(*ABONNEMENTS_TEST)
+    return CSR.depuis_aretes(np.array(suiveurs), np.array(suivis))
+
+
+@pytest.fixture
+def base_de_test():
+    """Initialisation des données de test dans le schéma dédié aux tests"""
+    with patch.dict(os.environ, ENV_TEST):
+        ResetDatabase().lancer(test_dao=True)
+        cache_suggestions.vider()
+        yield
+
+
+def test_deux_sauts(suivis):
+    """Relations communes : ni l'utilisateur lui-même ni ses suivis ne sont proposés"""
+
+    # WHEN
+    lignes, candidats, nb = deux_sauts(suivis, np.array([991, 992, 996]))
+
+    # THEN
+    # 991 -> 992 -> {991, 993, 994} ; 992 -> {991, 993, 994} -> {992, 994, 995}
+    assert lignes.tolist() == [0, 0, 1]
+    assert candidats.tolist() == [993, 994, 995]
+    assert nb.tolist() == [1, 1, 1]
+
+
+def test_deux_sauts_compte_les_chemins():
+    """Le nombre de relations communes est le nombre de chemins à deux sauts"""
+
+    # GIVEN
+    suivis = CSR.depuis_aretes(np.array([1, 1, 1, 2, 3, 4]), np.array([2, 3, 4, 5, 5, 6]))
+
+    # WHEN
+    _, candidats, nb = deux_sauts(suivis, np.array([1]))
+
+    # THEN
+    assert dict(zip(candidats.tolist(), nb.tolist())) == {5: 2, 6: 1}
+
+
+def test_profils_sportifs():
+    """Profils normalisés, les sports inconnus sont ignorés"""
+
+    # WHEN
+    profils = profils_sportifs([(1, "course", 3), (1, "vélo", 4), (2, "curling", 1)])
+
+    # THEN
+    assert profils.shape == (2, 5)
+    assert profils[1].tolist() == pytest.approx([0.6, 0, 0.8, 0, 0])
+    assert not profils[0].any()
+
+
+def test_classer_pondere_par_les_sports():
+    """À relations communes égales, les sports en commun départagent les candidats"""
+
+    # GIVEN
+    profils = profils_sportifs([(1, "course", 1), (2, "natation", 1), (3, "course", 1)])
+    ids = np.array([1])
+    lignes, candidats, nb = np.array([0, 0, 0]), np.array([2, 3, 4]), np.array([1, 1, 2])
+
+    # WHEN
+    suggestions = classer(ids, lignes, candidats, nb, profils, nb_max=2)
+
+    # THEN
+    assert suggestions == {1: [(3, 1, 2.0), (4, 2, 2.0)]}
+
+
+def test_lister_suggestions(base_de_test):
+    """993 pratique un sport de 991 : il passe devant 994"""
+
+    # GIVEN
+    with patch("service.suggestion_service.JOURS_ACTIFS", 100000):
+        SuggestionService().precalculer()
+
+    # WHEN
+    suggestions = SuggestionService().lister_suggestions(991)
+
+    # THEN
+    assert [s["id_utilisateur"] for s in suggestions] == [993, 994]
+    assert suggestions[0]["nb_relations_communes"] == 1
+    assert suggestions[0]["score"] > suggestions[1]["score"]
+
+
+def test_lister_suggestions_non_precalculees(base_de_test):
+    """Sans suggestions précalculées, rien n'est calculé pendant la requête :
+    l'utilisateur est traité au précalcul suivant"""
+
+    # GIVEN : aucun utilisateur actif (activité postérieure à demain)
+    with patch("service.suggestion_service.JOURS_ACTIFS", -1):
+        SuggestionService().precalculer()
+
+    # WHEN
+    with patch.object(SuggestionService, "calculer") as calculer:
+        suggestions = SuggestionService().lister_suggestions(991)
+
+    # THEN
+    assert suggestions == []
+    calculer.assert_not_called()
+    with patch("service.suggestion_service.JOURS_ACTIFS", -1):
+        assert SuggestionService().precalculer() == 1
+    assert [s[0] for s in cache_suggestions.obtenir(991)] == [993, 994]
+
+
+def test_lister_suggestions_utilisateur_inexistant(base_de_test):
+    """Suggestions d'un utilisateur inexistant"""
+
+    # WHEN / THEN
+    with pytest.raises(NotFoundError):
+        SuggestionService().lister_suggestions(99999)
+
+
+def test_precalculer(base_de_test):
+    """Les suggestions des utilisateurs actifs sont mises en cache"""
+
+    # WHEN
+    with patch("service.suggestion_service.JOURS_ACTIFS", 100000):
+        nb = SuggestionService().precalculer()
+
+    # THEN
+    assert nb == 5
+    assert [s[0] for s in cache_suggestions.obtenir(991)] == [993, 994]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
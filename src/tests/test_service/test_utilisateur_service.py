@@ -4,13 +4,19 @@ from unittest.mock import patch
 
 from service.utilisateur_service import UtilisateurService
 
-from utils.reset_database import ResetDatabase
+from dao.utilisateur_dao import UtilisateurDao
+
+from business_object.utilisateur import Utilisateur
+
+from exceptions import NotFoundError
+
+from utils.reset_database import ResetDatabase, ENV_TEST
 
 
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Initialisation des données de test dans la base de données"""
-    with patch.dict(os.environ, {"POSTGRES_SCHEMA": "projet_test_dao"}):
+    with patch.dict(os.environ, ENV_TEST):
         # Reset de la base de données avant de commencer
         ResetDatabase().lancer(test_dao=True)
         yield
@@ -113,5 +119,130 @@ def test_se_connecter_utilisateur_inexistant():
         UtilisateurService().se_connecter(pseudo, mot_de_passe)
 
 
+def test_se_connecter_utilisateur_cache():
+    """Test que des identifiants vérifiés récemment ne sont pas revérifiés en base"""
+
+    # GIVEN
+    pseudo = "johndoe"
+    mot_de_passe = "mdp1"
+    UtilisateurService().se_connecter(pseudo, mot_de_passe)
+
+    # WHEN
+    with patch("dao.utilisateur_dao.UtilisateurDao.se_connecter") as se_connecter_dao:
+        utilisateur = UtilisateurService().se_connecter(pseudo, mot_de_passe)
+
+    # THEN
+    se_connecter_dao.assert_not_called()
+    assert utilisateur.pseudo == pseudo
+
+
+def test_se_connecter_utilisateur_cache_mauvais_mot_de_passe():
+    """Test qu'un mauvais mot de passe est refusé même si l'utilisateur est en cache"""
+
+    # GIVEN
+    pseudo = "johndoe"
+    UtilisateurService().se_connecter(pseudo, "mdp1")
+
+    # WHEN / THEN
+    with pytest.raises(Exception):
+        UtilisateurService().se_connecter(pseudo, "wrongpassword")
+
+
+def test_trouver_par_id_cache():
+    """Test qu'un profil déjà lu n'est pas relu en base"""
+
+    # GIVEN
+    UtilisateurService().trouver_par_id(992)
+
+    # WHEN
+    with patch("dao.utilisateur_dao.UtilisateurDao.trouver_par_id") as trouver_par_id_dao:
+        utilisateur = UtilisateurService().trouver_par_id(992)
+
+    # THEN
+    trouver_par_id_dao.assert_not_called()
+    assert utilisateur.pseudo == "janedoe"
+
+
+def test_trouver_erreur_base_non_mise_en_cache():
+    """Test qu'une erreur de la base n'est pas mise en cache comme une absence"""
+
+    # GIVEN
+    with patch("dao.utilisateur_dao.DBConnection", side_effect=ConnectionError):
+        with pytest.raises(ConnectionError):
+            UtilisateurService().trouver_par_id(993)
+        with pytest.raises(ConnectionError):
+            UtilisateurService().trouver_par_pseudo("samsmith")
+
+    # WHEN
+    par_id = UtilisateurService().trouver_par_id(993)
+    par_pseudo = UtilisateurService().trouver_par_pseudo("samsmith")
+
+    # THEN
+    assert par_id.pseudo == "samsmith"
+    assert par_pseudo.id_utilisateur == 993
+
+
+def test_trouver_par_pseudo_apres_modification():
+    """Test que la modification d'un utilisateur invalide le cache"""
+
+    # GIVEN
+    UtilisateurService().trouver_par_pseudo("mikebrown")
+    UtilisateurDao().modifier(
+        Utilisateur(
+            id_utilisateur=995,
+            pseudo="mikebrown2",
+            nom="Brown",
+            prenom="Mike",
+            date_de_naissance="1988-11-30",
+            sexe="Homme",
+        )
+    )
+
+    # WHEN / THEN
+    assert UtilisateurService().trouver_par_pseudo("mikebrown2").id_utilisateur == 995
+    with pytest.raises(NotFoundError):
+        UtilisateurService().trouver_par_pseudo("mikebrown")
+
+
+def test_trouver_par_ids():
+    """Test de la recherche de plusieurs utilisateurs, en partie déjà en cache"""
+
+    # GIVEN
+    UtilisateurService().trouver_par_id(991)
+
+    # WHEN
+    utilisateurs = UtilisateurService().trouver_par_ids([991, 992, 999999])
+
+    # THEN
+    assert [u.id_utilisateur for u in utilisateurs] == [991, 992]
+
+
+def test_rechercher_texte_vide():
+    """Une recherche sans texte est refusée"""
+
+    # GIVEN
+    texte = "  "
+
+    # WHEN / THEN
+    with pytest.raises(ValueError):
+        UtilisateurService().rechercher(texte)
+
+
+def test_autocompleter():
+    """Les préfixes plus longs sont servis par l'arbre des préfixes"""
+
+    # GIVEN
+    premiers = UtilisateurService().autocompleter("j")
+
+    # WHEN
+    with patch.object(UtilisateurDao, "lister_par_prefixe") as lister:
+        suivants = UtilisateurService().autocompleter("Jo")
+
+    # THEN
+    assert [r["pseudo"] for r in premiers] == ["johndoe", "janedoe"]
+    assert suivants == [{"id_utilisateur": 991, "pseudo": "johndoe"}]
+    lister.assert_not_called()
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,357 @@
+import time
+import pickle
+import socket
+import threading
+
+import pytest
+
+from utils.cache import MANQUANT, Cache, CacheMemoire, CacheSQLite, CacheReseau
+from utils.serveur_cache import ServeurCache
+
+CLE_SECRETE = b"cle-de-test"
+
+
+@pytest.fixture(scope="module")
+def serveur():
+    """Serveur de cache local sur un port libre"""
+    serveur = ServeurCache("localhost", 0)
+    serveur.demarrer_en_arriere_plan()
+    yield serveur
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def cache_reseau(serveur, espace="test", cle_secrete=CLE_SECRETE, **kwargs):
+    port = serveur.server_address[1]
+    return CacheReseau(espace, cle_secrete, "localhost", port, **kwargs)
+
+
+@pytest.fixture(params=["memoire", "sqlite", "reseau"])
+def cache(request, tmp_path, serveur):
+    if request.param == "memoire":
+        return CacheMemoire("test")
+    if request.param == "sqlite":
+        return CacheSQLite("test", CLE_SECRETE, str(tmp_path / "cache.sqlite"))
+    cache = cache_reseau(serveur)
+    cache.vider()
+    return cache
+
+
+# --- Interface commune ---
+
+
+def test_ajouter_obtenir_supprimer(cache):
+    """Cycle de vie d'une entrée et métriques de lecture"""
+
+    # WHEN
+    absente = cache.obtenir("cle")
+    cache.ajouter("cle", {"valeur": [1, 2]})
+    presente = cache.obtenir("cle")
+    cache.supprimer("cle")
+
+    # THEN
+    assert absente is MANQUANT
+    assert presente == {"valeur": [1, 2]}
+    assert cache.obtenir("cle") is MANQUANT
+    assert (cache.metriques["succes"], cache.metriques["echecs"]) == (1, 2)
+
+
+def test_valeur_none_conservee(cache):
+    """Une ressource absente (None) est mise en cache comme les autres valeurs"""
+
+    # WHEN
+    cache.ajouter(("id", 1), None)
+
+    # THEN
+    assert cache.obtenir(("id", 1)) is None
+
+
+def test_vider(cache):
+    """vider retire toutes les entrées"""
+
+    # GIVEN
+    cache.ajouter("a", 1)
+    cache.ajouter("b", 2)
+
+    # WHEN
+    cache.vider()
+
+    # THEN
+    assert cache.obtenir("a") is MANQUANT
+    assert cache.obtenir("b") is MANQUANT
+
+
+def test_incrementer(cache):
+    """Un compteur absent est créé à 0"""
+
+    # WHEN
+    valeurs = [cache.incrementer("compteur") for _ in range(3)]
+
+    # THEN
+    assert valeurs == [1, 2, 3]
+    assert cache.incrementer("compteur", 10) == 13
+
+
+def test_lecture_renvoie_une_copie(cache):
+    """Modifier une valeur lue ne modifie pas l'entrée du cache"""
+
+    # GIVEN
+    cache.ajouter("cle", {"sports": ["course"]})
+
+    # WHEN
+    cache.obtenir("cle")["sports"].append("vélo")
+
+    # THEN
+    assert cache.obtenir("cle") == {"sports": ["course"]}
+
+
+def test_expiration(cache):
+    """Une entrée expirée est absente"""
+
+    if isinstance(cache, CacheReseau):
+        pytest.skip("durées de vie memcached à la seconde")
+
+    # GIVEN
+    cache.ajouter("cle", "valeur", duree_vie=0.05)
+
+    # WHEN
+    time.sleep(0.1)
+
+    # THEN
+    assert cache.obtenir("cle") is MANQUANT
+
+
+def test_obtenir_ou_calculer_un_seul_calcul(cache):
+    """Des appels concurrents sur une clé absente ne la calculent qu'une fois"""
+
+    # GIVEN
+    nb_calculs = []
+
+    def calculer():
+        nb_calculs.append(1)
+        time.sleep(0.1)
+        return 42
+
+    resultats = []
+
+    def appeler():
+        resultats.append(cache.obtenir_ou_calculer("cle", calculer))
+
+    threads = [threading.Thread(target=appeler) for _ in range(10)]
+
+    # WHEN
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # THEN
+    assert resultats == [42] * 10
+    assert len(nb_calculs) == 1
+    assert cache.metriques["calculs"] == 1
+
+
+def test_cache_abstrait():
+    """Cache ne s'instancie pas, une sous-classe incomplète non plus"""
+
+    class Incomplet(Cache):
+        def _lire(self, cle):
+            return MANQUANT
+
+    with pytest.raises(TypeError):
+        Cache("test")
+    with pytest.raises(TypeError):
+        Incomplet("test")
+
+
+# --- CacheMemoire ---
+
+
+def test_memoire_lru():
+    """Au-delà de taille_max, l'entrée la moins récemment lue est retirée"""
+
+    # GIVEN
+    cache = CacheMemoire("test", taille_max=2)
+    cache.ajouter("a", 1)
+    cache.ajouter("b", 2)
+    cache.obtenir("a")
+
+    # WHEN
+    cache.ajouter("c", 3)
+
+    # THEN
+    assert cache.obtenir("b") is MANQUANT
+    assert (cache.obtenir("a"), cache.obtenir("c")) == (1, 3)
+    assert len(cache) == 2
+
+
+# --- CacheSQLite ---
+
+
+def test_sqlite_taille_max(tmp_path):
+    """Le nombre d'entrées de l'espace est ramené à taille_max"""
+
+    # GIVEN
+    chemin = str(tmp_path / "cache.sqlite")
+    cache = CacheSQLite("test", CLE_SECRETE, chemin, taille_max=20)
+    autre = CacheSQLite("autre", CLE_SECRETE, chemin, taille_max=20)
+    autre.ajouter("x", 0)
+
+    # WHEN
+    for i in range(100):
+        cache.ajouter(i, i)
+    cache.purger()
+
+    # THEN
+    nb = cache._connexion().execute(
+        "SELECT COUNT(*) FROM cache WHERE espace = 'test'"
+    ).fetchone()[0]
+    assert nb == 20
+    assert cache.obtenir(99) == 99
+    assert cache.obtenir(0) is MANQUANT
+    assert autre.obtenir("x") == 0
+
+
+def test_sqlite_partage_entre_instances(tmp_path):
+    """Deux instances sur le même fichier (deux workers) partagent les entrées"""
+
+    # GIVEN
+    chemin = str(tmp_path / "cache.sqlite")
+    CacheSQLite("test", CLE_SECRETE, chemin).ajouter("cle", "valeur")
+
+    # WHEN
+    valeur = CacheSQLite("test", CLE_SECRETE, chemin).obtenir("cle")
+
+    # THEN
+    assert valeur == "valeur"
+
+
+def test_sqlite_valeur_non_signee_ignoree(tmp_path):
+    """Une valeur écrite dans le fichier par un autre processus, sans la clé, n'est
+    pas désérialisée"""
+
+    # GIVEN
+    cache = CacheSQLite("test", CLE_SECRETE, str(tmp_path / "cache.sqlite"))
+    cache.ajouter("cle", "valeur")
+    cache._connexion().execute(
+        "UPDATE cache SET valeur = ? WHERE espace = 'test'",
+        (b"\0" * 32 + pickle.dumps(Piege()),),
+    )
+
+    # WHEN
+    valeur = cache.obtenir("cle")
+
+    # THEN
+    assert valeur is MANQUANT
+    assert not Piege.execute
+    assert cache.metriques["erreurs"] == 1
+
+
+def test_sqlite_autre_cle_secrete(tmp_path):
+    """Les valeurs et compteurs signés avec une autre clé sont refusés"""
+
+    # GIVEN
+    chemin = str(tmp_path / "cache.sqlite")
+    autre = CacheSQLite("test", b"autre", chemin)
+    autre.ajouter("cle", "valeur")
+    autre.incrementer("compteur", 5)
+    cache = CacheSQLite("test", CLE_SECRETE, chemin)
+
+    # WHEN / THEN
+    assert cache.obtenir("cle") is MANQUANT
+    assert cache.incrementer("compteur") == 1
+
+
+# --- CacheReseau ---
+
+
+def ecrire_brut(serveur, cle: bytes, donnees: bytes):
+    """Écrit une valeur sur le serveur sans passer par CacheReseau (client tiers)"""
+    adresse = ("localhost", serveur.server_address[1])
+    with socket.create_connection(adresse) as connexion:
+        connexion.sendall(b"set %s 1 0 %d\r\n%s\r\n" % (cle, len(donnees), donnees))
+        assert connexion.recv(100) == b"STORED\r\n"
+
+
+class Piege:
+    """Objet dont la désérialisation serait exécutée"""
+
+    execute = False
+
+    def __reduce__(self):
+        return (setattr, (Piege, "execute", True))
+
+
+def test_reseau_valeur_non_signee_ignoree(serveur):
+    """Une valeur écrite par un tiers n'est pas désérialisée"""
+
+    # GIVEN
+    cache = cache_reseau(serveur)
+    ecrire_brut(serveur, cache._cle("cle"), b"\0" * 32 + pickle.dumps(Piege()))
+
+    # WHEN
+    valeur = cache.obtenir("cle")
+
+    # THEN
+    assert valeur is MANQUANT
+    assert not Piege.execute
+    assert cache.metriques["erreurs"] == 1
+
+
+def test_reseau_valeur_copiee_ignoree(serveur):
+    """Une valeur signée copiée depuis une autre entrée est refusée"""
+
+    # GIVEN
+    cache = cache_reseau(serveur)
+    cache.ajouter("pseudo_a", "profil a")
+    adresse = ("localhost", serveur.server_address[1])
+    with socket.create_connection(adresse) as connexion:
+        fichier = connexion.makefile("rwb")
+        fichier.write(b"get " + cache._cle("pseudo_a") + b"\r\n")
+        fichier.flush()
+        taille = int(fichier.readline().split()[3])
+        donnees = fichier.read(taille)
+    ecrire_brut(serveur, cache._cle("pseudo_b"), donnees)
+
+    # WHEN / THEN
+    assert cache.obtenir("pseudo_a") == "profil a"
+    assert cache.obtenir("pseudo_b") is MANQUANT
+
+
+def test_reseau_autre_cle_secrete(serveur):
+    """Les valeurs signées avec une autre clé sont refusées"""
+
+    # GIVEN
+    cache_reseau(serveur, cle_secrete=b"autre").ajouter("cle", "valeur")
+
+    # WHEN
+    valeur = cache_reseau(serveur).obtenir("cle")
+
+    # THEN
+    assert valeur is MANQUANT
+
+
+def test_reseau_cle_secrete_obligatoire(serveur):
+    """Un cache réseau sans clé de signature est refusé"""
+
+    # WHEN / THEN
+    with pytest.raises(ValueError):
+        cache_reseau(serveur, cle_secrete=b"")
+
+
+def test_reseau_serveur_indisponible():
+    """Sans serveur, le cache se comporte comme s'il était vide"""
+
+    # GIVEN
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+    cache = CacheReseau("test", CLE_SECRETE, "localhost", port, delai=0.1)
+
+    # WHEN
+    cache.ajouter("cle", "valeur")
+    valeur = cache.obtenir_ou_calculer("cle", lambda: "calculee")
+
+    # THEN
+    assert valeur == "calculee"
+    assert cache.metriques["erreurs"] >= 1
@@ -0,0 +1,152 @@
+import asyncio
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+
+from utils import compression
+from utils.compression import MiddlewareCompression, encodages_acceptes
+
+CORPS = json.dumps([{"id_activite": i, "sport": "course"} for i in range(50)]).encode()
+JSON = [(b"content-type", b"application/json")]
+
+
+def appeler(morceaux, entetes, accept_encoding=None, seuil=100, module_br=None):
+    """Fait passer par le middleware une réponse envoyée en un ou plusieurs morceaux
+    et renvoie les messages ASGI reçus par le serveur"""
+
+    async def application(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": entetes})
+        for i, morceau in enumerate(morceaux):
+            suite = i < len(morceaux) - 1
+            message = {"type": "http.response.body", "body": morceau}
+            await send({**message, "more_body": suite})
+
+    messages = []
+
+    async def envoyer(message):
+        messages.append(message)
+
+    scope = {"type": "http", "headers": []}
+    if accept_encoding is not None:
+        scope["headers"].append((b"accept-encoding", accept_encoding.encode()))
+    middleware = MiddlewareCompression(application, seuil=seuil)
+    with patch.object(compression, "brotli", module_br):
+        asyncio.run(middleware(scope, None, envoyer))
+    return messages
+
+
+def entetes(message) -> dict:
+    return {nom: valeur for nom, valeur in message["headers"]}
+
+
+def test_compression_gzip():
+    """Au-delà du seuil, le corps est compressé et les en-têtes mis à jour"""
+
+    # GIVEN
+    entetes_reponse = JSON + [
+        (b"content-length", str(len(CORPS)).encode()),
+        (b"vary", b"Origin"),
+    ]
+
+    # WHEN
+    debut, corps = appeler([CORPS], entetes_reponse, "gzip, deflate")
+
+    # THEN
+    recus = entetes(debut)
+    assert recus[b"content-encoding"] == b"gzip"
+    assert recus[b"content-length"] == str(len(corps["body"])).encode()
+    assert recus[b"vary"] == b"Origin, Accept-Encoding"
+    assert [nom for nom, _ in debut["headers"]].count(b"content-length") == 1
+    assert gzip.decompress(corps["body"]) == CORPS
+
+
+def test_compression_brotli_preferee():
+    """brotli, s'il est installé, est préféré à gzip"""
+
+    # GIVEN
+    brotli = pytest.importorskip("brotli")
+
+    # WHEN
+    debut, corps = appeler([CORPS], JSON, "gzip, br", module_br=brotli)
+
+    # THEN
+    assert entetes(debut)[b"content-encoding"] == b"br"
+    assert brotli.decompress(corps["body"]) == CORPS
+
+
+def test_sous_le_seuil():
+    """Une réponse plus petite que le seuil est transmise telle quelle"""
+
+    # WHEN
+    debut, corps = appeler([CORPS], JSON, "gzip", seuil=len(CORPS) + 1)
+
+    # THEN
+    assert b"content-encoding" not in entetes(debut)
+    assert corps["body"] == CORPS
+
+
+@pytest.mark.parametrize("accept_encoding", [None, "", "gzip;q=0", "identity"])
+def test_encodage_non_accepte(accept_encoding):
+    """Sans Accept-Encoding, ou avec gzip refusé (q=0), rien n'est compressé"""
+
+    # WHEN
+    debut, corps = appeler([CORPS], JSON, accept_encoding)
+
+    # THEN
+    assert b"content-encoding" not in entetes(debut)
+    assert corps["body"] == CORPS
+
+
+def test_encodages_acceptes():
+    """Les qualités nulles ou invalides excluent l'encodage"""
+
+    # THEN
+    assert encodages_acceptes("gzip;q=0.5, br;q=0, deflate;q=x") == {"gzip"}
+    assert encodages_acceptes("GZIP, *") == {"gzip", "*"}
+
+
+def test_deja_encode():
+    """Une réponse déjà encodée n'est pas compressée une deuxième fois"""
+
+    # GIVEN
+    deja_compresse = gzip.compress(CORPS)
+    entetes_reponse = JSON + [(b"content-encoding", b"gzip")]
+
+    # WHEN
+    messages = appeler([deja_compresse], entetes_reponse, "gzip")
+
+    # THEN
+    assert messages[0]["headers"] == entetes_reponse
+    assert messages[1]["body"] == deja_compresse
+
+
+@pytest.mark.parametrize(
+    "entetes_reponse", [[(b"content-type", b"text/event-stream")], JSON]
+)
+def test_flux_transmis_tel_quel(entetes_reponse):
+    """Les flux SSE et les réponses envoyées en plusieurs morceaux ne sont pas
+    compressés, ni retenus : chaque morceau est transmis à son arrivée"""
+
+    # GIVEN
+    morceaux = [CORPS, b"data: 1\n\n", b""]
+
+    # WHEN
+    messages = appeler(morceaux, entetes_reponse, "gzip")
+
+    # THEN
+    assert b"content-encoding" not in entetes(messages[0])
+    assert [m["body"] for m in messages[1:]] == morceaux
+    assert [m["more_body"] for m in messages[1:]] == [True, True, False]
+
+
+def test_type_non_compressible():
+    """Les types qui ne se compressent pas (images...) sont transmis tels quels"""
+
+    # WHEN
+    debut, corps = appeler([CORPS], [(b"content-type", b"image/png")], "gzip")
+
+    # THEN
+    assert b"content-encoding" not in entetes(debut)
+    assert corps["body"] == CORPS
@@ -0,0 +1,109 @@
+import statistics
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from utils.generateur_donnees import GenerateurDonnees, SPORTS
+
+DATE_FIN = date(2025, 6, 30)
+
+
+def generateur(graine=42, nb_utilisateurs=200, nb_activites=500):
+    return GenerateurDonnees(
+        nb_utilisateurs=nb_utilisateurs,
+        nb_activites=nb_activites,
+        graine=graine,
+        date_fin=DATE_FIN,
+    )
+
+
+def toutes_les_lignes(g: GenerateurDonnees) -> dict:
+    # Les credentials ne sont pas comparés : le sel est tiré par utils.securite
+    return {
+        "utilisateurs": list(g.lignes_utilisateurs()),
+        "activites": list(g.lignes_activites()),
+        "abonnements": list(g.lignes_abonnements()),
+        "jaimes": list(g.lignes_jaimes()),
+        "commentaires": list(g.lignes_commentaires()),
+    }
+
+
+def test_meme_graine_memes_lignes():
+    """Deux générateurs de même graine produisent exactement les mêmes lignes"""
+
+    # WHEN
+    premier = toutes_les_lignes(generateur(graine=7))
+    second = toutes_les_lignes(generateur(graine=7))
+
+    # THEN
+    assert premier == second
+    assert all(premier.values())
+
+
+def test_graine_differente_lignes_differentes():
+    """Changer la graine change le jeu de données"""
+
+    # WHEN
+    premier = toutes_les_lignes(generateur(graine=7))
+    second = toutes_les_lignes(generateur(graine=8))
+
+    # THEN
+    assert premier["activites"] != second["activites"]
+    assert premier["abonnements"] != second["abonnements"]
+
+
+def test_lignes_coherentes():
+    """Ids contigus, références valides, pas de doublon ni d'auto-abonnement"""
+
+    # GIVEN
+    g = generateur()
+
+    # WHEN
+    lignes = toutes_les_lignes(g)
+
+    # THEN
+    ids_utilisateurs = {u[0] for u in lignes["utilisateurs"]}
+    assert ids_utilisateurs == set(range(1, 201))
+    assert [a[0] for a in lignes["activites"]] == list(range(1, 501))
+    assert all(a[1] in ids_utilisateurs and a[2] in SPORTS for a in lignes["activites"])
+    assert all(a[3] <= DATE_FIN for a in lignes["activites"])
+    abonnements = lignes["abonnements"]
+    assert len(set(abonnements)) == len(abonnements)
+    assert all(suiveur != suivi for suiveur, suivi in abonnements)
+    assert len(set(lignes["jaimes"])) == len(lignes["jaimes"])
+    commentaires = lignes["commentaires"]
+    assert [c[0] for c in commentaires] == list(range(1, len(commentaires) + 1))
+    assert all(c[4] <= DATE_FIN for c in commentaires)
+    assert len(list(g.lignes_credentials())) == 200
+
+
+def test_degres_queue_lourde():
+    """Abonnements en loi de puissance : quelques utilisateurs concentrent les
+    suiveurs, la plupart en ont peu"""
+
+    # GIVEN
+    g = generateur(nb_utilisateurs=2000, nb_activites=0)
+
+    # WHEN
+    abonnements = list(g.lignes_abonnements())
+
+    # THEN
+    nb_suiveurs = Counter(suivi for _, suivi in abonnements)
+    nb_suivis = Counter(suiveur for suiveur, _ in abonnements)
+    suiveurs = sorted((nb_suiveurs.get(i, 0) for i in range(1, 2001)), reverse=True)
+    suivis = [nb_suivis.get(i, 0) for i in range(1, 2001)]
+    moyenne = len(abonnements) / 2000
+    # Le 1 % le plus suivi reçoit plus d'un quart des abonnements
+    assert sum(suiveurs[:20]) > 0.25 * len(abonnements)
+    assert statistics.median(suiveurs) < moyenne / 2
+    # Le nombre de suivis a une longue traîne (Pareto)
+    assert max(suivis) > 5 * moyenne
+
+
+def test_parametres_invalides():
+    """Au moins 2 utilisateurs et un nombre d'activités positif"""
+    with pytest.raises(ValueError):
+        GenerateurDonnees(nb_utilisateurs=1, nb_activites=10)
+    with pytest.raises(ValueError):
+        GenerateurDonnees(nb_utilisateurs=10, nb_activites=-1)
@@ -0,0 +1,162 @@
+from unittest.mock import patch
+
+import pytest
+
+from utils import instrumentation
+from utils.instrumentation import (
+    Metriques,
+    MesuresRequete,
+    entete_server_timing,
+    mesures_requete,
+    normaliser_requete,
+    signaler_n_plus_un,
+)
+
+
+@pytest.mark.parametrize(
+    "sql, modele",
+    [
+        (
+            "SELECT * FROM activite WHERE id_activite = 42",
+            "SELECT * FROM activite WHERE id_activite = ?",
+        ),
+        (
+            "SELECT *\n  FROM utilisateur\n WHERE pseudo = 'l''ami' AND age > 3.5",
+            "SELECT * FROM utilisateur WHERE pseudo = ? AND age > ?",
+        ),
+        (
+            "SELECT * FROM jaime WHERE id_activite IN (1, 2, 3)",
+            "SELECT * FROM jaime WHERE id_activite IN (?, ...)",
+        ),
+        (
+            b"DELETE FROM jaime WHERE id_auteur = 7",
+            "DELETE FROM jaime WHERE id_auteur = ?",
+        ),
+        ("SELECT id_2 FROM t2", "SELECT id_2 FROM t2"),
+    ],
+)
+def test_normaliser_requete(sql, modele):
+    """Les valeurs littérales sont remplacées par '?', pas les noms qui contiennent
+    des chiffres"""
+
+    # THEN
+    assert normaliser_requete(sql) == modele
+
+
+def test_motifs_n_plus_un():
+    """Seuls les modèles exécutés au moins seuil fois sont signalés, du plus
+    fréquent au moins fréquent"""
+
+    # GIVEN
+    mesures = MesuresRequete()
+    for _ in range(5):
+        mesures.ajouter_requete("SELECT ? FROM a", 0.001)
+    for _ in range(3):
+        mesures.ajouter_requete("SELECT ? FROM b", 0.002)
+    mesures.ajouter_requete("SELECT ? FROM c", 0.05)
+
+    # WHEN
+    motifs = mesures.motifs_n_plus_un(seuil=3)
+
+    # THEN
+    assert motifs == [("SELECT ? FROM a", 5), ("SELECT ? FROM b", 3)]
+    assert mesures.motifs_n_plus_un(seuil=6) == []
+    assert mesures.nb_requetes == 9
+    assert mesures.requete_plus_lente == "SELECT ? FROM c"
+
+
+def test_requetes_sql_mesurees_dans_la_requete_http():
+    """Les requêtes SQL exécutées pendant une requête HTTP sont ajoutées à ses
+    mesures, sous leur forme normalisée"""
+
+    # GIVEN
+    mesures = MesuresRequete()
+    jeton = mesures_requete.set(mesures)
+
+    # WHEN
+    try:
+        for i in range(2):
+            instrumentation._enregistrer_requete_sql(f"SELECT {i}", 0.002)
+    finally:
+        mesures_requete.reset(jeton)
+
+    # THEN
+    assert mesures.modeles == {"SELECT ?": 2}
+    assert mesures.duree_bdd == pytest.approx(0.004)
+
+
+def test_entete_server_timing():
+    """Durées en millisecondes, avec les nombres de requêtes et de connexions"""
+
+    # GIVEN
+    mesures = MesuresRequete()
+    mesures.ajouter_requete("SELECT ?", 0.012)
+    mesures.ajouter_requete("SELECT ?", 0.0031)
+    mesures.ajouter_connexion(0.004)
+
+    # WHEN
+    entete = entete_server_timing(mesures, duree_totale=0.05, duree_cpu=0.0205)
+
+    # THEN
+    assert entete.split(", ") == [
+        'bdd;dur=15.1;desc="2 requetes"',
+        "sql-max;dur=12.0",
+        'connexion;dur=4.0;desc="1 connexions"',
+        "cpu;dur=20.5",
+        "total;dur=50.0",
+    ]
+
+
+def test_exporter():
+    """Texte Prometheus : compteurs par méthode, route et statut, histogramme cumulé
+    des durées et motifs N+1 par route"""
+
+    # GIVEN
+    metriques = Metriques()
+    metriques.ajouter_requete_http("GET", "/fil", 200, 0.02)
+    metriques.ajouter_requete_http("GET", "/fil", 200, 0.3)
+    metriques.ajouter_requete_http("POST", "/jaimes", 401, 0.001)
+    metriques.ajouter_requete_sql(0.5)
+    metriques.ajouter_connexion(0.25)
+    metriques.ajouter_n_plus_un("/fil")
+
+    # WHEN
+    lignes = metriques.exporter().splitlines()
+
+    # THEN
+    assert "# TYPE http_requetes_total counter" in lignes
+    assert 'http_requetes_total{methode="GET",route="/fil",statut="200"} 2' in lignes
+    assert 'http_requetes_total{methode="POST",route="/jaimes",statut="401"} 1' in (
+        lignes
+    )
+    assert "# TYPE http_duree_secondes histogram" in lignes
+    assert 'http_duree_secondes_bucket{route="/fil",le="0.01"} 0' in lignes
+    assert 'http_duree_secondes_bucket{route="/fil",le="0.025"} 1' in lignes
+    assert 'http_duree_secondes_bucket{route="/fil",le="0.5"} 2' in lignes
+    assert 'http_duree_secondes_bucket{route="/fil",le="+Inf"} 2' in lignes
+    assert 'http_duree_secondes_count{route="/fil"} 2' in lignes
+    assert 'http_duree_secondes_sum{route="/fil"} 0.320000' in lignes
+    assert "bdd_requetes_total 1" in lignes
+    assert "bdd_duree_secondes_total 0.500000" in lignes
+    assert "bdd_connexions_total 1" in lignes
+    assert "bdd_connexion_duree_secondes_total 0.250000" in lignes
+    assert 'n_plus_un_total{route="/fil"} 1' in lignes
+
+
+def test_signaler_n_plus_un(caplog):
+    """Un motif N+1 est compté pour la route et écrit dans les logs"""
+
+    # GIVEN
+    metriques = Metriques()
+    mesures = MesuresRequete()
+    for _ in range(instrumentation.SEUIL_N_PLUS_UN):
+        mesures.ajouter_requete("SELECT ? FROM jaime", 0.001)
+
+    # WHEN
+    with patch.object(instrumentation, "metriques", metriques):
+        signaler_n_plus_un(mesures, "GET", "/fil")
+        signaler_n_plus_un(MesuresRequete(), "GET", "/autre")
+
+    # THEN
+    assert metriques.n_plus_un == {"/fil": 1}
+    assert "Motif N+1 sur GET /fil" in caplog.text
@@ -0,0 +1,61 @@
+import pytest
+
+from utils.limiteur_debit import LimiteurMemoire, LimiteurSQLite, LimiteurInactif
+
+
+@pytest.fixture(params=["memoire", "sqlite"])
+def limiteur(request, tmp_path):
+    """Limiteur de 2 jetons, pratiquement pas rechargé pendant le test"""
+    if request.param == "memoire":
+        return LimiteurMemoire(capacite=2, debit=0.001)
+    return LimiteurSQLite(str(tmp_path / "limiteur.sqlite"), "test", 2, 0.001)
+
+
+def test_consommer(limiteur):
+    """Au-delà de la capacité, les tentatives sont refusées avec un temps d'attente"""
+
+    # WHEN
+    attentes = [limiteur.consommer("cle") for _ in range(3)]
+
+    # THEN
+    assert attentes[:2] == [0, 0]
+    assert attentes[2] > 0
+    assert limiteur.consommer("autre") == 0
+
+
+def test_attente_sans_consommer(limiteur):
+    """attente ne consomme pas de jeton"""
+
+    # WHEN
+    attentes = [limiteur.attente("cle") for _ in range(5)]
+
+    # THEN
+    assert attentes == [0] * 5
+    assert limiteur.consommer("cle") == 0
+
+
+def test_rendre(limiteur):
+    """Un jeton rendu autorise une nouvelle tentative, sans dépasser la capacité"""
+
+    # GIVEN
+    limiteur.consommer("cle")
+    limiteur.consommer("cle")
+
+    # WHEN
+    limiteur.rendre("cle")
+    limiteur.rendre("cle")
+    limiteur.rendre("cle")
+
+    # THEN
+    assert [limiteur.consommer("cle") for _ in range(2)] == [0, 0]
+    assert limiteur.consommer("cle") > 0
+
+
+def test_limiteur_inactif():
+    """Le limiteur inactif autorise toutes les tentatives"""
+
+    # GIVEN
+    limiteur = LimiteurInactif()
+
+    # WHEN / THEN
+    assert all(limiteur.consommer("cle") == 0 for _ in range(1000))
@@ -0,0 +1,115 @@
+import os
+import logging
+import importlib
+import threading
+
+import pytest
+
+from unittest.mock import patch
+
+import utils.log_decorator
+
+from utils.log_decorator import log
+
+
+class Service:
+    @log
+    def se_connecter(self, pseudo, mot_de_passe):
+        return pseudo
+
+    @log
+    def exterieure(self):
+        return self.interieure()
+
+    @log
+    def interieure(self):
+        return 1
+
+
+@pytest.fixture
+def journal(caplog):
+    caplog.set_level(logging.INFO, logger="utils.log_decorator")
+    return caplog
+
+
+def test_mot_de_passe_masque(journal):
+    """Les mots de passe passés par position ou par nom ne sont pas écrits"""
+
+    # WHEN
+    Service().se_connecter("johndoe", "secret1")
+    Service().se_connecter("johndoe", mot_de_passe="secret2")
+
+    # THEN
+    assert "secret" not in journal.text
+    assert "Service.se_connecter('johndoe', '*****') - DEBUT" in journal.text
+
+
+def test_indentation_appels_imbriques(journal):
+    """Un appel imbriqué est indenté d'un niveau de plus"""
+
+    # WHEN
+    Service().exterieure()
+
+    # THEN
+    debuts = [r.getMessage() for r in journal.records if "DEBUT" in r.getMessage()]
+    assert debuts == [
+        "    Service.exterieure() - DEBUT",
+        "        Service.interieure() - DEBUT",
+    ]
+
+
+def test_indentation_propre_au_thread(journal):
+    """Les appels d'autres threads ne modifient pas l'indentation"""
+
+    # GIVEN
+    demarre, fin = threading.Event(), threading.Event()
+
+    @log
+    def bloquante(self):
+        demarre.set()
+        fin.wait(5)
+
+    thread = threading.Thread(target=bloquante, args=(Service(),))
+    thread.start()
+    demarre.wait(5)
+
+    # WHEN
+    Service().interieure()
+    fin.set()
+    thread.join()
+
+    # THEN
+    assert "    Service.interieure() - DEBUT" in [r.getMessage() for r in journal.records]
+
+
+def test_niveau_desactive(caplog):
+    """Sans le niveau INFO, rien n'est écrit"""
+
+    # GIVEN
+    caplog.set_level(logging.WARNING, logger="utils.log_decorator")
+
+    # WHEN
+    resultat = Service().interieure()
+
+    # THEN
+    assert resultat == 1
+    assert caplog.records == []
+
+
+def test_decorateur_inactif():
+    """LOG_DECORATEUR=inactif : la méthode est renvoyée telle quelle"""
+
+    # GIVEN
+    def methode(self):
+        return 1
+
+    # WHEN
+    try:
+        with patch.dict(os.environ, {"LOG_DECORATEUR": "inactif"}):
+            module = importlib.reload(utils.log_decorator)
+            decoree = module.log(methode)
+    finally:
+        importlib.reload(utils.log_decorator)
+
+    # THEN
+    assert decoree is methode
@@ -0,0 +1,116 @@
+import json
+import logging
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from utils import log_init
+from utils.log_init import (
+    installer_file_attente,
+    arreter_file_attente,
+    exporter_metriques_logs,
+)
+
+
+class HandlerMemoire(logging.Handler):
+    """Garde les messages formatés et le thread qui les a formatés"""
+
+    def __init__(self):
+        super().__init__()
+        self.lignes = []
+
+    def emit(self, record):
+        self.lignes.append((self.format(record), threading.current_thread()))
+
+
+@pytest.fixture
+def handler():
+    """Logger racine avec un seul handler, passé derrière la file d'attente"""
+    racine = logging.getLogger()
+    handlers, niveau = list(racine.handlers), racine.level
+    for h in handlers:
+        racine.removeHandler(h)
+    handler = HandlerMemoire()
+    racine.addHandler(handler)
+    racine.setLevel(logging.INFO)
+    yield handler
+    arreter_file_attente()
+    for h in list(racine.handlers):
+        racine.removeHandler(h)
+    for h in handlers:
+        racine.addHandler(h)
+    racine.setLevel(niveau)
+
+
+def test_message_fige_a_l_appel(handler):
+    """Le message est figé par l'appelant : modifier les arguments ensuite ne change
+    pas la ligne écrite, mise en forme par le thread d'écriture"""
+
+    # GIVEN
+    installer_file_attente()
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    parcours = ["course"]
+
+    # WHEN
+    logging.info("sports %s", parcours)
+    parcours.append("vélo")
+    arreter_file_attente()
+
+    # THEN
+    assert [ligne for ligne, _ in handler.lignes] == ["INFO sports ['course']"]
+    assert handler.lignes[0][1] is not threading.current_thread()
+
+
+def test_exception_figee_a_l_appel(handler):
+    """La trace d'exception est formatée par l'appelant et écrite par le listener,
+    y compris avec le formateur JSON"""
+
+    # GIVEN
+    installer_file_attente()
+    handler.setFormatter(log_init.FormateurJson())
+
+    # WHEN
+    try:
+        raise ValueError("distance négative")
+    except ValueError:
+        logging.exception("échec")
+    arreter_file_attente()
+
+    # THEN
+    ligne = json.loads(handler.lignes[0][0])
+    assert ligne["message"] == "échec"
+    assert "ValueError: distance négative" in ligne["exception"]
+
+
+def test_rejets_exportes(handler):
+    """Les enregistrements rejetés (file pleine) sont comptés dans /metrics"""
+
+    # GIVEN
+    installer_file_attente(taille_max=1)
+    log_init._listener.stop()  # plus personne ne vide la file
+
+    # WHEN
+    for i in range(5):
+        logging.info("message %d", i)
+    metriques = exporter_metriques_logs()
+
+    # THEN
+    assert "logs_rejetes_total 4\n" in metriques
+    assert "logs_file_attente 1\n" in metriques
+    log_init._listener = None
+
+
+def test_arret_enregistre_une_fois(handler):
+    """Réinstaller la file n'empile pas les fonctions atexit"""
+
+    # GIVEN
+    with patch.object(log_init, "_arret_enregistre", False):
+        with patch("atexit.register") as register:
+
+            # WHEN
+            installer_file_attente()
+            installer_file_attente()
+
+    # THEN
+    register.assert_called_once_with(arreter_file_attente)
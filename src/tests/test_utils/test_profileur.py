@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+from unittest.mock import patch
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+import app as application
+from business_object.utilisateur import Utilisateur
+from utils.profileur import Profileur, verrou_profilage
+
+
+def boucle_active(arret: threading.Event):
+    total = 0
+    while not arret.is_set():
+        total += sum(range(100))
+    return total
+
+
+def profiler_pendant(cible, duree: float = 0.2, **parametres) -> Profileur:
+    """Profile le processus pendant qu'un thread nommé 'cible' exécute cible(arret)"""
+    arret = threading.Event()
+    thread = threading.Thread(target=cible, args=(arret,), name="cible", daemon=True)
+    thread.start()
+    profileur = Profileur(intervalle=0.001, **parametres)
+    profileur.demarrer()
+    try:
+        time.sleep(duree)
+    finally:
+        profileur.arreter()
+        arret.set()
+        thread.join()
+    return profileur
+
+
+def test_thread_actif_echantillonne():
+    """La fonction exécutée par un thread actif apparaît dans ses piles collapsed"""
+
+    # WHEN
+    profileur = profiler_pendant(boucle_active)
+
+    # THEN
+    lignes = profileur.exporter_collapsed().splitlines()
+    piles_cible = [ligne for ligne in lignes if ligne.startswith("cible;")]
+    assert piles_cible
+    assert any("boucle_active" in ligne for ligne in piles_cible)
+    for ligne in lignes:
+        _, nb = ligne.rsplit(" ", 1)
+        assert int(nb) > 0
+    assert profileur.nb_releves > 0
+
+
+def test_thread_en_attente_ignore():
+    """Un thread bloqué dans une attente n'est compté que si inclure_attente"""
+
+    # WHEN
+    ignore = profiler_pendant(lambda arret: arret.wait())
+    inclus = profiler_pendant(lambda arret: arret.wait(), inclure_attente=True)
+
+    # THEN
+    assert not any(pile.startswith("cible;") for pile in ignore.piles)
+    assert any(pile.startswith("cible;") for pile in inclus.piles)
+
+
+@pytest.fixture
+def client():
+    """Client de l'API, l'utilisateur connecté étant choisi par le test
+    (sans accès à la base)"""
+    connecte = {}
+    application.app.dependency_overrides[application.get_current_user] = (
+        lambda: connecte["utilisateur"]
+    )
+    with patch.dict(os.environ, {"ADMIN_PSEUDOS": "admin"}):
+        yield TestClient(application.app), connecte
+    application.app.dependency_overrides.clear()
+
+
+def utilisateur(pseudo: str) -> Utilisateur:
+    return Utilisateur(pseudo, "Nom", "Prenom", "2000-01-01", "F", id_utilisateur=1)
+
+
+def test_profil_reserve_aux_administrateurs(client):
+    """/debug/profile répond 403 à un utilisateur qui n'est pas administrateur"""
+
+    # GIVEN
+    client, connecte = client
+    connecte["utilisateur"] = utilisateur("sportif")
+
+    # WHEN
+    reponse = client.get("/debug/profile", params={"seconds": 0.01})
+
+    # THEN
+    assert reponse.status_code == 403
+
+
+@pytest.mark.parametrize("seconds", [0, -1, application.PROFIL_DUREE_MAX + 1])
+def test_profil_duree_limitee(client, seconds):
+    """La durée du profilage est comprise entre 0 et PROFIL_DUREE_MAX (60 s)"""
+
+    # GIVEN
+    client, connecte = client
+    connecte["utilisateur"] = utilisateur("admin")
+
+    # WHEN
+    reponse = client.get("/debug/profile", params={"seconds": seconds})
+
+    # THEN
+    assert application.PROFIL_DUREE_MAX == 60
+    assert reponse.status_code == 400
+
+
+def test_profil_administrateur(client):
+    """Un administrateur reçoit les piles au format collapsed, un seul profilage
+    à la fois"""
+
+    # GIVEN
+    client, connecte = client
+    connecte["utilisateur"] = utilisateur("admin")
+
+    # WHEN
+    reponse = client.get("/debug/profile", params={"seconds": 0.05})
+    with verrou_profilage:
+        reponse_occupee = client.get("/debug/profile", params={"seconds": 0.05})
+
+    # THEN
+    assert reponse.status_code == 200
+    assert "profil.collapsed" in reponse.headers["content-disposition"]
+    assert reponse_occupee.status_code == 409
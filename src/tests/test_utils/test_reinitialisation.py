@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+from utils import reinitialisation
+from utils.reinitialisation import a_reinitialiser, reinitialiser_etats
+
+
+def test_reinitialiser_etats_appelle_les_fonctions_enregistrees():
+    """Chaque fonction enregistrée est appelée une fois, même ajoutée deux fois"""
+
+    # GIVEN
+    appels = []
+    with patch.object(reinitialisation, "_fonctions", []):
+        a_reinitialiser(lambda: appels.append("a"))
+
+        @a_reinitialiser
+        def vider_b():
+            appels.append("b")
+
+        a_reinitialiser(vider_b)
+
+        # WHEN
+        reinitialiser_etats()
+
+    # THEN
+    assert appels == ["a", "b"]
+
+
+def test_reinitialiser_etats_continue_apres_une_erreur():
+    """Une remise à zéro en échec n'empêche pas les suivantes"""
+
+    # GIVEN
+    appels = []
+
+    def echouer():
+        raise RuntimeError("boum")
+
+    with patch.object(reinitialisation, "_fonctions", []):
+        a_reinitialiser(echouer)
+        a_reinitialiser(lambda: appels.append("suivante"))
+
+        # WHEN
+        reinitialiser_etats()
+
+    # THEN
+    assert appels == ["suivante"]
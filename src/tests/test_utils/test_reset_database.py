@@ -0,0 +1,76 @@
+import os
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from dao.db_connection import DBConnection
+from utils.generateur_donnees import GenerateurDonnees
+from utils.reset_database import ENV_TEST, ResetDatabase, _FluxCopy
+
+
+def test_flux_copy_echappements():
+    """Tabulations, fins de ligne et antislashs sont échappés, None devient \\N"""
+
+    # GIVEN
+    lignes = [(1, "a\tb", None), (2, "ligne 1\nligne 2\r", "c:\\chemin")]
+
+    # WHEN
+    texte = _FluxCopy(lignes).read()
+
+    # THEN
+    assert texte == "1\ta\\tb\t\\N\n2\tligne 1\\nligne 2\\r\tc:\\\\chemin\n"
+
+
+def test_flux_copy_lecture_par_morceaux():
+    """Une lecture par morceaux redonne le même texte qu'une lecture complète"""
+
+    # GIVEN
+    lignes = [(i, f"texte {i}", date(2025, 1, 1)) for i in range(100)]
+    complet = _FluxCopy(lignes).read()
+    flux = _FluxCopy(lignes)
+
+    # WHEN
+    morceaux = []
+    while morceau := flux.read(37):
+        morceaux.append(morceau)
+
+    # THEN
+    assert "".join(morceaux) == complet
+    assert all(len(m) == 37 for m in morceaux[:-1])
+    assert complet.startswith("0\ttexte 0\t2025-01-01\n")
+
+
+def compter(table: str) -> int:
+    with DBConnection().connection as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) AS nb FROM {table};")
+            return cursor.fetchone()["nb"]
+
+
+@pytest.fixture
+def generateur():
+    """Petite base synthétique dans le schéma dédié aux tests"""
+    generateur = GenerateurDonnees(nb_utilisateurs=30, nb_activites=80, graine=3)
+    with patch.dict(os.environ, ENV_TEST):
+        ResetDatabase().lancer(test_dao=True, generateur=generateur)
+        yield generateur
+
+
+def test_peupler_synthetique(generateur):
+    """Toutes les lignes du générateur sont chargées et les séquences recalées"""
+
+    # THEN
+    assert compter("utilisateur") == 30
+    assert compter("credentials") == 30
+    assert compter("activite") == 80
+    assert compter("abonnement") == len(list(generateur.lignes_abonnements()))
+    assert compter("jaime") == len(list(generateur.lignes_jaimes()))
+    assert compter("commentaire") == len(list(generateur.lignes_commentaires()))
+    with DBConnection().connection as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO activite (id_utilisateur, sport, date_activite) "
+                "VALUES (1, 'course', CURRENT_DATE) RETURNING id_activite;"
+            )
+            assert cursor.fetchone()["id_activite"] == 81
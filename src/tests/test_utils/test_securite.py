@@ -0,0 +1,198 @@
+import os
+import time
+
+from unittest.mock import patch
+
+import pytest
+
+from utils.securite import (
+    CacheIdentifiants,
+    doit_etre_rehache,
+    generer_salt,
+    hash_password,
+    verifier_mot_de_passe,
+)
+
+# Coût bcrypt et itérations PBKDF2 minimaux : les tests restent rapides
+ENV_RAPIDE = {"BCRYPT_COUT": "4", "PBKDF2_ITERATIONS": "1000"}
+
+
+def hacher(kdf: str, mot_de_passe: str, sel: str, **env) -> str:
+    with patch.dict(os.environ, {**ENV_RAPIDE, "KDF_MOT_DE_PASSE": kdf, **env}):
+        return hash_password(mot_de_passe, sel)
+
+
+@pytest.mark.parametrize(
+    "kdf, prefixe",
+    [("bcrypt", "$2b$04$"), ("pbkdf2", "$pbkdf2-sha256$1000$"), ("sha256", "")],
+)
+def test_verifier_mot_de_passe(kdf, prefixe):
+    """Le hash est vérifié d'après son préfixe, quel que soit l'algorithme
+    configuré"""
+
+    # GIVEN
+    sel = generer_salt()
+    hash_stocke = hacher(kdf, "m0tdepasse", sel)
+
+    # WHEN
+    with patch.dict(os.environ, {"KDF_MOT_DE_PASSE": "bcrypt"}):
+        correct = verifier_mot_de_passe("m0tdepasse", sel, hash_stocke)
+        incorrect = verifier_mot_de_passe("autre", sel, hash_stocke)
+
+    # THEN
+    assert hash_stocke.startswith(prefixe)
+    assert correct
+    assert not incorrect
+
+
+@pytest.mark.parametrize("prefixe", ["$2a$", "$2y$"])
+def test_verifier_mot_de_passe_variantes_bcrypt(prefixe):
+    """Les hash bcrypt produits par d'autres implémentations ($2a$, $2y$) sont
+    reconnus"""
+
+    # GIVEN
+    hash_stocke = prefixe + hacher("bcrypt", "m0tdepasse", "")[4:]
+
+    # THEN
+    assert verifier_mot_de_passe("m0tdepasse", "", hash_stocke)
+    assert not verifier_mot_de_passe("autre", "", hash_stocke)
+
+
+@pytest.mark.parametrize("kdf", ["pbkdf2", "sha256"])
+def test_verifier_mot_de_passe_mauvais_sel(kdf):
+    """PBKDF2 et SHA-256 utilisent le sel de la table"""
+
+    # GIVEN
+    hash_stocke = hacher(kdf, "m0tdepasse", "sel1")
+
+    # THEN
+    assert not verifier_mot_de_passe("m0tdepasse", "sel2", hash_stocke)
+
+
+def test_hash_sha256_historique():
+    """Le format historique (64 caractères hexadécimaux) reste vérifiable"""
+
+    # GIVEN
+    hash_stocke = hacher("sha256", "m0tdepasse", "sel")
+
+    # THEN
+    assert len(hash_stocke) == 64
+    assert verifier_mot_de_passe("m0tdepasse", "sel", hash_stocke)
+
+
+@pytest.mark.parametrize(
+    "kdf_hash, env_hash, kdf_config, env_config, attendu",
+    [
+        ("bcrypt", {}, "bcrypt", {}, False),
+        ("bcrypt", {}, "bcrypt", {"BCRYPT_COUT": "5"}, True),
+        ("bcrypt", {"BCRYPT_COUT": "5"}, "bcrypt", {}, False),
+        ("pbkdf2", {}, "pbkdf2", {}, False),
+        ("pbkdf2", {}, "pbkdf2", {"PBKDF2_ITERATIONS": "2000"}, True),
+        ("pbkdf2", {"PBKDF2_ITERATIONS": "2000"}, "pbkdf2", {}, False),
+        ("sha256", {}, "sha256", {}, False),
+        ("sha256", {}, "bcrypt", {}, True),
+        ("pbkdf2", {}, "bcrypt", {}, True),
+        ("bcrypt", {}, "pbkdf2", {}, True),
+    ],
+)
+def test_doit_etre_rehache(kdf_hash, env_hash, kdf_config, env_config, attendu):
+    """Un hash est recalculé si l'algorithme configuré a changé, ou si le coût
+    bcrypt ou le nombre d'itérations PBKDF2 configuré a augmenté"""
+
+    # GIVEN
+    hash_stocke = hacher(kdf_hash, "m0tdepasse", "sel", **env_hash)
+
+    # WHEN
+    env = {**ENV_RAPIDE, "KDF_MOT_DE_PASSE": kdf_config, **env_config}
+    with patch.dict(os.environ, env):
+        resultat = doit_etre_rehache(hash_stocke)
+
+    # THEN
+    assert resultat is attendu
+
+
+def test_kdf_inconnu():
+    """Un algorithme inconnu dans KDF_MOT_DE_PASSE est refusé"""
+
+    # THEN
+    with pytest.raises(ValueError):
+        hacher("md5", "m0tdepasse", "sel")
+
+
+@pytest.fixture
+def cache_identifiants():
+    with patch.dict(os.environ, {"CACHE_BACKEND": "memoire"}):
+        return CacheIdentifiants(duree_vie=60)
+
+
+def test_cache_identifiants_present(cache_identifiants):
+    """Des identifiants vérifiés récemment renvoient l'utilisateur"""
+
+    # GIVEN
+    cache_identifiants.ajouter("alice", "m0tdepasse", "utilisateur alice")
+
+    # WHEN
+    utilisateur = cache_identifiants.obtenir("alice", "m0tdepasse")
+
+    # THEN
+    assert utilisateur == "utilisateur alice"
+    assert cache_identifiants.obtenir("bob", "m0tdepasse") is None
+
+
+def test_cache_identifiants_mot_de_passe_change(cache_identifiants):
+    """Un autre mot de passe que celui vérifié n'est pas accepté par le cache, et
+    un compte oublié doit être vérifié à nouveau"""
+
+    # GIVEN
+    cache_identifiants.ajouter("alice", "ancien", "utilisateur alice")
+
+    # WHEN
+    avec_nouveau = cache_identifiants.obtenir("alice", "nouveau")
+    cache_identifiants.oublier("alice")
+    apres_oubli = cache_identifiants.obtenir("alice", "ancien")
+
+    # THEN
+    assert avec_nouveau is None
+    assert apres_oubli is None
+
+
+def test_cache_identifiants_empreinte(cache_identifiants):
+    """Le mot de passe clair n'est pas conservé dans le cache"""
+
+    # GIVEN
+    cache_identifiants.ajouter("alice", "m0tdepasse", "utilisateur alice")
+
+    # WHEN
+    empreinte, _ = cache_identifiants._cache.obtenir("alice")
+
+    # THEN
+    assert b"m0tdepasse" not in empreinte
+    assert len(empreinte) == 32
+
+
+def test_cache_identifiants_expiration():
+    """Une vérification n'est plus valable après duree_vie"""
+
+    # GIVEN
+    with patch.dict(os.environ, {"CACHE_BACKEND": "memoire"}):
+        cache_identifiants = CacheIdentifiants(duree_vie=0.05)
+    cache_identifiants.ajouter("alice", "m0tdepasse", "utilisateur alice")
+
+    # WHEN
+    time.sleep(0.1)
+
+    # THEN
+    assert cache_identifiants.obtenir("alice", "m0tdepasse") is None
+
+
+def test_cache_identifiants_desactive():
+    """Avec une durée de vie nulle, rien n'est mis en cache"""
+
+    # GIVEN
+    cache_identifiants = CacheIdentifiants(duree_vie=0)
+
+    # WHEN
+    cache_identifiants.ajouter("alice", "m0tdepasse", "utilisateur alice")
+
+    # THEN
+    assert cache_identifiants.obtenir("alice", "m0tdepasse") is None
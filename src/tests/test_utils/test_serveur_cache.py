@@ -0,0 +1,97 @@
+import time
+import socket
+
+import pytest
+
+from utils.serveur_cache import ServeurCache
+
+
+@pytest.fixture
+def client():
+    """Connexion à un serveur de cache local : renvoie une fonction d'envoi"""
+    serveur = ServeurCache("localhost", 0)
+    serveur.demarrer_en_arriere_plan()
+    connexion = socket.create_connection(("localhost", serveur.server_address[1]))
+    fichier = connexion.makefile("rwb")
+
+    def commande(ligne: bytes, donnees: bytes | None = None, nb_lignes: int = 1):
+        fichier.write(ligne + b"\r\n")
+        if donnees is not None:
+            fichier.write(donnees + b"\r\n")
+        fichier.flush()
+        return [fichier.readline().rstrip(b"\r\n") for _ in range(nb_lignes)]
+
+    yield commande
+    connexion.close()
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def test_set_get_delete(client):
+    """Écriture, lecture et suppression d'une valeur"""
+
+    # WHEN
+    ecriture = client(b"set cle 1 0 6", b"valeur")
+    lecture = client(b"get cle", nb_lignes=3)
+    suppression = client(b"delete cle")
+
+    # THEN
+    assert ecriture == [b"STORED"]
+    assert lecture == [b"VALUE cle 1 6", b"valeur", b"END"]
+    assert suppression == [b"DELETED"]
+    assert client(b"get cle") == [b"END"]
+    assert client(b"delete cle") == [b"NOT_FOUND"]
+
+
+def test_add_existante(client):
+    """add n'écrase pas une valeur présente (baux de calcul)"""
+
+    # GIVEN
+    client(b"add bail 0 0 1", b"1")
+
+    # WHEN
+    reponse = client(b"add bail 0 0 1", b"2")
+
+    # THEN
+    assert reponse == [b"NOT_STORED"]
+    assert client(b"get bail", nb_lignes=3)[1] == b"1"
+
+
+def test_incr(client):
+    """incr d'un compteur absent, puis présent ; decr borné à 0"""
+
+    # WHEN
+    absent = client(b"incr compteur 1")
+    client(b"set compteur 0 0 1", b"5")
+
+    # THEN
+    assert absent == [b"NOT_FOUND"]
+    assert client(b"incr compteur 3") == [b"8"]
+    assert client(b"decr compteur 20") == [b"0"]
+
+
+def test_expiration(client):
+    """Une valeur expirée n'est plus lue"""
+
+    # GIVEN
+    client(b"set cle 0 1 1", b"x")
+
+    # WHEN
+    time.sleep(1.1)
+
+    # THEN
+    assert client(b"get cle") == [b"END"]
+
+
+def test_flush_all_et_commande_inconnue(client):
+    """flush_all vide le serveur ; une commande inconnue renvoie ERROR"""
+
+    # GIVEN
+    client(b"set cle 0 0 1", b"x")
+
+    # WHEN
+    reponses = client(b"flush_all") + client(b"inconnue")
+
+    # THEN
+    assert reponses == [b"OK", b"ERROR"]
+    assert client(b"get cle") == [b"END"]
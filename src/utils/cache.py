@@ -0,0 +1,632 @@
+"""Caches de l'application
+
+Tous les caches partagent la même interface (classe Cache) :
+- obtenir / ajouter / supprimer / vider / incrementer
+- obtenir_ou_calculer : en cas d'absence, un seul appelant calcule la valeur pendant
+  que les autres attendent son résultat (protection contre les "cache stampedes")
+- des compteurs de succès / échecs par espace de noms, exportés dans /metrics
+
+Trois implémentations, choisies par la variable CACHE_BACKEND (fonction creer_cache) :
+- CacheMemoire ("memoire") : LRU avec durée de vie, propre au processus
+- CacheSQLite ("sqlite")   : fichier SQLite local, partagé par les workers d'une machine
+- CacheReseau ("reseau")   : serveur memcached (ou utils/serveur_cache.py en local)
+Les deux derniers lisent des données que d'autres processus peuvent écrire : leurs
+valeurs sont signées (HMAC) avec la clé CACHE_CLE avant d'être désérialisées.
+
+Quel que soit le backend, une lecture renvoie une copie de la valeur mise en cache :
+la modifier ne change pas ce que liront les autres appelants.
+
+Les valeurs None sont conservées comme les autres ("cache négatif") : une ressource
+absente de la base n'est pas recherchée à nouveau tant que l'entrée est valide.
+Une entrée absente du cache est signalée par la sentinelle MANQUANT.
+"""
+
+import os
+import abc
+import hmac
+import time
+import pickle
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from collections import OrderedDict, Counter
+
+import dotenv
+
+dotenv.load_dotenv()
+
+
+class _Manquant:
+    def __repr__(self):
+        return "MANQUANT"
+
+
+MANQUANT = _Manquant()
+
+# Caches créés par creer_cache, par espace de noms (pour les métriques)
+_caches = {}
+_verrou_caches = threading.Lock()
+
+
+class Cache(abc.ABC):
+    """Interface commune des caches
+
+    Les sous-classes implémentent _lire, _ecrire, _effacer, _vider et _incrementer.
+    Les méthodes _prendre_bail / _rendre_bail permettent de limiter le calcul d'une
+    valeur absente à un seul processus (par défaut : un seul thread du processus).
+
+    Parameters
+    ----------
+    espace : str
+        espace de noms du cache (préfixe des clés, étiquette des métriques)
+    duree_vie : float
+        durée de validité (en secondes) d'une entrée
+    duree_vie_absent : float
+        durée de validité (en secondes) d'une entrée None (ressource absente)
+    """
+
+    def __init__(self, espace: str, duree_vie: float = 300, duree_vie_absent: float = 30):
+        self.espace = espace
+        self.duree_vie = duree_vie
+        self.duree_vie_absent = duree_vie_absent
+        self.metriques = Counter()
+        self._calculs = {}
+        self._verrou_calculs = threading.Lock()
+
+    # --- A implémenter par les sous-classes ---
+
+    @abc.abstractmethod
+    def _lire(self, cle):
+        """Valeur associée à la clé, ou MANQUANT"""
+
+    @abc.abstractmethod
+    def _ecrire(self, cle, valeur, duree_vie: float):
+        """Enregistre la valeur pour duree_vie secondes"""
+
+    @abc.abstractmethod
+    def _effacer(self, cle):
+        """Retire l'entrée si elle existe"""
+
+    @abc.abstractmethod
+    def _vider(self):
+        """Retire toutes les entrées de l'espace de noms"""
+
+    @abc.abstractmethod
+    def _incrementer(self, cle, delta: int) -> int:
+        """Incrémente atomiquement un compteur entier et renvoie sa nouvelle valeur"""
+
+    def _prendre_bail(self, cle, duree: float) -> bool:
+        return True
+
+    def _rendre_bail(self, cle):
+        pass
+
+    # --- Interface publique ---
+
+    def obtenir(self, cle):
+        """Valeur associée à la clé, ou MANQUANT si absente ou expirée"""
+        valeur = self._lire(cle)
+        self.metriques["succes" if valeur is not MANQUANT else "echecs"] += 1
+        return valeur
+
+    def ajouter(self, cle, valeur, duree_vie: float | None = None):
+        if duree_vie is None:
+            duree_vie = self.duree_vie_absent if valeur is None else self.duree_vie
+        if duree_vie > 0:
+            self._ecrire(cle, valeur, duree_vie)
+
+    def supprimer(self, cle):
+        self._effacer(cle)
+
+    def vider(self):
+        self._vider()
+
+    def incrementer(self, cle, delta: int = 1) -> int:
+        """Incrémente atomiquement un compteur entier (créé à 0) et renvoie sa nouvelle valeur"""
+        return self._incrementer(cle, delta)
+
+    def obtenir_ou_calculer(self, cle, calculer, duree_vie: float | None = None, attente_max: float = 10):
+        """Valeur en cache, sinon calculée par calculer() puis mise en cache
+
+        Un seul thread du processus (et, si le backend le permet, un seul processus)
+        calcule une valeur absente : les autres attendent son résultat au plus attente_max
+        secondes, puis la calculent eux-mêmes.
+        """
+        valeur = self.obtenir(cle)
+        if valeur is not MANQUANT:
+            return valeur
+
+        with self._verrou_calculs:
+            verrou, nb = self._calculs.get(cle, (None, 0))
+            if verrou is None:
+                verrou = threading.Lock()
+            self._calculs[cle] = (verrou, nb + 1)
+        try:
+            with verrou:
+                # Un autre thread a pu calculer la valeur pendant l'attente du verrou
+                valeur = self._lire(cle)
+                if valeur is MANQUANT:
+                    valeur = self._calculer_une_fois(cle, calculer, duree_vie, attente_max)
+                return valeur
+        finally:
+            with self._verrou_calculs:
+                verrou, nb = self._calculs[cle]
+                if nb <= 1:
+                    del self._calculs[cle]
+                else:
+                    self._calculs[cle] = (verrou, nb - 1)
+
+    def _calculer_une_fois(self, cle, calculer, duree_vie, attente_max):
+        if not self._prendre_bail(cle, attente_max):
+            # Un autre processus calcule la valeur : on attend qu'elle apparaisse
+            fin = time.monotonic() + attente_max
+            while time.monotonic() < fin:
+                time.sleep(0.02)
+                valeur = self._lire(cle)
+                if valeur is not MANQUANT:
+                    return valeur
+        try:
+            self.metriques["calculs"] += 1
+            valeur = calculer()
+            self.ajouter(cle, valeur, duree_vie)
+            return valeur
+        finally:
+            self._rendre_bail(cle)
+
+
+class CacheMemoire(Cache):
+    """Cache LRU avec durée de vie des entrées, propre au processus
+
+    Les valeurs sont conservées sérialisées (pickle) : chaque lecture renvoie une
+    nouvelle copie, comme avec les autres backends. Seuls les compteurs
+    (incrementer), des entiers, sont conservés tels quels.
+
+    Parameters
+    ----------
+    taille_max : int
+        nombre maximal d'entrées, les moins récemment utilisées sont retirées
+    """
+
+    def __init__(
+        self,
+        espace: str = "defaut",
+        taille_max: int = 10000,
+        duree_vie: float = 300,
+        duree_vie_absent: float = 30,
+    ):
+        super().__init__(espace, duree_vie, duree_vie_absent)
+        self.taille_max = taille_max
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def _lire(self, cle):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return MANQUANT
+            valeur, expiration = entree
+            if expiration < time.monotonic():
+                del self._entrees[cle]
+                return MANQUANT
+            self._entrees.move_to_end(cle)
+        return pickle.loads(valeur) if isinstance(valeur, bytes) else valeur
+
+    def _ecrire(self, cle, valeur, duree_vie):
+        donnees = pickle.dumps(valeur, pickle.HIGHEST_PROTOCOL)
+        with self._verrou:
+            self._entrees[cle] = (donnees, time.monotonic() + duree_vie)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def _effacer(self, cle):
+        with self._verrou:
+            self._entrees.pop(cle, None)
+
+    def _vider(self):
+        with self._verrou:
+            self._entrees.clear()
+
+    def _incrementer(self, cle, delta):
+        with self._verrou:
+            valeur, expiration = self._entrees.get(cle, (0, float("inf")))
+            if expiration < time.monotonic():
+                valeur, expiration = 0, float("inf")
+            elif isinstance(valeur, bytes):
+                valeur = pickle.loads(valeur)
+            self._entrees[cle] = (valeur + delta, expiration)
+            self._entrees.move_to_end(cle)
+            return valeur + delta
+
+    def __len__(self):
+        return len(self._entrees)
+
+
+class CacheSigne(Cache):
+    """Cache dont les valeurs sont stockées hors du processus, là où d'autres peuvent
+    les écrire : chaque valeur sérialisée (pickle) est précédée de sa signature
+    HMAC-SHA256 (clé secrète et clé de l'entrée). Une valeur dont la signature est
+    invalide (écrite par un tiers, ou copiée depuis une autre entrée) n'est jamais
+    désérialisée et compte comme absente.
+
+    Parameters
+    ----------
+    cle_secrete : bytes
+        clé de signature des valeurs, commune à tous les processus
+    """
+
+    def __init__(
+        self,
+        espace: str,
+        cle_secrete: bytes,
+        duree_vie: float = 300,
+        duree_vie_absent: float = 30,
+    ):
+        super().__init__(espace, duree_vie, duree_vie_absent)
+        if not cle_secrete:
+            raise ValueError("La clé de signature du cache ne doit pas être vide")
+        self.cle_secrete = cle_secrete
+
+    def _signature(self, cle: bytes, donnees: bytes) -> bytes:
+        return hmac.digest(self.cle_secrete, cle + b"\n" + donnees, "sha256")
+
+    def _encoder(self, cle: bytes, valeur) -> bytes:
+        donnees = pickle.dumps(valeur, pickle.HIGHEST_PROTOCOL)
+        return self._signature(cle, donnees) + donnees
+
+    def _decoder(self, cle: bytes, donnees: bytes):
+        signature, donnees = donnees[:32], donnees[32:]
+        if not hmac.compare_digest(signature, self._signature(cle, donnees)):
+            self.metriques["erreurs"] += 1
+            logging.warning(f"Cache {self.espace} : valeur mal signée ignorée")
+            return MANQUANT
+        return pickle.loads(donnees)
+
+
+class CacheSQLite(CacheSigne):
+    """Cache stocké dans un fichier SQLite local, partagé par les processus d'une machine
+    Les valeurs sont signées (voir CacheSigne) : tout processus pouvant écrire dans
+    le fichier pourrait sinon faire désérialiser des données arbitraires.
+
+    Le nombre d'entrées de l'espace est ramené à taille_max à intervalles réguliers
+    (au plus un dixième d'écritures en plus entre deux purges) : les entrées qui
+    expirent le plus tôt sont retirées.
+
+    Parameters
+    ----------
+    chemin : str
+        fichier SQLite
+    taille_max : int
+        nombre maximal d'entrées de l'espace de noms
+    """
+
+    def __init__(
+        self,
+        espace: str,
+        cle_secrete: bytes,
+        chemin: str = "cache.sqlite",
+        duree_vie: float = 300,
+        duree_vie_absent: float = 30,
+        taille_max: int = 10000,
+    ):
+        super().__init__(espace, cle_secrete, duree_vie, duree_vie_absent)
+        self.chemin = chemin
+        self.taille_max = taille_max
+        self._intervalle_purge = max(1, min(1000, taille_max // 10))
+        self._local = threading.local()
+        self._nb_ecritures = 0
+        connexion = self._connexion()
+        connexion.execute(
+            "CREATE TABLE IF NOT EXISTS cache (espace TEXT NOT NULL, cle TEXT NOT NULL, "
+            "valeur BLOB, expiration REAL NOT NULL, PRIMARY KEY (espace, cle))"
+        )
+        connexion.execute(
+            "CREATE TABLE IF NOT EXISTS bail (espace TEXT NOT NULL, cle TEXT NOT NULL, "
+            "expiration REAL NOT NULL, PRIMARY KEY (espace, cle))"
+        )
+        connexion.execute(
+            "CREATE INDEX IF NOT EXISTS cache_expiration ON cache (espace, expiration)"
+        )
+
+    def _connexion(self) -> sqlite3.Connection:
+        # Une connexion par thread (les connexions sqlite3 ne se partagent pas entre threads)
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=5, isolation_level=None)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("PRAGMA synchronous=OFF")
+            self._local.connexion = connexion
+        return connexion
+
+    def _cle_signee(self, cle) -> bytes:
+        return f"{self.espace}\n{cle!r}".encode()
+
+    def _lire(self, cle):
+        res = (
+            self._connexion()
+            .execute(
+                "SELECT valeur FROM cache WHERE espace = ? AND cle = ? AND expiration >= ?",
+                (self.espace, repr(cle), time.time()),
+            )
+            .fetchone()
+        )
+        return MANQUANT if res is None else self._decoder(self._cle_signee(cle), res[0])
+
+    def _ecrire(self, cle, valeur, duree_vie):
+        donnees = self._encoder(self._cle_signee(cle), valeur)
+        self._connexion().execute(
+            "INSERT OR REPLACE INTO cache (espace, cle, valeur, expiration) VALUES (?, ?, ?, ?)",
+            (self.espace, repr(cle), donnees, time.time() + duree_vie),
+        )
+        # Purge régulière des entrées expirées et des entrées en trop
+        self._nb_ecritures += 1
+        if self._nb_ecritures % self._intervalle_purge == 0:
+            self.purger()
+
+    def purger(self):
+        """Supprime les entrées expirées, puis celles au-delà de taille_max"""
+        connexion = self._connexion()
+        connexion.execute("DELETE FROM cache WHERE expiration < ?", (time.time(),))
+        connexion.execute(
+            "DELETE FROM cache WHERE espace = ? AND cle IN "
+            "(SELECT cle FROM cache WHERE espace = ? "
+            " ORDER BY expiration DESC LIMIT -1 OFFSET ?)",
+            (self.espace, self.espace, self.taille_max),
+        )
+
+    def _effacer(self, cle):
+        self._connexion().execute(
+            "DELETE FROM cache WHERE espace = ? AND cle = ?", (self.espace, repr(cle))
+        )
+
+    def _vider(self):
+        self._connexion().execute("DELETE FROM cache WHERE espace = ?", (self.espace,))
+
+    def _incrementer(self, cle, delta):
+        connexion = self._connexion()
+        connexion.execute("BEGIN IMMEDIATE")
+        try:
+            res = connexion.execute(
+                "SELECT valeur FROM cache WHERE espace = ? AND cle = ? AND expiration >= ?",
+                (self.espace, repr(cle), time.time()),
+            ).fetchone()
+            valeur = MANQUANT
+            if res is not None:
+                valeur = self._decoder(self._cle_signee(cle), res[0])
+            # Compteur absent ou mal signé : repart de 0
+            valeur = (0 if valeur is MANQUANT else valeur) + delta
+            connexion.execute(
+                "INSERT OR REPLACE INTO cache (espace, cle, valeur, expiration) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    self.espace,
+                    repr(cle),
+                    self._encoder(self._cle_signee(cle), valeur),
+                    float("inf"),
+                ),
+            )
+            connexion.execute("COMMIT")
+        except Exception:
+            connexion.execute("ROLLBACK")
+            raise
+        return valeur
+
+    def _prendre_bail(self, cle, duree):
+        connexion = self._connexion()
+        maintenant = time.time()
+        connexion.execute("BEGIN IMMEDIATE")
+        try:
+            connexion.execute(
+                "DELETE FROM bail WHERE espace = ? AND cle = ? AND expiration < ?",
+                (self.espace, repr(cle), maintenant),
+            )
+            curseur = connexion.execute(
+                "INSERT OR IGNORE INTO bail (espace, cle, expiration) VALUES (?, ?, ?)",
+                (self.espace, repr(cle), maintenant + duree),
+            )
+            connexion.execute("COMMIT")
+        except Exception:
+            connexion.execute("ROLLBACK")
+            raise
+        return curseur.rowcount == 1
+
+    def _rendre_bail(self, cle):
+        self._connexion().execute(
+            "DELETE FROM bail WHERE espace = ? AND cle = ?", (self.espace, repr(cle))
+        )
+
+
+class CacheReseau(CacheSigne):
+    """Client d'un serveur de cache parlant le protocole texte de memcached
+    (memcached, ou utils/serveur_cache.py pour le développement)
+
+    Le serveur n'étant pas authentifié, les valeurs sont signées (voir CacheSigne)
+    et stockées avec le flag 1. Les compteurs sont stockés en texte (flag 0) pour
+    pouvoir utiliser la commande incr. En cas d'erreur réseau, le cache se comporte
+    comme s'il était vide : l'application continue sans lui. vider() vide tout le
+    serveur (utilisé uniquement lors d'un reset de la base).
+
+    Parameters
+    ----------
+    hote : str
+        adresse du serveur
+    port : int
+        port du serveur
+    delai : float
+        délai maximal (en secondes) des opérations réseau
+    """
+
+    def __init__(
+        self,
+        espace: str,
+        cle_secrete: bytes,
+        hote: str = "localhost",
+        port: int = 11211,
+        duree_vie: float = 300,
+        duree_vie_absent: float = 30,
+        delai: float = 0.5,
+    ):
+        super().__init__(espace, cle_secrete, duree_vie, duree_vie_absent)
+        self.hote = hote
+        self.port = port
+        self.delai = delai
+        self._local = threading.local()
+        # Après une erreur réseau, le serveur n'est plus sollicité pendant PAUSE_ERREUR s
+        self._pause_jusqu_a = 0.0
+
+    PAUSE_ERREUR = 5
+
+    def _cle(self, cle) -> bytes:
+        # Clés memcached : 250 octets au plus, sans espace ni caractère de contrôle
+        return f"{self.espace}:{hashlib.sha1(repr(cle).encode()).hexdigest()}".encode()
+
+    def _fichier(self):
+        fichier = getattr(self._local, "fichier", None)
+        if fichier is None:
+            connexion = socket.create_connection((self.hote, self.port), timeout=self.delai)
+            connexion.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            fichier = connexion.makefile("rwb")
+            self._local.connexion = connexion
+            self._local.fichier = fichier
+        return fichier
+
+    def _fermer(self):
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is not None:
+            connexion.close()
+        self._local.connexion = None
+        self._local.fichier = None
+
+    def _commande(self, ligne: bytes, donnees: bytes | None = None, lire=None):
+        """Envoie une commande et renvoie lire(fichier) (ou la ligne de réponse)
+        Renvoie MANQUANT en cas d'erreur réseau"""
+        if time.monotonic() < self._pause_jusqu_a:
+            self.metriques["erreurs"] += 1
+            return MANQUANT
+        try:
+            fichier = self._fichier()
+            fichier.write(ligne + b"\r\n")
+            if donnees is not None:
+                fichier.write(donnees + b"\r\n")
+            fichier.flush()
+            if lire is not None:
+                return lire(fichier)
+            return fichier.readline().rstrip(b"\r\n")
+        except OSError as e:
+            self._fermer()
+            self.metriques["erreurs"] += 1
+            self._pause_jusqu_a = time.monotonic() + self.PAUSE_ERREUR
+            logging.warning(f"Cache {self.espace} indisponible : {e}")
+            return MANQUANT
+
+    @staticmethod
+    def _expiration(duree_vie: float) -> int:
+        # 0 = pas d'expiration pour memcached : une durée non nulle vaut au moins 1 s
+        return max(1, int(round(duree_vie)))
+
+    def _lire(self, cle):
+        cle = self._cle(cle)
+
+        def lire(fichier):
+            entete = fichier.readline().rstrip(b"\r\n")
+            if entete == b"END":
+                return MANQUANT
+            _, _, flags, taille = entete.split()
+            donnees = fichier.read(int(taille) + 2)[:-2]
+            fichier.readline()  # END
+            return self._decoder(cle, donnees) if int(flags) == 1 else int(donnees)
+
+        return self._commande(b"get " + cle, lire=lire)
+
+    def _ecrire(self, cle, valeur, duree_vie):
+        cle = self._cle(cle)
+        donnees = self._encoder(cle, valeur)
+        self._commande(
+            b"set %s 1 %d %d" % (cle, self._expiration(duree_vie), len(donnees)),
+            donnees,
+        )
+
+    def _effacer(self, cle):
+        self._commande(b"delete " + self._cle(cle))
+
+    def _vider(self):
+        self._commande(b"flush_all")
+
+    def _incrementer(self, cle, delta):
+        cle = self._cle(cle)
+        reponse = self._commande(b"incr %s %d" % (cle, delta))
+        if reponse == b"NOT_FOUND":
+            # Création du compteur (add échoue si un autre client l'a créé entre-temps)
+            self._commande(b"add %s 0 0 1" % cle, b"0")
+            reponse = self._commande(b"incr %s %d" % (cle, delta))
+        if reponse is MANQUANT or not reponse.isdigit():
+            return 0
+        return int(reponse)
+
+    def _prendre_bail(self, cle, duree):
+        reponse = self._commande(
+            b"add %s:bail 0 %d 1" % (self._cle(cle), self._expiration(duree)), b"1"
+        )
+        # Serveur indisponible : chacun calcule de son côté
+        return reponse is MANQUANT or reponse == b"STORED"
+
+    def _rendre_bail(self, cle):
+        self._commande(b"delete %s:bail" % self._cle(cle))
+
+
+def creer_cache(
+    espace: str,
+    taille_max: int = 10000,
+    duree_vie: float = 300,
+    duree_vie_absent: float = 30,
+) -> Cache:
+    """Cache de l'espace de noms donné, avec le backend configuré par CACHE_BACKEND
+    ('memoire', 'sqlite' ou 'reseau')"""
+    backend = os.environ.get("CACHE_BACKEND", "memoire").lower()
+    if backend not in ("memoire", "sqlite", "reseau"):
+        raise ValueError("CACHE_BACKEND doit valoir 'memoire', 'sqlite' ou 'reseau'")
+    cle_secrete = os.environ.get("CACHE_CLE", "").encode()
+    if backend != "memoire" and not cle_secrete:
+        raise ValueError(f"CACHE_CLE doit être définie avec CACHE_BACKEND={backend}")
+
+    if backend == "memoire":
+        cache = CacheMemoire(espace, taille_max, duree_vie, duree_vie_absent)
+    elif backend == "sqlite":
+        chemin = os.environ.get("CACHE_FICHIER", "cache.sqlite")
+        cache = CacheSQLite(
+            espace, cle_secrete, chemin, duree_vie, duree_vie_absent, taille_max
+        )
+    else:
+        hote, _, port = os.environ.get("CACHE_SERVEUR", "localhost:11211").partition(":")
+        cache = CacheReseau(
+            espace,
+            cle_secrete,
+            hote,
+            int(port or 11211),
+            duree_vie,
+            duree_vie_absent,
+        )
+
+    with _verrou_caches:
+        _caches[espace] = cache
+    return cache
+
+
+def exporter_metriques_caches() -> str:
+    """Compteurs des caches au format Prometheus"""
+    lignes = [
+        "# HELP cache_operations_total Lectures (succes, echecs), calculs et erreurs des caches",
+        "# TYPE cache_operations_total counter",
+    ]
+    with _verrou_caches:
+        caches = sorted(_caches.items())
+    for espace, cache in caches:
+        for resultat in ("succes", "echecs", "calculs", "erreurs"):
+            lignes.append(
+                f'cache_operations_total{{espace="{espace}",resultat="{resultat}"}} '
+                f"{cache.metriques[resultat]}"
+            )
+    return "\n".join(lignes) + "\n"
@@ -0,0 +1,164 @@
+"""Compression des réponses HTTP (brotli ou gzip) au-delà d'une taille minimale
+
+Middleware ASGI : le corps complet de la réponse est compressé avec le meilleur encodage
+accepté par le client (en-tête Accept-Encoding). Ne sont pas compressées :
+- les réponses plus petites que `seuil` octets (le gain ne compense pas le coût CPU)
+- les réponses déjà encodées, les types non compressibles (images, archives...)
+- les réponses envoyées en plusieurs morceaux (StreamingResponse, flux SSE)
+
+brotli est utilisé si le paquet est installé (pip install brotli), sinon gzip seul.
+"""
+
+import gzip
+
+import anyio
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    brotli = None
+
+TYPES_COMPRESSIBLES = (
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "text/",
+)
+
+# Au-delà de cette taille, la compression est faite dans un thread pour ne pas
+# bloquer la boucle d'évènements (zlib et brotli libèrent le GIL)
+TAILLE_MIN_THREAD = 256 * 1024
+
+
+def encodages_acceptes(accept_encoding: str) -> set[str]:
+    """Encodages acceptés par le client (ceux de qualité q=0 sont exclus)"""
+    acceptes = set()
+    for element in accept_encoding.lower().split(","):
+        nom, _, parametres = element.strip().partition(";")
+        qualite = 1.0
+        parametres = parametres.strip()
+        if parametres.startswith("q="):
+            try:
+                qualite = float(parametres[2:])
+            except ValueError:
+                qualite = 0.0
+        if nom and qualite > 0:
+            acceptes.add(nom.strip())
+    return acceptes
+
+
+def choisir_encodage(accept_encoding: str) -> str | None:
+    """Encodage utilisé pour la réponse : 'br', 'gzip' ou None (pas de compression)"""
+    acceptes = encodages_acceptes(accept_encoding)
+    if brotli is not None and ("br" in acceptes or "*" in acceptes):
+        return "br"
+    if "gzip" in acceptes or "*" in acceptes:
+        return "gzip"
+    return None
+
+
+def compresser(
+    corps: bytes, encodage: str, niveau_gzip: int = 6, qualite_brotli: int = 4
+) -> bytes:
+    if encodage == "br":
+        return brotli.compress(corps, quality=qualite_brotli)
+    return gzip.compress(corps, compresslevel=niveau_gzip, mtime=0)
+
+
+class MiddlewareCompression:
+    """Middleware ASGI de compression des réponses
+
+    Parameters
+    ----------
+    app : ASGIApp
+        application encapsulée
+    seuil : int
+        taille minimale (en octets) d'une réponse compressée
+    niveau_gzip : int
+        niveau de compression gzip (1 à 9)
+    qualite_brotli : int
+        qualité de compression brotli (0 à 11), les valeurs élevées sont très lentes
+    """
+
+    def __init__(
+        self, app, seuil: int = 1024, niveau_gzip: int = 6, qualite_brotli: int = 4
+    ):
+        self.app = app
+        self.seuil = seuil
+        self.niveau_gzip = niveau_gzip
+        self.qualite_brotli = qualite_brotli
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for nom, valeur in scope["headers"]:
+            if nom == b"accept-encoding":
+                accept_encoding = valeur.decode("latin-1")
+                break
+        encodage = choisir_encodage(accept_encoding)
+        if encodage is None:
+            await self.app(scope, receive, send)
+            return
+
+        debut = None  # message http.response.start en attente
+        transmis = False  # la réponse passe telle quelle (streaming ou non compressible)
+
+        async def envoyer(message):
+            nonlocal debut, transmis
+            if transmis:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                debut = message
+                if not self._compressible(message["headers"]):
+                    transmis = True
+                    await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            corps = message.get("body", b"")
+            if message.get("more_body", False) or len(corps) < self.seuil:
+                transmis = True
+                await send(debut)
+                await send(message)
+                return
+
+            if len(corps) >= TAILLE_MIN_THREAD:
+                compresse = await anyio.to_thread.run_sync(
+                    compresser, corps, encodage, self.niveau_gzip, self.qualite_brotli
+                )
+            else:
+                compresse = compresser(corps, encodage, self.niveau_gzip, self.qualite_brotli)
+
+            entetes = [
+                (nom, valeur)
+                for nom, valeur in debut["headers"]
+                if nom not in (b"content-length", b"vary")
+            ]
+            vary = [valeur for nom, valeur in debut["headers"] if nom == b"vary"]
+            vary.append(b"Accept-Encoding")
+            entetes += [
+                (b"content-encoding", encodage.encode("latin-1")),
+                (b"content-length", str(len(compresse)).encode("latin-1")),
+                (b"vary", b", ".join(vary)),
+            ]
+            await send({**debut, "headers": entetes})
+            await send({"type": "http.response.body", "body": compresse})
+
+        await self.app(scope, receive, envoyer)
+
+    @staticmethod
+    def _compressible(entetes) -> bool:
+        type_contenu = b""
+        for nom, valeur in entetes:
+            if nom == b"content-encoding":
+                return False
+            if nom == b"content-type":
+                type_contenu = valeur
+        type_contenu = type_contenu.decode("latin-1").lower()
+        return type_contenu.startswith(TYPES_COMPRESSIBLES) and "event-stream" not in type_contenu
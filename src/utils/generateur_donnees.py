@@ -0,0 +1,180 @@
+import random
+
+from datetime import date, timedelta
+from typing import Iterator
+
+from utils.securite import hash_password, generer_salt
+
+
+SPORTS = ["course", "natation", "vélo", "randonnée", "autre"]
+
+# Vitesses plausibles (km/h) par sport, pour générer des distances cohérentes
+VITESSES_SPORTS = {
+    "course": (8.0, 14.0),
+    "natation": (2.0, 4.0),
+    "vélo": (18.0, 32.0),
+    "randonnée": (3.0, 6.0),
+    "autre": (4.0, 12.0),
+}
+
+NOMS = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand"]
+PRENOMS = ["Camille", "Louis", "Emma", "Hugo", "Chloe", "Lucas", "Lea", "Jules"]
+COMMENTAIRES = [
+    "Super activité !",
+    "Bravo, quelle régularité.",
+    "Belle sortie, le parcours a l'air magnifique.",
+    "Impressionnant comme allure !",
+    "On y retourne ensemble la semaine prochaine ?",
+]
+
+
+class GenerateurDonnees:
+    """Générateur de données synthétiques pour les bases de benchmark et de test de charge
+
+    Les activités, abonnements et jaimes suivent une loi de puissance : quelques
+    utilisateurs très actifs et très suivis, une longue traîne d'utilisateurs peu actifs.
+    Les lignes sont produites sous forme de tuples, prêtes à être chargées par COPY.
+
+    Tous les utilisateurs partagent le même mot de passe (self.mot_de_passe) : il est
+    haché une seule fois, les credentials sont donc générés sans coût de hachage par ligne.
+
+    Attributes
+    ----------
+    nb_utilisateurs : int
+        nombre d'utilisateurs à générer (ids de 1 à nb_utilisateurs)
+    nb_activites : int
+        nombre d'activités à générer (ids de 1 à nb_activites)
+    nb_abonnements_moyen : float
+        nombre moyen d'utilisateurs suivis par utilisateur
+    nb_jaimes_moyen : float
+        nombre moyen de jaimes par activité
+    nb_commentaires_moyen : float
+        nombre moyen de commentaires par activité
+    exposant : float
+        exposant de la loi de Zipf utilisée pour la popularité des utilisateurs
+    graine : int
+        graine du générateur aléatoire, pour des jeux de données reproductibles
+    mot_de_passe : str
+        mot de passe en clair commun à tous les utilisateurs générés
+    """
+
+    def __init__(
+        self,
+        nb_utilisateurs: int,
+        nb_activites: int,
+        nb_abonnements_moyen: float = 20,
+        nb_jaimes_moyen: float = 5,
+        nb_commentaires_moyen: float = 1,
+        exposant: float = 1.1,
+        graine: int = 42,
+        mot_de_passe: str = "motdepasse",
+        date_fin: date | None = None,
+    ):
+        if nb_utilisateurs < 2:
+            raise ValueError("Il faut au moins 2 utilisateurs")
+        if nb_activites < 0:
+            raise ValueError("Le nombre d'activités doit être positif")
+
+        self.nb_utilisateurs = nb_utilisateurs
+        self.nb_activites = nb_activites
+        self.nb_abonnements_moyen = nb_abonnements_moyen
+        self.nb_jaimes_moyen = nb_jaimes_moyen
+        self.nb_commentaires_moyen = nb_commentaires_moyen
+        self.exposant = exposant
+        self.graine = graine
+        self.mot_de_passe = mot_de_passe
+        self.date_fin = date_fin or date.today()
+
+        # Poids de popularité : le rang de chaque utilisateur est tiré au hasard
+        rng = random.Random(graine)
+        rangs = list(range(1, nb_utilisateurs + 1))
+        rng.shuffle(rangs)
+        self._ids_utilisateurs = list(range(1, nb_utilisateurs + 1))
+        self._poids_cumules = []
+        total = 0.0
+        for rang in rangs:
+            total += 1.0 / rang**exposant
+            self._poids_cumules.append(total)
+
+    def _tirer_degre(self, rng: random.Random, moyenne: float, maximum: int) -> int:
+        """Tire un degré suivant une loi de Pareto (alpha = 2) de moyenne donnée"""
+        if moyenne <= 0:
+            return 0
+        return min(maximum, int(moyenne / 2 * rng.paretovariate(2.0)))
+
+    def _tirer_utilisateurs(self, rng: random.Random, k: int) -> list[int]:
+        """Tire k utilisateurs (avec remise) proportionnellement à leur popularité"""
+        return rng.choices(self._ids_utilisateurs, cum_weights=self._poids_cumules, k=k)
+
+    def _auteurs_activites(self) -> list[int]:
+        """Auteur de chaque activité (même tirage à chaque appel grâce à la graine)"""
+        rng = random.Random(self.graine + 1)
+        return self._tirer_utilisateurs(rng, self.nb_activites)
+
+    def lignes_utilisateurs(self) -> Iterator[tuple]:
+        """(id_utilisateur, pseudo, nom, prenom, date_de_naissance, sexe)"""
+        rng = random.Random(self.graine + 2)
+        for id_utilisateur in self._ids_utilisateurs:
+            yield (
+                id_utilisateur,
+                f"util{id_utilisateur}",
+                rng.choice(NOMS),
+                rng.choice(PRENOMS),
+                date(1960, 1, 1) + timedelta(days=rng.randrange(45 * 365)),
+                rng.choice(["homme", "femme"]),
+            )
+
+    def lignes_credentials(self) -> Iterator[tuple]:
+        """(id_utilisateur, mot_de_passe_hash, sel), hash calculé une seule fois"""
+        sel = generer_salt()
+        mot_de_passe_hash = hash_password(self.mot_de_passe, sel)
+        for id_utilisateur in self._ids_utilisateurs:
+            yield (id_utilisateur, mot_de_passe_hash, sel)
+
+    def lignes_activites(self) -> Iterator[tuple]:
+        """(id_activite, id_utilisateur, sport, date_activite, distance, duree)"""
+        rng = random.Random(self.graine + 3)
+        for id_activite, id_utilisateur in enumerate(self._auteurs_activites(), 1):
+            sport = rng.choice(SPORTS)
+            vitesse_min, vitesse_max = VITESSES_SPORTS[sport]
+            duree = round(rng.lognormvariate(4.0, 0.5), 1)  # minutes, ~55 min en médiane
+            distance = round(rng.uniform(vitesse_min, vitesse_max) * duree / 60, 2)
+            date_activite = self.date_fin - timedelta(days=rng.randrange(365))
+            yield (id_activite, id_utilisateur, sport, date_activite, distance, duree)
+
+    def lignes_abonnements(self) -> Iterator[tuple]:
+        """(id_utilisateur_suiveur, id_utilisateur_suivi), sans doublon ni auto-abonnement"""
+        rng = random.Random(self.graine + 4)
+        for id_suiveur in self._ids_utilisateurs:
+            degre = self._tirer_degre(
+                rng, self.nb_abonnements_moyen, self.nb_utilisateurs - 1
+            )
+            suivis = set(self._tirer_utilisateurs(rng, degre))
+            suivis.discard(id_suiveur)
+            for id_suivi in suivis:
+                yield (id_suiveur, id_suivi)
+
+    def lignes_jaimes(self) -> Iterator[tuple]:
+        """(id_activite, id_auteur), sans doublon"""
+        rng = random.Random(self.graine + 5)
+        for id_activite in range(1, self.nb_activites + 1):
+            degre = self._tirer_degre(rng, self.nb_jaimes_moyen, self.nb_utilisateurs)
+            for id_auteur in set(self._tirer_utilisateurs(rng, degre)):
+                yield (id_activite, id_auteur)
+
+    def lignes_commentaires(self) -> Iterator[tuple]:
+        """(id_commentaire, id_activite, id_auteur, contenu, date_commentaire)"""
+        rng = random.Random(self.graine + 6)
+        id_commentaire = 0
+        for id_activite, ligne in enumerate(self.lignes_activites(), 1):
+            date_activite = ligne[3]
+            degre = self._tirer_degre(rng, self.nb_commentaires_moyen, 1000)
+            for id_auteur in self._tirer_utilisateurs(rng, degre):
+                id_commentaire += 1
+                yield (
+                    id_commentaire,
+                    id_activite,
+                    id_auteur,
+                    rng.choice(COMMENTAIRES),
+                    min(self.date_fin, date_activite + timedelta(days=rng.randrange(3))),
+                )
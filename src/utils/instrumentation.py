@@ -0,0 +1,246 @@
+"""Instrumentation des requêtes HTTP et des requêtes SQL
+
+Pour chaque requête HTTP, un objet MesuresRequete est placé dans une ContextVar par le
+middleware de app.py. Le curseur CurseurInstrumente (utilisé par DBConnection) y ajoute
+le nombre de requêtes SQL, leur durée et la plus lente. Les connexions y ajoutent leur
+temps d'ouverture. Les totaux de toutes les requêtes sont exposés au format Prometheus.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+import contextvars
+
+from collections import Counter
+
+import dotenv
+
+from psycopg2.extras import RealDictCursor
+
+dotenv.load_dotenv()
+
+# Une même requête SQL (à la valeur des paramètres près) exécutée au moins
+# SEUIL_N_PLUS_UN fois pendant une requête HTTP est signalée comme un motif N+1
+SEUIL_N_PLUS_UN = int(os.environ.get("SEUIL_N_PLUS_UN", "10"))
+
+# Une requête SQL plus lente que ce seuil (en ms) est écrite dans les logs
+SEUIL_REQUETE_LENTE_MS = float(os.environ.get("SEUIL_REQUETE_LENTE_MS", "200"))
+
+# Bornes (en secondes) de l'histogramme des durées des requêtes HTTP
+BORNES_DUREE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+_RE_CHAINE = re.compile(r"'(?:[^']|'')*'")
+_RE_NOMBRE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTE = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_RE_ESPACES = re.compile(r"\s+")
+
+
+def normaliser_requete(sql) -> str:
+    """Modèle d'une requête SQL : valeurs littérales remplacées par '?', espaces réduits"""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", errors="replace")
+    sql = _RE_CHAINE.sub("?", str(sql))
+    sql = _RE_NOMBRE.sub("?", sql)
+    sql = _RE_LISTE.sub("(?, ...)", sql)
+    return _RE_ESPACES.sub(" ", sql).strip()
+
+
+class MesuresRequete:
+    """Mesures collectées pendant le traitement d'une requête HTTP
+
+    L'objet est partagé (et non copié) par les threads qui traitent la requête :
+    un verrou protège les mises à jour.
+    """
+
+    def __init__(self):
+        self.nb_requetes = 0
+        self.duree_bdd = 0.0
+        self.nb_connexions = 0
+        self.duree_connexion = 0.0
+        self.requete_plus_lente = None
+        self.duree_plus_lente = 0.0
+        self.modeles = Counter()
+        self._verrou = threading.Lock()
+
+    def ajouter_requete(self, modele: str, duree: float):
+        with self._verrou:
+            self.nb_requetes += 1
+            self.duree_bdd += duree
+            self.modeles[modele] += 1
+            if duree > self.duree_plus_lente:
+                self.duree_plus_lente = duree
+                self.requete_plus_lente = modele
+
+    def ajouter_connexion(self, duree: float):
+        with self._verrou:
+            self.nb_connexions += 1
+            self.duree_connexion += duree
+
+    def motifs_n_plus_un(self, seuil: int = SEUIL_N_PLUS_UN) -> list[tuple[str, int]]:
+        """Modèles de requêtes exécutés au moins seuil fois"""
+        return [(modele, nb) for modele, nb in self.modeles.most_common() if nb >= seuil]
+
+
+# Mesures de la requête HTTP en cours (None en dehors d'une requête HTTP)
+mesures_requete = contextvars.ContextVar("mesures_requete", default=None)
+
+
+class Metriques:
+    """Compteurs cumulés depuis le démarrage du processus, exportés au format Prometheus"""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        with self._verrou:
+            self.http_requetes = Counter()
+            self.http_duree = {}
+            self.bdd_requetes = 0
+            self.bdd_duree = 0.0
+            self.bdd_connexions = 0
+            self.bdd_duree_connexion = 0.0
+            self.n_plus_un = Counter()
+
+    def ajouter_requete_sql(self, duree: float):
+        with self._verrou:
+            self.bdd_requetes += 1
+            self.bdd_duree += duree
+
+    def ajouter_connexion(self, duree: float):
+        with self._verrou:
+            self.bdd_connexions += 1
+            self.bdd_duree_connexion += duree
+
+    def ajouter_requete_http(self, methode: str, route: str, statut: int, duree: float):
+        with self._verrou:
+            self.http_requetes[(methode, route, str(statut))] += 1
+            compteurs = self.http_duree.setdefault(route, [0] * len(BORNES_DUREE) + [0, 0.0])
+            for i, borne in enumerate(BORNES_DUREE):
+                if duree <= borne:
+                    compteurs[i] += 1
+            compteurs[-2] += 1
+            compteurs[-1] += duree
+
+    def ajouter_n_plus_un(self, route: str):
+        with self._verrou:
+            self.n_plus_un[route] += 1
+
+    def exporter(self) -> str:
+        """Texte au format d'exposition Prometheus"""
+        lignes = []
+
+        def entete(nom, type_metrique, aide):
+            lignes.append(f"# HELP {nom} {aide}")
+            lignes.append(f"# TYPE {nom} {type_metrique}")
+
+        with self._verrou:
+            entete("http_requetes_total", "counter", "Requetes HTTP traitees")
+            for (methode, route, statut), nb in sorted(self.http_requetes.items()):
+                lignes.append(
+                    f'http_requetes_total{{methode="{methode}",route="{route}",'
+                    f'statut="{statut}"}} {nb}'
+                )
+
+            entete("http_duree_secondes", "histogram", "Duree des requetes HTTP")
+            for route, compteurs in sorted(self.http_duree.items()):
+                for borne, nb in zip(BORNES_DUREE, compteurs):
+                    lignes.append(f'http_duree_secondes_bucket{{route="{route}",le="{borne}"}} {nb}')
+                lignes.append(
+                    f'http_duree_secondes_bucket{{route="{route}",le="+Inf"}} {compteurs[-2]}'
+                )
+                lignes.append(f'http_duree_secondes_count{{route="{route}"}} {compteurs[-2]}')
+                lignes.append(f'http_duree_secondes_sum{{route="{route}"}} {compteurs[-1]:.6f}')
+
+            entete("bdd_requetes_total", "counter", "Requetes SQL executees")
+            lignes.append(f"bdd_requetes_total {self.bdd_requetes}")
+            entete("bdd_duree_secondes_total", "counter", "Temps passe dans les requetes SQL")
+            lignes.append(f"bdd_duree_secondes_total {self.bdd_duree:.6f}")
+            entete("bdd_connexions_total", "counter", "Connexions ouvertes a la base")
+            lignes.append(f"bdd_connexions_total {self.bdd_connexions}")
+            entete(
+                "bdd_connexion_duree_secondes_total",
+                "counter",
+                "Temps passe a ouvrir les connexions a la base",
+            )
+            lignes.append(f"bdd_connexion_duree_secondes_total {self.bdd_duree_connexion:.6f}")
+
+            entete("n_plus_un_total", "counter", "Requetes HTTP presentant un motif N+1")
+            for route, nb in sorted(self.n_plus_un.items()):
+                lignes.append(f'n_plus_un_total{{route="{route}"}} {nb}')
+
+        return "\n".join(lignes) + "\n"
+
+
+metriques = Metriques()
+
+
+def enregistrer_connexion(duree: float):
+    """Enregistre le temps d'ouverture d'une connexion à la base"""
+    metriques.ajouter_connexion(duree)
+    mesures = mesures_requete.get()
+    if mesures is not None:
+        mesures.ajouter_connexion(duree)
+
+
+def _enregistrer_requete_sql(sql, duree: float):
+    metriques.ajouter_requete_sql(duree)
+    mesures = mesures_requete.get()
+    if mesures is not None or duree * 1000 >= SEUIL_REQUETE_LENTE_MS:
+        modele = normaliser_requete(sql)
+        if mesures is not None:
+            mesures.ajouter_requete(modele, duree)
+        if duree * 1000 >= SEUIL_REQUETE_LENTE_MS:
+            logger.warning("Requete SQL lente (%.1f ms) : %s", duree * 1000, modele)
+
+
+class CurseurInstrumente(RealDictCursor):
+    """RealDictCursor qui mesure la durée de chaque requête exécutée"""
+
+    def execute(self, query, vars=None):
+        debut = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _enregistrer_requete_sql(query, time.perf_counter() - debut)
+
+    def executemany(self, query, vars_list):
+        debut = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _enregistrer_requete_sql(query, time.perf_counter() - debut)
+
+    def copy_expert(self, sql, file, size=8192):
+        debut = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _enregistrer_requete_sql(sql, time.perf_counter() - debut)
+
+
+def entete_server_timing(mesures: MesuresRequete, duree_totale: float, duree_cpu: float) -> str:
+    """Valeur de l'en-tête Server-Timing (durées en millisecondes)"""
+    return ", ".join(
+        [
+            f'bdd;dur={mesures.duree_bdd * 1000:.1f};desc="{mesures.nb_requetes} requetes"',
+            f"sql-max;dur={mesures.duree_plus_lente * 1000:.1f}",
+            f'connexion;dur={mesures.duree_connexion * 1000:.1f};desc="{mesures.nb_connexions} connexions"',
+            f"cpu;dur={duree_cpu * 1000:.1f}",
+            f"total;dur={duree_totale * 1000:.1f}",
+        ]
+    )
+
+
+def signaler_n_plus_un(mesures: MesuresRequete, methode: str, route: str):
+    """Écrit dans les logs les requêtes SQL répétées (motif N+1) et les compte"""
+    motifs = mesures.motifs_n_plus_un()
+    if not motifs:
+        return
+    metriques.ajouter_n_plus_un(route)
+    for modele, nb in motifs:
+        logger.warning("Motif N+1 sur %s %s : %d executions de %s", methode, route, nb, modele)
@@ -0,0 +1,210 @@
+"""Limitation du nombre de tentatives d'authentification (seaux à jetons)
+
+Chaque clé (pseudo ou adresse IP) dispose d'un seau de `capacite` jetons, rempli au
+rythme de `debit` jetons par seconde. Une tentative consomme un jeton : si le seau est
+vide, elle est refusée et le temps d'attente avant le prochain jeton est renvoyé.
+
+La tentative peut aussi être vérifiée sans consommer de jeton (attente), et un jeton
+consommé peut être rendu (rendre), par exemple quand la tentative a réussi.
+
+Implémentations :
+- LimiteurMemoire : propre au processus, O(1) en mémoire par clé active, les clés
+  les moins récemment utilisées sont retirées au-delà de `taille_max`
+- LimiteurSQLite : état partagé par les workers uvicorn d'une même machine. Ses
+  méthodes font des entrées-sorties bloquantes (attribut bloquant)
+- LimiteurInactif : n'impose aucune limite (tests de charge)
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+from collections import OrderedDict
+
+import dotenv
+
+dotenv.load_dotenv()
+
+
+class LimiteurMemoire:
+    """Seaux à jetons en mémoire
+
+    Parameters
+    ----------
+    capacite : float
+        nombre maximal de tentatives consécutives
+    debit : float
+        nombre de jetons rendus par seconde
+    taille_max : int
+        nombre maximal de clés suivies
+    """
+
+    bloquant = False
+
+    def __init__(self, capacite: float, debit: float, taille_max: int = 100000):
+        self.capacite = capacite
+        self.debit = debit
+        self.taille_max = taille_max
+        self._seaux = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def _modifier(self, cle: str, variation: float, condition: bool) -> float:
+        """Ajoute variation aux jetons de la clé (si condition, seulement quand au moins
+        un jeton est disponible)
+        Renvoie 0 si un jeton était disponible, sinon le temps d'attente (en secondes)"""
+        maintenant = time.monotonic()
+        with self._verrou:
+            jetons, dernier = self._seaux.pop(cle, (self.capacite, maintenant))
+            jetons = min(self.capacite, jetons + (maintenant - dernier) * self.debit)
+            if jetons >= 1:
+                attente = 0.0
+            else:
+                attente = (1 - jetons) / self.debit
+            if attente == 0 or not condition:
+                jetons = min(self.capacite, jetons + variation)
+            self._seaux[cle] = (jetons, maintenant)
+            if len(self._seaux) > self.taille_max:
+                self._seaux.popitem(last=False)
+        return attente
+
+    def consommer(self, cle: str) -> float:
+        """Consomme un jeton pour la clé
+        Renvoie 0 si la tentative est autorisée, sinon le temps d'attente (en secondes)"""
+        return self._modifier(cle, -1, condition=True)
+
+    def attente(self, cle: str) -> float:
+        """Temps d'attente avant la prochaine tentative (0 si autorisée), sans consommer
+        de jeton"""
+        return self._modifier(cle, 0, condition=True)
+
+    def rendre(self, cle: str):
+        """Rend un jeton consommé pour la clé"""
+        self._modifier(cle, 1, condition=False)
+
+
+class LimiteurSQLite:
+    """Seaux à jetons stockés dans une base SQLite locale, partagée entre processus
+
+    Parameters
+    ----------
+    chemin : str
+        fichier SQLite
+    espace : str
+        préfixe des clés (plusieurs limiteurs peuvent partager le fichier)
+    capacite : float
+        nombre maximal de tentatives consécutives
+    debit : float
+        nombre de jetons rendus par seconde
+    """
+
+    bloquant = True
+
+    def __init__(self, chemin: str, espace: str, capacite: float, debit: float):
+        self.chemin = chemin
+        self.espace = espace
+        self.capacite = capacite
+        self.debit = debit
+        self._local = threading.local()
+        self._nb_appels = 0
+        with self._connexion() as connexion:
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS seau "
+                "(cle TEXT PRIMARY KEY, jetons REAL NOT NULL, dernier REAL NOT NULL)"
+            )
+
+    def _connexion(self) -> sqlite3.Connection:
+        # Une connexion par thread (les connexions sqlite3 ne se partagent pas entre threads)
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=5, isolation_level=None)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("PRAGMA synchronous=OFF")
+            self._local.connexion = connexion
+        return connexion
+
+    def _modifier(self, cle: str, variation: float, condition: bool) -> float:
+        """Ajoute variation aux jetons de la clé (si condition, seulement quand au moins
+        un jeton est disponible)
+        Renvoie 0 si un jeton était disponible, sinon le temps d'attente (en secondes)"""
+        cle = f"{self.espace}:{cle}"
+        # Horloge commune aux processus (time.monotonic ne l'est pas forcément)
+        maintenant = time.time()
+        connexion = self._connexion()
+        connexion.execute("BEGIN IMMEDIATE")
+        try:
+            res = connexion.execute(
+                "SELECT jetons, dernier FROM seau WHERE cle = ?", (cle,)
+            ).fetchone()
+            jetons, dernier = res if res is not None else (self.capacite, maintenant)
+            jetons = min(self.capacite, jetons + max(0.0, maintenant - dernier) * self.debit)
+            if jetons >= 1:
+                attente = 0.0
+            else:
+                attente = (1 - jetons) / self.debit
+            if attente == 0 or not condition:
+                jetons = min(self.capacite, jetons + variation)
+            connexion.execute(
+                "INSERT OR REPLACE INTO seau (cle, jetons, dernier) VALUES (?, ?, ?)",
+                (cle, jetons, maintenant),
+            )
+            connexion.execute("COMMIT")
+        except Exception:
+            connexion.execute("ROLLBACK")
+            raise
+
+        self._nb_appels += 1
+        if self._nb_appels % 1000 == 0:
+            self.purger()
+        return attente
+
+    def consommer(self, cle: str) -> float:
+        """Consomme un jeton pour la clé
+        Renvoie 0 si la tentative est autorisée, sinon le temps d'attente (en secondes)"""
+        return self._modifier(cle, -1, condition=True)
+
+    def attente(self, cle: str) -> float:
+        """Temps d'attente avant la prochaine tentative (0 si autorisée), sans consommer
+        de jeton"""
+        return self._modifier(cle, 0, condition=True)
+
+    def rendre(self, cle: str):
+        """Rend un jeton consommé pour la clé"""
+        self._modifier(cle, 1, condition=False)
+
+    def purger(self):
+        """Supprime les seaux redevenus pleins (équivalents à une clé absente)"""
+        delai_remplissage = self.capacite / self.debit
+        self._connexion().execute(
+            "DELETE FROM seau WHERE cle LIKE ? AND dernier < ?",
+            (f"{self.espace}:%", time.time() - delai_remplissage),
+        )
+
+
+class LimiteurInactif:
+    """Limiteur qui autorise toutes les tentatives"""
+
+    bloquant = False
+
+    def consommer(self, cle: str) -> float:
+        return 0.0
+
+    def attente(self, cle: str) -> float:
+        return 0.0
+
+    def rendre(self, cle: str):
+        pass
+
+
+def creer_limiteur(espace: str, capacite: float, debit: float):
+    """Limiteur configuré par la variable LIMITEUR_BACKEND ('memoire', 'sqlite' ou
+    'aucun')"""
+    backend = os.environ.get("LIMITEUR_BACKEND", "memoire").lower()
+    if backend == "sqlite":
+        chemin = os.environ.get("LIMITEUR_FICHIER", "limiteur_debit.sqlite")
+        return LimiteurSQLite(chemin, espace, capacite, debit)
+    if backend == "memoire":
+        return LimiteurMemoire(capacite, debit)
+    if backend == "aucun":
+        return LimiteurInactif()
+    raise ValueError("LIMITEUR_BACKEND doit valoir 'memoire', 'sqlite' ou 'aucun'")
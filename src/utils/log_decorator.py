@@ -1,28 +1,105 @@
+import os
 import logging.config
 import numbers
+import contextvars
+
+import dotenv
 
 from functools import wraps
 
+dotenv.load_dotenv()
 
-class LogIndetation:
-    """Pour indenter les logs lorsque l'on rentre dans une nouvelle méthode"""
+# Mettre LOG_DECORATEUR=inactif (par ex. en production) pour que @log renvoie
+# la méthode telle quelle : aucun surcoût à l'appel
+DECORATEUR_ACTIF = os.environ.get("LOG_DECORATEUR", "actif").lower() not in (
+    "inactif",
+    "0",
+    "false",
+    "non",
+)
+
+PARAMETRES_MASQUES = {"password", "passwd", "pwd", "pass", "mot_de_passe", "mdp"}
+
+# Niveau d'imbrication propre à chaque thread / tâche asynchrone
+_niveau_indentation = contextvars.ContextVar("niveau_indentation_log", default=0)
 
-    current_indentation = 0
+
+class LogIndetation:
+    """Pour indenter les logs lorsque l'on rentre dans une nouvelle méthode
+    Le niveau est stocké dans une ContextVar : chaque requête traitée en parallèle
+    (threadpool FastAPI) a sa propre indentation"""
 
     @classmethod
     def increase_indentation(cls):
         """Ajouter une indentation"""
-        cls.current_indentation += 1
+        _niveau_indentation.set(_niveau_indentation.get() + 1)
 
     @classmethod
     def decrease_indentation(cls):
         """Retirer une indentation"""
-        cls.current_indentation -= 1
+        _niveau_indentation.set(max(0, _niveau_indentation.get() - 1))
 
     @classmethod
     def get_indentation(cls):
         """Obtenir l'indentation"""
-        return "    " * cls.current_indentation
+        return "    " * _niveau_indentation.get()
+
+
+class _Appel:
+    """Représentation d'un appel de méthode, calculée seulement si un handler écrit le message"""
+
+    __slots__ = ("func", "args", "kwargs", "_texte")
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self._texte = None
+
+    def __str__(self):
+        if self._texte is None:
+            class_name = self.args[0].__class__.__name__ if self.args else ""
+            param_names = self.func.__code__.co_varnames[1 : self.func.__code__.co_argcount]
+
+            # Paramètres positionnels puis nommés, en cachant les mots de passe
+            args_list = []
+            for i, arg in enumerate(self.args[1:]):
+                if i < len(param_names) and param_names[i] in PARAMETRES_MASQUES:
+                    args_list.append("*****")
+                else:
+                    args_list.append(arg if isinstance(arg, numbers.Number) else str(arg))
+            for nom, valeur in self.kwargs.items():
+                if nom in PARAMETRES_MASQUES:
+                    args_list.append("*****")
+                else:
+                    args_list.append(
+                        valeur if isinstance(valeur, numbers.Number) else str(valeur)
+                    )
+
+            # Transforme en tuple pour avoir un affichage avec des parentheses
+            self._texte = f"{class_name}.{self.func.__name__}{tuple(args_list)}"
+        return self._texte
+
+
+class _Sortie:
+    """Aperçu de la valeur retournée, calculé seulement si un handler écrit le message"""
+
+    __slots__ = ("result",)
+
+    def __init__(self, result):
+        self.result = result
+
+    def __str__(self):
+        result = self.result
+        # Reduction de l affichage de la sortie si trop longue
+        if isinstance(result, list):
+            return f"{[str(item) for item in result[:3]]} ... ({len(result)} elements)"
+        if isinstance(result, dict):
+            apercu = [(str(k), str(v)) for k, v in list(result.items())[:3]]
+            return f"{apercu} ... ({len(result)} elements)"
+        if isinstance(result, str) and len(result) > 50:
+            return f"{result[:50]} ... ({len(result)} caracteres)"
+        return str(result)
 
 
 def log(func):
@@ -30,57 +107,32 @@ def log(func):
     Lorsque ce décorateur est appliqué à une méthode, cela affichera dans les logs :
     - l'appel de cette méthode avec les valeurs de paramètres
     - la sortie retournée par cette méthode
+
+    Si le niveau INFO est désactivé, la méthode est appelée directement, sans aucun formatage.
     """
+    if not DECORATEUR_ACTIF:
+        return func
 
     @wraps(func)
     def wrapper(*args, **kwargs):
+        # Obtenu à l'appel : un logger créé à l'import, avant logging.config.dictConfig,
+        # serait désactivé par une configuration sans disable_existing_loggers: false
         logger = logging.getLogger(__name__)
-
-        LogIndetation.increase_indentation()
-        indentation = LogIndetation.get_indentation()
-
-        # Recuperation des parametres de la methode
-        class_name = args[0].__class__.__name__ if args else ""
-        method_name = func.__name__
-        args_list = list(
-            [
-                str(arg) if not isinstance(arg, numbers.Number) else arg
-                for arg in args[1:]
-            ]
-            + list(kwargs.values())
-        )
-
-        # pour cacher les mots de passe
-        param_names = func.__code__.co_varnames[1 : func.__code__.co_argcount]
-        for i, v in enumerate(param_names):
-            if v in ["password", "passwd", "pwd", "pass", "mot_de_passe", "mdp"]:
-                args_list[i] = "*****"
-
-        # Transforme en tuple pour avoir un affichage avec des parentheses
-        args_list = tuple(args_list)
-
-        # Affichage dans le fichier de log
-        logger.info(f"{indentation}{class_name}.{method_name}{args_list} - DEBUT")
-        result = func(*args, **kwargs)
-        logger.info(f"{indentation}{class_name}.{method_name}{args_list} - FIN")
-
-        # Reduction de l affichage de la sortie si trop longue
-        if isinstance(result, list):
-            result_str = str([str(item) for item in result[:3]])
-            result_str += " ... (" + str(len(result)) + " elements)"
-        elif isinstance(result, dict):
-            result_str = [(str(k), str(v)) for k, v in result.items()][:3]
-            result_str += " ... (" + str(len(result)) + " elements)"
-        elif isinstance(result, str) and len(result) > 50:
-            result_str = result[:50]
-            result_str += " ... (" + str(len(result)) + " caracteres)"
-        else:
-            result_str = str(result)
-
-        logger.info(f"{indentation}   └─> Sortie : {result_str}")
-
-        LogIndetation.decrease_indentation()
-
-        return result
+        if not logger.isEnabledFor(logging.INFO):
+            return func(*args, **kwargs)
+
+        token = _niveau_indentation.set(_niveau_indentation.get() + 1)
+        try:
+            indentation = LogIndetation.get_indentation()
+            appel = _Appel(func, args, kwargs)
+
+            logger.info("%s%s - DEBUT", indentation, appel)
+            result = func(*args, **kwargs)
+            logger.info("%s%s - FIN", indentation, appel)
+            logger.info("%s   └─> Sortie : %s", indentation, _Sortie(result))
+
+            return result
+        finally:
+            _niveau_indentation.reset(token)
 
     return wrapper
@@ -1,9 +1,140 @@
 import os
+import copy
+import json
+import queue
+import atexit
 import logging
 import logging.config
+import logging.handlers
+import contextvars
 import yaml
 
 
+# Identifiant de la requête HTTP en cours (renseigné par un middleware de app.py)
+id_requete = contextvars.ContextVar("id_requete", default="-")
+
+_listener = None
+_handler_file = None
+_arret_enregistre = False
+_formateur_exceptions = logging.Formatter()
+
+
+class FiltreIdRequete(logging.Filter):
+    """Ajoute l'identifiant de la requête en cours aux enregistrements de log"""
+
+    def filter(self, record):
+        # Déjà renseigné si l'enregistrement vient de la file d'attente
+        if not hasattr(record, "id_requete"):
+            record.id_requete = id_requete.get()
+        return True
+
+
+class FormateurJson(logging.Formatter):
+    """Formateur produisant une ligne JSON par enregistrement (logs structurés)"""
+
+    def format(self, record):
+        donnees = {
+            "date": self.formatTime(record, self.datefmt),
+            "niveau": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "id_requete": getattr(record, "id_requete", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            donnees["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Trace déjà formatée par QueueHandlerBorne.prepare
+            donnees["exception"] = record.exc_text
+        return json.dumps(donnees, ensure_ascii=False)
+
+
+class QueueHandlerBorne(logging.handlers.QueueHandler):
+    """QueueHandler sur une file de taille bornée
+    Si la file est pleine : l'enregistrement est rejeté (politique "rejeter")
+    ou le thread appelant attend qu'une place se libère (politique "bloquer")"""
+
+    def __init__(self, file: queue.Queue, bloquer: bool = False):
+        super().__init__(file)
+        self.bloquer = bloquer
+        self.nb_rejetes = 0
+
+    def prepare(self, record):
+        """Comme QueueHandler.prepare, fige le message (msg % args) et la trace
+        d'exception dans le thread appelant : l'enregistrement mis en file ne garde
+        aucune référence aux arguments, qui peuvent changer après l'appel. Seule la
+        mise en forme (format des handlers) est faite dans le thread du listener"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _formateur_exceptions.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.bloquer:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.nb_rejetes += 1
+
+
+def arreter_file_attente():
+    """Vide la file de logs et arrête le thread d'écriture"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def installer_file_attente(taille_max: int = 10000, politique: str = "rejeter"):
+    """Remplace les handlers du logger racine par un QueueHandler :
+    l'écriture sur disque est faite par un QueueListener dans un thread dédié"""
+    global _listener, _handler_file, _arret_enregistre
+
+    if politique not in ("rejeter", "bloquer"):
+        raise ValueError("La politique de la file de logs doit être 'rejeter' ou 'bloquer'")
+
+    arreter_file_attente()
+
+    racine = logging.getLogger()
+    handlers = list(racine.handlers)
+    for handler in handlers:
+        racine.removeHandler(handler)
+
+    file = queue.Queue(maxsize=taille_max)
+    handler_file = QueueHandlerBorne(file, bloquer=(politique == "bloquer"))
+    # Le filtre s'exécute dans le thread de la requête, où la ContextVar est renseignée
+    handler_file.addFilter(FiltreIdRequete())
+    racine.addHandler(handler_file)
+
+    _listener = logging.handlers.QueueListener(file, *handlers, respect_handler_level=True)
+    _listener.start()
+    _handler_file = handler_file
+    if not _arret_enregistre:
+        atexit.register(arreter_file_attente)
+        _arret_enregistre = True
+
+
+def exporter_metriques_logs() -> str:
+    """Enregistrements rejetés par la file de logs (politique "rejeter") et taille
+    de la file, au format Prometheus"""
+    nb_rejetes = _handler_file.nb_rejetes if _handler_file is not None else 0
+    taille = _handler_file.queue.qsize() if _handler_file is not None else 0
+    return (
+        "# HELP logs_rejetes_total Logs rejetés (file d'attente pleine)\n"
+        "# TYPE logs_rejetes_total counter\n"
+        f"logs_rejetes_total {nb_rejetes}\n"
+        "# HELP logs_file_attente Enregistrements de log en attente d'écriture\n"
+        "# TYPE logs_file_attente gauge\n"
+        f"logs_file_attente {taille}\n"
+    )
+
+
 def initialiser_logs(nom):
     """Initialiser les logs à partir du fichier de config"""
 
@@ -14,10 +145,19 @@ def initialiser_logs(nom):
     # Création du dossier logs à la racine si non existant
     os.makedirs("logs", exist_ok=True)
 
-    stream = open("logging_config.yml", encoding="utf-8")
-    config = yaml.load(stream, Loader=yaml.FullLoader)
+    with open("logging_config.yml", encoding="utf-8") as stream:
+        config = yaml.load(stream, Loader=yaml.FullLoader)
+
+    # Section propre au projet, inconnue de dictConfig
+    options_file = config.pop("file_attente", None) or {}
     logging.config.dictConfig(config)
 
+    if options_file.get("active", False):
+        installer_file_attente(
+            taille_max=options_file.get("taille_max", 10000),
+            politique=options_file.get("politique", "rejeter"),
+        )
+
     logging.info("-" * 50)
     logging.info(f"Lancement {nom}                           ")
     logging.info("-" * 50)
@@ -0,0 +1,87 @@
+"""Profileur statistique par échantillonnage des piles d'appels
+
+Un thread dédié relève à intervalle régulier la pile de chaque thread du processus
+(sys._current_frames) et compte les piles identiques. Le résultat est produit au
+format "collapsed" (une pile par ligne, fonctions séparées par ';', suivie du nombre
+d'échantillons), lisible par flamegraph.pl ou https://www.speedscope.app.
+"""
+
+import os
+import sys
+import threading
+
+from collections import Counter
+
+# Fonctions en bout de pile d'un thread qui attend (pool de threads inactif, boucle
+# d'évènements sans travail) : ces échantillons sont ignorés par défaut
+FONCTIONS_ATTENTE = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+# Un seul profilage à la fois dans le processus
+verrou_profilage = threading.Lock()
+
+
+def _nom_fonction(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}".replace(";", ":")
+
+
+def _est_en_attente(frame) -> bool:
+    fichier = os.path.basename(frame.f_code.co_filename)
+    return (fichier, frame.f_code.co_name) in FONCTIONS_ATTENTE
+
+
+class Profileur:
+    """Échantillonneur de piles d'appels, exécuté dans son propre thread
+
+    Parameters
+    ----------
+    intervalle : float
+        temps (en secondes) entre deux relevés
+    inclure_attente : bool
+        si True, les threads en attente sont aussi comptés
+    """
+
+    def __init__(self, intervalle: float = 0.005, inclure_attente: bool = False):
+        self.intervalle = intervalle
+        self.inclure_attente = inclure_attente
+        self.piles = Counter()
+        self.nb_releves = 0
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._echantillonner, name="Profileur", daemon=True)
+
+    def demarrer(self):
+        self._thread.start()
+
+    def arreter(self) -> Counter:
+        """Arrête l'échantillonnage et renvoie le nombre d'échantillons par pile"""
+        self._arret.set()
+        self._thread.join()
+        return self.piles
+
+    def _echantillonner(self):
+        ident_profileur = threading.get_ident()
+        while not self._arret.wait(self.intervalle):
+            noms_threads = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == ident_profileur:
+                    continue
+                if not self.inclure_attente and _est_en_attente(frame):
+                    continue
+                pile = []
+                while frame is not None:
+                    pile.append(_nom_fonction(frame))
+                    frame = frame.f_back
+                pile.append(noms_threads.get(ident, str(ident)).replace(";", ":"))
+                self.piles[";".join(reversed(pile))] += 1
+            self.nb_releves += 1
+
+    def exporter_collapsed(self) -> str:
+        """Piles au format collapsed (flamegraph.pl, speedscope)"""
+        return "".join(f"{pile} {nb}\n" for pile, nb in self.piles.most_common())
+
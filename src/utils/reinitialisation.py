@@ -0,0 +1,34 @@
+"""États dérivés de la base à remettre à zéro après sa réinitialisation
+
+Les modules qui gardent en mémoire ou en cache des données lues en base (caches,
+index, tampons d'écriture) enregistrent à leur import une fonction de remise à zéro
+avec a_reinitialiser. ResetDatabase.lancer les appelle toutes après le reset, sans
+dépendre des fonctionnalités concernées.
+"""
+
+import logging
+import threading
+
+_fonctions = []
+_verrou = threading.Lock()
+
+
+def a_reinitialiser(fonction):
+    """Enregistre une fonction sans argument à appeler après chaque reset de la base.
+    Renvoie la fonction, pour être utilisable comme décorateur"""
+    with _verrou:
+        if fonction not in _fonctions:
+            _fonctions.append(fonction)
+    return fonction
+
+
+def reinitialiser_etats():
+    """Appelle les fonctions enregistrées, dans l'ordre d'enregistrement. Une erreur
+    est journalisée sans empêcher les remises à zéro suivantes"""
+    with _verrou:
+        fonctions = list(_fonctions)
+    for fonction in fonctions:
+        try:
+            fonction()
+        except Exception as e:
+            logging.error(f"Réinitialisation de {fonction!r} en échec : {e}")
@@ -1,14 +1,68 @@
 import os
 import logging
+import argparse
+import pkgutil
+import importlib
 import dotenv
 
+from typing import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
+from psycopg2.extras import execute_values
+
 from utils.log_decorator import log
 from utils.singleton import Singleton
+from utils.generateur_donnees import GenerateurDonnees
 from dao.db_connection import DBConnection
 
+import dao
 from utils.securite import hash_password, generer_salt
+from utils.reinitialisation import reinitialiser_etats
+
+# Environnement des tests DAO, actif le temps du reset (et à réutiliser par les tests)
+# Coût bcrypt minimal : les tests hachent les mots de passe à chaque reset
+ENV_TEST = {"POSTGRES_SCHEMA": "projet_test_dao", "BCRYPT_COUT": "4"}
+
+
+class _FluxCopy:
+    """Objet 'fichier' lu par COPY FROM STDIN, alimenté au fil de l'eau par un itérateur de tuples
+    (évite de construire en mémoire le texte complet de plusieurs millions de lignes)"""
+
+    _ECHAPPEMENTS = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+    def __init__(self, lignes: Iterable[tuple]):
+        self._lignes = iter(lignes)
+        self._tampon = ""
+
+    def _formater(self, ligne: tuple) -> str:
+        return (
+            "\t".join(
+                "\\N" if v is None else str(v).translate(self._ECHAPPEMENTS)
+                for v in ligne
+            )
+            + "\n"
+        )
+
+    def read(self, taille: int = -1) -> str:
+        morceaux = [self._tampon]
+        longueur = len(self._tampon)
+        while taille < 0 or longueur < taille:
+            ligne = next(self._lignes, None)
+            if ligne is None:
+                break
+            texte = self._formater(ligne)
+            morceaux.append(texte)
+            longueur += len(texte)
+        donnees = "".join(morceaux)
+        if taille < 0:
+            self._tampon = ""
+            return donnees
+        self._tampon = donnees[taille:]
+        return donnees[:taille]
+
+    def readline(self, taille: int = -1) -> str:
+        return self.read(taille)
 
 
 class ResetDatabase(metaclass=Singleton):
@@ -17,15 +71,17 @@ class ResetDatabase(metaclass=Singleton):
     """
 
     @log
-    def lancer(self, test_dao=False):
+    def lancer(self, test_dao=False, generateur: GenerateurDonnees | None = None):
         """Lancement de la réinitialisation des données
-        Si test_dao = True : réinitialisation des données de test"""
+        Si test_dao = True : réinitialisation des données de test
+        Si un generateur est fourni : la base est peuplée avec ses données synthétiques
+        (chargées par COPY) au lieu des scripts SQL de population"""
         if test_dao:
-            mock.patch.dict(os.environ, {"POSTGRES_SCHEMA": "projet_test_dao"}).start()
-            pop_data_path = "data/pop_db_test.sql"
-        else:
-            pop_data_path = "data/pop_db.sql"
+            with mock.patch.dict(os.environ, ENV_TEST):
+                return self._reinitialiser("data/pop_db_test.sql", generateur)
+        return self._reinitialiser("data/pop_db.sql", generateur)
 
+    def _reinitialiser(self, pop_data_path: str, generateur: GenerateurDonnees | None):
         dotenv.load_dotenv()
 
         schema = os.environ["POSTGRES_SCHEMA"]
@@ -38,42 +94,27 @@ class ResetDatabase(metaclass=Singleton):
         init_db_as_string = init_db.read()
         init_db.close()
 
-        pop_db = open(pop_data_path, encoding="utf-8")
-        pop_db_as_string = pop_db.read()
-        pop_db.close()
-
         try:
             with DBConnection().connection as connection:
                 with connection.cursor() as cursor:
                     cursor.execute(create_schema)
                     cursor.execute(init_db_as_string)
-                    cursor.execute(pop_db_as_string)
-
-                    # Récupérer tous les credentials et remplacer les mots de passe bruts
-                    cursor.execute(
-                        "SELECT id_utilisateur, mot_de_passe_hash FROM credentials;"
-                    )
-                    credentials = cursor.fetchall()
-
-                    for cred in credentials:
-                        # mot_de_passe_hash contient temporairement le mot de passe en clair (ex: "mdp1")
-                        mot_de_passe_clair = cred["mot_de_passe_hash"]
-                        sel = generer_salt()
-                        mot_de_passe_hash = hash_password(mot_de_passe_clair, sel)
-
-                        cursor.execute(
-                            """
-                            UPDATE credentials
-                            SET mot_de_passe_hash = %(hash)s, sel = %(sel)s
-                            WHERE id_utilisateur = %(id)s;
-                            """,
-                            {
-                                "hash": mot_de_passe_hash,
-                                "sel": sel,
-                                "id": cred["id_utilisateur"],
-                            },
-                        )
 
+                    if generateur is None:
+                        pop_db = open(pop_data_path, encoding="utf-8")
+                        cursor.execute(pop_db.read())
+                        pop_db.close()
+                        self._hacher_mots_de_passe(cursor)
+                    else:
+                        self._peupler_synthetique(cursor, generateur)
+                    self._recalculer_compteurs_abonnements(cursor)
+
+            # Caches, index et tampons décrits à partir de l'ancienne base : les DAO
+            # sont importés pour que tous les états enregistrés le soient, y compris
+            # lancé en ligne de commande
+            for module in pkgutil.iter_modules(dao.__path__):
+                importlib.import_module(f"dao.{module.name}")
+            reinitialiser_etats()
             logging.info("Base de données réinitialisée avec succès")
             return True
 
@@ -81,7 +122,131 @@ class ResetDatabase(metaclass=Singleton):
             logging.error(f"Erreur lors du reset de la base de données : {e}")
             raise
 
+    def _hacher_mots_de_passe(self, cursor):
+        """Remplace les mots de passe en clair des scripts de population par leur hash,
+        en une seule requête UPDATE pour tous les utilisateurs"""
+        cursor.execute("SELECT id_utilisateur, mot_de_passe_hash FROM credentials;")
+        credentials = cursor.fetchall()
+
+        def hacher(cred):
+            # mot_de_passe_hash contient temporairement le mot de passe en clair (ex: "mdp1")
+            sel = generer_salt()
+            return (cred["id_utilisateur"], hash_password(cred["mot_de_passe_hash"], sel), sel)
+
+        # bcrypt libère le GIL : les hash sont calculés en parallèle
+        with ThreadPoolExecutor() as pool:
+            valeurs = list(pool.map(hacher, credentials))
+
+        execute_values(
+            cursor,
+            """
+            UPDATE credentials c
+            SET mot_de_passe_hash = v.hash, sel = v.sel
+            FROM (VALUES %s) AS v(id, hash, sel)
+            WHERE c.id_utilisateur = v.id;
+            """,
+            valeurs,
+        )
+
+    def _recalculer_compteurs_abonnements(self, cursor):
+        """Initialise les compteurs nb_suiveurs / nb_suivis des utilisateurs à partir
+        des abonnements insérés par les scripts de population ou par COPY"""
+        cursor.execute(
+            """
+            UPDATE utilisateur u
+            SET nb_suiveurs = COALESCE(s.nb, 0), nb_suivis = COALESCE(v.nb, 0)
+            FROM utilisateur x
+            LEFT JOIN (
+                SELECT id_utilisateur_suivi AS id, COUNT(*) AS nb
+                FROM abonnement GROUP BY id_utilisateur_suivi
+            ) s ON s.id = x.id_utilisateur
+            LEFT JOIN (
+                SELECT id_utilisateur_suiveur AS id, COUNT(*) AS nb
+                FROM abonnement GROUP BY id_utilisateur_suiveur
+            ) v ON v.id = x.id_utilisateur
+            WHERE u.id_utilisateur = x.id_utilisateur;
+            """
+        )
+
+    def _copier(self, cursor, table: str, colonnes: list[str], lignes: Iterator[tuple]):
+        """Charge des lignes dans une table avec COPY FROM STDIN"""
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(colonnes)}) FROM STDIN",
+            _FluxCopy(lignes),
+        )
+        logging.info(f"COPY {table} : {cursor.rowcount} lignes")
+
+    def _peupler_synthetique(self, cursor, generateur: GenerateurDonnees):
+        """Peuple la base avec les données du générateur puis recale les séquences"""
+        self._copier(
+            cursor,
+            "utilisateur",
+            ["id_utilisateur", "pseudo", "nom", "prenom", "date_de_naissance", "sexe"],
+            generateur.lignes_utilisateurs(),
+        )
+        self._copier(
+            cursor,
+            "credentials",
+            ["id_utilisateur", "mot_de_passe_hash", "sel"],
+            generateur.lignes_credentials(),
+        )
+        self._copier(
+            cursor,
+            "activite",
+            ["id_activite", "id_utilisateur", "sport", "date_activite", "distance", "duree"],
+            generateur.lignes_activites(),
+        )
+        self._copier(
+            cursor,
+            "abonnement",
+            ["id_utilisateur_suiveur", "id_utilisateur_suivi"],
+            generateur.lignes_abonnements(),
+        )
+        self._copier(
+            cursor, "jaime", ["id_activite", "id_auteur"], generateur.lignes_jaimes()
+        )
+        self._copier(
+            cursor,
+            "commentaire",
+            ["id_commentaire", "id_activite", "id_auteur", "contenu", "date_commentaire"],
+            generateur.lignes_commentaires(),
+        )
+
+        # Les ids ont été fournis explicitement : on recale les séquences SERIAL
+        for table, colonne in [
+            ("utilisateur", "id_utilisateur"),
+            ("activite", "id_activite"),
+            ("commentaire", "id_commentaire"),
+        ]:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', '{colonne}'), "
+                f"COALESCE((SELECT MAX({colonne}) FROM {table}), 0) + 1, false);"
+            )
+        cursor.execute("ANALYZE;")
+
 
 if __name__ == "__main__":
-    ResetDatabase().lancer()
-    ResetDatabase().lancer(True)
+    parser = argparse.ArgumentParser(description="Réinitialisation de la base de données")
+    parser.add_argument(
+        "--utilisateurs",
+        type=int,
+        default=None,
+        help="Peupler avec N utilisateurs synthétiques au lieu de data/pop_db.sql",
+    )
+    parser.add_argument(
+        "--activites", type=int, default=None, help="Nombre d'activités synthétiques"
+    )
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.utilisateurs:
+        ResetDatabase().lancer(
+            generateur=GenerateurDonnees(
+                nb_utilisateurs=args.utilisateurs,
+                nb_activites=args.activites or 10 * args.utilisateurs,
+                graine=args.graine,
+            )
+        )
+    else:
+        ResetDatabase().lancer()
+        ResetDatabase().lancer(True)
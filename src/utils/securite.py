@@ -1,5 +1,44 @@
-import hashlib
 import os
+import hmac
+import hashlib
+
+import bcrypt
+import dotenv
+
+from utils.cache import creer_cache, MANQUANT
+from utils.reinitialisation import a_reinitialiser
+
+dotenv.load_dotenv()
+
+# Format des hash stockés (le préfixe indique l'algorithme utilisé) :
+# - "<64 caractères hexadécimaux>"          : SHA-256(mot de passe + sel), format historique
+# - "$pbkdf2-sha256$<iterations>$<hex>"     : PBKDF2-HMAC-SHA256 avec le sel de la table
+# - "$2b$<cout>$..."                        : bcrypt (le sel est inclus dans le hash)
+PREFIXE_PBKDF2 = "$pbkdf2-sha256$"
+PREFIXES_BCRYPT = ("$2a$", "$2b$", "$2y$")
+
+KDF_DISPONIBLES = ("bcrypt", "pbkdf2", "sha256")
+
+
+def _kdf_configure() -> str:
+    """Algorithme utilisé pour les nouveaux hash (variable KDF_MOT_DE_PASSE)"""
+    kdf = os.environ.get("KDF_MOT_DE_PASSE", "bcrypt").lower()
+    if kdf not in KDF_DISPONIBLES:
+        raise ValueError(f"KDF_MOT_DE_PASSE doit valoir {', '.join(KDF_DISPONIBLES)}")
+    return kdf
+
+
+def _cout_bcrypt() -> int:
+    return int(os.environ.get("BCRYPT_COUT", "12"))
+
+
+def _iterations_pbkdf2() -> int:
+    return int(os.environ.get("PBKDF2_ITERATIONS", "600000"))
+
+
+def _octets_bcrypt(password: str) -> bytes:
+    # bcrypt n'utilise que les 72 premiers octets (et refuse les mots de passe plus longs)
+    return password.encode("utf-8")[:72]
 
 
 def generer_salt(taille: int = 16) -> str:
@@ -7,13 +46,103 @@ def generer_salt(taille: int = 16) -> str:
     return os.urandom(taille).hex()
 
 
-def hash_password(password: str, sel: str = "") -> str:
-    """Hachage du mot de passe avec SHA-256 et un sel."""
+def _hash_sha256(password: str, sel: str) -> str:
     password_bytes = password.encode("utf-8") + sel.encode("utf-8")
-    hash_object = hashlib.sha256(password_bytes)
-    return hash_object.hexdigest()
+    return hashlib.sha256(password_bytes).hexdigest()
+
+
+def _hash_pbkdf2(password: str, sel: str, iterations: int) -> str:
+    derive = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), sel.encode("utf-8"), iterations)
+    return f"{PREFIXE_PBKDF2}{iterations}${derive.hex()}"
+
+
+def hash_password(password: str, sel: str = "") -> str:
+    """Hachage du mot de passe avec l'algorithme configuré (KDF_MOT_DE_PASSE) et un sel."""
+    kdf = _kdf_configure()
+    if kdf == "bcrypt":
+        return bcrypt.hashpw(_octets_bcrypt(password), bcrypt.gensalt(_cout_bcrypt())).decode()
+    if kdf == "pbkdf2":
+        return _hash_pbkdf2(password, sel, _iterations_pbkdf2())
+    return _hash_sha256(password, sel)
 
 
 def verifier_mot_de_passe(mot_de_passe_clair: str, sel: str, hash_stocke: str) -> bool:
-    """Vérifie si le mot de passe clair correspond au hash stocké."""
-    return hash_password(mot_de_passe_clair, sel) == hash_stocke
+    """Vérifie si le mot de passe clair correspond au hash stocké, quel que soit son algorithme."""
+    if hash_stocke.startswith(PREFIXES_BCRYPT):
+        return bcrypt.checkpw(_octets_bcrypt(mot_de_passe_clair), hash_stocke.encode())
+    if hash_stocke.startswith(PREFIXE_PBKDF2):
+        iterations = int(hash_stocke[len(PREFIXE_PBKDF2) :].split("$", 1)[0])
+        calcule = _hash_pbkdf2(mot_de_passe_clair, sel, iterations)
+    else:
+        calcule = _hash_sha256(mot_de_passe_clair, sel)
+    return hmac.compare_digest(calcule, hash_stocke)
+
+
+def doit_etre_rehache(hash_stocke: str) -> bool:
+    """Vrai si le hash n'utilise pas l'algorithme (ou le coût) configuré actuellement :
+    il est alors recalculé à la prochaine connexion réussie."""
+    kdf = _kdf_configure()
+    if hash_stocke.startswith(PREFIXES_BCRYPT):
+        return kdf != "bcrypt" or int(hash_stocke[4:6]) < _cout_bcrypt()
+    if hash_stocke.startswith(PREFIXE_PBKDF2):
+        iterations = int(hash_stocke[len(PREFIXE_PBKDF2) :].split("$", 1)[0])
+        return kdf != "pbkdf2" or iterations < _iterations_pbkdf2()
+    return kdf != "sha256"
+
+
+class CacheIdentifiants:
+    """Cache des identifiants récemment vérifiés, pour ne pas recalculer un hash coûteux
+    (bcrypt) à chaque requête authentifiée
+
+    Une entrée par pseudo : empreinte HMAC du mot de passe (le mot de passe clair n'est
+    jamais conservé) et utilisateur. La clé HMAC est AUTH_CACHE_CLE si elle est définie
+    (nécessaire pour partager le cache entre processus), sinon une clé aléatoire.
+
+    Parameters
+    ----------
+    duree_vie : float
+        durée de validité (en secondes) d'une vérification
+    taille_max : int
+        nombre maximal d'entrées (cache en mémoire)
+    """
+
+    def __init__(self, duree_vie: float = 60, taille_max: int = 10000):
+        self.duree_vie = duree_vie
+        cle = os.environ.get("AUTH_CACHE_CLE")
+        self._cle = cle.encode("utf-8") if cle else os.urandom(32)
+        self._cache = creer_cache("identifiants", taille_max=taille_max, duree_vie=duree_vie)
+
+    def _empreinte(self, mot_de_passe: str) -> bytes:
+        return hmac.new(self._cle, mot_de_passe.encode("utf-8"), hashlib.sha256).digest()
+
+    def obtenir(self, pseudo: str, mot_de_passe: str):
+        """Utilisateur si ces identifiants ont été vérifiés récemment, sinon None"""
+        if self.duree_vie <= 0:
+            return None
+        entree = self._cache.obtenir(pseudo)
+        if entree is MANQUANT:
+            return None
+        empreinte_stockee, utilisateur = entree
+        if not hmac.compare_digest(self._empreinte(mot_de_passe), empreinte_stockee):
+            return None
+        return utilisateur
+
+    def ajouter(self, pseudo: str, mot_de_passe: str, utilisateur):
+        if self.duree_vie <= 0:
+            return
+        self._cache.ajouter(pseudo, (self._empreinte(mot_de_passe), utilisateur))
+
+    def oublier(self, pseudo: str):
+        """Retire un pseudo du cache (modification ou suppression du compte)"""
+        self._cache.supprimer(pseudo)
+
+    def vider(self):
+        self._cache.vider()
+
+
+cache_identifiants = CacheIdentifiants(
+    duree_vie=float(os.environ.get("AUTH_CACHE_TTL", "60")),
+    taille_max=int(os.environ.get("AUTH_CACHE_TAILLE", "10000")),
+)
+# Les identifiants vérifiés avant un reset de la base ne sont plus valables
+a_reinitialiser(cache_identifiants.vider)
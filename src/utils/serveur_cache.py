@@ -0,0 +1,129 @@
+"""Serveur de cache local, compatible avec le sous-ensemble du protocole texte de
+memcached utilisé par CacheReseau (get, set, add, delete, incr, flush_all)
+
+Il remplace memcached en développement ou pour les tests. Les données ne sont pas
+persistées et aucune limite de mémoire n'est appliquée.
+
+Lancement (depuis la racine du projet) :
+    python src/utils/serveur_cache.py --port 11211
+puis CACHE_BACKEND=reseau, CACHE_SERVEUR=localhost:11211 et CACHE_CLE dans le .env
+"""
+
+import time
+import argparse
+import threading
+import socketserver
+
+
+class _Stockage:
+    def __init__(self):
+        self.entrees = {}
+        self.verrou = threading.Lock()
+
+    def lire(self, cle):
+        entree = self.entrees.get(cle)
+        if entree is None:
+            return None
+        expiration = entree[1]
+        if expiration and expiration < time.monotonic():
+            del self.entrees[cle]
+            return None
+        return entree
+
+
+class _Gestionnaire(socketserver.StreamRequestHandler):
+    def handle(self):
+        stockage = self.server.stockage
+        while True:
+            ligne = self.rfile.readline()
+            if not ligne:
+                return
+            morceaux = ligne.split()
+            if not morceaux:
+                continue
+            commande = morceaux[0]
+
+            if commande in (b"set", b"add"):
+                cle, flags, expiration, taille = morceaux[1:5]
+                donnees = self.rfile.read(int(taille) + 2)[:-2]
+                expiration = time.monotonic() + int(expiration) if int(expiration) else 0
+                with stockage.verrou:
+                    if commande == b"add" and stockage.lire(cle) is not None:
+                        reponse = b"NOT_STORED"
+                    else:
+                        stockage.entrees[cle] = (int(flags), expiration, donnees)
+                        reponse = b"STORED"
+
+            elif commande == b"get":
+                reponses = []
+                with stockage.verrou:
+                    for cle in morceaux[1:]:
+                        entree = stockage.lire(cle)
+                        if entree is not None:
+                            flags, _, donnees = entree
+                            reponses.append(
+                                b"VALUE %s %d %d\r\n%s\r\n" % (cle, flags, len(donnees), donnees)
+                            )
+                reponse = b"".join(reponses) + b"END"
+
+            elif commande == b"delete":
+                with stockage.verrou:
+                    trouve = stockage.entrees.pop(morceaux[1], None) is not None
+                reponse = b"DELETED" if trouve else b"NOT_FOUND"
+
+            elif commande in (b"incr", b"decr"):
+                cle, delta = morceaux[1], int(morceaux[2])
+                with stockage.verrou:
+                    entree = stockage.lire(cle)
+                    if entree is None:
+                        reponse = b"NOT_FOUND"
+                    else:
+                        flags, expiration, donnees = entree
+                        valeur = int(donnees) + (delta if commande == b"incr" else -delta)
+                        valeur = max(0, valeur)
+                        stockage.entrees[cle] = (flags, expiration, b"%d" % valeur)
+                        reponse = b"%d" % valeur
+
+            elif commande == b"flush_all":
+                with stockage.verrou:
+                    stockage.entrees.clear()
+                reponse = b"OK"
+
+            elif commande == b"version":
+                reponse = b"VERSION serveur_cache"
+
+            elif commande == b"quit":
+                return
+
+            else:
+                reponse = b"ERROR"
+
+            self.wfile.write(reponse + b"\r\n")
+            self.wfile.flush()
+
+
+class ServeurCache(socketserver.ThreadingTCPServer):
+    """Serveur de cache (un thread par connexion cliente)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, hote: str = "localhost", port: int = 11211):
+        super().__init__((hote, port), _Gestionnaire)
+        self.stockage = _Stockage()
+
+    def demarrer_en_arriere_plan(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="ServeurCache", daemon=True)
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur de cache local (protocole memcached)")
+    parser.add_argument("--hote", default="localhost")
+    parser.add_argument("--port", type=int, default=11211)
+    args = parser.parse_args()
+
+    with ServeurCache(args.hote, args.port) as serveur:
+        print(f"Serveur de cache en écoute sur {args.hote}:{args.port}")
+        serveur.serve_forever()
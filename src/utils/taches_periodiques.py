@@ -0,0 +1,67 @@
+"""Tâches de fond exécutées à intervalle régulier dans un thread dédié
+
+Démarrées et arrêtées avec l'application (lifespan dans app.py). Une exception levée
+par une exécution est journalisée sans arrêter la tâche.
+"""
+
+import time
+import logging
+import threading
+
+
+class TachePeriodique:
+    """Exécute fonction() toutes les intervalle secondes
+
+    Parameters
+    ----------
+    nom : str
+        nom de la tâche (nom du thread, logs)
+    intervalle : float
+        délai (en secondes) entre la fin d'une exécution et le début de la suivante
+    fonction : Callable[[], None]
+        traitement à exécuter
+    delai_initial : float
+        délai avant la première exécution
+    """
+
+    def __init__(self, nom: str, intervalle: float, fonction, delai_initial: float = 0):
+        self.nom = nom
+        self.intervalle = intervalle
+        self.fonction = fonction
+        self.delai_initial = delai_initial
+        self._arret = threading.Event()
+        self._thread = None
+
+    def demarrer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._boucle, name=self.nom, daemon=True)
+        self._thread.start()
+
+    def arreter(self, attente: float = 5):
+        """Demande l'arrêt et attend au plus attente secondes la fin de l'exécution en cours"""
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join(attente)
+            self._thread = None
+
+    def executer(self):
+        """Une exécution, les erreurs sont journalisées"""
+        debut = time.perf_counter()
+        try:
+            self.fonction()
+        except Exception:
+            logging.exception(f"Échec de la tâche {self.nom}")
+            return
+        logging.info(
+            f"Tâche {self.nom} exécutée en {(time.perf_counter() - debut) * 1000:.0f} ms"
+        )
+
+    def _boucle(self):
+        if self._arret.wait(self.delai_initial):
+            return
+        while True:
+            self.executer()
+            if self._arret.wait(self.intervalle):
+                return
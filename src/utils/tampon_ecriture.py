@@ -0,0 +1,135 @@
+"""Tampon d'écriture : éléments accumulés en mémoire puis écrits par lots
+
+Les requêtes ne font qu'ajouter l'élément au tampon (pas d'écriture synchrone en base).
+Un thread dédié écrit le contenu du tampon dès que taille_lot éléments sont en attente,
+et au plus tard toutes les intervalle secondes. Une écriture en échec est retentée au
+lot suivant ; au-delà de taille_max éléments en attente, les nouveaux sont perdus
+(journalisés) plutôt que de saturer la mémoire.
+
+Le tampon est vidé à l'arrêt de l'application (lifespan dans app.py). Les éléments
+ajoutés depuis la dernière écriture sont perdus si le processus est tué.
+"""
+
+import logging
+import threading
+
+
+class TamponEcriture:
+    """Accumule des éléments et les transmet par lots à la fonction d'écriture
+
+    Parameters
+    ----------
+    nom : str
+        nom du tampon (nom du thread, logs)
+    ecrire : Callable[[list], None]
+        écrit un lot d'éléments (au plus taille_lot)
+    taille_lot : int
+        nombre d'éléments qui déclenche une écriture
+    intervalle : float
+        délai maximal (en secondes) entre l'ajout d'un élément et son écriture
+    taille_max : int
+        nombre maximal d'éléments en attente
+    """
+
+    def __init__(
+        self,
+        nom: str,
+        ecrire,
+        taille_lot: int = 500,
+        intervalle: float = 0.2,
+        taille_max: int = 100_000,
+    ):
+        self.nom = nom
+        self.ecrire = ecrire
+        self.taille_lot = taille_lot
+        self.intervalle = intervalle
+        self.taille_max = taille_max
+        self._elements = []
+        self._verrou = threading.Lock()
+        self._verrou_ecriture = threading.Lock()
+        self._reveil = threading.Event()
+        self._arret = threading.Event()
+        self._thread = None
+        self.nb_perdus = 0
+
+    def __len__(self) -> int:
+        return len(self._elements)
+
+    def ajouter(self, element):
+        """Ajoute un élément, écrit au plus tard intervalle secondes après"""
+        with self._verrou:
+            if len(self._elements) >= self.taille_max:
+                self.nb_perdus += 1
+                logging.warning(f"Tampon {self.nom} plein : élément perdu")
+                return
+            self._elements.append(element)
+            plein = len(self._elements) >= self.taille_lot
+        if self._thread is None:
+            self.demarrer()
+        if plein:
+            self._reveil.set()
+
+    def vider(self) -> int:
+        """Écrit immédiatement tous les éléments en attente
+
+        Returns
+        -------
+        int
+            nombre d'éléments écrits
+        """
+        nb_ecrits = 0
+        with self._verrou_ecriture:
+            while True:
+                with self._verrou:
+                    lot = self._elements[: self.taille_lot]
+                    del self._elements[: self.taille_lot]
+                if not lot:
+                    return nb_ecrits
+                try:
+                    self.ecrire(lot)
+                except Exception:
+                    # Remis en tête : l'ordre d'ajout est conservé
+                    with self._verrou:
+                        self._elements[:0] = lot
+                    raise
+                nb_ecrits += len(lot)
+
+    def abandonner(self) -> int:
+        """Oublie les éléments en attente sans les écrire (après une réinitialisation
+        de la base)"""
+        with self._verrou:
+            nb, self._elements = len(self._elements), []
+        return nb
+
+    def demarrer(self):
+        with self._verrou:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._arret.clear()
+            self._thread = threading.Thread(
+                target=self._boucle, name=f"tampon-{self.nom}", daemon=True
+            )
+            self._thread.start()
+
+    def arreter(self, attente: float = 5):
+        """Arrête le thread puis écrit les éléments restants"""
+        self._arret.set()
+        self._reveil.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(attente)
+        self._vider_journalise()
+
+    def _vider_journalise(self):
+        try:
+            self.vider()
+        except Exception:
+            logging.exception(f"Échec de l'écriture du tampon {self.nom}")
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            self._reveil.wait(self.intervalle)
+            self._reveil.clear()
+            if self._arret.is_set():
+                return
+            self._vider_journalise()
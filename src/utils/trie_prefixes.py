@@ -0,0 +1,114 @@
+"""Arbre des préfixes (trie) des résultats d'autocomplétion
+
+Chaque nœud correspond à un préfixe et garde les meilleurs résultats lus en base pour
+ce préfixe (au plus taille_resultats, dans l'ordre de la base). Quand un nœud a moins
+de taille_resultats résultats, sa liste est complète : les préfixes plus longs sont
+servis en la filtrant, sans accès à la base. Les frappes successives d'un même mot
+("j", "jo", "joh"...) ne lisent donc la base que tant que les listes sont tronquées.
+
+Seuls les nœuds situés sur le chemin d'un mot modifié sont invalidés (invalider).
+Les résultats expirent après duree_vie secondes (modifications faites par d'autres
+processus).
+"""
+
+import time
+import threading
+
+
+class _Noeud:
+    __slots__ = ("enfants", "resultats", "instant")
+
+    def __init__(self):
+        self.enfants = {}
+        self.resultats = None  # list[tuple[int, str]] : (identifiant, mot)
+        self.instant = 0.0
+
+
+class TriePrefixes:
+    """Résultats d'autocomplétion indexés par préfixe
+
+    Parameters
+    ----------
+    taille_resultats : int
+        nombre de résultats gardés par préfixe
+    duree_vie : float
+        durée (en secondes) de validité des résultats
+    nb_listes_max : int
+        nombre maximal de préfixes dont les résultats sont gardés (au-delà, le trie
+        est vidé)
+    horloge : Callable[[], float]
+        source du temps, remplaçable dans les tests
+    """
+
+    def __init__(
+        self,
+        taille_resultats: int = 20,
+        duree_vie: float = 60,
+        nb_listes_max: int = 100_000,
+        horloge=time.monotonic,
+    ):
+        self.taille_resultats = taille_resultats
+        self.duree_vie = duree_vie
+        self.nb_listes_max = nb_listes_max
+        self.horloge = horloge
+        self._verrou = threading.Lock()
+        self.vider()
+
+    def vider(self):
+        self._racine = _Noeud()
+        self._nb_listes = 0
+
+    def _frais(self, noeud: _Noeud, maintenant: float) -> bool:
+        return (
+            noeud.resultats is not None and maintenant - noeud.instant < self.duree_vie
+        )
+
+    def obtenir(self, prefixe: str) -> list[tuple] | None:
+        """Résultats du préfixe (en minuscules) sans accès à la base, None s'ils
+        doivent être lus en base"""
+        maintenant = self.horloge()
+        with self._verrou:
+            noeud = self._racine
+            for i in range(len(prefixe) + 1):
+                if self._frais(noeud, maintenant):
+                    if i == len(prefixe):
+                        return list(noeud.resultats)
+                    if len(noeud.resultats) < self.taille_resultats:
+                        # Liste complète d'un préfixe plus court : filtrée
+                        return [
+                            (ident, mot)
+                            for ident, mot in noeud.resultats
+                            if mot.lower().startswith(prefixe)
+                        ]
+                if i == len(prefixe):
+                    return None
+                noeud = noeud.enfants.get(prefixe[i])
+                if noeud is None:
+                    return None
+
+    def enregistrer(self, prefixe: str, resultats: list[tuple]):
+        """Garde les résultats lus en base pour le préfixe (en minuscules)"""
+        with self._verrou:
+            if self._nb_listes >= self.nb_listes_max:
+                self.vider()
+            noeud = self._racine
+            for caractere in prefixe:
+                noeud = noeud.enfants.setdefault(caractere, _Noeud())
+            if noeud.resultats is None:
+                self._nb_listes += 1
+            noeud.resultats = list(resultats[: self.taille_resultats])
+            noeud.instant = self.horloge()
+
+    def invalider(self, mot: str):
+        """Oublie les résultats de tous les préfixes du mot (créé, modifié ou
+        supprimé)"""
+        with self._verrou:
+            noeud = self._racine
+            for caractere in [""] + list(mot.lower()):
+                if caractere:
+                    noeud = noeud.enfants.get(caractere)
+                    if noeud is None:
+                        return
+                if noeud.resultats is not None:
+                    noeud.resultats = None
+                    self._nb_listes -= 1
@@ -0,0 +1,53 @@
+"""Versions des ressources, pour les ETags et les requêtes conditionnelles (If-None-Match)
+
+Une version est un jeton aléatoire associé à une ressource (ex: ("activites", id_utilisateur)),
+stocké dans le cache "versions" (partagé entre workers selon CACHE_BACKEND). Les DAO
+changent le jeton après chaque écriture validée. Un jeton aléatoire plutôt qu'un compteur :
+après un redémarrage ou une éviction, une ressource ne peut pas retrouver une ancienne
+version déjà connue d'un client.
+"""
+
+import secrets
+
+from utils.cache import creer_cache, MANQUANT
+from utils.reinitialisation import a_reinitialiser
+
+# Version de la représentation JSON : à changer si le format des réponses change
+VERSION_FORMAT = "1"
+
+_versions = creer_cache("versions", taille_max=100000, duree_vie=24 * 3600)
+
+
+def version(type_ressource: str, id_ressource: int) -> str:
+    """Jeton de version courant de la ressource (créé s'il n'existe pas)"""
+    jeton = _versions.obtenir((type_ressource, id_ressource))
+    if jeton is MANQUANT:
+        jeton = secrets.token_hex(8)
+        _versions.ajouter((type_ressource, id_ressource), jeton)
+    return jeton
+
+
+def changer_version(type_ressource: str, *ids_ressources: int):
+    """À appeler après une écriture : les ETags déjà transmis deviennent invalides"""
+    for id_ressource in set(ids_ressources):
+        _versions.ajouter((type_ressource, id_ressource), secrets.token_hex(8))
+
+
+def etag(type_ressource: str, id_ressource: int) -> str:
+    """ETag (faible) de la ressource"""
+    return f'W/"{type_ressource}-{id_ressource}-{VERSION_FORMAT}-{version(type_ressource, id_ressource)}"'
+
+
+def etag_correspond(if_none_match: str | None, valeur_etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match contient l'ETag (comparaison faible)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    attendu = valeur_etag.removeprefix("W/")
+    return any(e.strip().removeprefix("W/") == attendu for e in if_none_match.split(","))
+
+
+@a_reinitialiser
+def vider():
+    _versions.vider()